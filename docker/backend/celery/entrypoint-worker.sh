@@ -13,9 +13,9 @@ if [ "${CELERY_SKIP_SYNC:-0}" != "1" ]; then
   python -m itcj2.cli.main celery sync-tasks || echo "Advertencia: sync-tasks falló, continuando..."
 fi
 
-echo "[celery-worker] Iniciando worker Celery (queues=${CELERY_QUEUES:-default,reports,notifications})..."
+echo "[celery-worker] Iniciando worker Celery (queues=${CELERY_QUEUES:-default,reports,notifications,media,email})..."
 exec celery -A itcj2.celery_app worker \
   --loglevel=info \
   --concurrency="${CELERY_WORKER_CONCURRENCY:-4}" \
-  --queues="${CELERY_QUEUES:-default,reports,notifications}" \
+  --queues="${CELERY_QUEUES:-default,reports,notifications,media,email}" \
   --hostname="${CELERY_HOSTNAME:-worker}@%h"
@@ -18,6 +18,7 @@ from itcj2.apps.agendatec.schemas.admin import ChangeRequestStatusBody, AdminCre
 from itcj2.apps.agendatec.models.appointment import Appointment
 from itcj2.apps.agendatec.models.request import Request as Req
 from itcj2.apps.agendatec.models.time_slot import TimeSlot
+from itcj2.apps.agendatec.services.request_service import invalidate_student_history
 from itcj2.core.models.coordinator import Coordinator
 from itcj2.core.models.program import Program
 from itcj2.core.models.program_coordinator import ProgramCoordinator
@@ -274,6 +275,7 @@ def admin_create_request(
         )
         db.add(r)
         db.commit()
+        invalidate_student_history(body.student_id)
 
         try:
             coord_ids = [
@@ -385,6 +387,7 @@ def admin_create_request(
         )
         db.add(ap)
         db.commit()
+        invalidate_student_history(body.student_id)
 
         try:
             from itcj2.sockets.requests import broadcast_appointment_created
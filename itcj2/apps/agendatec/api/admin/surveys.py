@@ -13,8 +13,8 @@ from itcj2.dependencies import DbSession, require_perms
 from itcj2.apps.agendatec.helpers import parse_range_from_params
 from itcj2.apps.agendatec.models.request import Request as Req
 from itcj2.core.models.user import User
+from itcj2.core.services import email_outbox
 from itcj2.core.utils.email_tools import student_email
-from itcj2.core.utils.msgraph_mail import acquire_token_silent, graph_send_mail
 
 router = APIRouter(tags=["agendatec-admin-surveys"])
 logger = logging.getLogger(__name__)
@@ -139,9 +139,11 @@ def send_surveys(
     user: dict = SurveyPerm,
     db: DbSession = None,
 ):
-    """Envía correos de encuesta a estudiantes atendidos."""
-    token = acquire_token_silent("agendatec")
-    if not token:
+    """Encola correos de encuesta a estudiantes atendidos (outbox, cola `email`).
+
+    Un correo por alumno: la cola los envía a Graph en lotes de hasta 20.
+    """
+    if not email_outbox.is_connected("agendatec"):
         raise HTTPException(
             status_code=401,
             detail={"error": "no_ms_session", "message": "Inicia sesión en la pestaña 'Conexión Outlook'."},
@@ -175,12 +177,8 @@ def send_surveys(
     subject = "📋 Tu opinión nos importa | AgendaTec"
     html = _SURVEY_HTML_TEMPLATE.format(forms_url=forms_url, year=datetime.now().year)
 
-    sent, errors = 0, []
     for addr in targets:
-        r = graph_send_mail(token, subject, html, [addr])
-        if r.status_code in (200, 202):
-            sent += 1
-        else:
-            errors.append({"to": addr, "status": r.status_code, "body": r.text})
+        email_outbox.enqueue(db, "agendatec", addr, subject, html, ref="agendatec:survey")
+    db.commit()
 
-    return {"ok": True, "sent": sent, "errors": errors, "total_targets": len(targets)}
+    return {"ok": True, "queued": len(targets), "errors": [], "total_targets": len(targets)}
@@ -14,6 +14,7 @@ from itcj2.apps.agendatec.schemas.coord import UpdateAppointmentBody
 from itcj2.apps.agendatec.models.appointment import Appointment
 from itcj2.apps.agendatec.models.request import Request
 from itcj2.apps.agendatec.models.time_slot import TimeSlot
+from itcj2.apps.agendatec.services.request_service import invalidate_student_history
 from itcj2.core.models.coordinator import Coordinator
 from itcj2.core.models.program import Program
 from itcj2.core.models.program_coordinator import ProgramCoordinator
@@ -304,6 +305,7 @@ async def update_appointment(
 
     ap.status = new_status
     db.commit()
+    invalidate_student_history(req.student_id)
 
     try:
         from itcj2.sockets.requests import broadcast_request_status_changed
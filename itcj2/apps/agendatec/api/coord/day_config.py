@@ -26,6 +26,7 @@ from itcj2.apps.agendatec.schemas.coord import (
 )
 from itcj2.apps.agendatec.models.availability_window import AvailabilityWindow
 from itcj2.apps.agendatec.models.time_slot import TimeSlot
+from itcj2.apps.agendatec.services.request_service import invalidate_student_history
 from itcj2.apps.agendatec.services.slot_service import SlotService
 from itcj2.core.services import period_service
 from itcj2.utils import async_broadcast as _async_broadcast
@@ -134,6 +135,10 @@ def _post_commit_effects(db, d, plan, result):
     except Exception:
         logger.exception("No se pudieron limpiar los holds de los slots borrados")
 
+    # El historial del alumno muestra el horario de la cita: el acortado lo cambió.
+    for student_id in result.history_student_ids:
+        invalidate_student_history(student_id)
+
     try:
         _async_broadcast(broadcast_slots_window_changed(str(d)))
     except Exception:
@@ -14,6 +14,7 @@ from itcj2.apps.agendatec.schemas.coord import UpdateRequestStatusBody
 from itcj2.apps.agendatec.models.appointment import Appointment
 from itcj2.apps.agendatec.models.request import Request
 from itcj2.apps.agendatec.models.time_slot import TimeSlot
+from itcj2.apps.agendatec.services.request_service import invalidate_student_history
 from itcj2.core.models.user import User
 from itcj2.core.services import period_service
 from itcj2.core.services.notification_service import NotificationService
@@ -170,6 +171,7 @@ async def update_request_status(
                     SlotService.reconcile_slot_programs(db, slot)
 
     db.commit()
+    invalidate_student_history(r.student_id)
 
     # WS: broadcast cambio de estado de la solicitud
     try:
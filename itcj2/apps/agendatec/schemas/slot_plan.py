@@ -111,3 +111,6 @@ class SplitResult:
     slots_deleted: int = 0
     slots_shortened: int = 0
     affected: List[AffectedAppointment] = field(default_factory=list)
+    # Alumnos con alguna cita (de cualquier estado) en un slot acortado: su
+    # historial cacheado muestra el horario viejo.
+    history_student_ids: List[int] = field(default_factory=list)
@@ -0,0 +1,783 @@
+"""
+Capa de reportes administrativos de AgendaTec.
+
+Dos consumidores:
+- `api/admin/stats.py` → `coordinator_stats()`: totales por coordinador y por
+  día resueltos en UNA consulta con `GROUP BY ROLLUP` / `GROUPING SETS`. Antes se
+  traían todas las filas agrupadas y se doblaban en Python con `defaultdict`
+  anidados por coordinador y por día.
+- `api/admin/reports.py` y `tasks/agendatec_tasks.py` → `write_requests_xlsx()`:
+  el Excel de solicitudes se escribe en streaming desde una proyección de
+  columnas (sin `joinedload` de cinco cadenas de relaciones, sin pandas) sobre
+  xlsxwriter en modo `constant_memory`. Los resúmenes por día/estado también
+  salen de SQL, así que la memoria no crece con el rango.
+
+Solo Postgres: ROLLUP, GROUPING SETS y `COUNT(*) FILTER` no existen en SQLite.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy import Date, and_, cast, func, literal, or_, select, tuple_, union_all
+from sqlalchemy.orm import Session, aliased
+
+from itcj2.apps.agendatec.models.appointment import Appointment
+from itcj2.apps.agendatec.models.request import Request as Req
+from itcj2.apps.agendatec.models.time_slot import TimeSlot
+from itcj2.core.models.academic_period import AcademicPeriod
+from itcj2.core.models.coordinator import Coordinator
+from itcj2.core.models.program import Program
+from itcj2.core.models.program_coordinator import ProgramCoordinator
+from itcj2.core.models.user import User
+
+logger = logging.getLogger(__name__)
+
+STATE_KEYS = (
+    "RESOLVED_SUCCESS", "RESOLVED_NOT_COMPLETED", "ATTENDED_OTHER_SLOT",
+    "NO_SHOW", "CANCELED", "PENDING",
+)
+_ATTENDED = ("RESOLVED_SUCCESS", "RESOLVED_NOT_COMPLETED", "ATTENDED_OTHER_SLOT")
+_UNATTENDED = ("NO_SHOW", "CANCELED")
+
+DEFAULT_CITAS_COLS = [
+    "ID", "Día", "Horario", "Programa", "Alumno", "NoControl",
+    "Coordinador", "EstadoSolicitud", "EstadoCita", "Período",
+    "Descripción", "ComentarioCoord", "Creado", "Actualizado",
+]
+DEFAULT_BAJAS_COLS = [
+    "ID", "Programa", "Alumno", "NoControl", "Coordinador",
+    "Estado", "Período", "Descripción", "ComentarioCoord",
+    "Creado", "Actualizado",
+]
+SUMMARY_OPTS = {"total", "coordinator", "program"}
+
+_COL_WIDTHS = {
+    "ID": 8, "Día": 12, "Horario": 14, "Programa": 22, "Alumno": 32,
+    "NoControl": 13, "Coordinador": 26, "EstadoSolicitud": 20, "EstadoCita": 16,
+    "Período": 16, "Descripción": 45, "ComentarioCoord": 45, "Creado": 17,
+    "Actualizado": 17, "Estado": 20,
+}
+
+# Orden de las columnas de estado en los resúmenes (ya traducidas).
+_ESTADOS = ["Resuelta", "Atendida sin resolver", "No asistió", "Asistió otro horario", "Pendiente", "Cancelada"]
+
+# Cada cuántas filas se reporta progreso al callback (tarea Celery).
+_PROGRESS_EVERY = 500
+
+
+def translate_request_status(status: str) -> str:
+    return {
+        "PENDING": "Pendiente",
+        "RESOLVED_SUCCESS": "Resuelta",
+        "RESOLVED_NOT_COMPLETED": "Atendida sin resolver",
+        "NO_SHOW": "No asistió",
+        "ATTENDED_OTHER_SLOT": "Asistió otro horario",
+        "CANCELED": "Cancelada",
+    }.get(status, status)
+
+
+def translate_appointment_status(status: str) -> str:
+    return {
+        "SCHEDULED": "Programada",
+        "DONE": "Completada",
+        "NO_SHOW": "No asistió",
+        "CANCELED": "Cancelada",
+    }.get(status, status)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ESTADÍSTICA POR COORDINADOR (GROUP BY ROLLUP)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _coordinator_rows(start_date, end_date, rtype: str):
+    """Subconsulta (coord_id, coord_name, day, status) con una fila por solicitud
+    atribuida a un coordinador.
+
+    Las citas se atribuyen al coordinador de la cita y se fechan por el día del
+    slot; las bajas a TODOS los coordinadores de la carrera y se fechan por
+    `updated_at` — mismo criterio que la versión anterior del endpoint.
+    """
+    parts = []
+    if rtype in ("ALL", "APPOINTMENT"):
+        parts.append(
+            select(
+                Coordinator.id.label("coord_id"),
+                User.full_name.label("coord_name"),
+                TimeSlot.day.label("day"),
+                Req.status.label("status"),
+            )
+            .select_from(Req)
+            .join(Appointment, Appointment.request_id == Req.id)
+            .join(TimeSlot, TimeSlot.id == Appointment.slot_id)
+            .join(Coordinator, Coordinator.id == Appointment.coordinator_id)
+            .join(User, User.id == Coordinator.user_id)
+            .where(Req.type == "APPOINTMENT", TimeSlot.day >= start_date, TimeSlot.day <= end_date)
+        )
+    if rtype in ("ALL", "DROP"):
+        drop_day = cast(Req.updated_at, Date)
+        parts.append(
+            select(
+                Coordinator.id.label("coord_id"),
+                User.full_name.label("coord_name"),
+                drop_day.label("day"),
+                Req.status.label("status"),
+            )
+            .select_from(Req)
+            .join(ProgramCoordinator, ProgramCoordinator.program_id == Req.program_id)
+            .join(Coordinator, Coordinator.id == ProgramCoordinator.coordinator_id)
+            .join(User, User.id == Coordinator.user_id)
+            .where(Req.type == "DROP", drop_day >= start_date, drop_day <= end_date)
+        )
+    if len(parts) == 1:
+        return parts[0].subquery("coord_rows")
+    return union_all(*parts).subquery("coord_rows")
+
+
+def _bucket(row, want_states: bool, day: Optional[str] = None) -> dict:
+    out = {"day": day} if day is not None else {}
+    out.update({
+        "total": int(row.total or 0),
+        "pending": int(row.pending or 0),
+        "attended": int(row.attended or 0),
+        "unattended": int(row.unattended or 0),
+    })
+    if want_states:
+        out["states"] = {k: int(getattr(row, f"s_{k.lower()}") or 0) for k in STATE_KEYS}
+    return out
+
+
+def coordinator_stats(
+    db: Session,
+    start_date,
+    end_date,
+    *,
+    rtype: str = "ALL",
+    by_day: bool = False,
+    want_states: bool = True,
+) -> dict:
+    """Totales por coordinador (y opcionalmente por día) en una sola consulta.
+
+    Niveles que devuelve la agrupación, distinguidos con `GROUPING()`:
+        (coordinador, día) → `coordinators[].days[]`      (solo by_day)
+        (coordinador)      → `coordinators[].totals`
+        (día)              → `overall_by_day[]`           (solo by_day)
+        ()                 → `overall`
+
+    Returns:
+        dict con claves overall, coordinators y, si by_day, overall_by_day.
+    """
+    rows = _coordinator_rows(start_date, end_date, rtype)
+    st = rows.c.status
+    coord = tuple_(rows.c.coord_id, rows.c.coord_name)
+
+    cols = [
+        rows.c.coord_id,
+        rows.c.coord_name,
+        func.grouping(rows.c.coord_id).label("g_coord"),
+        func.count().label("total"),
+        func.count().filter(st == "PENDING").label("pending"),
+        func.count().filter(st.in_(_ATTENDED)).label("attended"),
+        func.count().filter(st.in_(_UNATTENDED)).label("unattended"),
+    ]
+    if want_states:
+        cols += [func.count().filter(st == k).label(f"s_{k.lower()}") for k in STATE_KEYS]
+
+    if by_day:
+        cols += [rows.c.day, func.grouping(rows.c.day).label("g_day")]
+        # ROLLUP((coord), day) da (coord, day), (coord) y (); el (day) suelto
+        # alimenta overall_by_day.
+        group = func.grouping_sets(
+            tuple_(rows.c.coord_id, rows.c.coord_name, rows.c.day),
+            coord,
+            tuple_(rows.c.day),
+            tuple_(),
+        )
+    else:
+        group = func.rollup(coord)
+
+    result = db.execute(select(*cols).group_by(group)).all()
+
+    overall: dict = {}
+    overall_by_day = []
+    per_coord: dict[int, dict] = {}
+    per_coord_days: dict[int, list] = {}
+
+    for r in result:
+        coord_level = not r.g_coord
+        day_level = by_day and not r.g_day
+        if coord_level:
+            cid = int(r.coord_id)
+            if day_level:
+                if r.day is not None:
+                    per_coord_days.setdefault(cid, []).append(_bucket(r, want_states, r.day.isoformat()))
+            else:
+                per_coord[cid] = {
+                    "coordinator_id": cid,
+                    "coordinator_name": r.coord_name,
+                    "totals": _bucket(r, want_states),
+                }
+        elif day_level:
+            if r.day is not None:
+                overall_by_day.append(_bucket(r, want_states, r.day.isoformat()))
+        else:
+            overall = _bucket(r, want_states)
+
+    coord_list = []
+    for cid, obj in sorted(per_coord.items(), key=lambda kv: kv[1]["coordinator_name"] or ""):
+        if by_day:
+            obj["days"] = sorted(per_coord_days.get(cid, []), key=lambda d: d["day"])
+        coord_list.append(obj)
+
+    out = {"overall": overall, "coordinators": coord_list}
+    if by_day:
+        out["overall_by_day"] = sorted(overall_by_day, key=lambda d: d["day"])
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REPORTE XLSX DE SOLICITUDES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _report_rows_cte(filters: dict):
+    """CTE con la proyección mínima que necesita el Excel, ya filtrada.
+
+    `filters` es JSON-serializable a propósito (viaja tal cual a la tarea
+    Celery): start/end en ISO, listas de ids y estados, period_id, q, type.
+    El coordinador es el de la cita y, si no hay, el primero de la carrera
+    (por coordinator_id, para que sea determinista).
+    """
+    from datetime import datetime
+
+    student = aliased(User, name="stu")
+    apt_user = aliased(User, name="apt_user")
+    pc_user = aliased(User, name="pc_user")
+    pc_coord = aliased(Coordinator, name="pc_coord")
+
+    first_program_coord = (
+        select(pc_user.full_name)
+        .select_from(ProgramCoordinator)
+        .join(pc_coord, pc_coord.id == ProgramCoordinator.coordinator_id)
+        .join(pc_user, pc_user.id == pc_coord.user_id)
+        .where(ProgramCoordinator.program_id == Req.program_id)
+        .order_by(ProgramCoordinator.coordinator_id)
+        .limit(1)
+        .correlate(Req)
+        .scalar_subquery()
+    )
+
+    stmt = (
+        select(
+            Req.id.label("id"),
+            Req.type.label("type"),
+            Req.status.label("status"),
+            Req.description.label("description"),
+            Req.coordinator_comment.label("coordinator_comment"),
+            Req.created_at.label("created_at"),
+            Req.updated_at.label("updated_at"),
+            Program.name.label("program_name"),
+            student.full_name.label("student_name"),
+            student.control_number.label("control_number"),
+            AcademicPeriod.name.label("period_name"),
+            Appointment.status.label("apt_status"),
+            TimeSlot.day.label("slot_day"),
+            TimeSlot.start_time.label("slot_start"),
+            TimeSlot.end_time.label("slot_end"),
+            TimeSlot.is_booked.label("slot_booked"),
+            func.coalesce(apt_user.full_name, first_program_coord).label("coordinator_name"),
+        )
+        .select_from(Req)
+        .outerjoin(Program, Program.id == Req.program_id)
+        .outerjoin(student, student.id == Req.student_id)
+        .outerjoin(AcademicPeriod, AcademicPeriod.id == Req.period_id)
+        .outerjoin(Appointment, Appointment.request_id == Req.id)
+        .outerjoin(TimeSlot, TimeSlot.id == Appointment.slot_id)
+        .outerjoin(Coordinator, Coordinator.id == Appointment.coordinator_id)
+        .outerjoin(apt_user, apt_user.id == Coordinator.user_id)
+        .where(
+            Req.created_at >= datetime.fromisoformat(filters["start"]),
+            Req.created_at <= datetime.fromisoformat(filters["end"]),
+        )
+    )
+
+    if filters.get("statuses"):
+        stmt = stmt.where(Req.status.in_(filters["statuses"]))
+    if filters.get("program_ids"):
+        stmt = stmt.where(Req.program_id.in_(filters["program_ids"]))
+    if filters.get("coordinator_ids"):
+        stmt = stmt.where(Appointment.coordinator_id.in_(filters["coordinator_ids"]))
+    if filters.get("period_id"):
+        stmt = stmt.where(Req.period_id == filters["period_id"])
+    terms = [t.strip() for t in (filters.get("q") or "").split(",") if t.strip()]
+    if terms:
+        conditions = []
+        for term in terms:
+            conditions.append(student.control_number.ilike(f"%{term}%"))
+            conditions.append(student.full_name.ilike(f"%{term}%"))
+        stmt = stmt.where(or_(*conditions))
+    if filters.get("appointment_statuses"):
+        stmt = stmt.where(Appointment.status.in_(filters["appointment_statuses"]))
+    if filters.get("type"):
+        stmt = stmt.where(Req.type == filters["type"])
+
+    return stmt.cte("report_rows")
+
+
+def _citas_where(rows):
+    return and_(rows.c.type == "APPOINTMENT", rows.c.slot_day.isnot(None), rows.c.slot_booked.is_(True))
+
+
+def _bajas_where(rows):
+    return rows.c.type == "DROP"
+
+
+def count_report_rows(db: Session, filters: dict) -> int:
+    """Filas que tendría el Excel (citas agendadas + bajas). Decide sync vs Celery."""
+    rows = _report_rows_cte(filters)
+    return int(
+        db.execute(
+            select(func.count()).select_from(rows).where(or_(_citas_where(rows), _bajas_where(rows)))
+        ).scalar() or 0
+    )
+
+
+def _fmt_dt(value) -> Optional[str]:
+    return value.strftime("%Y-%m-%d %H:%M") if value else None
+
+
+def _cita_row(r) -> dict:
+    return {
+        "ID": r.id,
+        "Día": r.slot_day.strftime("%Y-%m-%d") if r.slot_day else None,
+        "Horario": f"{r.slot_start.strftime('%H:%M')} - {r.slot_end.strftime('%H:%M')}" if r.slot_start else None,
+        "Programa": r.program_name,
+        "Alumno": r.student_name,
+        "NoControl": r.control_number,
+        "Coordinador": r.coordinator_name,
+        "EstadoSolicitud": translate_request_status(r.status),
+        "EstadoCita": translate_appointment_status(r.apt_status),
+        "Período": r.period_name,
+        "Descripción": r.description or "",
+        "ComentarioCoord": r.coordinator_comment or "",
+        "Creado": _fmt_dt(r.created_at),
+        "Actualizado": _fmt_dt(r.updated_at),
+    }
+
+
+def _baja_row(r) -> dict:
+    return {
+        "ID": r.id,
+        "Programa": r.program_name,
+        "Alumno": r.student_name,
+        "NoControl": r.control_number,
+        "Coordinador": r.coordinator_name,
+        "Estado": translate_request_status(r.status),
+        "Período": r.period_name,
+        "Descripción": r.description or "",
+        "ComentarioCoord": r.coordinator_comment or "",
+        "Creado": _fmt_dt(r.created_at),
+        "Actualizado": _fmt_dt(r.updated_at),
+    }
+
+
+def _summary_dims(rows, opts: list, cols: list) -> dict:
+    """Dimensiones extra del resumen según las opciones y columnas elegidas."""
+    dims = {}
+    if "coordinator" in opts and "Coordinador" in cols:
+        dims["coordinator"] = rows.c.coordinator_name
+    if "program" in opts and "Programa" in cols:
+        dims["program"] = rows.c.program_name
+    return dims
+
+
+def _summary_dim_cols(dims: dict) -> list:
+    """Columnas (grupo, clave) por dimensión. Una dimensión que no está en
+    ningún grouping set no puede ir en GROUPING() ni en el SELECT, así que se
+    sustituye por constantes."""
+    out = []
+    for name in ("coordinator", "program"):
+        col = dims.get(name)
+        if col is not None:
+            out += [func.grouping(col).label(f"g_{name}"), col.label(name)]
+        else:
+            out += [literal(1).label(f"g_{name}"), literal(None).label(name)]
+    return out
+
+
+def _summary_key(r):
+    """Clave del resumen al que pertenece la fila agrupada, o None si se descarta."""
+    if not r.g_coordinator:
+        return ("coordinator", r.coordinator) if r.coordinator else None
+    if not r.g_program:
+        return ("program", r.program) if r.program else None
+    return ("total", None)
+
+
+def _citas_summary_counts(db: Session, rows, opts: list, cols: list) -> dict:
+    """{("total"|"coordinator"|"program", clave): {día: {estado: n}}} en una consulta.
+
+    GROUPING SETS ((día, estado), (coord, día, estado), (carrera, día, estado)).
+    """
+    dims = _summary_dims(rows, opts, cols)
+    sets = [tuple_(rows.c.slot_day, rows.c.status)]
+    sets += [tuple_(col, rows.c.slot_day, rows.c.status) for col in dims.values()]
+
+    stmt = (
+        select(
+            *_summary_dim_cols(dims),
+            rows.c.slot_day,
+            rows.c.status,
+            func.count().label("n"),
+        )
+        .where(_citas_where(rows))
+        .group_by(func.grouping_sets(*sets))
+    )
+
+    out: dict = {}
+    for r in db.execute(stmt):
+        key = _summary_key(r)
+        if key is None:
+            continue
+        day = r.slot_day.strftime("%Y-%m-%d")
+        estado = translate_request_status(r.status)
+        cell = out.setdefault(key, {}).setdefault(day, {})
+        cell[estado] = cell.get(estado, 0) + int(r.n)
+    return out
+
+
+def _bajas_summary_counts(db: Session, rows, opts: list, cols: list) -> dict:
+    """{("total"|"coordinator"|"program", clave): {estado: n}} en una consulta."""
+    dims = _summary_dims(rows, opts, cols)
+    sets = [tuple_(rows.c.status)]
+    sets += [tuple_(col, rows.c.status) for col in dims.values()]
+
+    stmt = (
+        select(
+            *_summary_dim_cols(dims),
+            rows.c.status,
+            func.count().label("n"),
+        )
+        .where(_bajas_where(rows))
+        .group_by(func.grouping_sets(*sets))
+    )
+
+    out: dict = {}
+    for r in db.execute(stmt):
+        key = _summary_key(r)
+        if key is None:
+            continue
+        estado = translate_request_status(r.status)
+        bucket = out.setdefault(key, {})
+        bucket[estado] = bucket.get(estado, 0) + int(r.n)
+    return out
+
+
+class _Formats:
+    """Formatos de xlsxwriter compartidos por las dos hojas."""
+
+    def __init__(self, wb):
+        self.header = wb.add_format({
+            'bold': True, 'bg_color': '#2F5496', 'font_color': 'white',
+            'border': 1, 'align': 'center', 'valign': 'vcenter',
+            'font_size': 11, 'text_wrap': True,
+        })
+        self.cell = (
+            wb.add_format({'border': 1, 'align': 'left', 'valign': 'vcenter', 'text_wrap': True, 'font_size': 10, 'bg_color': '#FFFFFF'}),
+            wb.add_format({'border': 1, 'align': 'left', 'valign': 'vcenter', 'text_wrap': True, 'font_size': 10, 'bg_color': '#F2F2F2'}),
+        )
+        self.id = (
+            wb.add_format({'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10, 'bg_color': '#FFFFFF', 'bold': True}),
+            wb.add_format({'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10, 'bg_color': '#F2F2F2', 'bold': True}),
+        )
+        self.dt = (
+            wb.add_format({'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10, 'bg_color': '#FFFFFF'}),
+            wb.add_format({'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10, 'bg_color': '#F2F2F2'}),
+        )
+
+        def _mk(bg_e, bg_o, fc):
+            return (
+                wb.add_format({'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10, 'bg_color': bg_e, 'font_color': fc, 'bold': True}),
+                wb.add_format({'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10, 'bg_color': bg_o, 'font_color': fc, 'bold': True}),
+            )
+
+        self.status = {
+            'Resuelta':              _mk('#C6EFCE', '#A9D8B8', '#006100'),
+            'Atendida sin resolver': _mk('#E2EFDA', '#D4E7C5', '#375623'),
+            'No asistió':           _mk('#FFC7CE', '#FFAAB5', '#9C0006'),
+            'Asistió otro horario': _mk('#BDD7EE', '#9BC2E6', '#1F4E79'),
+            'Pendiente':             _mk('#D9D9D9', '#BFBFBF', '#404040'),
+            'Cancelada':             _mk('#404040', '#2D2D2D', '#FFFFFF'),
+        }
+        self.cita = {
+            'Programada': _mk('#DDEBF7', '#BDD7EE', '#1F4E79'),
+            'Completada': _mk('#C6EFCE', '#A9D8B8', '#006100'),
+            'No asistió': _mk('#FCE4D6', '#F8CBAD', '#974706'),
+            'Cancelada':  _mk('#FFC7CE', '#FFAAB5', '#9C0006'),
+        }
+
+        self.sum_hdr = wb.add_format({'bold': True, 'bg_color': '#1F4E79', 'font_color': 'white', 'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10})
+        self.sum_sub = wb.add_format({'bold': True, 'bg_color': '#2F5496', 'font_color': 'white', 'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 9})
+        self.sum_day = wb.add_format({'bold': True, 'bg_color': '#D6DCE4', 'font_color': '#1F4E79', 'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10})
+        self.sum_cell = wb.add_format({'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10, 'bg_color': '#FFFFFF'})
+        self.sum_tot = wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10, 'bg_color': '#E2EFDA', 'font_color': '#375623'})
+        self.sum_grand = wb.add_format({'bold': True, 'border': 2, 'align': 'center', 'valign': 'vcenter', 'font_size': 11, 'bg_color': '#2F5496', 'font_color': 'white'})
+        self.sum_sec = wb.add_format({'bold': True, 'bg_color': '#4472C4', 'font_color': 'white', 'border': 1, 'align': 'center', 'valign': 'vcenter', 'font_size': 10})
+
+    def for_cell(self, col: str, val, idx: int):
+        odd = idx % 2
+        if col in ('EstadoSolicitud', 'Estado'):
+            f = self.status.get(val)
+            if f:
+                return f[odd]
+        elif col == 'EstadoCita':
+            f = self.cita.get(val)
+            if f:
+                return f[odd]
+        elif col == 'ID':
+            return self.id[odd]
+        elif col in ('Día', 'Horario', 'Creado', 'Actualizado'):
+            return self.dt[odd]
+        return self.cell[odd]
+
+
+class _SummaryGrid:
+    """Celdas del resumen lateral agrupadas por fila.
+
+    En `constant_memory` xlsxwriter descarta una fila en cuanto se escribe la
+    siguiente, así que el resumen (que va a la derecha de los datos, desde la
+    fila 0) no puede pintarse al final como antes: se arma aquí por fila y se
+    vuelca junto con la fila de datos correspondiente.
+    """
+
+    def __init__(self):
+        self.rows: dict[int, list] = {}
+        self.widths: dict[int, int] = {}
+
+    def write(self, row, col, value, fmt):
+        self.rows.setdefault(row, []).append(("write", col, value, fmt))
+
+    def merge(self, row, c0, c1, value, fmt):
+        self.rows.setdefault(row, []).append(("merge", c0, c1, value, fmt))
+
+    def width(self, col, w):
+        self.widths[col] = w
+
+    def flush_row(self, ws, row):
+        for op in self.rows.pop(row, ()):
+            if op[0] == "write":
+                ws.write(row, op[1], op[2], op[3])
+            else:
+                ws.merge_range(row, op[1], row, op[2], op[3], op[4])
+
+    def flush_rest(self, ws):
+        for row in sorted(self.rows):
+            self.flush_row(ws, row)
+
+
+def _layout_citas_summary(grid: _SummaryGrid, fm: _Formats, counts: dict, sc: int, opts: list, cols: list):
+    if not counts or 'Día' not in cols or 'EstadoSolicitud' not in cols or not opts:
+        return
+    ncols = len(_ESTADOS) + 2
+    grid.merge(0, sc, sc + ncols - 1, 'RESUMEN POR DÍA', fm.sum_hdr)
+    grid.width(sc, 12)
+    for i in range(len(_ESTADOS)):
+        grid.width(sc + 1 + i, 10)
+    grid.width(sc + len(_ESTADOS) + 1, 8)
+
+    def _hdrs(row):
+        grid.write(row, sc, 'Día', fm.sum_sub)
+        for i, e in enumerate(_ESTADOS):
+            grid.write(row, sc + 1 + i, e[:15], fm.sum_sub)
+        grid.write(row, sc + len(_ESTADOS) + 1, 'Total', fm.sum_sub)
+
+    def _data(by_day, row):
+        totals = {e: 0 for e in _ESTADOS}
+        gran = 0
+        for dia in sorted(by_day):
+            grid.write(row, sc, dia, fm.sum_day)
+            td = 0
+            for i, e in enumerate(_ESTADOS):
+                cnt = by_day[dia].get(e, 0)
+                f = fm.status.get(e, (fm.sum_cell,))[0] if cnt > 0 else fm.sum_cell
+                grid.write(row, sc + 1 + i, cnt if cnt > 0 else '', f)
+                totals[e] += cnt
+                td += cnt
+            grid.write(row, sc + len(_ESTADOS) + 1, td, fm.sum_tot)
+            gran += td
+            row += 1
+        grid.write(row, sc, 'TOTAL', fm.sum_grand)
+        for i, e in enumerate(_ESTADOS):
+            grid.write(row, sc + 1 + i, totals[e], fm.sum_grand)
+        grid.write(row, sc + len(_ESTADOS) + 1, gran, fm.sum_grand)
+        return row + 1
+
+    def _section(title, by_day, row):
+        grid.merge(row, sc, sc + ncols - 1, title, fm.sum_sec)
+        _hdrs(row + 1)
+        return _data(by_day, row + 2) + 1
+
+    cr = 1
+    if 'total' in opts and ("total", None) in counts:
+        cr = _section('TOTAL GENERAL', counts[("total", None)], cr)
+    if 'coordinator' in opts and 'Coordinador' in cols:
+        for key in sorted(k for k in counts if k[0] == "coordinator"):
+            cr = _section(f"Coordinador: {key[1]}", counts[key], cr)
+    if 'program' in opts and 'Programa' in cols:
+        for key in sorted(k for k in counts if k[0] == "program"):
+            cr = _section(f"Carrera: {key[1]}", counts[key], cr)
+
+
+def _layout_bajas_summary(grid: _SummaryGrid, fm: _Formats, counts: dict, sc: int, opts: list, cols: list):
+    if not counts or 'Estado' not in cols or not opts:
+        return
+    grid.merge(0, sc, sc + 1, 'RESUMEN DE BAJAS', fm.sum_hdr)
+    grid.width(sc, 22)
+    grid.width(sc + 1, 10)
+
+    def _block(row, by_status, title):
+        grid.merge(row, sc, sc + 1, title, fm.sum_sec)
+        row += 1
+        grid.write(row, sc, 'Estado', fm.sum_sub)
+        grid.write(row, sc + 1, 'Cantidad', fm.sum_sub)
+        row += 1
+        total = 0
+        for e in _ESTADOS:
+            cnt = by_status.get(e, 0)
+            if cnt > 0:
+                f = fm.status.get(e, (fm.sum_cell,))[0]
+                grid.write(row, sc, e, f)
+                grid.write(row, sc + 1, cnt, f)
+                total += cnt
+                row += 1
+        grid.write(row, sc, 'TOTAL', fm.sum_grand)
+        grid.write(row, sc + 1, total, fm.sum_grand)
+        return row + 2
+
+    cr = 1
+    if 'total' in opts and ("total", None) in counts:
+        cr = _block(cr, counts[("total", None)], 'TOTAL GENERAL')
+    if 'program' in opts and 'Programa' in cols:
+        for key in sorted(k for k in counts if k[0] == "program"):
+            cr = _block(cr, counts[key], f"Carrera: {key[1]}")
+    if 'coordinator' in opts and 'Coordinador' in cols:
+        for key in sorted(k for k in counts if k[0] == "coordinator"):
+            cr = _block(cr, counts[key], f"Coordinador: {key[1]}")
+
+
+def _stream_sheet(ws, fm: _Formats, cols: list, rows_iter, to_dict, grid: _SummaryGrid, tick) -> int:
+    """Escribe encabezado + filas en orden estricto (requisito de constant_memory)."""
+    for ci, cn in enumerate(cols):
+        ws.set_column(ci, ci, _COL_WIDTHS.get(cn, 15))
+    for ci, w in grid.widths.items():
+        ws.set_column(ci, ci, w)
+    ws.freeze_panes(1, 0)
+    ws.set_row(0, 22)
+    for ci, cn in enumerate(cols):
+        ws.write(0, ci, cn, fm.header)
+    grid.flush_row(ws, 0)
+
+    n = 0
+    for r in rows_iter:
+        data = to_dict(r)
+        for ci, cn in enumerate(cols):
+            val = data.get(cn, '')
+            ws.write(n + 1, ci, val, fm.for_cell(cn, val, n))
+        grid.flush_row(ws, n + 1)
+        n += 1
+        tick()
+
+    grid.flush_rest(ws)
+    if n:
+        ws.autofilter(0, 0, n, len(cols) - 1)
+    return n
+
+
+def write_requests_xlsx(
+    db: Session,
+    target,
+    filters: dict,
+    layout: dict,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """Escribe el Excel de solicitudes (hojas "Citas" y "Solicitudes de Baja").
+
+    Args:
+        target:   ruta o file-like donde xlsxwriter deja el .xlsx.
+        filters:  ver `_report_rows_cte`.
+        layout:   citas_cols, bajas_cols, citas_summary, bajas_summary,
+                  order_by, order_dir.
+        progress: callback opcional `(filas_escritas, total)`; se llama cada
+                  `_PROGRESS_EVERY` filas.
+
+    Returns:
+        número de filas de datos escritas entre ambas hojas.
+    """
+    import xlsxwriter
+
+    rows = _report_rows_cte(filters)
+    citas_cols = layout["citas_cols"]
+    bajas_cols = layout["bajas_cols"]
+
+    citas_counts = _citas_summary_counts(db, rows, layout["citas_summary"], citas_cols)
+    bajas_counts = _bajas_summary_counts(db, rows, layout["bajas_summary"], bajas_cols)
+    n_citas = sum(n for by_day in citas_counts.get(("total", None), {}).values() for n in by_day.values())
+    n_bajas = sum(bajas_counts.get(("total", None), {}).values())
+    total = n_citas + n_bajas
+
+    written = 0
+
+    def tick():
+        nonlocal written
+        written += 1
+        if progress and written % _PROGRESS_EVERY == 0:
+            progress(written, total)
+
+    citas_stmt = (
+        select(rows)
+        .where(_citas_where(rows))
+        .order_by(rows.c.slot_day, rows.c.slot_start, rows.c.id)
+    )
+
+    desc = layout.get("order_dir") == "desc"
+    order_by = layout.get("order_by")
+    if order_by == "student_name":
+        key = func.lower(func.coalesce(rows.c.student_name, literal("")))
+    elif order_by == "program":
+        key = func.lower(func.coalesce(rows.c.program_name, literal("")))
+    else:
+        key = rows.c.created_at
+    bajas_stmt = (
+        select(rows)
+        .where(_bajas_where(rows))
+        .order_by(key.desc() if desc else key.asc(), rows.c.id)
+    )
+
+    wb = xlsxwriter.Workbook(target, {"constant_memory": True})
+    try:
+        fm = _Formats(wb)
+
+        grid = _SummaryGrid()
+        _layout_citas_summary(grid, fm, citas_counts, len(citas_cols) + 2, layout["citas_summary"], citas_cols)
+        ws = wb.add_worksheet("Citas")
+        _stream_sheet(
+            ws, fm, citas_cols,
+            db.execute(citas_stmt.execution_options(yield_per=1000)),
+            _cita_row, grid, tick,
+        )
+
+        grid = _SummaryGrid()
+        _layout_bajas_summary(grid, fm, bajas_counts, len(bajas_cols) + 2, layout["bajas_summary"], bajas_cols)
+        ws = wb.add_worksheet("Solicitudes de Baja")
+        _stream_sheet(
+            ws, fm, bajas_cols,
+            db.execute(bajas_stmt.execution_options(yield_per=1000)),
+            _baja_row, grid, tick,
+        )
+    finally:
+        wb.close()
+
+    if progress:
+        progress(written, total)
+    return written
@@ -14,6 +14,7 @@ from itcj2.apps.agendatec.models.appointment import Appointment
 from itcj2.apps.agendatec.models.audit_log import AuditLog
 from itcj2.apps.agendatec.models.request import Request
 from itcj2.apps.agendatec.models.time_slot import TimeSlot
+from itcj2.apps.agendatec.services.request_service import invalidate_student_history
 from itcj2.core.models.program_coordinator import ProgramCoordinator
 from itcj2.core.models.user import User
 from itcj2.core.services.notification_service import NotificationService
@@ -108,6 +109,7 @@ def admin_change_request_status(
         )
     )
     db.commit()
+    invalidate_student_history(r.student_id)
 
     # SOCKETS: avisar a coordinadores
     try:
@@ -10,6 +10,7 @@ Centraliza la lógica de negocio para gestión de solicitudes de estudiantes:
 """
 from __future__ import annotations
 
+import json
 import logging
 from dataclasses import dataclass
 from datetime import datetime
@@ -289,6 +290,7 @@ class RequestService:
         )
         db.add(request_obj)
         db.commit()
+        invalidate_student_history(student.id)
 
         logger.info("Solicitud de baja creada", extra={
             "request_id": request_obj.id, "period_id": period.id
@@ -393,6 +395,7 @@ class RequestService:
             )
             db.add(appointment)
             db.commit()
+            invalidate_student_history(student.id)
 
             logger.info("Solicitud de cita creada", extra={
                 "request_id": request_obj.id,
@@ -463,6 +466,7 @@ class RequestService:
 
         request.status = "CANCELED"
         db.commit()
+        invalidate_student_history(request.student_id)
 
         logger.info("Solicitud cancelada", extra={"slot_released": slot.id if slot else None})
 
@@ -478,9 +482,13 @@ class RequestService:
     # ───────────────────────────────────────────────────────────────────────────
 
     def get_student_requests(self, db: Session, student: User) -> dict:
-        """Obtiene las solicitudes de un estudiante."""
-        from sqlalchemy import and_, or_
+        """Obtiene las solicitudes de un estudiante.
 
+        El historial completo (solicitud + cita + slot + período) sale de
+        `_load_student_history` — una sola consulta con outer joins — y se
+        guarda en Redis por alumno. Aquí solo se reparte entre `active` e
+        `history` según el período activo, que se consulta siempre fresco.
+        """
         active_period = period_service.get_active_period(db)
         active_period_info = None
 
@@ -497,35 +505,42 @@ class RequestService:
                     config.student_admission_deadline.isoformat()
                 )
 
-        active = None
-        if active_period:
-            active = (
-                db.query(Request)
-                .filter(
-                    Request.student_id == student.id,
-                    Request.period_id == active_period.id,
-                    Request.status == "PENDING",
-                )
-                .order_by(Request.created_at.desc())
-                .first()
-            )
+        cached = get_cached_student_history(student.id)
+        if cached is None:
+            cached = self._load_student_history(db, student.id)
+            set_cached_student_history(student.id, cached)
+        items, periods_dict = cached["items"], cached["periods"]
 
-        history_query = db.query(Request).filter(Request.student_id == student.id)
         if active_period:
-            history_query = history_query.filter(
-                or_(
-                    Request.status != "PENDING",
-                    and_(Request.status == "PENDING", Request.period_id != active_period.id),
-                )
+            periods_dict[active_period.id] = {
+                "id": active_period.id,
+                "name": active_period.name,
+                "status": active_period.status,
+            }
+
+        # `items` ya viene ordenado por created_at desc: la activa es la
+        # PENDING más reciente del período activo y el historial excluye todas
+        # las PENDING de ese período.
+        active = None
+        history = []
+        for item in items:
+            in_active = (
+                active_period is not None
+                and item["status"] == "PENDING"
+                and item["period_id"] == active_period.id
             )
-        history = history_query.order_by(Request.created_at.desc()).all()
+            if not in_active:
+                history.append(item)
+            elif active is None:
+                active = item
 
-        periods_dict = self._build_periods_dict(db, active, history, active_period)
+        for item in ([active] if active else []) + history:
+            item["period"] = periods_dict.get(item["period_id"]) if item["period_id"] else None
 
         return {
             "active_period": active_period_info,
-            "active": self._request_to_dict(db, active, periods_dict) if active else None,
-            "history": [self._request_to_dict(db, r, periods_dict) for r in history],
+            "active": active,
+            "history": history,
             "periods": periods_dict,
         }
 
@@ -719,44 +734,39 @@ class RequestService:
     # MÉTODOS PRIVADOS - UTILIDADES
     # ───────────────────────────────────────────────────────────────────────────
 
-    def _build_periods_dict(
-        self,
-        db: Session,
-        active: Optional[Request],
-        history: list[Request],
-        active_period: Optional[AcademicPeriod],
-    ) -> dict:
-        """Construye diccionario de períodos para las solicitudes."""
-        period_ids = set()
-        if active and active.period_id:
-            period_ids.add(active.period_id)
-        for h in history:
-            if h.period_id:
-                period_ids.add(h.period_id)
+    def _load_student_history(self, db: Session, student_id: int) -> dict:
+        """Todas las solicitudes del alumno con su cita, slot y período en una consulta.
+
+        Devuelve `{"items": [...], "periods": {period_id: {...}}}`, serializable
+        a JSON para el caché. `item["period"]` se resuelve al leer, para que el
+        período activo siempre salga con su estado actual.
+        """
+        rows = (
+            db.query(Request, Appointment, TimeSlot, AcademicPeriod)
+            .outerjoin(Appointment, Appointment.request_id == Request.id)
+            .outerjoin(TimeSlot, TimeSlot.id == Appointment.slot_id)
+            .outerjoin(AcademicPeriod, AcademicPeriod.id == Request.period_id)
+            .filter(Request.student_id == student_id)
+            .order_by(Request.created_at.desc(), Request.id.desc())
+            .all()
+        )
 
+        items = []
         periods_dict = {}
+        for r, ap, sl, p in rows:
+            if p is not None and p.id not in periods_dict:
+                periods_dict[p.id] = {"id": p.id, "name": p.name, "status": p.status}
+            items.append(self._request_to_dict(r, ap, sl))
 
-        if active_period:
-            periods_dict[active_period.id] = {
-                "id": active_period.id,
-                "name": active_period.name,
-                "status": active_period.status,
-            }
+        return {"items": items, "periods": periods_dict}
 
-        for pid in period_ids:
-            if pid not in periods_dict:
-                p = db.get(AcademicPeriod, pid)
-                if p:
-                    periods_dict[pid] = {
-                        "id": p.id,
-                        "name": p.name,
-                        "status": p.status,
-                    }
-
-        return periods_dict
-
-    def _request_to_dict(self, db: Session, r: Request, periods_dict: dict) -> dict:
-        """Convierte una Request a diccionario."""
+    def _request_to_dict(
+        self,
+        r: Request,
+        ap: Optional[Appointment],
+        sl: Optional[TimeSlot],
+    ) -> dict:
+        """Convierte una Request (con su cita y slot ya cargados) a diccionario."""
         item = {
             "id": r.id,
             "type": r.type,
@@ -765,29 +775,75 @@ class RequestService:
             "created_at": r.created_at.isoformat(),
             "comment": r.coordinator_comment,
             "period_id": r.period_id,
-            "period": periods_dict.get(r.period_id) if r.period_id else None,
         }
-        if r.type == "APPOINTMENT":
-            ap = db.query(Appointment).filter(Appointment.request_id == r.id).first()
-            if ap:
-                sl = db.get(TimeSlot, ap.slot_id)
-                if sl:
-                    item["appointment"] = {
-                        "id": ap.id,
-                        "program_id": ap.program_id,
-                        "coordinator_id": ap.coordinator_id,
-                        "slot": {
-                            "id": sl.id,
-                            "day": sl.day.isoformat(),
-                            "start_time": sl.start_time.isoformat(),
-                            "end_time": sl.end_time.isoformat(),
-                            "is_booked": sl.is_booked,
-                        },
-                        "status": ap.status,
-                    }
+        if r.type == "APPOINTMENT" and ap and sl:
+            item["appointment"] = {
+                "id": ap.id,
+                "program_id": ap.program_id,
+                "coordinator_id": ap.coordinator_id,
+                "slot": {
+                    "id": sl.id,
+                    "day": sl.day.isoformat(),
+                    "start_time": sl.start_time.isoformat(),
+                    "end_time": sl.end_time.isoformat(),
+                    "is_booked": sl.is_booked,
+                },
+                "status": ap.status,
+            }
         return item
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# CACHÉ DEL HISTORIAL POR ALUMNO
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# `GET /requests/mine` es lo primero que abre cada alumno en la ventana de
+# admisión. El historial solo cambia cuando se crea, cancela o resuelve una
+# solicitud suya, así que se guarda en Redis y esos caminos lo invalidan con
+# `invalidate_student_history`. Fail-open: si Redis falla se consulta la BD.
+
+_HISTORY_PREFIX = "agendatec:v1:student_requests"
+
+
+def _history_key(student_id: int) -> str:
+    return f"{_HISTORY_PREFIX}:{student_id}"
+
+
+def _history_ttl() -> int:
+    from itcj2.config import get_settings
+    return int(getattr(get_settings(), "AGENDATEC_STUDENT_HISTORY_TTL", 300))
+
+
+def get_cached_student_history(student_id: int) -> Optional[dict]:
+    """Historial cacheado del alumno, o None si no está (o Redis falla)."""
+    try:
+        raw = get_redis().get(_history_key(student_id))
+    except Exception as e:
+        logger.warning("student_history: error leyendo caché de %s (%s)", student_id, e)
+        return None
+    if raw is None:
+        return None
+    data = json.loads(raw)
+    # JSON convierte las llaves int en str.
+    data["periods"] = {int(k): v for k, v in data["periods"].items()}
+    return data
+
+
+def set_cached_student_history(student_id: int, data: dict) -> None:
+    try:
+        get_redis().setex(_history_key(student_id), _history_ttl(), json.dumps(data))
+    except Exception as e:
+        logger.warning("student_history: error escribiendo caché de %s (%s)", student_id, e)
+
+
+def invalidate_student_history(student_id: int) -> None:
+    """Borra el historial cacheado (crear, cancelar o cambiar estado de una solicitud, o mover su cita)."""
+    try:
+        get_redis().delete(_history_key(student_id))
+    except Exception as e:
+        logger.warning("student_history: error invalidando caché de %s (%s)", student_id, e)
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # INSTANCIA SINGLETON
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -425,8 +425,12 @@ class SlotService:
 
     @staticmethod
     def apply_split(db: Session, coord_id: int, day: date, plan, program_ids: List[int]):
-        """Ejecuta el plan. NO hace commit: el endpoint sostiene el advisory lock."""
-        from itcj2.apps.agendatec.models import TimeSlot, TimeSlotProgram
+        """Ejecuta el plan. NO hace commit: el endpoint sostiene el advisory lock.
+
+        Tras su commit, el endpoint invalida el historial de
+        `result.history_student_ids`.
+        """
+        from itcj2.apps.agendatec.models import Appointment, TimeSlot, TimeSlotProgram
         from itcj2.apps.agendatec.schemas.slot_plan import SplitResult
 
         # `plan.blocked` ya nunca es True: el split por bloques no rechaza
@@ -447,6 +451,14 @@ class SlotService:
             slot.end_time = sh.new_end
             result.slots_shortened += 1
 
+        if plan.to_shorten:
+            result.history_student_ids = sorted({
+                row[0] for row in
+                db.query(Appointment.student_id)
+                .filter(Appointment.slot_id.in_([sh.slot_id for sh in plan.to_shorten]))
+                .all()
+            })
+
         # SessionLocal usa autoflush=False (itcj2/database.py:38). Sin este flush
         # explícito, cualquier SELECT posterior devolvería el end_time VIEJO y la
         # grilla se generaría sobre datos rancios.
@@ -79,7 +79,7 @@
     try {
       const res = await sendBatch({ test, limit, offset });
       const mode = res.test_mode ? "PRUEBA" : "PRODUCCIÓN";
-      log(`[${mode}] Enviados: ${res.sent}, omitidos: ${res.skipped}, errores: ${res.errors?.length || 0}, candidatos totales: ${res.total_candidates}, siguiente offset: ${res.next_offset}`);
+      log(`[${mode}] Encolados: ${res.queued}, omitidos: ${res.skipped}, errores: ${res.errors?.length || 0}, candidatos totales: ${res.total_candidates}, siguiente offset: ${res.next_offset}`);
       if (res.errors && res.errors.length) {
         console.warn("Errores de envío:", res.errors);
       }
@@ -458,6 +458,17 @@
     try {
       const r = await fetch(`${xlsxUrl}?${buildQs()}`, { method: "POST", credentials: "include" });
       if (!r.ok) throw new Error(`HTTP ${r.status}`);
+      if (r.status === 202) {
+        // Rango grande: el servidor lo encoló en Celery y avisará con una
+        // notificación que trae el enlace de descarga.
+        const j = await r.json();
+        const rows = j?.data?.rows;
+        showToast?.(
+          `El reporte${rows ? ` (${rows} solicitudes)` : ""} se está generando. Te llegará una notificación cuando esté listo.`,
+          "info"
+        );
+        return;
+      }
       const blob = await r.blob();
       const url = URL.createObjectURL(blob);
       const a = document.createElement("a");
@@ -1,10 +1,37 @@
-"""Lógica del directorio de extensiones (unifica puestos + extras)."""
+"""Lógica del directorio de extensiones (unifica puestos + extras).
+
+El directorio completo (todos los deptos oficiales, puestos y extras) se arma
+con dos consultas con join — el titular de cada puesto sale de un
+``DISTINCT ON (position_id)`` sobre sus asignaciones activas — y se guarda
+agrupado en Redis (``directory:v1:snapshot``). `list_directory` filtra ese
+snapshot en memoria (depto, origen y búsqueda ``q``), sin tocar la BD.
+
+Lo invalidan las escrituras de este módulo y las de puestos/departamentos en
+core (`invalidate_directory`); el TTL cubre lo que no pasa por ellas (p. ej.
+cambios de nombre de usuario). Sin Redis se arma en cada llamada (fail-open).
+"""
+import json
 import logging
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Versionado: subir a v2 invalida de golpe si cambia el shape.
+_KEY = "directory:v1:snapshot"
+_TTL = 300  # segundos
+
+
+def _redis():
+    """Cliente Redis compartido. None si no disponible (fail-open)."""
+    try:
+        from itcj2.core.utils.redis_conn import get_redis
+        return get_redis()
+    except Exception as e:  # pragma: no cover - defensivo
+        logger.warning("directory: sin Redis (%s)", e)
+        return None
+
 
 def official_departments(db: Session) -> list[dict]:
     """Deptos OFICIALES activos en orden jerárquico (DFS preorden), con `depth` del árbol completo.
@@ -29,40 +56,39 @@ def official_department_order(db: Session) -> dict[int, int]:
 _LEGACY_HEAD_CODES = {"director", "subdirector_admin_services"}
 
 
-def _is_head_position(position) -> bool:
-    """True si `position` es el jefe de su departamento (code == head_{dept.code})."""
-    dept = position.department
-    if not dept:
+def _is_head_position(position_code, department_code) -> bool:
+    """True si el puesto es el jefe de su departamento (code == head_{dept.code})."""
+    if not department_code:
         return False
-    return position.code == f"head_{dept.code}" or position.code in _LEGACY_HEAD_CODES
+    return position_code == f"head_{department_code}" or position_code in _LEGACY_HEAD_CODES
 
 
-def _position_row(position, holder_name):
+def _position_row(row):
     return {
         "source": "position",
-        "department_id": position.department_id,
-        "department": position.department.name if position.department else "—",
-        "title": position.title,
-        "holder": holder_name or "",
-        "extension": position.phone_extension or "",
-        "notes": position.phone_notes or "",
-        "position_id": position.id,
+        "department_id": row.department_id,
+        "department": row.department or "—",
+        "title": row.title,
+        "holder": row.holder or "",
+        "extension": row.phone_extension or "",
+        "notes": row.phone_notes or "",
+        "position_id": row.id,
         "entry_id": None,
-        "is_head": _is_head_position(position),
+        "is_head": _is_head_position(row.code, row.department_code),
     }
 
 
-def _entry_row(entry):
+def _entry_row(row):
     return {
         "source": "entry",
-        "department_id": entry.department_id,
-        "department": entry.department.name if entry.department else "—",
-        "title": entry.label,
-        "holder": entry.holder_name or "",
-        "extension": entry.extension,
-        "notes": entry.notes or "",
-        "position_id": entry.position_id,
-        "entry_id": entry.id,
+        "department_id": row.department_id,
+        "department": row.department or "—",
+        "title": row.label,
+        "holder": row.holder_name or "",
+        "extension": row.extension,
+        "notes": row.notes or "",
+        "position_id": row.position_id,
+        "entry_id": row.id,
         "is_head": False,
     }
 
@@ -90,51 +116,117 @@ def group_by_department(rows, dept_order: dict[int, int]):
     return out
 
 
-def list_directory(db: Session, *, q=None, department_id=None, source="all"):
-    """Lista unificada agrupada por departamento oficial, en orden jerárquico."""
+def _position_rows(db: Session) -> list[dict]:
+    """Puestos activos con extensión, su depto y su titular en una consulta."""
+    from sqlalchemy.dialects.postgresql import distinct_on
+
+    from itcj2.core.models.department import Department
     from itcj2.core.models.position import Position, UserPosition
+    from itcj2.core.models.user import User
+
+    # Un titular por puesto: la asignación activa más antigua
+    holder = (
+        select(UserPosition.position_id, User.full_name.label("holder"))
+        .join(User, User.id == UserPosition.user_id)
+        .where(UserPosition.is_active == True)  # noqa: E712
+        .ext(distinct_on(UserPosition.position_id))
+        .order_by(UserPosition.position_id, UserPosition.start_date, UserPosition.id)
+        .subquery("holder")
+    )
+    rows = db.execute(
+        select(
+            Position.id, Position.code, Position.title, Position.phone_extension,
+            Position.phone_notes, Position.department_id,
+            Department.name.label("department"), Department.code.label("department_code"),
+            holder.c.holder,
+        )
+        .outerjoin(Department, Department.id == Position.department_id)
+        .outerjoin(holder, holder.c.position_id == Position.id)
+        .where(Position.phone_extension.isnot(None), Position.is_active == True)  # noqa: E712
+    ).all()
+    return [_position_row(r) for r in rows]
+
+
+def _entry_rows(db: Session) -> list[dict]:
     from itcj2.apps.directory.models import DirectoryEntry
+    from itcj2.core.models.department import Department
+
+    rows = db.execute(
+        select(
+            DirectoryEntry.id, DirectoryEntry.department_id, DirectoryEntry.position_id,
+            DirectoryEntry.label, DirectoryEntry.holder_name, DirectoryEntry.extension,
+            DirectoryEntry.notes, Department.name.label("department"),
+        )
+        .outerjoin(Department, Department.id == DirectoryEntry.department_id)
+        .where(DirectoryEntry.is_active == True)  # noqa: E712
+    ).all()
+    return [_entry_row(r) for r in rows]
 
+
+def _compute(db: Session) -> dict:
     depts = official_departments(db)
     dept_order = {d["id"]: i for i, d in enumerate(depts)}
     dept_depth = {d["id"]: d["depth"] for d in depts}
-    rows = []
-
-    if source in ("all", "position"):
-        pos_query = db.query(Position).filter(
-            Position.phone_extension.isnot(None),
-            Position.is_active == True,  # noqa: E712
-        )
-        if department_id:
-            pos_query = pos_query.filter(Position.department_id == department_id)
-        for pos in pos_query.all():
-            assignment = (
-                db.query(UserPosition)
-                .filter_by(position_id=pos.id, is_active=True)
-                .first()
-            )
-            holder = ""
-            if assignment and assignment.user:
-                holder = assignment.user.full_name
-            rows.append(_position_row(pos, holder))
-
-    if source in ("all", "entry"):
-        ent_query = db.query(DirectoryEntry).filter(DirectoryEntry.is_active == True)  # noqa: E712
-        if department_id:
-            ent_query = ent_query.filter(DirectoryEntry.department_id == department_id)
-        for ent in ent_query.all():
-            rows.append(_entry_row(ent))
-
-    if q:
-        ql = q.strip().lower()
-        rows = [
-            r for r in rows
-            if ql in f"{r['title']} {r['holder']} {r['extension']} {r['notes']} {r['department']}".lower()
-        ]
 
-    groups = group_by_department(rows, dept_order)
+    groups = group_by_department(_position_rows(db) + _entry_rows(db), dept_order)
     for g in groups:
         g["depth"] = dept_depth.get(g["department_id"], 0)
+    return {
+        "departments": [{"id": d["id"], "name": d["name"], "depth": d["depth"]} for d in depts],
+        "groups": groups,
+    }
+
+
+def directory_snapshot(db: Session) -> dict:
+    """{"departments": [...], "groups": [...]} del directorio completo (Redis read-through)."""
+    r = _redis()
+    if r is not None:
+        try:
+            cached = r.get(_KEY)
+            if cached is not None:
+                return json.loads(cached)
+        except Exception as e:
+            logger.warning("directory: error leyendo snapshot (%s); fallback a BD", e)
+            r = None  # no escribir si la lectura falló
+
+    value = _compute(db)
+
+    if r is not None:
+        try:
+            r.setex(_KEY, _TTL, json.dumps(value))
+        except Exception as e:
+            logger.warning("directory: error escribiendo snapshot (%s)", e)
+    return value
+
+
+def invalidate_directory() -> None:
+    """Borra el snapshot (escrituras de extensiones, entradas, puestos o deptos)."""
+    r = _redis()
+    if r is None:
+        return
+    try:
+        r.delete(_KEY)
+    except Exception as e:
+        logger.warning("directory: invalidate err (%s)", e)
+
+
+def list_directory(db: Session, *, q=None, department_id=None, source="all"):
+    """Lista unificada agrupada por departamento oficial, en orden jerárquico.
+
+    Filtra en memoria el snapshot cacheado; conserva el orden de grupos y filas.
+    """
+    ql = q.strip().lower() if q else ""
+    groups = []
+    for g in directory_snapshot(db)["groups"]:
+        if department_id and g["department_id"] != department_id:
+            continue
+        rows = [
+            r for r in g["rows"]
+            if (source == "all" or r["source"] == source)
+            and (not ql or ql in f"{r['title']} {r['holder']} {r['extension']} {r['notes']} {r['department']}".lower())
+        ]
+        if rows:
+            groups.append({**g, "rows": rows})
     return groups
 
 
@@ -147,6 +239,7 @@ def set_position_extension(db: Session, position_id, extension, notes, by_user_i
     pos.phone_extension = (extension or "").strip() or None
     pos.phone_notes = (notes or "").strip() or None
     db.commit()
+    invalidate_directory()
     db.refresh(pos)
     return pos
 
@@ -171,6 +264,7 @@ def create_entry(db: Session, *, department_id, label, extension, position_id=No
         raise ValueError("La extensión es obligatoria")
     db.add(entry)
     db.commit()
+    invalidate_directory()
     db.refresh(entry)
     return entry
 
@@ -193,6 +287,7 @@ def update_entry(db: Session, entry_id, *, label=None, extension=None, position_
     if department_id is not None:
         entry.department_id = department_id
     db.commit()
+    invalidate_directory()
     db.refresh(entry)
     return entry
 
@@ -204,3 +299,4 @@ def delete_entry(db: Session, entry_id):
         raise ValueError(f"La entrada {entry_id} no existe")
     db.delete(entry)
     db.commit()
+    invalidate_directory()
@@ -3,12 +3,12 @@ Attachments API v2 — 5 endpoints.
 Fuente: itcj/apps/helpdesk/routes/api/attachments.py
 """
 import os
-import gzip
 import uuid
 import logging
+from typing import Literal
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Form
+from itcj2.core.services import file_delivery, file_storage, media_jobs, media_service
 from itcj2.dependencies import DbSession, require_perms
 
 router = APIRouter(tags=["helpdesk-attachments"])
@@ -50,7 +50,7 @@ def upload_attachment(
     if attachment_type == "comment" and not comment_id:
         raise HTTPException(400, detail={"error": "missing_comment_id", "message": "comment_id es requerido para adjuntos de comentario"})
 
-    filepath = None
+    staged = None
     try:
         ticket = ticket_service.get_ticket_by_id(db, ticket_id, user_id, check_permissions=True)
 
@@ -87,65 +87,25 @@ def upload_attachment(
         if attachment_type == "comment" and is_img:
             seq = fvs.get_next_comment_image_number(db, ticket_id)
             store_filename = f"{ticket.ticket_number}_{seq}.jpg"
-            folder = os.path.join(UPLOAD_FOLDER, "comments", ticket.ticket_number)
-        elif attachment_type == "resolution":
+        elif attachment_type in ("resolution", "comment"):
             store_filename = original_filename
-            folder = os.path.join(UPLOAD_FOLDER, "resolutions", ticket.ticket_number)
-        elif attachment_type == "comment":
-            store_filename = original_filename
-            folder = os.path.join(UPLOAD_FOLDER, "comments", ticket.ticket_number)
         else:
             unique = f"{ticket.id}_{now_local().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
             store_filename = f"{unique}.{extension}"
-            folder = os.path.join(UPLOAD_FOLDER, str(ticket.id))
+
+        storage = file_storage.get_storage()
+        filepath = file_storage.attachment_key(
+            storage, UPLOAD_FOLDER, attachment_type, ticket.id, ticket.ticket_number, store_filename)
 
         # Ensure unique filename for non-ticket types
         if attachment_type != "ticket":
-            base, ext = os.path.splitext(store_filename)
-            candidate = store_filename
-            counter = 1
-            while os.path.exists(os.path.join(folder, candidate)):
-                candidate = f"{base}_{counter}{ext}"
-                counter += 1
-            store_filename = candidate
-
-        os.makedirs(folder, exist_ok=True)
-        filepath = os.path.join(folder, store_filename)
-
-        mime_type = file.content_type
-        file_size = result["size"]
-
-        if is_img:
-            try:
-                file.file.seek(0)
-                compressed, compressed_size = fvs.compress_image_for_helpdesk(file.file)
-                with open(filepath, "wb") as f:
-                    f.write(compressed.read())
-                file_size = compressed_size
-                mime_type = "image/jpeg"
-            except Exception as e:
-                logger.warning(f"No se pudo comprimir imagen: {e}")
-                file.file.seek(0)
-                with open(filepath, "wb") as f:
-                    f.write(file.file.read())
-        else:
-            # Documentos: gzip transparente — se guarda comprimido solo si reduce
-            # tamaño (PDF/Office ya vienen comprimidos y se dejan tal cual). Se
-            # descomprime al vuelo en el endpoint de descarga. file_size queda como
-            # el tamaño lógico (descomprimido) para mostrar el real al usuario.
-            file.file.seek(0)
-            raw_bytes = file.file.read()
-            gz_bytes = gzip.compress(raw_bytes, compresslevel=6)
-            if len(gz_bytes) < len(raw_bytes):
-                store_filename += ".gz"
-                filepath += ".gz"
-                with open(filepath, "wb") as f:
-                    f.write(gz_bytes)
-                logger.info(f"Adjunto comprimido gzip: {len(raw_bytes)} -> {len(gz_bytes)} bytes")
-            else:
-                with open(filepath, "wb") as f:
-                    f.write(raw_bytes)
+            filepath = storage.unique(filepath)
+            store_filename = os.path.basename(filepath)
 
+        # El request solo deja el crudo en staging: la recompresión (imágenes) y
+        # el gzip transparente (documentos) los hace la cola `media` tras el
+        # commit. file_size queda como el tamaño lógico para mostrar el real.
+        staged = media_jobs.stage_upload(file.file)
         attachment = Attachment(
             ticket_id=ticket_id,
             uploaded_by_id=user_id,
@@ -153,12 +113,14 @@ def upload_attachment(
             comment_id=comment_id if attachment_type == "comment" else None,
             filename=store_filename,
             original_filename=original_filename,
-            filepath=filepath,
-            mime_type=mime_type,
-            file_size=file_size,
+            filepath=staged,
+            mime_type=file.content_type,
+            file_size=result["size"],
+            media_status="processing",
         )
 
         db.add(attachment)
+        media_jobs.enqueue_attachment(db, "helpdesk", attachment, target=filepath, is_image=is_img)
         db.commit()
 
         logger.info(f"Archivo {original_filename} ({attachment_type}) subido al ticket {ticket_id}")
@@ -168,8 +130,8 @@ def upload_attachment(
         raise
     except Exception as e:
         logger.error(f"Error al subir archivo al ticket {ticket_id}: {e}")
-        if filepath and os.path.exists(filepath):
-            os.remove(filepath)
+        if staged and os.path.exists(staged):
+            os.remove(staged)
         raise
 
 
@@ -201,6 +163,8 @@ def list_attachments(
 @router.get("/{attachment_id}/download")
 def download_attachment(
     attachment_id: int,
+    request: Request,
+    size: Literal["thumb", "medium", "full"] | None = None,
     user: dict = require_perms("helpdesk", [
         "helpdesk.tickets.api.read.own",
         "helpdesk.tickets.api.read.all",
@@ -218,30 +182,24 @@ def download_attachment(
 
     ticket_service.get_ticket_by_id(db, attachment.ticket_id, user_id, check_permissions=True)
 
-    if not os.path.exists(attachment.filepath):
+    if not file_storage.exists(attachment.filepath):
         raise HTTPException(404, detail={"error": "file_not_found", "message": "El archivo no existe en el servidor"})
 
-    # Adjuntos comprimidos con gzip transparente: se descomprimen al vuelo y se
-    # sirven con el nombre y mime_type originales.
-    if attachment.filepath.endswith(".gz"):
-        def _decompressed_stream():
-            with gzip.open(attachment.filepath, "rb") as fh:
-                while True:
-                    chunk = fh.read(65536)
-                    if not chunk:
-                        break
-                    yield chunk
-
-        return StreamingResponse(
-            _decompressed_stream(),
-            media_type=attachment.mime_type or "application/octet-stream",
-            headers={"Content-Disposition": f'attachment; filename="{attachment.original_filename}"'},
+    # ?size= es para <img>: variante inline (WebP si se acepta) con caché larga.
+    # Sin size se mantiene la descarga del archivo completo.
+    if size and (attachment.mime_type or "").startswith("image/"):
+        return media_service.variant_response(
+            request, attachment.filepath, attachment.variants, size,
+            fallback_mime=attachment.mime_type,
         )
 
-    return FileResponse(
-        attachment.filepath,
+    # Adjuntos con gzip transparente: se entregan comprimidos (Content-Encoding:
+    # gzip) con el nombre y mime_type originales; ver file_delivery.
+    return file_delivery.send_file(
+        request, attachment.filepath,
         media_type=attachment.mime_type,
         filename=attachment.original_filename,
+        gzipped=attachment.filepath.endswith(".gz"),
     )
 
 
@@ -269,8 +227,8 @@ def delete_attachment(
     if not is_admin and attachment.uploaded_by_id != user_id:
         raise HTTPException(403, detail={"error": "forbidden", "message": "Solo el uploader o admin pueden eliminar el archivo"})
 
-    if os.path.exists(attachment.filepath):
-        os.remove(attachment.filepath)
+    media_service.remove_variants(attachment.filepath, attachment.variants)
+    file_storage.delete(attachment.filepath)
 
     db.delete(attachment)
     db.commit()
@@ -281,6 +239,7 @@ def delete_attachment(
 
 @router.get("/custom-field/{ticket_id}/{field_key}")
 def download_custom_field_file(
+    request: Request,
     ticket_id: int,
     field_key: str,
     user: dict = require_perms("helpdesk", [
@@ -338,8 +297,8 @@ def download_custom_field_file(
         "gif": "image/gif", "webp": "image/webp", "pdf": "application/pdf",
     }
 
-    return FileResponse(
-        filepath,
+    return file_delivery.send_file(
+        request, filepath,
         media_type=mime_types.get(ext, "application/octet-stream"),
         filename=filename,
     )
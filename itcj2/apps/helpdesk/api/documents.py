@@ -25,6 +25,25 @@ def _stream(buffer, mimetype, filename):
     )
 
 
+def _stream_file(fileobj, mimetype, filename, chunk_size=64 * 1024):
+    """Emite un archivo temporal por bloques y lo cierra (se borra) al terminar."""
+    def _chunks():
+        try:
+            while True:
+                chunk = fileobj.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            fileobj.close()
+
+    return StreamingResponse(
+        _chunks(),
+        media_type=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 def _generate_single(ticket, doc_type, doc_format):
     from itcj2.apps.helpdesk.services import document_service
 
@@ -66,28 +85,42 @@ def generate_documents(
     if body.output_mode not in ("zip", "concatenated"):
         raise HTTPException(400, detail={"error": "invalid_output_mode", "message": "output_mode debe ser zip o concatenated"})
 
+    # Solo ids: los lotes se cargan por tandas con su propia sesión
+    # (document_service._iter_document_chunks) mientras se emite la respuesta.
+    query = db.query(Ticket.id).order_by(Ticket.created_at.desc())
     if body.ticket_ids == "all":
-        tickets = db.query(Ticket).order_by(Ticket.created_at.desc()).all()
+        ticket_ids = [tid for (tid,) in query]
     elif isinstance(body.ticket_ids, list):
-        tickets = db.query(Ticket).filter(Ticket.id.in_(body.ticket_ids)).order_by(Ticket.created_at.desc()).all()
+        ticket_ids = [tid for (tid,) in query.filter(Ticket.id.in_(body.ticket_ids))]
     else:
         raise HTTPException(400, detail={"error": "invalid_ticket_ids", "message": 'ticket_ids debe ser un array o "all"'})
 
-    if not tickets:
+    if not ticket_ids:
         raise HTTPException(404, detail={"error": "no_tickets_found", "message": "No se encontraron tickets"})
 
+    prefix = _PREFIXES.get(body.doc_type, "Documentos")
     try:
-        if len(tickets) == 1:
-            return _generate_single(tickets[0], body.doc_type, body.format)
+        if len(ticket_ids) == 1:
+            return _generate_single(db.get(Ticket, ticket_ids[0]), body.doc_type, body.format)
 
-        if body.output_mode == "concatenated" and body.format == "pdf":
-            buffer = document_service.generate_concatenated_pdf(tickets, body.doc_type)
-            prefix = _PREFIXES.get(body.doc_type, "Documentos")
-            return _stream(buffer, "application/pdf", f"{prefix}_concatenado.pdf")
+        # Devuelve la conexión del request ya: lo que sigue usa sus propias sesiones.
+        db.rollback()
 
-        buffer = document_service.generate_batch_zip(tickets, body.doc_type, body.format)
-        prefix = _PREFIXES.get(body.doc_type, "Documentos")
-        return _stream(buffer, "application/zip", f"{prefix}.zip")
+        if body.output_mode == "concatenated" and body.format == "pdf":
+            try:
+                out = document_service.build_concatenated_pdf(ticket_ids, body.doc_type)
+                return _stream_file(out, "application/pdf", f"{prefix}_concatenado.pdf")
+            except ImportError:
+                logger.warning("pypdf no disponible, generando ZIP como fallback")
+
+        # El ZIP se emite entrada por entrada: un error a mitad de camino ya no
+        # puede cambiar el status, así que los fallos por ticket solo se registran
+        # (como antes) y el ZIP sale sin ese archivo.
+        return StreamingResponse(
+            document_service.iter_batch_zip(ticket_ids, body.doc_type, body.format),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{prefix}.zip"'},
+        )
 
     except ValueError as e:
         raise HTTPException(400, detail={"error": "generation_error", "message": str(e)})
@@ -250,6 +250,7 @@ def cancel_request(
 @router.get("/{request_id}/document")
 def download_document(
     request_id: int,
+    request: Request,
     user: dict = require_perms("helpdesk", ["helpdesk.inventory.retirement.api.read"]),
     db: DbSession = None,
 ):
@@ -259,8 +260,8 @@ def download_document(
     (head_mat_services, subdirector_admin_services, director, head_comp_center).
     """
     import os
-    from fastapi.responses import FileResponse
     from itcj2.apps.helpdesk.models.inventory_retirement_request import InventoryRetirementRequest
+    from itcj2.core.services import file_delivery, file_storage
 
     req = db.get(InventoryRetirementRequest, request_id)
     if not req:
@@ -277,17 +278,16 @@ def download_document(
         if user_id not in signer_ids:
             raise HTTPException(403, detail={"success": False, "error": "Sin acceso a esta solicitud"})
 
-    if not os.path.exists(req.document_path):
+    if not file_storage.exists(req.document_path):
         logger.error(f"download_document: archivo no encontrado en disco: {req.document_path} (req {req.id})")
         raise HTTPException(404, detail={"success": False, "error": "Archivo no encontrado en el servidor"})
 
     filename = req.document_original_name or os.path.basename(req.document_path)
     # Forzar descarga: ad-blockers bloquean preview inline. Usuario abre el archivo localmente.
-    return FileResponse(
-        path=req.document_path,
+    return file_delivery.send_file(
+        request, req.document_path,
         filename=filename,
         media_type="application/octet-stream",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
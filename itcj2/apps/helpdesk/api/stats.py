@@ -3,6 +3,7 @@ Stats API v2 — 11 endpoints (2 originales + 9 del merge feature/helpdesk-stats
 Fuente: itcj/apps/helpdesk/routes/api/stats.py
 """
 import logging
+import math
 import random
 from datetime import datetime, time, timedelta
 from typing import Optional
@@ -10,6 +11,7 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
 from sqlalchemy.orm import Session
 
+from itcj2.core.services.business_time import business_hours
 from itcj2.dependencies import DbSession, require_perms
 
 router = APIRouter(tags=["helpdesk-stats"])
@@ -510,6 +512,11 @@ def get_global_stats(
 
         res_hours = [_resolution_hours(t) for t in resolved_tickets if _resolution_hours(t) is not None]
         avg_resolution_hours = _safe_avg(res_hours)
+        # Mismo conjunto en horas hábiles (sin noches, fines ni días inhábiles),
+        # en una sola pasada vectorizada.
+        res_business = business_hours(
+            [t.created_at for t in resolved_tickets], [t.resolved_at for t in resolved_tickets], db=db)
+        avg_resolution_business_hours = _safe_avg([float(h) for h in res_business if not math.isnan(h)])
 
         invested = [t.time_invested_minutes / 60 for t in tickets if t.time_invested_minutes and t.time_invested_minutes > 0]
         avg_time_invested_hours = _safe_avg(invested)
@@ -555,6 +562,7 @@ def get_global_stats(
                 "avg_rating_speed": avg_rating_speed,
                 "efficiency_rate": efficiency_rate,
                 "avg_resolution_hours": avg_resolution_hours,
+                "avg_resolution_business_hours": avg_resolution_business_hours,
                 "avg_time_to_assign_hours": avg_time_to_assign_hours,
                 "avg_time_invested_hours": avg_time_invested_hours,
                 "rated_count": len(rated),
@@ -58,6 +58,7 @@ async def add_comment(
     from itcj2.apps.helpdesk.services import file_validation_service as fvs
     from itcj2.apps.helpdesk.models import Attachment
     from itcj2.config import get_settings
+    from itcj2.core.services import file_storage, media_jobs
     from werkzeug.utils import secure_filename
 
     user_id = int(user["sub"])
@@ -134,33 +135,21 @@ async def add_comment(
         try:
             original_filename = secure_filename(f.filename)
             is_img = info["is_image"]
-            folder = os.path.join(UPLOAD_FOLDER, "comments", ticket.ticket_number)
-            os.makedirs(folder, exist_ok=True)
+            storage = file_storage.get_storage()
 
             if is_img:
                 img_counter += 1
                 seq = existing_image_count + img_counter
                 store_filename = f"{ticket.ticket_number}_{seq}.jpg"
-                filepath = os.path.join(folder, store_filename)
-                f.file.seek(0)
-                compressed, file_size = fvs.compress_image_for_helpdesk(f.file)
-                with open(filepath, "wb") as out:
-                    out.write(compressed.read())
-                mime_type = "image/jpeg"
+                filepath = file_storage.attachment_key(
+                    storage, UPLOAD_FOLDER, "comment", ticket.id, ticket.ticket_number, store_filename)
             else:
-                store_filename = original_filename
-                counter = 1
-                base, ext = os.path.splitext(store_filename)
-                while os.path.exists(os.path.join(folder, store_filename)):
-                    store_filename = f"{base}_{counter}{ext}"
-                    counter += 1
-                filepath = os.path.join(folder, store_filename)
-                f.file.seek(0)
-                with open(filepath, "wb") as out:
-                    out.write(f.file.read())
-                file_size = info["size"]
-                mime_type = f.content_type
+                filepath = storage.unique(file_storage.attachment_key(
+                    storage, UPLOAD_FOLDER, "comment", ticket.id, ticket.ticket_number, original_filename))
+                store_filename = os.path.basename(filepath)
 
+            # Crudo a staging; la cola `media` lo procesa tras el commit.
+            staged = media_jobs.stage_upload(f.file)
             att = Attachment(
                 ticket_id=ticket_id,
                 uploaded_by_id=user_id,
@@ -168,11 +157,13 @@ async def add_comment(
                 comment_id=comment.id,
                 filename=store_filename,
                 original_filename=original_filename,
-                filepath=filepath,
-                mime_type=mime_type,
-                file_size=file_size,
+                filepath=staged,
+                mime_type=f.content_type,
+                file_size=info["size"],
+                media_status="processing",
             )
             db.add(att)
+            media_jobs.enqueue_attachment(db, "helpdesk", att, target=filepath, is_image=is_img)
             saved_files.append(att)
         except Exception as file_err:
             logger.error(f"Error guardando archivo {f.filename}: {file_err}")
@@ -1,7 +1,7 @@
 import os
 from datetime import datetime, timedelta
 
-from sqlalchemy import Column, BigInteger, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy import JSON, Column, BigInteger, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import text
 
@@ -29,6 +29,12 @@ class Attachment(Base):
     filepath = Column(String(500), nullable=False)
     mime_type = Column(String(100), nullable=True)
     file_size = Column(Integer, nullable=True)
+    # Manifiesto de core/services/media_service (thumb/medium/full en WebP+JPEG).
+    # NULL en documentos y en fotos subidas antes del pipeline.
+    variants = Column(JSON, nullable=True)
+    # 'processing' mientras la cola `media` procesa el upload (filepath apunta
+    # al crudo en staging); 'ready' al terminar. Ver core/services/media_jobs.py.
+    media_status = Column(String(20), nullable=False, default='ready', server_default='ready')
 
     # Timestamps y limpieza
     uploaded_at = Column(DateTime, nullable=False, server_default=text("NOW()"))
@@ -42,6 +48,9 @@ class Attachment(Base):
     __table_args__ = (
         Index('ix_helpdesk_attachment_auto_delete', 'auto_delete_at'),
         Index('ix_helpdesk_attachment_type', 'attachment_type'),
+        # Keyset de la purga (core/services/file_purge.py).
+        Index('ix_helpdesk_attachment_purge_keyset', 'auto_delete_at', 'id',
+              postgresql_where=text('auto_delete_at IS NOT NULL')),
     )
 
     def __repr__(self):
@@ -74,6 +83,8 @@ class Attachment(Base):
             'original_filename': self.original_filename,
             'mime_type': self.mime_type,
             'file_size': self.file_size,
+            'sizes': [n for n in ('thumb', 'medium', 'full') if n in (self.variants or {})],
+            'media_status': self.media_status,
             'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
             'uploaded_by': {
                 'id': self.uploaded_by.id,
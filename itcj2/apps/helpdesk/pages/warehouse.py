@@ -61,15 +61,14 @@ def _query_products_ctx(request: Request, user: dict) -> dict:
     Aplica los filtros de la barra (search/category/stock) server-side y pagina.
     El scope por ``department_code`` replica ``resolve_dept_code`` del endpoint
     API ``GET /products`` (admin ve todos los departamentos; el resto solo el
-    suyo). El filtro de stock usa ``is_below_restock`` (calculado tras enriquecer
-    con el stock disponible, igual que la API).
+    suyo). El filtro de stock usa ``is_below_restock`` (calculado al enriquecer
+    con el stock materializado del producto, igual que la API).
     """
     from itcj2.apps.warehouse.models.category import WarehouseCategory
     from itcj2.apps.warehouse.models.product import WarehouseProduct
     from itcj2.apps.warehouse.models.subcategory import WarehouseSubcategory
     from itcj2.apps.warehouse.services.utils import (
         enrich_product,
-        get_stock_totals,
         resolve_dept_code,
     )
     from itcj2.database import SessionLocal
@@ -101,8 +100,7 @@ def _query_products_ctx(request: Request, user: dict) -> dict:
             )
 
         products = q.order_by(WarehouseProduct.name).all()
-        stock_map = get_stock_totals(_db, [pr.id for pr in products])
-        enriched = [enrich_product(pr, stock_map) for pr in products]
+        enriched = [enrich_product(pr) for pr in products]
 
         if stock == "low":
             enriched = [e for e in enriched if e["is_below_restock"]]
@@ -1,51 +1,176 @@
 """
 Servicio para limpieza automática de attachments
+
+La purga corre por lotes con core/services/file_purge.PurgeRun: selección por
+keyset sobre (auto_delete_at, id), borrado de archivos en paralelo, DELETE y
+notas de auditoría en sentencias masivas, commit por lote.
 """
-from datetime import datetime, timedelta
-import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 import logging
 
+from sqlalchemy import bindparam, delete, func, select, tuple_, update
 from sqlalchemy.orm import Session
 
 from itcj2.apps.helpdesk.models.attachment import Attachment
+from itcj2.core.services.file_purge import PurgeRun
+from itcj2.core.utils.timezone import db_now
 
 logger = logging.getLogger(__name__)
 
 AUTO_DELETE_DAYS = 7
 
+_TYPE_KEYS = {"ticket": "ticket_image", "resolution": "resolution", "comment": "comment"}
 
-def cleanup_expired_attachments(db: Session) -> int:
-    """
-    Elimina attachments cuya fecha de auto-delete ya pasó.
 
-    Ejecutar periódicamente con cron o celery.
-    """
-    now = datetime.now()
+def _empty_counts(with_bytes: bool = True) -> dict:
+    counts = {"ticket_image": 0, "resolution": 0, "comment": 0, "total": 0}
+    if with_bytes:
+        counts["freed_bytes"] = 0
+    return counts
 
-    expired = db.query(Attachment).filter(
-        Attachment.auto_delete_at.isnot(None),
-        Attachment.auto_delete_at <= now
-    ).all()
 
-    deleted_count = 0
+def _select_expired(now: datetime):
+    """Lote de vencidos. Doble condición de seguridad:
 
-    for attachment in expired:
-        try:
-            if os.path.exists(attachment.filepath):
-                os.remove(attachment.filepath)
-                logger.info(f"Archivo eliminado: {attachment.filepath}")
+      1. auto_delete_at está fijado y ya venció.
+      2. El ticket está CLOSED y ticket.updated_at tiene >= 7 días (guarda
+         contra fechas mal calculadas que pudieran adelantar el borrado).
+    """
+    from itcj2.apps.helpdesk.models.ticket import Ticket
 
-            db.delete(attachment)
-            deleted_count += 1
+    cutoff = now - timedelta(days=AUTO_DELETE_DAYS)
+
+    def _select(db: Session, after, limit: int) -> list:
+        stmt = (
+            select(
+                Attachment.id, Attachment.auto_delete_at, Attachment.filepath, Attachment.variants,
+                Attachment.ticket_id, Attachment.comment_id, Attachment.attachment_type,
+                Attachment.original_filename, Ticket.ticket_number,
+            )
+            .join(Ticket, Ticket.id == Attachment.ticket_id)
+            .where(
+                Attachment.auto_delete_at.isnot(None),
+                Attachment.auto_delete_at <= now,
+                Ticket.status == 'CLOSED',
+                Ticket.updated_at <= cutoff,
+            )
+            .order_by(Attachment.auto_delete_at, Attachment.id)
+            .limit(limit)
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(Attachment.auto_delete_at, Attachment.id) > tuple_(*after))
+        return db.execute(stmt).all()
+
+    return _select
+
+
+def _finish_deleted(db: Session, rows: list) -> None:
+    db.execute(
+        delete(Attachment)
+        .where(Attachment.id.in_([r.id for r in rows]))
+        .execution_options(synchronize_session=False)
+    )
+    _audit_notes(db, rows, datetime.now(timezone.utc).strftime("%Y-%m-%d"))
+
+
+def _audit_notes(db: Session, rows: list, deletion_date: str) -> None:
+    """Notas de auditoría agrupadas por entidad padre, en UPDATEs masivos.
+
+    Un solo mensaje por ticket (imágenes), un solo mensaje por ticket (resolución),
+    y un solo mensaje por comentario — listando todos los archivos en cada caso.
+    Cada grupo es un UPDATE ejecutado con la lista de parámetros (executemany).
+    """
+    from itcj2.apps.helpdesk.models.ticket import Ticket
+    from itcj2.apps.helpdesk.models.comment import Comment
+
+    ticket_images: dict = defaultdict(int)           # ticket_id → cantidad de imágenes
+    ticket_resolutions: dict = defaultdict(list)     # ticket_id → [filenames]
+    comment_files: dict = defaultdict(list)          # comment_id → [filenames]
+
+    for row in rows:
+        if row.attachment_type == "ticket":
+            ticket_images[row.ticket_id] += 1
+        elif row.attachment_type == "resolution":
+            ticket_resolutions[row.ticket_id].append(row.original_filename)
+        elif row.attachment_type == "comment" and row.comment_id:
+            comment_files[row.comment_id].append(row.original_filename)
+
+    tickets = Ticket.__table__
+    comments = Comment.__table__
+
+    def _append(table, column: str, params: list) -> None:
+        if params:
+            col = table.c[column]
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("target_id"))
+                .values({column: func.coalesce(col, "") + bindparam("note")}),
+                params,
+            )
+
+    _append(tickets, "description", [
+        {"target_id": ticket_id,
+         "note": f"\n\n[{deletion_date}] Se eliminaron {count} imagen(es) adjunta(s) automáticamente."}
+        for ticket_id, count in ticket_images.items()
+    ])
+    _append(tickets, "resolution_notes", [
+        {"target_id": ticket_id,
+         "note": f"\n\n[{deletion_date}] Archivos de resolución eliminados automáticamente:"
+                 + "".join(f"\n  - {f}" for f in filenames)}
+        for ticket_id, filenames in ticket_resolutions.items()
+    ])
+    if comment_files:
+        db.execute(
+            update(comments)
+            .where(comments.c.id == bindparam("target_id"))
+            .values(
+                content=func.coalesce(comments.c.content, "") + bindparam("note"),
+                updated_at=bindparam("stamp"),
+            ),
+            [
+                {"target_id": comment_id,
+                 "note": f"\n\n[{deletion_date}] Archivos eliminados automáticamente:"
+                         + "".join(f"\n  - {f}" for f in filenames),
+                 "stamp": datetime.now(timezone.utc)}
+                for comment_id, filenames in comment_files.items()
+            ],
+        )
+
+
+def expired_purge(db: Session, *, after=None, dry_run: bool = False,
+                  by_ticket: dict | None = None) -> PurgeRun:
+    """Prepara la purga de vencidos; `by_ticket` (si se pasa) acumula el desglose
+    dict[ticket_number, {ticket_image, resolution, comment, total, freed_bytes}]."""
+    def _account(row, freed: int) -> None:
+        counts = by_ticket.setdefault(row.ticket_number or f"ticket_{row.ticket_id}", _empty_counts())
+        key = _TYPE_KEYS.get(row.attachment_type)
+        if key:
+            counts[key] += 1
+        counts["total"] += 1
+        counts["freed_bytes"] += freed
+
+    return PurgeRun(
+        db,
+        select=_select_expired(db_now()),
+        finish=_finish_deleted,
+        account=_account if by_ticket is not None else None,
+        after=after,
+        dry_run=dry_run,
+    )
 
-        except Exception as e:
-            logger.error(f"Error al eliminar attachment {attachment.id}: {e}")
 
-    if deleted_count > 0:
-        db.commit()
-        logger.info(f"Limpieza completada: {deleted_count} attachments eliminados")
+def cleanup_expired_attachments(db: Session) -> int:
+    """
+    Elimina attachments cuya fecha de auto-delete ya pasó.
 
-    return deleted_count
+    Ejecutar periódicamente con cron o celery.
+    """
+    purge = expired_purge(db)
+    purge.run()
+    if purge.purged:
+        logger.info(f"Limpieza completada: {purge.purged} attachments eliminados")
+    return purge.purged
 
 
 def set_auto_delete_on_closed_tickets(db: Session) -> int:
@@ -56,25 +181,49 @@ def set_auto_delete_on_closed_tickets(db: Session) -> int:
     Se usa updated_at porque una vez cerrado el ticket ya no recibe más
     cambios, por lo que updated_at equivale a la fecha de cierre.
 
-    Ejecutar periódicamente con cron o celery.
+    Un solo UPDATE ... FROM sobre los adjuntos sin fecha.
     """
     from itcj2.apps.helpdesk.models.ticket import Ticket
 
-    closed_tickets = db.query(Ticket).filter(
-        Ticket.status == 'CLOSED',
-    ).all()
-
-    updated_count = 0
-
-    for ticket in closed_tickets:
-        delete_at = ticket.updated_at + timedelta(days=AUTO_DELETE_DAYS)
-        for attachment in ticket.attachments:
-            if attachment.auto_delete_at is None:
-                attachment.auto_delete_at = delete_at
-                updated_count += 1
+    result = db.execute(
+        update(Attachment)
+        .where(
+            Attachment.ticket_id == Ticket.id,
+            Ticket.status == 'CLOSED',
+            Attachment.auto_delete_at.is_(None),
+        )
+        .values(auto_delete_at=Ticket.updated_at + timedelta(days=AUTO_DELETE_DAYS))
+        .execution_options(synchronize_session=False)
+    )
+    updated_count = result.rowcount or 0
 
     if updated_count > 0:
         db.commit()
         logger.info(f"Marcados {updated_count} attachments para auto-delete")
 
     return updated_count
+
+
+def pending_marks_by_ticket(db: Session) -> dict:
+    """Lo que marcaría `set_auto_delete_on_closed_tickets` (dry-run), agregado en SQL.
+
+    Returns:
+        dict[ticket_number, {ticket_image, resolution, comment, total}]
+    """
+    from itcj2.apps.helpdesk.models.ticket import Ticket
+
+    rows = db.execute(
+        select(Ticket.ticket_number, Attachment.attachment_type, func.count())
+        .join(Ticket, Ticket.id == Attachment.ticket_id)
+        .where(Ticket.status == 'CLOSED', Attachment.auto_delete_at.is_(None))
+        .group_by(Ticket.ticket_number, Attachment.attachment_type)
+    ).all()
+
+    breakdown: dict = {}
+    for ticket_number, att_type, count in rows:
+        counts = breakdown.setdefault(ticket_number, _empty_counts(with_bytes=False))
+        key = _TYPE_KEYS.get(att_type)
+        if key:
+            counts[key] += count
+        counts["total"] += count
+    return breakdown
@@ -22,6 +22,7 @@ from itcj2.apps.helpdesk.models.inventory_campaign import InventoryCampaign
 from itcj2.apps.helpdesk.models.inventory_campaign_validation import InventoryCampaignValidation
 from itcj2.apps.helpdesk.models.inventory_item import InventoryItem
 from itcj2.apps.helpdesk.services.inventory_history_service import InventoryHistoryService
+from itcj2.core.services import sequence_service
 
 logger = logging.getLogger(__name__)
 
@@ -165,21 +166,8 @@ class CampaignService:
     @staticmethod
     def generate_folio(db: Session) -> str:
         """Genera folio único global por año: CAM-{YEAR}-{SEQ:03d}."""
-        year = datetime.now().year
-        last = (
-            db.query(InventoryCampaign)
-            .filter(InventoryCampaign.folio.like(f"CAM-{year}-%"))
-            .order_by(InventoryCampaign.id.desc())
-            .first()
-        )
-        if last:
-            try:
-                seq = int(last.folio.split("-")[-1]) + 1
-            except Exception:
-                seq = 1
-        else:
-            seq = 1
-        return f"CAM-{year}-{seq:03d}"
+        seq = sequence_service.Sequence("helpdesk.campaign_folio", "CAM-{year}-{n:03d}", InventoryCampaign.folio)
+        return sequence_service.next_number(db, seq)
 
     # ── Crear campaña ─────────────────────────────────────────────────────────
 
@@ -0,0 +1,144 @@
+"""
+Caché en disco de los formatos generados (solicitud / orden de trabajo).
+
+Llenar la plantilla con python-docx (incluidas las palomitas de Pillow) y pasar
+por LibreOffice cuesta segundos por documento; un ticket cerrado no cambia, así
+que se guarda el resultado.
+
+La clave es un hash de (hash de la plantilla, tipo, ticket id, ticket.updated_at,
+versión del render): cualquier cambio del ticket (resolver, cerrar, editar), una
+plantilla nueva en instance/ o un cambio en el código de llenado
+(``RENDER_VERSION``) produce otra clave y la entrada vieja simplemente deja de
+usarse hasta que la desaloja el LRU.
+
+Disco: ``HELPDESK_DOC_CACHE_PATH/{k[:2]}/{k}.{docx|pdf}``. Escritura atómica
+(tmp + rename), así que varios workers pueden compartir el directorio. El LRU usa
+el mtime como "último acceso" (se toca en cada hit; atime no es fiable con
+noatime) y se aplica al escribir, como mucho una vez por minuto por proceso.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Subir al cambiar cómo se llenan las plantillas en document_service.
+RENDER_VERSION = 1
+
+_EVICT_EVERY = 60
+_last_evict = 0.0
+_evict_lock = threading.Lock()
+_template_hashes: dict[str, tuple[tuple[int, int], str]] = {}
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+def _root() -> str:
+    return _settings().HELPDESK_DOC_CACHE_PATH
+
+
+def template_hash(path: str) -> str:
+    """sha256 de la plantilla, memorizado por (mtime, tamaño)."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _template_hashes.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _template_hashes[path] = (stamp, digest)
+    return digest
+
+
+def key_for(template_path: str, doc_type: str, ticket) -> str:
+    stamp = ticket.updated_at or ticket.created_at
+    raw = '|'.join((
+        template_hash(template_path), doc_type, str(ticket.id),
+        stamp.isoformat() if stamp else '', f'v{RENDER_VERSION}',
+    ))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _path(key: str, fmt: str) -> str:
+    return os.path.join(_root(), key[:2], f'{key}.{fmt}')
+
+
+def get(key: str, fmt: str) -> bytes | None:
+    path = _path(key, fmt)
+    try:
+        with open(path, 'rb') as fh:
+            data = fh.read()
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return data
+
+
+def put(key: str, fmt: str, data: bytes) -> None:
+    path = _path(key, fmt)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+        with open(tmp, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except OSError as e:
+        # La caché es opcional: un disco lleno no debe romper la descarga.
+        logger.warning(f'document_cache: no se pudo guardar {path}: {e}')
+        return
+    _maybe_evict()
+
+
+def _maybe_evict() -> None:
+    global _last_evict
+    now = time.monotonic()
+    if now - _last_evict < _EVICT_EVERY or not _evict_lock.acquire(blocking=False):
+        return
+    try:
+        _last_evict = now
+        evict(_settings().HELPDESK_DOC_CACHE_MAX_MB * 1024 * 1024)
+    finally:
+        _evict_lock.release()
+
+
+def evict(max_bytes: int) -> int:
+    """Borra las entradas menos usadas hasta quedar en 90% de `max_bytes`. Devuelve cuántas."""
+    entries = []
+    total = 0
+    for dirpath, _, files in os.walk(_root()):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    if total <= max_bytes:
+        return 0
+
+    target = int(max_bytes * 0.9)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    logger.info(f'document_cache: {removed} entradas desalojadas (quedan {total} bytes)')
+    return removed
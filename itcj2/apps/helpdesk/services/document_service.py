@@ -3,15 +3,16 @@ Servicio para generación de documentos DOCX y PDF a partir de plantillas ISO.
 Usa las plantillas Word originales en instance/apps/helpdesk/templates/ y las llena
 con datos de los tickets, preservando el formato exacto del documento certificado.
 
-Para PDF: convierte el DOCX generado usando LibreOffice CLI.
+Para PDF: convierte el DOCX generado con el pool de LibreOffice residentes
+(core/services/office_converter.py); los lotes se convierten en paralelo.
+DOCX y PDF se cachean en disco por versión del ticket (document_cache.py).
+Los lotes se generan por tandas y se emiten en streaming (iter_batch_zip).
 """
 import os
-import shutil
-import subprocess
 import tempfile
 import zipfile
 from io import BytesIO
-from typing import List
+from typing import Iterator, List
 
 from docx import Document
 from docx.shared import Pt
@@ -21,6 +22,8 @@ from docx.opc.packuri import PackURI
 from PIL import Image, ImageDraw
 
 from itcj2.apps.helpdesk.models.ticket import Ticket
+from itcj2.apps.helpdesk.services import document_cache
+from itcj2.core.services import office_converter
 import logging
 
 logger = logging.getLogger(__name__)
@@ -180,9 +183,8 @@ def _overlay_checkmark_on_image_run(run, checked: bool):
 
 # ==================== SOLICITUD DE MANTENIMIENTO ====================
 
-def generate_solicitud_docx(ticket: Ticket) -> BytesIO:
+def _render_solicitud_docx(ticket: Ticket, template_path: str) -> BytesIO:
     """Genera FORMATO PARA SOLICITUD DE MANTENIMIENTO usando la plantilla original."""
-    template_path = _get_template_path(TEMPLATE_SOLICITUD)
     doc = Document(template_path)
 
     if len(doc.paragraphs) > 1 and len(doc.paragraphs[1].runs) > 2:
@@ -238,12 +240,8 @@ def generate_solicitud_docx(ticket: Ticket) -> BytesIO:
 
 # ==================== ORDEN DE TRABAJO ====================
 
-def generate_orden_trabajo_docx(ticket: Ticket) -> BytesIO:
+def _render_orden_trabajo_docx(ticket: Ticket, template_path: str) -> BytesIO:
     """Genera FORMATO PARA ORDEN DE TRABAJO usando la plantilla original."""
-    if not ticket.is_resolved and ticket.status != 'CLOSED':
-        raise ValueError('Solo se puede generar orden de trabajo para tickets resueltos o cerrados')
-
-    template_path = _get_template_path(TEMPLATE_ORDEN)
     doc = Document(template_path)
 
     table0 = doc.tables[0]
@@ -338,161 +336,243 @@ def _mark_service_type_overlay(cell, ticket: Ticket):
         _overlay_checkmark_on_image_run(runs[idx], is_checked)
 
 
-# ==================== CONVERSIÓN A PDF ====================
+# ==================== CACHÉ + FUNCIONES PÚBLICAS ====================
+#
+# Todo pasa por document_cache (ver su docstring): DOCX y PDF se guardan por
+# (plantilla, tipo, ticket, updated_at), así que un ticket cerrado se renderiza
+# y convierte una sola vez.
 
-def _find_libreoffice_cmd():
-    for cmd in ['libreoffice', 'soffice']:
-        if shutil.which(cmd):
-            return cmd
+_RENDERERS = {
+    'solicitud': (TEMPLATE_SOLICITUD, _render_solicitud_docx),
+    'orden_trabajo': (TEMPLATE_ORDEN, _render_orden_trabajo_docx),
+}
 
-    win_paths = [
-        r'C:\Program Files\LibreOffice\program\soffice.exe',
-        r'C:\Program Files (x86)\LibreOffice\program\soffice.exe',
-    ]
-    for path in win_paths:
-        if os.path.exists(path):
-            return path
 
-    return None
+def _has_orden(ticket: Ticket) -> bool:
+    return ticket.is_resolved or ticket.status == 'CLOSED'
 
 
-def _convert_docx_to_pdf(docx_buffer: BytesIO) -> BytesIO:
-    lo_cmd = _find_libreoffice_cmd()
-    if not lo_cmd:
-        raise RuntimeError(
-            'LibreOffice no está instalado. '
-            'Instálalo para la conversión a PDF, o descarga en formato DOCX.'
-        )
+def _check_part(ticket: Ticket, doc_type: str):
+    if doc_type == 'orden_trabajo' and not _has_orden(ticket):
+        raise ValueError('Solo se puede generar orden de trabajo para tickets resueltos o cerrados')
+
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        docx_path = os.path.join(tmpdir, 'document.docx')
-        with open(docx_path, 'wb') as f:
-            f.write(docx_buffer.read())
+def _cache_key(ticket: Ticket, doc_type: str) -> tuple:
+    template, render = _RENDERERS[doc_type]
+    template_path = _get_template_path(template)
+    return document_cache.key_for(template_path, doc_type, ticket), template_path, render
 
-        result = subprocess.run(
-            [
-                lo_cmd, '--headless', '--convert-to', 'pdf',
-                '--outdir', tmpdir, docx_path
-            ],
-            capture_output=True,
-            text=True,
-            timeout=60,
-        )
 
-        if result.returncode != 0:
-            logger.error(f'LibreOffice error: {result.stderr}')
-            raise RuntimeError(f'Error al convertir a PDF: {result.stderr}')
+def _docx(ticket: Ticket, doc_type: str) -> BytesIO:
+    _check_part(ticket, doc_type)
+    key, template_path, render = _cache_key(ticket, doc_type)
+    data = document_cache.get(key, 'docx')
+    if data is None:
+        data = render(ticket, template_path).getvalue()
+        document_cache.put(key, 'docx', data)
+    return BytesIO(data)
 
-        pdf_path = os.path.join(tmpdir, 'document.pdf')
-        if not os.path.exists(pdf_path):
-            raise RuntimeError('No se generó el archivo PDF')
 
-        pdf_buffer = BytesIO()
-        with open(pdf_path, 'rb') as f:
-            pdf_buffer.write(f.read())
-        pdf_buffer.seek(0)
-        return pdf_buffer
+def _pdfs(parts: list) -> list:
+    """PDF de cada (ticket, doc_type), en orden: ``BytesIO`` o la excepción de esa parte.
 
+    Los aciertos de caché salen directo; los DOCX faltantes se llenan en serie
+    (usan la sesión ORM del ticket) y se convierten juntos en el pool de
+    LibreOffice, en paralelo.
+    """
+    out: list = [None] * len(parts)
+    misses = []
+    for i, (ticket, doc_type) in enumerate(parts):
+        try:
+            _check_part(ticket, doc_type)
+            key = _cache_key(ticket, doc_type)[0]
+            data = document_cache.get(key, 'pdf')
+            if data is not None:
+                out[i] = BytesIO(data)
+            else:
+                misses.append((i, key, _docx(ticket, doc_type)))
+        except Exception as e:
+            out[i] = e
+
+    if misses:
+        converted = office_converter.convert_many([docx for _, _, docx in misses], 'docx')
+        for (i, key, _), pdf in zip(misses, converted):
+            if not isinstance(pdf, Exception):
+                document_cache.put(key, 'pdf', pdf.getvalue())
+            out[i] = pdf
+    return out
+
+
+def _single_pdf(ticket: Ticket, doc_type: str) -> BytesIO:
+    pdf = _pdfs([(ticket, doc_type)])[0]
+    if isinstance(pdf, Exception):
+        raise pdf
+    return pdf
+
+
+def generate_solicitud_docx(ticket: Ticket) -> BytesIO:
+    return _docx(ticket, 'solicitud')
+
+
+def generate_orden_trabajo_docx(ticket: Ticket) -> BytesIO:
+    return _docx(ticket, 'orden_trabajo')
 
-# ==================== FUNCIONES PÚBLICAS (PDF) ====================
 
 def generate_solicitud_pdf(ticket: Ticket) -> BytesIO:
-    docx_buffer = generate_solicitud_docx(ticket)
-    return _convert_docx_to_pdf(docx_buffer)
+    return _single_pdf(ticket, 'solicitud')
 
 
 def generate_orden_trabajo_pdf(ticket: Ticket) -> BytesIO:
-    docx_buffer = generate_orden_trabajo_docx(ticket)
-    return _convert_docx_to_pdf(docx_buffer)
+    return _single_pdf(ticket, 'orden_trabajo')
 
 
 # ==================== GENERACIÓN EN LOTE ====================
 
-def generate_batch_zip(tickets: List[Ticket], doc_type: str, doc_format: str) -> BytesIO:
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for ticket in tickets:
+def _ticket_parts(ticket: Ticket, doc_type: str) -> list:
+    """Partes de un ticket para un lote: [(prefijo, doc_type)] en orden de salida."""
+    if doc_type not in ('solicitud', 'orden_trabajo', 'combinado'):
+        raise ValueError(f'Tipo de documento inválido: {doc_type}')
+
+    parts = []
+    if doc_type in ('solicitud', 'combinado'):
+        parts.append(('Solicitud', 'solicitud'))
+    if doc_type in ('orden_trabajo', 'combinado'):
+        if _has_orden(ticket):
+            parts.append(('OrdenTrabajo', 'orden_trabajo'))
+        elif doc_type == 'orden_trabajo':
+            logger.warning(f'Omitiendo {ticket.ticket_number}: no resuelto')
+    return parts
+
+
+def _batch_documents(tickets: List[Ticket], doc_type: str, doc_format: str) -> list:
+    """[(ticket_number, prefijo, buffer | Exception)] de todo el lote (con caché)."""
+    entries = []
+    for ticket in tickets:
+        try:
+            for prefix, part in _ticket_parts(ticket, doc_type):
+                entries.append((ticket, prefix, part))
+        except Exception as e:
+            logger.error(f'Error generando documento para {ticket.ticket_number}: {e}')
+
+    if doc_format == 'pdf':
+        bufs = _pdfs([(ticket, part) for ticket, _, part in entries])
+    else:
+        bufs = []
+        for ticket, _, part in entries:
             try:
-                if doc_type == 'combinado':
-                    _add_combined_to_zip(zf, ticket, doc_format)
-                else:
-                    _add_single_type_to_zip(zf, ticket, doc_type, doc_format)
+                bufs.append(_docx(ticket, part))
             except Exception as e:
-                logger.error(f'Error generando documento para {ticket.ticket_number}: {e}')
-                continue
+                bufs.append(e)
+    return [(ticket.ticket_number, prefix, buf) for (ticket, prefix, _), buf in zip(entries, bufs)]
 
-    zip_buffer.seek(0)
-    return zip_buffer
 
+# Tickets por tanda: se cargan con su propia sesión, se renderizan/convierten
+# (en paralelo) y se escriben antes de pasar a la siguiente. Acota la memoria a
+# una tanda, sin importar el tamaño del lote.
+BATCH_CHUNK = 16
+_SPOOL_MAX = 1024 * 1024
 
-def _add_single_type_to_zip(zf, ticket: Ticket, doc_type: str, doc_format: str):
-    generators = {
-        ('solicitud', 'pdf'): generate_solicitud_pdf,
-        ('solicitud', 'docx'): generate_solicitud_docx,
-        ('orden_trabajo', 'pdf'): generate_orden_trabajo_pdf,
-        ('orden_trabajo', 'docx'): generate_orden_trabajo_docx,
-    }
 
-    gen_func = generators.get((doc_type, doc_format))
-    if not gen_func:
-        raise ValueError(f'Combinación inválida: {doc_type}/{doc_format}')
+def _iter_document_chunks(ticket_ids: List[int], doc_type: str, doc_format: str):
+    """Genera ``_batch_documents`` por tandas de BATCH_CHUNK tickets.
 
-    if doc_type == 'orden_trabajo' and not ticket.is_resolved and ticket.status != 'CLOSED':
-        logger.warning(f'Omitiendo {ticket.ticket_number}: no resuelto')
-        return
+    Cada tanda abre y cierra su sesión: el export puede tardar minutos y no debe
+    retener la conexión del request (pgbouncer en modo transacción).
+    """
+    from itcj2.database import SessionLocal
 
-    prefix = 'Solicitud' if doc_type == 'solicitud' else 'OrdenTrabajo'
-    file_buffer = gen_func(ticket)
-    zf.writestr(f'{prefix}_{ticket.ticket_number}.{doc_format}', file_buffer.read())
+    for i in range(0, len(ticket_ids), BATCH_CHUNK):
+        ids = ticket_ids[i:i + BATCH_CHUNK]
+        with SessionLocal() as db:
+            by_id = {t.id: t for t in db.query(Ticket).filter(Ticket.id.in_(ids))}
+            tickets = [by_id[t] for t in ids if t in by_id]
+            docs = _batch_documents(tickets, doc_type, doc_format)
+        yield docs
 
 
-def _add_combined_to_zip(zf, ticket: Ticket, doc_format: str):
-    if doc_format == 'pdf':
-        sol_buf = generate_solicitud_pdf(ticket)
-    else:
-        sol_buf = generate_solicitud_docx(ticket)
-    zf.writestr(f'Solicitud_{ticket.ticket_number}.{doc_format}', sol_buf.read())
+class _ChunkSink:
+    """Destino no buscable para ZipFile: acumula lo escrito hasta `drain()`."""
 
-    if ticket.is_resolved or ticket.status == 'CLOSED':
-        if doc_format == 'pdf':
-            ot_buf = generate_orden_trabajo_pdf(ticket)
-        else:
-            ot_buf = generate_orden_trabajo_docx(ticket)
-        zf.writestr(f'OrdenTrabajo_{ticket.ticket_number}.{doc_format}', ot_buf.read())
+    def __init__(self):
+        self._parts = []
 
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
 
-def generate_concatenated_pdf(tickets: List[Ticket], doc_type: str) -> BytesIO:
-    try:
-        from pypdf import PdfWriter, PdfReader
-    except ImportError:
-        logger.warning('pypdf no disponible, generando ZIP como fallback')
-        return generate_batch_zip(tickets, doc_type, 'pdf')
+    def flush(self):
+        pass
 
-    writer = PdfWriter()
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
 
-    for ticket in tickets:
-        try:
-            if doc_type == 'combinado':
-                _append_pdf_pages(writer, generate_solicitud_pdf(ticket))
-                if ticket.is_resolved or ticket.status == 'CLOSED':
-                    _append_pdf_pages(writer, generate_orden_trabajo_pdf(ticket))
-            elif doc_type == 'solicitud':
-                _append_pdf_pages(writer, generate_solicitud_pdf(ticket))
-            elif doc_type == 'orden_trabajo':
-                if not ticket.is_resolved and ticket.status != 'CLOSED':
+
+def iter_batch_zip(ticket_ids: List[int], doc_type: str, doc_format: str) -> Iterator[bytes]:
+    """ZIP del lote como iterador de bytes (para ``StreamingResponse``).
+
+    ZipFile sobre un destino no buscable escribe cada entrada con data
+    descriptor, así que cada archivo sale en cuanto se genera.
+    """
+    if doc_format not in ('pdf', 'docx'):
+        raise ValueError(f'Combinación inválida: {doc_type}/{doc_format}')
+
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for docs in _iter_document_chunks(ticket_ids, doc_type, doc_format):
+            for ticket_number, prefix, buf in docs:
+                if isinstance(buf, Exception):
+                    logger.error(f'Error generando documento para {ticket_number}: {buf}')
                     continue
-                _append_pdf_pages(writer, generate_orden_trabajo_pdf(ticket))
-        except Exception as e:
-            logger.error(f'Error concatenando PDF para {ticket.ticket_number}: {e}')
-            continue
+                zf.writestr(f'{prefix}_{ticket_number}.{doc_format}', buf.getvalue())
+            del docs
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
 
-    if len(writer.pages) == 0:
-        raise ValueError('No se generó contenido para ningún ticket')
 
-    buffer = BytesIO()
-    writer.write(buffer)
-    buffer.seek(0)
-    return buffer
+def build_concatenated_pdf(ticket_ids: List[int], doc_type: str):
+    """PDF concatenado del lote en un archivo temporal (posicionado al inicio).
+
+    Cada PDF fuente se pasa por un SpooledTemporaryFile (a disco pasado 1 MB) y
+    la salida también: pypdf lee el contenido de las páginas de ahí al escribir.
+    Los objetos idénticos (logos de la plantilla, repetidos en cada hoja) se
+    deduplican antes de escribir. Lanza ImportError si falta pypdf.
+    """
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    sources = []
+    try:
+        for docs in _iter_document_chunks(ticket_ids, doc_type, 'pdf'):
+            for ticket_number, _, buf in docs:
+                try:
+                    if isinstance(buf, Exception):
+                        raise buf
+                    spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX)
+                    spool.write(buf.getvalue())
+                    spool.seek(0)
+                    sources.append(spool)
+                    _append_pdf_pages(writer, spool)
+                except Exception as e:
+                    logger.error(f'Error concatenando PDF para {ticket_number}: {e}')
+                    continue
+            del docs
+
+        if len(writer.pages) == 0:
+            raise ValueError('No se generó contenido para ningún ticket')
+
+        if hasattr(writer, 'compress_identical_objects'):
+            writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+        out = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX)
+        writer.write(out)
+        out.seek(0)
+        return out
+    finally:
+        for spool in sources:
+            spool.close()
 
 
 def _append_pdf_pages(writer, pdf_buffer: BytesIO):
@@ -512,10 +592,11 @@ def generate_combined_pdf(ticket: Ticket) -> BytesIO:
 
     writer = PdfWriter()
 
-    _append_pdf_pages(writer, generate_solicitud_pdf(ticket))
-
-    if ticket.is_resolved or ticket.status == 'CLOSED':
-        _append_pdf_pages(writer, generate_orden_trabajo_pdf(ticket))
+    # Solicitud y orden se convierten a la vez (dos slots del pool) si no están en caché.
+    for pdf in _pdfs([(ticket, part) for _, part in _ticket_parts(ticket, 'combinado')]):
+        if isinstance(pdf, Exception):
+            raise pdf
+        _append_pdf_pages(writer, pdf)
 
     buffer = BytesIO()
     writer.write(buffer)
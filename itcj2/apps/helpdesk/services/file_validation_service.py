@@ -4,7 +4,6 @@ Valida magic bytes, extensiones, tamaños y comprime imágenes.
 """
 import logging
 import os
-import io
 import zipfile
 
 from PIL import Image
@@ -279,33 +278,6 @@ def validate_and_get_file_info(file_storage, allowed_extensions=None, max_size=N
     }
 
 
-def compress_image_for_helpdesk(image_file, max_size=(1920, 1920), quality=80):
-    """
-    Comprime una imagen para el helpdesk.
-
-    Returns:
-        tuple: (BytesIO buffer con imagen comprimida, tamaño en bytes)
-    """
-    img = Image.open(image_file)
-
-    if img.mode in ('RGBA', 'P', 'LA'):
-        background = Image.new('RGB', img.size, (255, 255, 255))
-        if img.mode == 'P':
-            img = img.convert('RGBA')
-        background.paste(img, mask=img.split()[-1] if 'A' in img.mode else None)
-        img = background
-    elif img.mode != 'RGB':
-        img = img.convert('RGB')
-
-    img.thumbnail(max_size, Image.LANCZOS)
-
-    buffer = io.BytesIO()
-    img.save(buffer, format='JPEG', quality=quality, optimize=True)
-    buffer.seek(0)
-
-    return buffer, buffer.getbuffer().nbytes
-
-
 def get_next_comment_image_number(db, ticket_id):
     """
     Obtiene el siguiente número consecutivo de imagen para comentarios del ticket.
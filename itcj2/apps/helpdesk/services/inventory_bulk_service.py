@@ -1,19 +1,28 @@
 """
 Servicio para registro masivo de equipos de inventario
 """
-from datetime import datetime, date, timedelta
+from collections import Counter
+from datetime import date, timedelta
 import logging
 import re
 
+from sqlalchemy import insert, or_, select
 from sqlalchemy.orm import Session
 
 from itcj2.apps.helpdesk.models.inventory_item import InventoryItem
 from itcj2.apps.helpdesk.models.inventory_category import InventoryCategory
 from itcj2.apps.helpdesk.models.inventory_history import InventoryHistory
+from itcj2.apps.helpdesk.services.inventory_service import InventoryService
 from itcj2.core.models.department import Department
 
 logger = logging.getLogger(__name__)
 
+_SERIAL_FIELDS = [
+    ("supplier_serial_list", "supplier_serial", "Serial proveedor"),
+    ("itcj_serial_list", "itcj_serial", "Serial ITCJ"),
+    ("id_tecnm_list", "id_tecnm", "ID TecNM"),
+]
+
 
 class InventoryBulkService:
     """Servicio para operaciones de registro masivo"""
@@ -21,36 +30,14 @@ class InventoryBulkService:
     @staticmethod
     def get_next_inventory_number(db: Session, category_id: int, year: int = None) -> str:
         """
-        Genera el siguiente número de inventario para una categoría.
-        Formato: PREFIX-YYYY-NNNN
+        Vista previa del siguiente número de inventario para una categoría.
+        Formato: PREFIX-YYYY-NNNN. No lo aparta: lo asigna el registro.
         """
-        if year is None:
-            year = datetime.now().year
-
-        category = db.get(InventoryCategory, category_id)
-        if not category:
+        try:
+            return InventoryService.peek_inventory_number(db, category_id, year)
+        except ValueError:
             raise ValueError(f"Categoría {category_id} no encontrada")
 
-        prefix = category.inventory_prefix
-        year_str = str(year)
-
-        last_item = db.query(InventoryItem).filter(
-            InventoryItem.category_id == category_id,
-            InventoryItem.inventory_number.like(f"{prefix}-{year_str}-%")
-        ).order_by(InventoryItem.inventory_number.desc()).first()
-
-        if last_item:
-            parts = last_item.inventory_number.split('-')
-            if len(parts) == 3:
-                last_num = int(parts[2])
-                next_num = last_num + 1
-            else:
-                next_num = 1
-        else:
-            next_num = 1
-
-        return f"{prefix}-{year_str}-{next_num:04d}"
-
     @staticmethod
     def parse_serial_list(raw_text: str, separator: str = "auto") -> list[str]:
         """
@@ -106,6 +93,9 @@ class InventoryBulkService:
         Valida las listas de seriales antes de un registro masivo.
         Verifica duplicados dentro de cada lista y contra la BD.
 
+        Los tres campos se comparan contra la BD en una sola consulta
+        (``campo IN (...) OR campo IN (...) ...``, índices únicos de cada campo).
+
         data keys: supplier_serial_list, itcj_serial_list, id_tecnm_list, serial_separator
         """
         separator = data.get("serial_separator", "newline")
@@ -116,13 +106,8 @@ class InventoryBulkService:
             "counts": {},
         }
 
-        serial_fields = [
-            ("supplier_serial_list", "supplier_serial", "Serial proveedor"),
-            ("itcj_serial_list", "itcj_serial", "Serial ITCJ"),
-            ("id_tecnm_list", "id_tecnm", "ID TecNM"),
-        ]
-
-        for list_key, db_field, label in serial_fields:
+        parsed_by_field = {}
+        for list_key, db_field, label in _SERIAL_FIELDS:
             raw = data.get(list_key, "")
             if not raw:
                 result["counts"][list_key] = 0
@@ -131,13 +116,7 @@ class InventoryBulkService:
             parsed = InventoryBulkService.parse_serial_list(raw, separator)
             result["counts"][list_key] = len(parsed)
 
-            seen = set()
-            dupes_in_list = []
-            for val in parsed:
-                if val in seen:
-                    dupes_in_list.append(val)
-                seen.add(val)
-
+            dupes_in_list = [val for val, count in Counter(parsed).items() if count > 1]
             if dupes_in_list:
                 result["valid"] = False
                 result["errors"].append({
@@ -146,20 +125,30 @@ class InventoryBulkService:
                 })
 
             if parsed:
-                existing = db.query(InventoryItem).filter(
-                    getattr(InventoryItem, db_field).in_(parsed)
-                ).all()
-                if existing:
-                    dupes_in_db = [getattr(e, db_field) for e in existing]
-                    result["valid"] = False
-                    result["errors"].append({
-                        "field": list_key,
-                        "message": f"{label}: ya existen en BD: {dupes_in_db}",
-                        "details": [
-                            {"serial": getattr(e, db_field), "inventory_number": e.inventory_number}
-                            for e in existing
-                        ],
-                    })
+                parsed_by_field[db_field] = parsed
+
+        if not parsed_by_field:
+            return result
+
+        columns = [getattr(InventoryItem, f) for f in parsed_by_field]
+        rows = db.execute(
+            select(InventoryItem.inventory_number, *columns)
+            .where(or_(*(col.in_(parsed_by_field[col.key]) for col in columns)))
+        ).all()
+
+        for list_key, db_field, label in _SERIAL_FIELDS:
+            wanted = set(parsed_by_field.get(db_field, ()))
+            existing = [r for r in rows if wanted and getattr(r, db_field) in wanted]
+            if existing:
+                result["valid"] = False
+                result["errors"].append({
+                    "field": list_key,
+                    "message": f"{label}: ya existen en BD: {[getattr(e, db_field) for e in existing]}",
+                    "details": [
+                        {"serial": getattr(e, db_field), "inventory_number": e.inventory_number}
+                        for e in existing
+                    ],
+                })
 
         return result
 
@@ -180,9 +169,12 @@ class InventoryBulkService:
           itcj_serial_list,       (texto con seriales ITCJ)
           id_tecnm_list,          (texto con IDs TecNM)
           serial_separator        (separador de las listas)
+
+        Los números de inventario se apartan como un bloque contiguo del
+        contador de (categoría, año); equipos e historial se insertan con un
+        INSERT multi-fila cada uno.
         """
         try:
-            created_items = []
             cc_department = db.query(Department).filter_by(code='comp_center').first()
 
             if not cc_department:
@@ -239,9 +231,10 @@ class InventoryBulkService:
             # campaign_id es opcional; se propaga a todos los items del lote
             batch_campaign_id = data.get('campaign_id') or None
 
-            for i, item_data in enumerate(items_overrides):
-                inventory_number = InventoryBulkService.get_next_inventory_number(db, data['category_id'])
+            inventory_numbers = InventoryService.reserve_inventory_numbers(db, data['category_id'], n)
 
+            rows = []
+            for i, item_data in enumerate(items_overrides):
                 department_id = item_data.get('department_id') or default_department_id
                 status = 'ACTIVE'
 
@@ -249,52 +242,55 @@ class InventoryBulkService:
                     department_id = cc_department.id
                     status = 'PENDING_ASSIGNMENT'
 
-                s_serial = supplier_serials[i] if i < len(supplier_serials) else None
-                i_serial = itcj_serials[i] if i < len(itcj_serials) else None
-                t_id = id_tecnm_parsed[i] if i < len(id_tecnm_parsed) else None
-
-                item = InventoryItem(
-                    inventory_number=inventory_number,
-                    category_id=data['category_id'],
-                    brand=data.get('brand'),
-                    model=data.get('model'),
-                    supplier_serial=s_serial,
-                    itcj_serial=i_serial,
-                    id_tecnm=t_id,
-                    specifications=data.get('specifications'),
-                    department_id=department_id,
-                    campaign_id=batch_campaign_id,
-                    assigned_to_user_id=item_data.get('assigned_to_user_id'),
-                    group_id=item_data.get('group_id'),
-                    location_detail=item_data.get('location_detail'),
-                    status=status,
-                    acquisition_date=acquisition_date,
-                    warranty_expiration=warranty_expiration,
-                    maintenance_frequency_days=data.get('maintenance_frequency_days'),
-                    next_maintenance_date=next_maintenance_date,
-                    notes=data.get('notes'),
-                    registered_by_id=registered_by_id,
-                    is_active=True
-                )
-
-                db.add(item)
-                db.flush()
-
-                history = InventoryHistory(
-                    item_id=item.id,
-                    event_type='REGISTERED',
-                    old_value=None,
-                    new_value={
+                rows.append({
+                    'inventory_number': inventory_numbers[i],
+                    'category_id': data['category_id'],
+                    'brand': data.get('brand'),
+                    'model': data.get('model'),
+                    'supplier_serial': supplier_serials[i] if i < len(supplier_serials) else None,
+                    'itcj_serial': itcj_serials[i] if i < len(itcj_serials) else None,
+                    'id_tecnm': id_tecnm_parsed[i] if i < len(id_tecnm_parsed) else None,
+                    'specifications': data.get('specifications'),
+                    'department_id': department_id,
+                    'campaign_id': batch_campaign_id,
+                    'assigned_to_user_id': item_data.get('assigned_to_user_id'),
+                    'group_id': item_data.get('group_id'),
+                    'location_detail': item_data.get('location_detail'),
+                    'status': status,
+                    'acquisition_date': acquisition_date,
+                    'warranty_expiration': warranty_expiration,
+                    'maintenance_frequency_days': data.get('maintenance_frequency_days'),
+                    'next_maintenance_date': next_maintenance_date,
+                    'notes': data.get('notes'),
+                    'registered_by_id': registered_by_id,
+                    'is_active': True,
+                })
+
+            # INSERT multi-fila con RETURNING (los objetos quedan en la sesión).
+            # Sin sort_by_parameter_order, que en algunos dialectos degrada a un
+            # INSERT por fila: el orden se recupera por el número de inventario.
+            inserted = {
+                item.inventory_number: item
+                for item in db.scalars(insert(InventoryItem).returning(InventoryItem), rows)
+            }
+            created_items = [inserted[number] for number in inventory_numbers]
+
+            db.execute(insert(InventoryHistory), [
+                {
+                    'item_id': item.id,
+                    'event_type': 'REGISTERED',
+                    'old_value': None,
+                    'new_value': {
                         'inventory_number': item.inventory_number,
                         'category_id': item.category_id,
                         'status': item.status,
                         'department_id': item.department_id,
                     },
-                    notes='Equipo registrado mediante registro masivo',
-                    performed_by_id=registered_by_id
-                )
-                db.add(history)
-                created_items.append(item)
+                    'notes': 'Equipo registrado mediante registro masivo',
+                    'performed_by_id': registered_by_id,
+                }
+                for item in created_items
+            ])
 
             db.commit()
             logger.info(f"Registro masivo: {len(created_items)} equipos creados por usuario {registered_by_id}")
@@ -17,6 +17,7 @@ from itcj2.apps.helpdesk.models.inventory_retirement_request import (
 logger = logging.getLogger(__name__)
 
 from itcj2.config import get_settings
+from itcj2.core.services import file_storage, sequence_service
 UPLOAD_BASE = get_settings().HELPDESK_RETIREMENT_PATH
 ALLOWED_EXTENSIONS = {"pdf", "docx", "doc", "png", "jpg", "jpeg"}
 
@@ -29,21 +30,9 @@ class InventoryRetirementService:
     @staticmethod
     def generate_folio(db: Session) -> str:
         """Genera folio único: BAJA-{YEAR}-{SEQ:03d}"""
-        year = datetime.now().year
-        last = (
-            db.query(InventoryRetirementRequest)
-            .filter(InventoryRetirementRequest.folio.like(f"BAJA-{year}-%"))
-            .order_by(InventoryRetirementRequest.id.desc())
-            .first()
-        )
-        if last:
-            try:
-                seq = int(last.folio.split("-")[-1]) + 1
-            except Exception:
-                seq = 1
-        else:
-            seq = 1
-        return f"BAJA-{year}-{seq:03d}"
+        seq = sequence_service.Sequence(
+            "helpdesk.retirement_folio", "BAJA-{year}-{n:03d}", InventoryRetirementRequest.folio)
+        return sequence_service.next_number(db, seq)
 
     # ── Validaciones ──────────────────────────────────────────────────────────
 
@@ -346,8 +335,10 @@ class InventoryRetirementService:
         if size is not None and size > max_size:
             raise ValueError(f"El archivo no debe exceder {max_size // (1024 * 1024)}MB")
 
-        os.makedirs(UPLOAD_BASE, exist_ok=True)
-        dest_path = os.path.join(UPLOAD_BASE, f"{req.folio}.{ext}")
+        storage = file_storage.get_storage()
+        dest_key = storage.place(UPLOAD_BASE, req.folio, f"{req.folio}.{ext}")
+        dest_path = storage.local_target(dest_key)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
         written = 0
         with open(dest_path, "wb") as f:
@@ -365,11 +356,15 @@ class InventoryRetirementService:
                         f"El archivo no debe exceder {max_size // (1024 * 1024)}MB"
                     )
                 f.write(chunk)
+        storage.publish(dest_key)
 
-        req.document_path = dest_path
+        previous = req.document_path
+        req.document_path = dest_key
         req.document_original_name = filename
         req.updated_at = datetime.now()
         db.commit()
+        if previous and previous != dest_key:
+            file_storage.delete(previous)
         db.refresh(req)
         return req
 
@@ -10,39 +10,52 @@ from itcj2.apps.helpdesk.models.inventory_item import InventoryItem
 from itcj2.apps.helpdesk.models.inventory_category import InventoryCategory
 from itcj2.apps.helpdesk.models.inventory_history import InventoryHistory
 from itcj2.core.models.department import Department
+from itcj2.core.services import sequence_service
+
+INVENTORY_NUMBER = sequence_service.Sequence(
+    "helpdesk.inventory_number", "{prefix}-{year}-{n:04d}", InventoryItem.inventory_number)
 
 
 class InventoryService:
     """Lógica de negocio para el sistema de inventario"""
 
     @staticmethod
-    def generate_inventory_number(db: Session, category_id):
-        """
-        Genera número de inventario único.
-        Formato: [PREFIX]-[YEAR]-[SEQUENCE]
-        """
+    def _numbering(db: Session, category_id, year: int | None) -> dict:
         category = db.get(InventoryCategory, category_id)
         if not category:
             raise ValueError("Categoría no encontrada")
+        return {
+            "key": str(category_id),
+            "where": (InventoryItem.category_id == category_id,),
+            "prefix": category.inventory_prefix,
+            "year": year or datetime.now().year,
+        }
 
-        prefix = category.inventory_prefix
-        year = datetime.now().year
+    @staticmethod
+    def reserve_inventory_numbers(db: Session, category_id, count: int = 1, year: int | None = None) -> list[str]:
+        """
+        Aparta `count` números consecutivos PREFIX-YEAR-NNNN para la categoría.
 
-        last_item = db.query(InventoryItem).filter(
-            InventoryItem.category_id == category_id,
-            InventoryItem.inventory_number.like(f"{prefix}-{year}-%")
-        ).order_by(InventoryItem.id.desc()).first()
+        Un solo UPDATE ... RETURNING sobre el contador de (categoría, año)
+        (core/services/sequence_service.py); el bloque queda apartado hasta el
+        commit del llamador y se libera con su rollback.
+        """
+        return sequence_service.next_numbers(
+            db, INVENTORY_NUMBER, count, **InventoryService._numbering(db, category_id, year))
 
-        if last_item:
-            try:
-                last_sequence = int(last_item.inventory_number.split('-')[-1])
-                next_sequence = last_sequence + 1
-            except Exception:
-                next_sequence = 1
-        else:
-            next_sequence = 1
+    @staticmethod
+    def peek_inventory_number(db: Session, category_id, year: int | None = None) -> str:
+        """Siguiente número que se asignaría, sin apartarlo (vista previa)."""
+        return sequence_service.peek_number(
+            db, INVENTORY_NUMBER, **InventoryService._numbering(db, category_id, year))
 
-        return f"{prefix}-{year}-{next_sequence:04d}"
+    @staticmethod
+    def generate_inventory_number(db: Session, category_id):
+        """
+        Genera número de inventario único.
+        Formato: [PREFIX]-[YEAR]-[SEQUENCE]
+        """
+        return InventoryService.reserve_inventory_numbers(db, category_id)[0]
 
     @staticmethod
     def create_item(db: Session, data, registered_by_id, ip_address=None):
@@ -63,6 +76,14 @@ class InventoryService:
             data['inventory_number'] = InventoryService.generate_inventory_number(
                 db, data['category_id']
             )
+        else:
+            # Un número capturado a mano con el formato del contador lo adelanta.
+            category = db.get(InventoryCategory, data['category_id'])
+            if category:
+                sequence_service.observe(
+                    db, INVENTORY_NUMBER, data['inventory_number'],
+                    key=str(category.id), prefix=category.inventory_prefix,
+                )
 
         existing = db.query(InventoryItem).filter_by(
             inventory_number=data['inventory_number']
@@ -168,7 +168,11 @@ class RetirementDocumentService:
 
     @staticmethod
     def generate_pdf(request, db=None) -> bytes:  # noqa: ARG004
-        """PDF deshabilitado por instrucción del usuario; usar Excel."""
+        """PDF deshabilitado por instrucción del usuario; usar Excel.
+
+        Si se rehabilita: ``office_converter.convert_to_pdf(xlsx, 'xlsx')`` (mismo
+        pool que los formatos de helpdesk; requiere libreoffice-calc en la imagen).
+        """
         raise RuntimeError(
             "Generación de PDF deshabilitada. Use formato Excel (xlsx) "
             "para mantener el formato oficial."
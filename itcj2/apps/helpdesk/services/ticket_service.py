@@ -6,7 +6,6 @@ from sqlalchemy import and_, case, or_
 from sqlalchemy.orm import Session, aliased
 from sqlalchemy.orm.attributes import flag_modified
 from werkzeug.utils import secure_filename
-from PIL import Image
 
 from itcj2.apps.helpdesk.models.ticket import Ticket
 from itcj2.apps.helpdesk.models.category import Category
@@ -18,6 +17,7 @@ from itcj2.apps.helpdesk.utils.custom_fields_validator import CustomFieldsValida
 from itcj2.apps.helpdesk.services.custom_fields_file_service import CustomFieldsFileService
 from itcj2.core.models.user import User
 from itcj2.core.models.department import Department
+from itcj2.core.services import file_storage, media_jobs
 from itcj2.models.base import paginate
 
 logger = logging.getLogger(__name__)
@@ -48,8 +48,6 @@ def _save_ticket_photo(db: Session, ticket_id, photo_file, uploader_id: int = No
         allowed_extensions = img_extensions
         max_size = s.HELPDESK_MAX_FILE_SIZE
 
-    os.makedirs(upload_path, exist_ok=True)
-
     original_filename = secure_filename(photo_file.filename)
     if '.' not in original_filename:
         raise ValueError('Archivo sin extensión')
@@ -83,62 +81,28 @@ def _save_ticket_photo(db: Session, ticket_id, photo_file, uploader_id: int = No
         }
         mime_type = _doc_mime_map.get(file_ext, 'application/octet-stream')
 
-    filepath = os.path.join(upload_path, filename)
+    filepath = file_storage.attachment_key(
+        file_storage.get_storage(), upload_path, 'ticket', ticket_id, None, filename)
 
+    # El request solo deja el crudo en staging; la recompresión (o el gzip del
+    # documento) la hace la cola `media` tras el commit.
+    staged = media_jobs.stage_upload(raw)
     try:
-        if is_image:
-            img = Image.open(raw)
-
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                if img.mode in ('RGBA', 'LA'):
-                    background.paste(img, mask=img.split()[-1])
-                img = background
-
-            max_size_dims = (1920, 1080)
-            if img.width > max_size_dims[0] or img.height > max_size_dims[1]:
-                img.thumbnail(max_size_dims, Image.Resampling.LANCZOS)
-
-            img.save(filepath, format='JPEG', quality=85, optimize=True)
-            final_size = os.path.getsize(filepath)
-            logger.info(f"Foto guardada: {filepath} ({final_size} bytes)")
-        else:
-            # gzip transparente: se guarda comprimido solo si reduce tamaño
-            # (PDF/Office ya vienen comprimidos). Se descomprime al descargar.
-            import gzip as _gzip
-            raw.seek(0)
-            raw_bytes = raw.read()
-            gz_bytes = _gzip.compress(raw_bytes, compresslevel=6)
-            if len(gz_bytes) < len(raw_bytes):
-                filename += '.gz'
-                filepath += '.gz'
-                with open(filepath, 'wb') as f:
-                    f.write(gz_bytes)
-                logger.info(f"Documento adjunto comprimido gzip: {len(raw_bytes)} -> {len(gz_bytes)} bytes ({filepath})")
-            else:
-                with open(filepath, 'wb') as f:
-                    f.write(raw_bytes)
-                logger.info(f"Documento adjunto guardado: {filepath} ({len(raw_bytes)} bytes)")
-            final_size = len(raw_bytes)
-
         attachment = Attachment(
             ticket_id=ticket_id,
             uploaded_by_id=uploader_id,
             filename=filename,
             original_filename=original_filename,
-            filepath=filepath,
-            mime_type=mime_type,
-            file_size=final_size
+            filepath=staged,
+            mime_type=photo_file.content_type if is_image else mime_type,
+            file_size=file_size,
+            media_status='processing',
         )
-
         db.add(attachment)
-
+        media_jobs.enqueue_attachment(db, 'helpdesk', attachment, target=filepath, is_image=is_image)
     except Exception as e:
-        logger.error(f"Error al procesar archivo del ticket: {e}")
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        logger.error(f"Error al registrar archivo del ticket: {e}")
+        os.remove(staged)
         raise
 
 
@@ -691,6 +655,7 @@ def resolve_ticket(
     try:
         db.commit()
         logger.info(f"Ticket {ticket.ticket_number} resuelto por usuario {resolved_by_id}")
+        _prerender_orden(ticket.id)
         return ticket
     except Exception as e:
         db.rollback()
@@ -698,6 +663,19 @@ def resolve_ticket(
         raise HTTPException(status_code=500, detail='Error al resolver ticket')
 
 
+def _prerender_orden(ticket_id: int) -> None:
+    """Encola el render de la orden de trabajo (queda en document_cache).
+
+    Resolver y cerrar cambian updated_at, que es parte de la clave de la caché:
+    se hace en ambas transiciones. Sin broker solo se pierde el precalentado.
+    """
+    try:
+        from itcj2.tasks.helpdesk_tasks import prerender_orden_trabajo
+        prerender_orden_trabajo.apply_async(kwargs={"ticket_id": ticket_id})
+    except Exception as e:
+        logger.warning(f"No se pudo encolar prerender de orden de trabajo ({ticket_id}): {e}")
+
+
 # ==================== CALIFICAR TICKET ====================
 def rate_ticket(
     db: Session,
@@ -757,6 +735,7 @@ def rate_ticket(
     try:
         db.commit()
         logger.info(f"Ticket {ticket.ticket_number} calificado - Atención: {rating_attention}/5, Rapidez: {rating_speed}/5")
+        _prerender_orden(ticket.id)
         return ticket
     except Exception as e:
         db.rollback()
@@ -511,7 +511,7 @@
             var icon = isImage ? 'fas fa-image text-info' : getFileIcon(att.original_filename);
             return '<div class="d-flex align-items-center justify-content-between border rounded p-2 mb-2">' +
                 '<div class="d-flex align-items-center gap-2 flex-grow-1 min-width-0">' +
-                (isImage ? '<img src="' + downloadUrl + '" class="rounded" style="width:40px;height:40px;object-fit:cover;cursor:pointer;" onclick="viewAttachmentImage(\'' + downloadUrl + '\', \'' + att.original_filename + '\')">' : '<i class="' + icon + ' fa-lg"></i>') +
+                (isImage ? '<img src="' + downloadUrl + '?size=thumb" class="rounded" style="width:40px;height:40px;object-fit:cover;cursor:pointer;" loading="lazy" onclick="viewAttachmentImage(\'' + downloadUrl + '?size=full\', \'' + att.original_filename + '\')">' : '<i class="' + icon + ' fa-lg"></i>') +
                 '<div class="min-width-0"><div class="text-truncate fw-semibold" style="max-width:300px;" title="' + att.original_filename + '">' + att.original_filename + '</div><small class="text-muted">' + formatFileSize(att.file_size) + ' - ' + HelpdeskUtils.formatTimeAgo(att.uploaded_at) + '</small></div>' +
                 '</div><div class="d-flex gap-1 flex-shrink-0">' +
                 '<a href="' + downloadUrl + '" class="btn btn-sm btn-outline-primary" download="' + att.original_filename + '" title="Descargar"><i class="fas fa-download"></i></a>' +
@@ -76,6 +76,7 @@
 
         // Start socket listeners
         setupWebSocketListeners();
+        document.addEventListener('notif:push', _onMediaReady);
 
         // Tutorial
         window.helpdeskTutorial?.maybeAutoStart('ticket_detail');
@@ -84,6 +85,15 @@
         loadTicketDetail();
     }
 
+    // Fotos/documentos subidos se procesan en la cola `media` del servidor; al
+    // terminar llega media_ready (vía FAB) y se recarga para mostrar la miniatura.
+    function _onMediaReady(e) {
+        const d = e?.detail;
+        if (d?.type === 'media_ready' && d.app === 'helpdesk' && d.ticket_id === ticketId) {
+            loadTicketDetail();
+        }
+    }
+
     // ==================== DESTROY ====================
     function destroy() {
         // Leave realtime room
@@ -106,6 +116,7 @@
             socket.off('ticket_reassigned');
         }
         ticketSocketBound = false;
+        document.removeEventListener('notif:push', _onMediaReady);
 
         // Reset warehouse listeners flag so _attachListeners() re-binds on revisit
         window.TicketWarehouse?._reset?.();
@@ -532,9 +543,9 @@
                     const isImage = att.mime_type && att.mime_type.startsWith('image/');
                     const downloadUrl = `/api/help-desk/v2/attachments/${att.id}/download`;
                     if (isImage) {
-                        return `<img src="${downloadUrl}" alt="${att.original_filename}" class="comment-attachment-thumb rounded"
-                            style="max-width:80px;max-height:80px;cursor:pointer;object-fit:cover;"
-                            onclick="viewAttachmentImage('${downloadUrl}', '${att.original_filename}')">`;
+                        return `<img src="${downloadUrl}?size=thumb" alt="${att.original_filename}" class="comment-attachment-thumb rounded"
+                            style="max-width:80px;max-height:80px;cursor:pointer;object-fit:cover;" loading="lazy"
+                            onclick="viewAttachmentImage('${downloadUrl}?size=full', '${att.original_filename}')">`;
                     }
                     return `<a href="${downloadUrl}" class="btn btn-sm btn-outline-secondary" download="${att.original_filename}">
                         <i class="fas fa-file me-1"></i>${att.original_filename}
@@ -1508,9 +1519,9 @@
                 if (isImage) {
                     return `
                         <div class="border rounded p-2 text-center" style="width:100px;">
-                            <img src="${downloadUrl}" alt="${att.original_filename}" class="rounded"
-                                style="max-width:80px;max-height:80px;cursor:pointer;object-fit:cover;"
-                                onclick="viewAttachmentImage('${downloadUrl}', '${att.original_filename}')">
+                            <img src="${downloadUrl}?size=thumb" alt="${att.original_filename}" class="rounded"
+                                style="max-width:80px;max-height:80px;cursor:pointer;object-fit:cover;" loading="lazy"
+                                onclick="viewAttachmentImage('${downloadUrl}?size=full', '${att.original_filename}')">
                             <small class="d-block text-truncate mt-1" title="${att.original_filename}">${att.original_filename}</small>
                         </div>`;
                 }
@@ -1545,8 +1556,8 @@
 
         if (isImage) {
             container.innerHTML = `
-                <div class="photo-thumbnail" onclick="openPhotoModal('${fileUrl}')">
-                    <img src="${fileUrl}" alt="Foto del problema" class="img-thumbnail">
+                <div class="photo-thumbnail" onclick="openPhotoModal('${fileUrl}?size=full')">
+                    <img src="${fileUrl}?size=medium" alt="Foto del problema" class="img-thumbnail">
                     <div class="photo-overlay">
                         <i class="fas fa-search-plus fa-2x"></i>
                     </div>
@@ -1858,8 +1869,8 @@
             return `
                 <div class="d-flex align-items-center justify-content-between border rounded p-2 mb-2">
                     <div class="d-flex align-items-center gap-2 flex-grow-1 min-width-0">
-                        ${isImage ? `<img src="${downloadUrl}" class="rounded" style="width:40px;height:40px;object-fit:cover;cursor:pointer;"
-                            onclick="viewAttachmentImage('${downloadUrl}', '${att.original_filename}')">` :
+                        ${isImage ? `<img src="${downloadUrl}?size=thumb" class="rounded" style="width:40px;height:40px;object-fit:cover;cursor:pointer;" loading="lazy"
+                            onclick="viewAttachmentImage('${downloadUrl}?size=full', '${att.original_filename}')">` :
                 `<i class="${icon} fa-lg"></i>`}
                         <div class="min-width-0">
                             <div class="text-truncate fw-semibold" style="max-width:300px;" title="${att.original_filename}">${att.original_filename}</div>
@@ -1,37 +1,43 @@
 """
-Cache in-memory de catálogos de configuración con invalidación manual.
-
-No usa TTL porque la invalidación se realiza explícitamente al modificar
-un registro en la API. El cache es por proceso: en entornos con múltiples
-workers (gunicorn, uvicorn multiprocess) cada worker mantiene su propio
-cache. La invalidación es best-effort — si un worker actualiza el catálogo
-sólo invalida su copia local. Bajo carga normal esto es aceptable dado que
-las prioridades y estados cambian raramente.
+Cache de catálogos de configuración de helpdesk.
+
+Cada catálogo es un `Catalog` de core/services/catalog_cache.py: snapshot
+inmutable por proceso, validado contra una generación en Redis e invalidado
+en TODOS los procesos (workers HTTP, sockets, Celery) al modificar un registro
+en la API. Los loaders usan el `db` del llamador; sin `db` se abre una sesión
+efímera.
+
+Snapshots:
+- PRIORITIES / STATUSES / AREAS / NOTIFICATION_TEMPLATES → code -> dict
+- TRANSITIONS → (from_code -> frozenset(to_code), (from, to) -> dict)
 """
 import logging
+from types import MappingProxyType
+
 from sqlalchemy.orm import Session
 
+from itcj2.core.services.catalog_cache import Catalog
+
 logger = logging.getLogger(__name__)
 
+
+def _by_code(rows) -> MappingProxyType:
+    return MappingProxyType({r.code: r.to_dict() for r in rows})
+
+
 # ==================== PRIORIDADES ====================
 
-_PRIORITIES_BY_CODE: dict[str, dict] | None = None
+def _load_priorities(db: Session) -> MappingProxyType:
+    from itcj2.apps.helpdesk.models.priority import Priority
+    return _by_code(db.query(Priority).order_by(Priority.display_order).all())
 
 
-def _ensure_loaded(db: Session) -> None:
-    """Carga el cache de prioridades desde BD si aún no está poblado."""
-    global _PRIORITIES_BY_CODE
-    if _PRIORITIES_BY_CODE is None:
-        from itcj2.apps.helpdesk.models.priority import Priority
-        rows = db.query(Priority).order_by(Priority.display_order).all()
-        _PRIORITIES_BY_CODE = {p.code: p.to_dict() for p in rows}
-        logger.debug(f"catalog_cache: cargadas {len(_PRIORITIES_BY_CODE)} prioridades")
+PRIORITIES = Catalog("helpdesk.priorities", _load_priorities)
 
 
 def get_priorities(db: Session, active_only: bool = True) -> list[dict]:
     """Devuelve lista de prioridades ordenada por display_order."""
-    _ensure_loaded(db)
-    items = list(_PRIORITIES_BY_CODE.values())
+    items = list(PRIORITIES.get(db).values())
     if active_only:
         items = [p for p in items if p.get("is_active")]
     return items
@@ -39,53 +45,43 @@ def get_priorities(db: Session, active_only: bool = True) -> list[dict]:
 
 def get_priority_by_code(db: Session, code: str) -> dict | None:
     """Lookup individual por code. Devuelve None si no existe."""
-    _ensure_loaded(db)
-    return _PRIORITIES_BY_CODE.get(code)
+    return PRIORITIES.get(db).get(code)
 
 
 def get_priority_codes(db: Session, active_only: bool = True) -> set[str]:
     """Conjunto de codes válidos. Útil para validación rápida."""
-    _ensure_loaded(db)
+    by_code = PRIORITIES.get(db)
     if active_only:
-        return {code for code, p in _PRIORITIES_BY_CODE.items() if p.get("is_active")}
-    return set(_PRIORITIES_BY_CODE.keys())
+        return {code for code, p in by_code.items() if p.get("is_active")}
+    return set(by_code.keys())
 
 
 def get_sla_hours(db: Session, code: str) -> int | None:
     """SLA en horas para la prioridad indicada por code. None si no existe."""
-    _ensure_loaded(db)
-    entry = _PRIORITIES_BY_CODE.get(code)
+    entry = PRIORITIES.get(db).get(code)
     if entry is None:
         return None
     return entry.get("sla_hours")
 
 
 def invalidate_priorities() -> None:
-    """Limpia el cache de prioridades. Debe llamarse tras cualquier operación write."""
-    global _PRIORITIES_BY_CODE
-    _PRIORITIES_BY_CODE = None
-    logger.debug("catalog_cache: cache de prioridades invalidado")
+    """Invalida el cache de prioridades. Debe llamarse tras cualquier operación write."""
+    PRIORITIES.invalidate()
 
 
 # ==================== ESTADOS (TicketStatus) ====================
 
-_STATUSES_BY_CODE: dict[str, dict] | None = None
+def _load_statuses(db: Session) -> MappingProxyType:
+    from itcj2.apps.helpdesk.models.ticket_status import TicketStatus
+    return _by_code(db.query(TicketStatus).order_by(TicketStatus.display_order).all())
 
 
-def _ensure_statuses_loaded(db: Session) -> None:
-    """Carga el cache de estados desde BD si aún no está poblado."""
-    global _STATUSES_BY_CODE
-    if _STATUSES_BY_CODE is None:
-        from itcj2.apps.helpdesk.models.ticket_status import TicketStatus
-        rows = db.query(TicketStatus).order_by(TicketStatus.display_order).all()
-        _STATUSES_BY_CODE = {s.code: s.to_dict() for s in rows}
-        logger.debug(f"catalog_cache: cargados {len(_STATUSES_BY_CODE)} estados")
+STATUSES = Catalog("helpdesk.statuses", _load_statuses)
 
 
 def get_statuses(db: Session, active_only: bool = True) -> list[dict]:
     """Devuelve lista de estados ordenada por display_order."""
-    _ensure_statuses_loaded(db)
-    items = list(_STATUSES_BY_CODE.values())
+    items = list(STATUSES.get(db).values())
     if active_only:
         items = [s for s in items if s.get("is_active")]
     return items
@@ -93,72 +89,59 @@ def get_statuses(db: Session, active_only: bool = True) -> list[dict]:
 
 def get_status_by_code(db: Session, code: str) -> dict | None:
     """Lookup individual por code. Devuelve None si no existe."""
-    _ensure_statuses_loaded(db)
-    return _STATUSES_BY_CODE.get(code)
+    return STATUSES.get(db).get(code)
 
 
 def get_status_codes(db: Session, active_only: bool = True) -> set[str]:
     """Conjunto de codes válidos. Útil para validación rápida."""
-    _ensure_statuses_loaded(db)
+    by_code = STATUSES.get(db)
     if active_only:
-        return {code for code, s in _STATUSES_BY_CODE.items() if s.get("is_active")}
-    return set(_STATUSES_BY_CODE.keys())
+        return {code for code, s in by_code.items() if s.get("is_active")}
+    return set(by_code.keys())
 
 
 def get_status_flags(status_code: str) -> dict | None:
     """
     Lookup de flags sin requerir db como parámetro.
-    Usa el cache existente. Si el cache no está poblado, abre una sesión efímera.
+    Si el cache no está poblado (o quedó viejo), abre una sesión efímera.
     Diseñado para uso en propiedades del modelo Ticket donde no hay db disponible.
     """
-    global _STATUSES_BY_CODE
-    if _STATUSES_BY_CODE is None:
-        from itcj2.database import SessionLocal
-        db = SessionLocal()
-        try:
-            _ensure_statuses_loaded(db)
-        finally:
-            db.close()
-    return _STATUSES_BY_CODE.get(status_code) if _STATUSES_BY_CODE else None
+    by_code = STATUSES.get()
+    return by_code.get(status_code) if by_code else None
 
 
 def invalidate_statuses() -> None:
-    """Limpia el cache de estados. Debe llamarse tras cualquier operación write."""
-    global _STATUSES_BY_CODE
-    _STATUSES_BY_CODE = None
-    logger.debug("catalog_cache: cache de estados invalidado")
+    """Invalida el cache de estados. Debe llamarse tras cualquier operación write."""
+    STATUSES.invalidate()
 
 
 # ==================== TRANSICIONES (StatusTransition) ====================
 
-_TRANSITIONS_BY_FROM_CODE: dict[str, set[str]] | None = None
-# Índice secundario: (from_code, to_code) -> dict completo de la transición
-_TRANSITIONS_FULL: dict[tuple[str, str], dict] | None = None
-
-
-def _ensure_transitions_loaded(db: Session) -> None:
-    """Carga el cache de transiciones activas desde BD si aún no está poblado."""
-    global _TRANSITIONS_BY_FROM_CODE, _TRANSITIONS_FULL
-    if _TRANSITIONS_BY_FROM_CODE is None:
-        from itcj2.apps.helpdesk.models.status_transition import StatusTransition
-        rows = db.query(StatusTransition).filter_by(is_active=True).all()
-        idx: dict[str, set[str]] = {}
-        full: dict[tuple[str, str], dict] = {}
-        for t in rows:
-            from_code = t.from_status.code if t.from_status else None
-            to_code = t.to_status.code if t.to_status else None
-            if from_code and to_code:
-                idx.setdefault(from_code, set()).add(to_code)
-                full[(from_code, to_code)] = t.to_dict(include_status_codes=True)
-        _TRANSITIONS_BY_FROM_CODE = idx
-        _TRANSITIONS_FULL = full
-        logger.debug(f"catalog_cache: cargadas {len(full)} transiciones")
+def _load_transitions(db: Session) -> tuple[MappingProxyType, MappingProxyType]:
+    """Transiciones activas: índice por origen y (from, to) -> dict completo."""
+    from itcj2.apps.helpdesk.models.status_transition import StatusTransition
+    rows = db.query(StatusTransition).filter_by(is_active=True).all()
+    idx: dict[str, set[str]] = {}
+    full: dict[tuple[str, str], dict] = {}
+    for t in rows:
+        from_code = t.from_status.code if t.from_status else None
+        to_code = t.to_status.code if t.to_status else None
+        if from_code and to_code:
+            idx.setdefault(from_code, set()).add(to_code)
+            full[(from_code, to_code)] = t.to_dict(include_status_codes=True)
+    return (
+        MappingProxyType({k: frozenset(v) for k, v in idx.items()}),
+        MappingProxyType(full),
+    )
+
+
+TRANSITIONS = Catalog("helpdesk.transitions", _load_transitions)
 
 
 def get_allowed_transitions(db: Session, from_code: str) -> set[str]:
     """Devuelve el conjunto de códigos de destino permitidos desde from_code."""
-    _ensure_transitions_loaded(db)
-    return set(_TRANSITIONS_BY_FROM_CODE.get(from_code, set()))
+    by_from, _ = TRANSITIONS.get(db)
+    return set(by_from.get(from_code, ()))
 
 
 def is_transition_allowed(db: Session, from_code: str, to_code: str) -> bool:
@@ -168,8 +151,8 @@ def is_transition_allowed(db: Session, from_code: str, to_code: str) -> bool:
     """
     if from_code == to_code:
         return True
-    _ensure_transitions_loaded(db)
-    return to_code in _TRANSITIONS_BY_FROM_CODE.get(from_code, set())
+    by_from, _ = TRANSITIONS.get(db)
+    return to_code in by_from.get(from_code, ())
 
 
 def get_transition_record(db: Session, from_code: str, to_code: str) -> dict | None:
@@ -177,40 +160,32 @@ def get_transition_record(db: Session, from_code: str, to_code: str) -> dict | N
     Devuelve el registro completo de la transición, incluyendo required_perm
     y required_fields. Útil para validaciones más finas en el service.
     """
-    _ensure_transitions_loaded(db)
-    return _TRANSITIONS_FULL.get((from_code, to_code)) if _TRANSITIONS_FULL else None
+    _, full = TRANSITIONS.get(db)
+    return full.get((from_code, to_code))
 
 
 def invalidate_transitions() -> None:
-    """Limpia el cache de transiciones. Debe llamarse tras cualquier operación write."""
-    global _TRANSITIONS_BY_FROM_CODE, _TRANSITIONS_FULL
-    _TRANSITIONS_BY_FROM_CODE = None
-    _TRANSITIONS_FULL = None
-    logger.debug("catalog_cache: cache de transiciones invalidado")
+    """Invalida el cache de transiciones. Debe llamarse tras cualquier operación write."""
+    TRANSITIONS.invalidate()
 
 
 # ==================== AREAS ====================
 
-_AREAS_BY_CODE: dict[str, dict] | None = None
-
 # Fallback defensivo usado cuando la BD es inalcanzable o el cache está vacío.
 _AREAS_FALLBACK: set[str] = {"DESARROLLO", "SOPORTE"}
 
 
-def _ensure_areas_loaded(db: Session) -> None:
-    """Carga el cache de áreas desde BD si aún no está poblado."""
-    global _AREAS_BY_CODE
-    if _AREAS_BY_CODE is None:
-        from itcj2.apps.helpdesk.models.area import Area
-        rows = db.query(Area).order_by(Area.display_order).all()
-        _AREAS_BY_CODE = {a.code: a.to_dict() for a in rows}
-        logger.debug(f"catalog_cache: cargadas {len(_AREAS_BY_CODE)} áreas")
+def _load_areas(db: Session) -> MappingProxyType:
+    from itcj2.apps.helpdesk.models.area import Area
+    return _by_code(db.query(Area).order_by(Area.display_order).all())
+
+
+AREAS = Catalog("helpdesk.areas", _load_areas)
 
 
 def get_areas(db: Session, active_only: bool = True) -> list[dict]:
     """Devuelve lista de áreas ordenada por display_order."""
-    _ensure_areas_loaded(db)
-    items = list(_AREAS_BY_CODE.values())
+    items = list(AREAS.get(db).values())
     if active_only:
         items = [a for a in items if a.get("is_active")]
     return items
@@ -218,8 +193,7 @@ def get_areas(db: Session, active_only: bool = True) -> list[dict]:
 
 def get_area_by_code(db: Session, code: str) -> dict | None:
     """Lookup individual por code. Devuelve None si no existe."""
-    _ensure_areas_loaded(db)
-    return _AREAS_BY_CODE.get(code)
+    return AREAS.get(db).get(code)
 
 
 def get_area_codes(db: Session = None, active_only: bool = True) -> set[str]:
@@ -229,39 +203,30 @@ def get_area_codes(db: Session = None, active_only: bool = True) -> set[str]:
     devuelve {'DESARROLLO', 'SOPORTE'} para no romper flujos existentes.
     """
     try:
-        _ensure_areas_loaded(db)
-        if not _AREAS_BY_CODE:
+        by_code = AREAS.get(db)
+        if not by_code:
             return _AREAS_FALLBACK.copy()
         if active_only:
-            return {code for code, a in _AREAS_BY_CODE.items() if a.get("is_active")}
-        return set(_AREAS_BY_CODE.keys())
+            return {code for code, a in by_code.items() if a.get("is_active")}
+        return set(by_code.keys())
     except Exception:
         logger.warning("catalog_cache: get_area_codes falló, usando fallback defensivo")
         return _AREAS_FALLBACK.copy()
 
 
 def invalidate_areas() -> None:
-    """Limpia el cache de áreas. Debe llamarse tras cualquier operación write."""
-    global _AREAS_BY_CODE
-    _AREAS_BY_CODE = None
-    logger.debug("catalog_cache: cache de áreas invalidado")
+    """Invalida el cache de áreas. Debe llamarse tras cualquier operación write."""
+    AREAS.invalidate()
 
 
 # ==================== NOTIFICATION TEMPLATES ====================
 
-_NOTIFICATION_TEMPLATES_BY_CODE: dict[str, dict] | None = None
+def _load_notification_templates(db: Session) -> MappingProxyType:
+    from itcj2.apps.helpdesk.models.notification_template import NotificationTemplate
+    return _by_code(db.query(NotificationTemplate).all())
 
 
-def _ensure_notification_templates_loaded(db: Session) -> None:
-    """Carga el cache de plantillas de notificación desde BD si aún no está poblado."""
-    global _NOTIFICATION_TEMPLATES_BY_CODE
-    if _NOTIFICATION_TEMPLATES_BY_CODE is None:
-        from itcj2.apps.helpdesk.models.notification_template import NotificationTemplate
-        rows = db.query(NotificationTemplate).all()
-        _NOTIFICATION_TEMPLATES_BY_CODE = {t.code: t.to_dict() for t in rows}
-        logger.debug(
-            f"catalog_cache: cargadas {len(_NOTIFICATION_TEMPLATES_BY_CODE)} plantillas de notificación"
-        )
+NOTIFICATION_TEMPLATES = Catalog("helpdesk.notification_templates", _load_notification_templates)
 
 
 def get_notification_template(db: Session, code: str) -> dict | None:
@@ -269,8 +234,7 @@ def get_notification_template(db: Session, code: str) -> dict | None:
     Lookup por code. Devuelve None si la plantilla no existe O si está
     marcada is_active=False, para que el helper use el fallback hardcoded.
     """
-    _ensure_notification_templates_loaded(db)
-    entry = _NOTIFICATION_TEMPLATES_BY_CODE.get(code)
+    entry = NOTIFICATION_TEMPLATES.get(db).get(code)
     if entry is None:
         return None
     return entry if entry.get("is_active") else None
@@ -278,15 +242,12 @@ def get_notification_template(db: Session, code: str) -> dict | None:
 
 def get_notification_templates(db: Session, active_only: bool = True) -> list[dict]:
     """Devuelve lista de todas las plantillas, opcionalmente filtradas por is_active."""
-    _ensure_notification_templates_loaded(db)
-    items = list(_NOTIFICATION_TEMPLATES_BY_CODE.values())
+    items = list(NOTIFICATION_TEMPLATES.get(db).values())
     if active_only:
         items = [t for t in items if t.get("is_active")]
     return items
 
 
 def invalidate_notification_templates() -> None:
-    """Limpia el cache de plantillas. Debe llamarse tras cualquier operación write."""
-    global _NOTIFICATION_TEMPLATES_BY_CODE
-    _NOTIFICATION_TEMPLATES_BY_CODE = None
-    logger.debug("catalog_cache: cache de plantillas de notificación invalidado")
+    """Invalida el cache de plantillas. Debe llamarse tras cualquier operación write."""
+    NOTIFICATION_TEMPLATES.invalidate()
@@ -4,70 +4,25 @@ from .timezone_utils import now_local, ensure_local_timezone
 
 def calculate_business_hours(start: datetime, end: datetime) -> float:
     """
-    Calcula las horas transcurridas en horario laboral (Lun-Vie, 8 AM - 6 PM).
-    
+    Calcula las horas transcurridas en horario laboral (Lun-Vie, 8 AM - 6 PM),
+    descontando los días inhábiles institucionales (core_business_closures).
+
+    Delegado en core/services/business_time.py: O(1) por intervalo en vez de
+    recorrer el rango día por día. Para muchos tickets a la vez, usar
+    `business_time.business_hours(starts, ends)` (vectorizado).
+
     Args:
         start: Fecha/hora de inicio
         end: Fecha/hora de fin
-    
+
     Returns:
         Horas en horario laboral
     """
+    from itcj2.core.services.business_time import hours_between
+
     if not start or not end:
         return 0.0
-    
-    # Asegurar que ambas fechas estén en timezone local
-    start = ensure_local_timezone(start)
-    end = ensure_local_timezone(end)
-    
-    # Ahora ya podemos comparar de forma segura
-    if start >= end:
-        return 0.0
-    
-    # Configuración de horario laboral
-    WORK_START = 8  # 8 AM
-    WORK_END = 18   # 6 PM
-    WORK_HOURS_PER_DAY = WORK_END - WORK_START  # 10 horas
-    
-    total_hours = 0.0
-    current = start
-    
-    while current.date() <= end.date():
-        # Saltar fines de semana (0=Monday, 6=Sunday)
-        if current.weekday() >= 5:  # Sábado o Domingo
-            current += timedelta(days=1)
-            current = current.replace(hour=WORK_START, minute=0, second=0, microsecond=0)
-            continue
-        
-        # Determinar hora de inicio del día
-        day_start = current.replace(hour=WORK_START, minute=0, second=0, microsecond=0)
-        day_end = current.replace(hour=WORK_END, minute=0, second=0, microsecond=0)
-        
-        # Ajustar si el inicio es antes o después del horario laboral
-        if current < day_start:
-            current = day_start
-        elif current >= day_end:
-            current += timedelta(days=1)
-            current = current.replace(hour=WORK_START, minute=0, second=0, microsecond=0)
-            continue
-        
-        # Calcular horas trabajadas en este día
-        if current.date() == end.date():
-            # Último día
-            effective_end = min(end, day_end)
-            hours = (effective_end - current).total_seconds() / 3600
-            total_hours += max(0, hours)
-            break
-        else:
-            # Día completo
-            hours = (day_end - current).total_seconds() / 3600
-            total_hours += max(0, hours)
-            
-            # Siguiente día
-            current += timedelta(days=1)
-            current = current.replace(hour=WORK_START, minute=0, second=0, microsecond=0)
-    
-    return round(total_hours, 2)
+    return round(hours_between(ensure_local_timezone(start), ensure_local_timezone(end)), 2)
 
 
 def calculate_sla_deadline(created_at: datetime, priority: str) -> datetime:
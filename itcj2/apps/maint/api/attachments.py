@@ -14,9 +14,10 @@ La eliminación manual por el uploader/admin elimina fila Y archivo.
 import os
 import uuid
 import logging
+from typing import Literal
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Form
+from itcj2.core.services import file_delivery, file_storage, media_jobs, media_service
 from itcj2.dependencies import DbSession, require_perms
 
 router = APIRouter(tags=["maint-attachments"])
@@ -28,25 +29,18 @@ def _get_settings():
     return get_settings()
 
 
-def _resolve_folder(upload_path: str, attachment_type: str, ticket) -> str:
-    """Devuelve la carpeta de destino según el tipo de adjunto."""
-    if attachment_type == "ticket":
-        return os.path.join(upload_path, str(ticket.id))
-    elif attachment_type == "resolution":
-        return os.path.join(upload_path, "resolutions", ticket.ticket_number)
-    else:  # comment
-        return os.path.join(upload_path, "comments", ticket.ticket_number)
-
-
-def _unique_filename(folder: str, base_name: str) -> str:
-    """Añade sufijo _2, _3, … si el nombre de archivo ya existe en la carpeta."""
-    base, ext = os.path.splitext(base_name)
-    candidate = base_name
-    counter = 1
-    while os.path.exists(os.path.join(folder, candidate)):
-        counter += 1
-        candidate = f"{base}_{counter}{ext}"
-    return candidate
+def _remove_partial(*keys) -> None:
+    """Borra lo que se alcanzó a escribir (publicado o aún en el destino local)."""
+    for key in keys:
+        if not key:
+            continue
+        try:
+            file_storage.delete(key)
+            local = file_storage.backend_for(key).local_target(key)
+            if local != key and os.path.exists(local):
+                os.remove(local)
+        except Exception:
+            pass
 
 
 def _save_attachment_file(
@@ -138,41 +132,36 @@ def _save_attachment_file(
                 },
             )
 
-    # --- Nombre y carpeta ---
+    # --- Nombre y clave (carpeta con shard, ver file_storage) ---
     original_filename = secure_filename(file.filename)
-    folder = _resolve_folder(upload_path, attachment_type, ticket)
+    storage = file_storage.get_storage()
 
     if attachment_type == "ticket":
         ts = now_local().strftime("%Y%m%d%H%M%S")
         uid = uuid.uuid4().hex[:8]
-        store_filename = f"{ticket.id}_{ts}_{uid}.{extension}"
+        filepath = file_storage.attachment_key(
+            storage, upload_path, attachment_type, ticket.id, ticket.ticket_number,
+            f"{ticket.id}_{ts}_{uid}.{extension}",
+        )
     else:
-        store_filename = _unique_filename(folder, original_filename)
+        filepath = storage.unique(file_storage.attachment_key(
+            storage, upload_path, attachment_type, ticket.id, ticket.ticket_number,
+            original_filename,
+        ))
+    store_filename = os.path.basename(filepath)
 
-    filepath = None
+    staged = None
     try:
-        os.makedirs(folder, exist_ok=True)
-        filepath = os.path.join(folder, store_filename)
-
-        mime_type = file.content_type or "application/octet-stream"
-
         if is_img:
-            try:
-                file.file.seek(0)
-                compressed, compressed_size = fvs.compress_image_for_helpdesk(file.file)
-                with open(filepath, "wb") as out:
-                    out.write(compressed.read())
-                file_size = compressed_size
-                mime_type = "image/jpeg"
-            except Exception as exc:
-                logger.warning(f"No se pudo comprimir imagen {original_filename}: {exc}")
-                file.file.seek(0)
-                with open(filepath, "wb") as out:
-                    out.write(file.file.read())
+            # Crudo a staging; la recompresión la hace la cola `media` tras el commit.
+            staged = media_jobs.stage_upload(file.file)
         else:
+            local = storage.local_target(filepath)
+            os.makedirs(os.path.dirname(local), exist_ok=True)
             file.file.seek(0)
-            with open(filepath, "wb") as out:
+            with open(local, "wb") as out:
                 out.write(file.file.read())
+            storage.publish(filepath)
 
         att = MaintAttachment(
             ticket_id=ticket.id,
@@ -181,11 +170,14 @@ def _save_attachment_file(
             comment_id=comment_id if attachment_type == "comment" else None,
             filename=store_filename,
             original_filename=original_filename,
-            filepath=filepath,
-            mime_type=mime_type,
+            filepath=staged or filepath,
+            mime_type=file.content_type or "application/octet-stream",
             file_size=file_size,
+            media_status="processing" if is_img else "ready",
         )
         db.add(att)
+        if is_img:
+            media_jobs.enqueue_attachment(db, "maint", att, target=filepath, is_image=True)
         db.flush()  # obtener att.id antes del commit
 
         log_entry = MaintTicketActionLog(
@@ -204,19 +196,11 @@ def _save_attachment_file(
         return att
 
     except HTTPException:
-        if filepath and os.path.exists(filepath):
-            try:
-                os.remove(filepath)
-            except OSError:
-                pass
+        _remove_partial(filepath, staged)
         raise
     except Exception as exc:
         db.rollback()
-        if filepath and os.path.exists(filepath):
-            try:
-                os.remove(filepath)
-            except OSError:
-                pass
+        _remove_partial(filepath, staged)
         logger.error(f"Error al guardar adjunto para ticket {ticket.id}: {exc}")
         raise HTTPException(500, detail="Error interno al guardar el archivo")
 
@@ -310,6 +294,8 @@ def list_attachments(
 @router.get("/attachments/{attachment_id}/download")
 def download_attachment(
     attachment_id: int,
+    request: Request,
+    size: Literal["thumb", "medium", "full"] | None = None,
     user: dict = require_perms("maint", ["maint.tickets.api.read.own"]),
     db: DbSession = None,
 ):
@@ -339,7 +325,7 @@ def download_attachment(
             },
         )
 
-    if not att.filepath or not os.path.exists(att.filepath):
+    if not file_storage.exists(att.filepath):
         raise HTTPException(
             404,
             detail={
@@ -359,8 +345,14 @@ def download_attachment(
     }
     mime_type = att.mime_type or mime_map.get(ext, "application/octet-stream")
 
-    return FileResponse(
-        att.filepath,
+    # ?size= es para <img>: variante inline con caché larga (ver media_service).
+    if size and mime_type.startswith("image/"):
+        return media_service.variant_response(
+            request, att.filepath, att.variants, size, fallback_mime=mime_type,
+        )
+
+    return file_delivery.send_file(
+        request, att.filepath,
         media_type=mime_type,
         filename=att.original_filename,
     )
@@ -402,9 +394,10 @@ def delete_attachment(
             },
         )
 
-    if att.filepath and os.path.exists(att.filepath):
+    media_service.remove_variants(att.filepath, att.variants)
+    if att.filepath:
         try:
-            os.remove(att.filepath)
+            file_storage.delete(att.filepath)
         except OSError as exc:
             logger.warning(f"No se pudo eliminar el archivo físico {att.filepath}: {exc}")
 
@@ -1,5 +1,6 @@
 from itcj2.apps.maint.models.area import MaintArea
 from itcj2.apps.maint.models.category import MaintCategory
+from itcj2.apps.maint.models.location import MaintLocation
 from itcj2.apps.maint.models.ticket import MaintTicket
 from itcj2.apps.maint.models.ticket_technician import MaintTicketTechnician
 from itcj2.apps.maint.models.technician_area import MaintTechnicianArea
@@ -16,6 +17,7 @@ from itcj2.apps.maint.models.notification_template import MaintNotificationTempl
 __all__ = [
     "MaintArea",
     "MaintCategory",
+    "MaintLocation",
     "MaintTicket",
     "MaintTicketTechnician",
     "MaintTechnicianArea",
@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy import JSON, BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import text
 
@@ -26,6 +26,12 @@ class MaintAttachment(Base):
     filepath = Column(String(500), nullable=True)   # NULL cuando is_purged=True
     mime_type = Column(String(100), nullable=True)
     file_size = Column(Integer, nullable=True)
+    # Manifiesto de core/services/media_service (thumb/medium/full en WebP+JPEG).
+    # NULL en documentos y en fotos subidas antes del pipeline.
+    variants = Column(JSON, nullable=True)
+    # 'processing' mientras la cola `media` procesa el upload (filepath apunta
+    # al crudo en staging); 'ready' al terminar. Ver core/services/media_jobs.py.
+    media_status = Column(String(20), nullable=False, default='ready', server_default='ready')
     uploaded_at = Column(DateTime, nullable=False, server_default=text("NOW()"))
     auto_delete_at = Column(DateTime, nullable=True)  # 2 días tras resolución
 
@@ -44,6 +50,9 @@ class MaintAttachment(Base):
         Index('ix_maint_attachment_auto_delete', 'auto_delete_at'),
         Index('ix_maint_attachment_ticket_type', 'ticket_id', 'attachment_type'),
         Index('ix_maint_attachment_purged', 'is_purged', 'auto_delete_at'),
+        # Keyset de la purga (core/services/file_purge.py).
+        Index('ix_maint_attachment_purge_keyset', 'auto_delete_at', 'id',
+              postgresql_where=text('NOT is_purged AND auto_delete_at IS NOT NULL')),
     )
 
     def to_dict(self):
@@ -56,6 +65,8 @@ class MaintAttachment(Base):
             'original_filename': self.original_filename,
             'mime_type': self.mime_type,
             'file_size': self.file_size,
+            'sizes': [n for n in ('thumb', 'medium', 'full') if n in (self.variants or {})],
+            'media_status': self.media_status,
             'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
             'uploaded_by': {
                 'id': self.uploaded_by.id,
@@ -0,0 +1,34 @@
+"""
+Dimensión de ubicaciones de tickets de mantenimiento.
+
+`MaintTicket.location` es texto libre; cada valor distinto (normalizado por
+`location_service.normalize`: minúsculas y sin blancos en los extremos) tiene
+aquí una fila con el edificio y el salón ya parseados por
+`utils/location_parser.py`. Los tickets la referencian por
+`location_id`, así los heatmaps agrupan por llave foránea indexada en vez de
+normalizar y parsear texto en cada consulta.
+
+La llena `services/location_service.py` al crear/editar tickets y el comando
+``maint backfill-locations`` para los existentes.
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, String
+from sqlalchemy.sql import text
+
+from itcj2.models.base import Base
+
+
+class MaintLocation(Base):
+    __tablename__ = 'maint_locations'
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String(300), nullable=False, unique=True)   # location_service.normalize(location)
+    building = Column(String(120), nullable=False)            # parse_building(); 'Sin clasificar' si no aplica
+    room = Column(String(300), nullable=True)                 # parse_room()
+    created_at = Column(DateTime, nullable=False, server_default=text("NOW()"))
+
+    __table_args__ = (
+        Index('ix_maint_locations_building', 'building'),
+    )
+
+    def __repr__(self):
+        return f'<MaintLocation {self.key!r} → {self.building}>'
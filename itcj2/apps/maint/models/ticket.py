@@ -47,6 +47,8 @@ class MaintTicket(Base):
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=False)
     location = Column(String(300), nullable=True)
+    location_id = Column(Integer, ForeignKey('maint_locations.id'), nullable=True)
+    # Ubicación normalizada/parseada (maint_locations); la llena location_service
     custom_fields = Column(JSON, nullable=True)   # Campos del field_template de la categoría
 
     # ==================== ESTADO ====================
@@ -98,6 +100,7 @@ class MaintTicket(Base):
     requester = relationship('User', foreign_keys=[requester_id])
     requester_department = relationship('Department', foreign_keys=[requester_department_id])
     category = relationship('MaintCategory', back_populates='tickets')
+    location_dim = relationship('MaintLocation')
     resolved_by = relationship('User', foreign_keys=[resolved_by_id])
     coordinator = relationship('User', foreign_keys=[coordinator_id])
     created_by_user = relationship('User', foreign_keys=[created_by_id])
@@ -123,6 +126,8 @@ class MaintTicket(Base):
         Index('ix_maint_tickets_category_status', 'category_id', 'status'),
         Index('ix_maint_tickets_resolved_by', 'resolved_by_id'),
         Index('ix_maint_tickets_due_at', 'due_at'),
+        # Heatmaps: rango de created_at agrupando por ubicación/categoría (index-only)
+        Index('ix_maint_tickets_created_location', 'created_at', 'location_id', 'category_id'),
     )
 
     # ==================== PROPIEDADES CALCULADAS ====================
@@ -8,8 +8,10 @@ from itcj2.apps.maint.models.ticket_technician import MaintTicketTechnician
 from itcj2.apps.maint.models.technician_area import MaintTechnicianArea
 from itcj2.apps.maint.models.status_log import MaintStatusLog
 from itcj2.apps.maint.models.action_log import MaintTicketActionLog
+from itcj2.apps.maint.services import sla_scheduler
 from itcj2.apps.maint.utils.timezone_utils import now_local
 from itcj2.core.models.user import User
+from itcj2.core.services.authz_cache import invalidate_user_scope
 from itcj2.core.services.authz_service import user_roles_in_app
 
 logger = logging.getLogger(__name__)
@@ -74,6 +76,7 @@ def assign_technicians(
     active_ids = {t.user_id for t in ticket.technicians if t.unassigned_at is None}
 
     new_assignments = []
+    new_technicians = []
     for user_id in user_ids:
         if user_id in active_ids:
             continue  # Ya asignado, ignorar
@@ -124,6 +127,7 @@ def assign_technicians(
             detail={'user_id': user_id, 'user_name': technician.full_name},
         ))
         new_assignments.append(assignment)
+        new_technicians.append(technician)
 
     if not new_assignments:
         raise HTTPException(status_code=400, detail='Todos los técnicos indicados ya están asignados')
@@ -142,6 +146,13 @@ def assign_technicians(
             notes=f'{len(new_assignments)} técnico(s) asignados',
         ))
 
+    # U10: email a cada técnico recién asignado, en la misma transacción
+    # (outbox; no-op si la cuenta de correo de maint no está conectada).
+    from itcj2.apps.maint.services.email_helper import MaintEmailHelper
+    for technician in new_technicians:
+        MaintEmailHelper.send_assigned(db, ticket, technician)
+    sla_scheduler.schedule(db, ticket)
+
     try:
         db.commit()
         logger.info(f"Ticket {ticket.ticket_number}: {len(new_assignments)} técnico(s) asignados por {assigned_by_id}")
@@ -258,6 +269,7 @@ def unassign_technician(
             changed_by_id=unassigned_by_id,
             notes='Sin técnicos asignados',
         ))
+    sla_scheduler.schedule(db, ticket)
 
     try:
         db.commit()
@@ -302,6 +314,7 @@ def assign_technician_area(
 
     try:
         db.commit()
+        invalidate_user_scope(user_id, 'maint')
         return area
     except Exception as e:
         db.rollback()
@@ -328,6 +341,7 @@ def remove_technician_area(
     query.delete(synchronize_session=False)
     try:
         db.commit()
+        invalidate_user_scope(user_id, 'maint')
         return count
     except Exception as e:
         db.rollback()
@@ -4,20 +4,22 @@ Servicio de limpieza automática de adjuntos de mantenimiento.
 Ciclo de vida:
   1. set_auto_delete_on_resolved_tickets — asigna auto_delete_at a adjuntos
      de tickets terminados que aún no lo tienen.
-  2. cleanup_expired_attachments — para cada adjunto con auto_delete_at vencido:
+  2. cleanup_expired_attachments — para cada adjunto con auto_delete_at vencido
+     (por lotes, ver core/services/file_purge.py):
        - elimina el archivo físico
        - marca is_purged=True, purged_at=ahora, filepath=None
        - conserva la fila para trazabilidad (diferencia clave vs helpdesk)
 
 Ambas funciones son idempotentes y se pueden llamar desde un cron o CLI.
 """
-import os
 import logging
 from datetime import timedelta
 
+from sqlalchemy import select, tuple_, update
 from sqlalchemy.orm import Session
 
 from itcj2.apps.maint.utils.timezone_utils import now_local
+from itcj2.core.services.file_purge import PurgeRun
 
 logger = logging.getLogger(__name__)
 
@@ -80,6 +82,30 @@ def set_auto_delete_on_resolved_tickets(db: Session) -> int:
     return updated
 
 
+def _select_expired(now):
+    from itcj2.apps.maint.models.attachment import MaintAttachment
+
+    def _select(db: Session, after, limit: int) -> list:
+        stmt = (
+            select(
+                MaintAttachment.id, MaintAttachment.auto_delete_at, MaintAttachment.filepath,
+                MaintAttachment.variants, MaintAttachment.ticket_id,
+            )
+            .where(
+                MaintAttachment.is_purged.is_(False),
+                MaintAttachment.auto_delete_at.isnot(None),
+                MaintAttachment.auto_delete_at <= now,
+            )
+            .order_by(MaintAttachment.auto_delete_at, MaintAttachment.id)
+            .limit(limit)
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(MaintAttachment.auto_delete_at, MaintAttachment.id) > tuple_(*after))
+        return db.execute(stmt).all()
+
+    return _select
+
+
 def cleanup_expired_attachments(db: Session) -> int:
     """
     Purga archivos físicos vencidos.
@@ -87,49 +113,30 @@ def cleanup_expired_attachments(db: Session) -> int:
     Para cada MaintAttachment con:
         is_purged=False AND auto_delete_at <= now()
 
-    - Elimina el archivo del disco si existe.
+    - Elimina el archivo del disco (y sus variantes) si existe.
     - Marca is_purged=True, purged_at=now(), filepath=None.
     - Conserva la fila (diferencia semántica vs helpdesk).
 
-    Commit único al final. Retorna el número de adjuntos purgados.
+    Por lotes con core/services/file_purge.PurgeRun: un UPDATE masivo y un
+    commit por lote. Un archivo que no se pudo borrar deja su fila sin purgar
+    para la siguiente corrida. Retorna el número de adjuntos purgados.
     """
     from itcj2.apps.maint.models.attachment import MaintAttachment
 
     now = now_local()
 
-    expired = (
-        db.query(MaintAttachment)
-        .filter(
-            MaintAttachment.is_purged.is_(False),
-            MaintAttachment.auto_delete_at.isnot(None),
-            MaintAttachment.auto_delete_at <= now,
+    def _finish(db: Session, rows: list) -> None:
+        db.execute(
+            update(MaintAttachment)
+            .where(MaintAttachment.id.in_([r.id for r in rows]))
+            .values(is_purged=True, purged_at=now, filepath=None, variants=None)
+            .execution_options(synchronize_session=False)
         )
-        .all()
-    )
 
-    purged = 0
-    for att in expired:
-        original_path = att.filepath
-        try:
-            if original_path and os.path.exists(original_path):
-                os.remove(original_path)
-                logger.info(
-                    f"Archivo purgado: {att.original_filename} "
-                    f"(ticket {att.ticket_id}, attachment {att.id})"
-                )
-        except OSError as exc:
-            logger.warning(
-                f"No se pudo eliminar archivo {original_path} "
-                f"(attachment {att.id}): {exc}"
-            )
-
-        att.is_purged = True
-        att.purged_at = now
-        att.filepath = None
-        purged += 1
+    purge = PurgeRun(db, select=_select_expired(now), finish=_finish)
+    purge.run()
 
-    if purged:
-        db.commit()
-        logger.info(f"Purga completada: {purged} adjuntos de maint marcados como purgados")
+    if purge.purged:
+        logger.info(f"Purga completada: {purge.purged} adjuntos de maint marcados como purgados")
 
-    return purged
+    return purge.purged
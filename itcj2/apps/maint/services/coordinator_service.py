@@ -88,6 +88,8 @@ class CoordinatorService:
             )
 
         db.commit()
+        from itcj2.core.services.authz_cache import invalidate_user_scope
+        invalidate_user_scope(user_id, "maint")
         logger.info(
             "Coordinador %s: áreas actualizadas a %s por %s",
             user_id,
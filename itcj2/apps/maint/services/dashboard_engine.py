@@ -0,0 +1,115 @@
+"""
+Motor de agregación de los dashboards de Mantenimiento.
+
+Antes cada KPI (by_status, overdue, por categoría, por prioridad, promedio de
+resolución, SLA...) era su propio ``SELECT count(*)`` sobre
+``_apply_visibility(db.query(MaintTicket), ...)``: 8-10 recorridos del mismo
+conjunto visible por carga de dashboard.
+
+Ahora:
+
+- `visible_tickets` expresa el conjunto visible como UN CTE con solo las
+  columnas que usan los KPIs.
+- `Tally.run` hace UNA sentencia agrupada por unas pocas dimensiones
+  (status, category_id, ...) con agregados condicionales
+  (``COUNT(*) FILTER (WHERE ...)``, `count_if` / `sum_if`) sobre ese CTE.
+- `Tally.total` / `Tally.by` reducen esas filas en memoria (decenas o pocos
+  cientos: 7 estados × categorías × ...), así que cualquier combinación de
+  filtros por dimensión sale gratis.
+
+Uso::
+
+    visible = visible_tickets(cond)
+    t = Tally.run(db, visible, ("status", "category_id"),
+                  overdue=lambda c: count_if(c.due_at < now))
+    t.by("status")                               # {status: n}
+    t.total("overdue", status=OPEN_STATUSES)     # suma filtrada
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+
+def visible_tickets(cond=None, name: str = "visible"):
+    """CTE con las columnas de MaintTicket que usan los dashboards, filtrado por `cond`."""
+    from itcj2.apps.maint.models.ticket import MaintTicket
+
+    stmt = select(
+        MaintTicket.id,
+        MaintTicket.status,
+        MaintTicket.priority,
+        MaintTicket.category_id,
+        MaintTicket.requester_id,
+        MaintTicket.requester_department_id,
+        MaintTicket.due_at,
+        MaintTicket.resolved_at,
+        MaintTicket.resolved_by_id,
+        MaintTicket.time_invested_minutes,
+        MaintTicket.rating_attention,
+    )
+    if cond is not None:
+        stmt = stmt.where(cond)
+    return stmt.cte(name)
+
+
+def count_if(cond):
+    """``COUNT(*) FILTER (WHERE cond)``."""
+    return func.count().filter(cond)
+
+
+def sum_if(col, cond):
+    """``SUM(col) FILTER (WHERE cond)``."""
+    return func.sum(col).filter(cond)
+
+
+class Tally:
+    """Resultado de una agregación agrupada; se consulta en memoria."""
+
+    def __init__(self, dims: tuple[str, ...], rows: list[dict]):
+        self.dims = dims
+        self.rows = rows
+
+    @classmethod
+    def run(cls, db: Session, source, dims: tuple[str, ...] = (),
+            **measures: Callable) -> "Tally":
+        """Una sola sentencia: ``GROUP BY dims`` con ``n`` (= COUNT(*)) y `measures`.
+
+        Cada medida es ``lambda c: <agregado>`` sobre las columnas `c` de `source`.
+        """
+        cols = [source.c[d] for d in dims]
+        stmt = select(
+            *cols,
+            func.count().label("n"),
+            *(build(source.c).label(name) for name, build in measures.items()),
+        ).select_from(source)
+        if cols:
+            stmt = stmt.group_by(*cols)
+        return cls(tuple(dims), [dict(r._mapping) for r in db.execute(stmt)])
+
+    def _rows(self, where: dict):
+        for row in self.rows:
+            ok = True
+            for dim, want in where.items():
+                value = row[dim]
+                if isinstance(want, (tuple, list, set, frozenset)):
+                    ok = value in want
+                else:
+                    ok = value == want
+                if not ok:
+                    break
+            if ok:
+                yield row
+
+    def total(self, measure: str = "n", **where):
+        """Suma de `measure` en las filas que cumplen `where` (valor o colección por dimensión)."""
+        return sum(row[measure] or 0 for row in self._rows(where))
+
+    def by(self, dim: str, measure: str = "n", **where) -> dict:
+        """``{valor de dim: suma de measure}`` en las filas que cumplen `where`."""
+        out: dict = {}
+        for row in self._rows(where):
+            out[row[dim]] = out.get(row[dim], 0) + (row[measure] or 0)
+        return out
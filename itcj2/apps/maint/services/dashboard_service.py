@@ -7,16 +7,22 @@ del usuario (mismo criterio que ticket_service.list_tickets).
 NOTA: El bloque de visibilidad se duplica aquí intencionalmente en lugar de
 extraerlo a un helper en ticket_service.py, para no modificar ese archivo.
 Mantener sincronizado con la lógica en ticket_service.list_tickets. Dentro de
-ESTE módulo, en cambio, la condición vive en UN solo sitio (`_visibility_cond`)
-compartido por `_apply_visibility` y `_apply_visibility_to_join` — antes tenían
-lógicas ligeramente distintas entre sí y ambas divergían de list_tickets.
+ESTE módulo, en cambio, la condición vive en UN solo sitio (`_visibility_cond`):
+los KPIs y `recent_activity` usan la misma (antes había dos versiones con
+lógicas ligeramente distintas entre sí y ambas divergían de list_tickets).
+
+Los insumos de esa condición (áreas de técnico/coordinador, departamentos y
+subárbol) se resuelven una vez por usuario y se cachean en authz_cache
+(`cached_scope`). Los KPIs salen de UNA sentencia con agregados condicionales
+sobre el CTE del conjunto visible (ver dashboard_engine).
 """
 import logging
 from datetime import timedelta
 
 from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager, joinedload
 
+from itcj2.apps.maint.services.dashboard_engine import Tally, count_if, sum_if, visible_tickets
 from itcj2.apps.maint.utils.timezone_utils import now_local
 
 logger = logging.getLogger(__name__)
@@ -27,7 +33,10 @@ logger = logging.getLogger(__name__)
 # ticket_service.list_tickets.
 FULL_ACCESS_ROLES = frozenset({'admin', 'dispatcher', 'maint_general_coordinator'})
 DEPT_ACCESS_ROLES = frozenset({'department_head', 'secretary'})
+# Roles que amplían el alcance más allá de propio/asignado (entran en la llave del caché).
+SCOPED_ROLES = frozenset({'maint_area_coordinator', 'tech_maint'}) | DEPT_ACCESS_ROLES
 OPEN_STATUSES = ('PENDING', 'ASSIGNED', 'IN_PROGRESS')
+RESOLVED_STATUSES = ('RESOLVED_SUCCESS', 'RESOLVED_FAILED')
 ALL_STATUSES = ('PENDING', 'ASSIGNED', 'IN_PROGRESS', 'RESOLVED_SUCCESS', 'RESOLVED_FAILED', 'CLOSED', 'CANCELED')
 
 
@@ -35,26 +44,69 @@ ALL_STATUSES = ('PENDING', 'ASSIGNED', 'IN_PROGRESS', 'RESOLVED_SUCCESS', 'RESOL
 # Helpers de visibilidad  (keep in sync with ticket_service.list_tickets)
 # ──────────────────────────────────────────────────────────────────────────────
 
+def _resolve_scope(db: Session, user_id: int, roles: set) -> dict:
+    """Áreas y departamentos que amplían la visibilidad de `user_id` (consulta BD)."""
+    from itcj2.apps.maint.services.ticket_service import _get_tech_maint_area_codes
+
+    area_codes: set[str] = set()
+    if 'maint_area_coordinator' in roles:
+        from itcj2.apps.maint.services.coordinator_service import CoordinatorService
+        area_codes |= set(CoordinatorService.get_coordinator_areas(db, user_id) or ())
+    if 'tech_maint' in roles:
+        area_codes |= set(_get_tech_maint_area_codes(db, user_id) or ())
+
+    # H5: multi-depto (antes un resolver mono-depto elegía uno al azar) + subárbol
+    # por procedencia (en sync con ticket_service.list_tickets).
+    from itcj2.core.services.scope_service import subtree_scope_for
+    dept_ids = set(subtree_scope_for(db, user_id, "maint", "maint.tickets.api.read.subtree"))
+    if DEPT_ACCESS_ROLES & roles:
+        from itcj2.apps.maint.services.department_dashboard_service import _resolve_user_departments
+        dept_ids |= {d["id"] for d in _resolve_user_departments(db, user_id)}
+
+    return {
+        "roles": sorted(SCOPED_ROLES & roles),
+        "area_codes": sorted(area_codes),
+        "dept_ids": sorted(dept_ids),
+    }
+
+
+def _visibility_scope(db: Session, user_id: int, roles: set) -> dict:
+    """`_resolve_scope` cacheado por usuario (authz_cache, mismo TTL e invalidación).
+
+    Si los roles con los que se resolvió no coinciden con los del request (el
+    token llegó antes que la invalidación) se recalcula sin usar el caché.
+    """
+    from itcj2.core.services.authz_cache import cached_scope
+
+    scope = cached_scope(user_id, "maint", lambda: _resolve_scope(db, user_id, roles))
+    if scope.get("roles") != sorted(SCOPED_ROLES & roles):
+        scope = _resolve_scope(db, user_id, roles)
+    return scope
+
+
 def _visibility_cond(db: Session, user_id: int, user_roles: list):
     """Condición SQL de visibilidad ÚNICA y ADITIVA (no excluyente): propio ∨
     asignado ∨ ruteado a mí (coordinador de área) ∨ categoría de mis áreas
     (técnico/coordinador de área) ∨ departamento/subárbol (jefe/secretaria +
     procedencia). Espejo EXACTO de la disyunción de
     ``ticket_service.list_tickets`` (no se importa de ahí para no acoplar este
-    fix a un archivo fuera de scope; se comparte AQUÍ entre ``_apply_visibility``
-    y ``_apply_visibility_to_join`` para que dejen de divergir entre sí — antes
+    fix a un archivo fuera de scope; la comparten los KPIs y ``recent_activity``
+    de ``get_dashboard`` para que dejen de divergir entre sí — antes
     ninguna incluía la propiedad y cada una ramificaba distinto, así que los
     KPIs no contaban los tickets propios de un departamento anterior mientras
     ``unrated_resolved`` sí, y ``recent_activity`` terminaba siendo un
     subconjunto distinto del resto del mismo dashboard).
+
+    Solo la asignación queda como subconsulta viva; áreas y departamentos vienen
+    de `_visibility_scope` (sin ida a la BD si están en caché).
     """
     from sqlalchemy import or_
     from itcj2.apps.maint.models.ticket import MaintTicket
     from itcj2.apps.maint.models import MaintTicketTechnician
     from itcj2.apps.maint.models.category import MaintCategory
-    from itcj2.apps.maint.services.ticket_service import _get_tech_maint_area_codes
 
     roles = set(user_roles)
+    scope = _visibility_scope(db, user_id, roles)
 
     assigned_subq = db.query(MaintTicketTechnician.ticket_id).filter(
         MaintTicketTechnician.user_id == user_id,
@@ -64,27 +116,13 @@ def _visibility_cond(db: Session, user_id: int, user_roles: list):
         MaintTicket.requester_id == user_id,
         MaintTicket.id.in_(assigned_subq),
     ]
-
-    area_codes: set[str] = set()
     if 'maint_area_coordinator' in roles:
-        from itcj2.apps.maint.services.coordinator_service import CoordinatorService
         conds.append(MaintTicket.coordinator_id == user_id)
-        area_codes |= set(CoordinatorService.get_coordinator_areas(db, user_id) or ())
-    if 'tech_maint' in roles:
-        area_codes |= set(_get_tech_maint_area_codes(db, user_id) or ())
-    if area_codes:
-        cat_subq = db.query(MaintCategory.id).filter(MaintCategory.code.in_(area_codes))
+    if scope["area_codes"]:
+        cat_subq = db.query(MaintCategory.id).filter(MaintCategory.code.in_(scope["area_codes"]))
         conds.append(MaintTicket.category_id.in_(cat_subq))
-
-    # H5: multi-depto (antes un resolver mono-depto elegía uno al azar) + subárbol
-    # por procedencia (en sync con ticket_service.list_tickets).
-    from itcj2.core.services.scope_service import subtree_scope_for
-    dept_ids = set(subtree_scope_for(db, user_id, "maint", "maint.tickets.api.read.subtree"))
-    if DEPT_ACCESS_ROLES & roles:
-        from itcj2.apps.maint.services.department_dashboard_service import _resolve_user_departments
-        dept_ids |= {d["id"] for d in _resolve_user_departments(db, user_id)}
-    if dept_ids:
-        conds.append(MaintTicket.requester_department_id.in_(dept_ids))
+    if scope["dept_ids"]:
+        conds.append(MaintTicket.requester_department_id.in_(scope["dept_ids"]))
 
     return or_(*conds)
 
@@ -121,63 +159,30 @@ def get_dashboard(db: Session, user_id: int, user_roles: list) -> dict:
     cutoff_30d = now - timedelta(days=30)
     cutoff_24h = now - timedelta(hours=24)
 
-    # ── Base query con visibilidad ─────────────────────────────────────────
-    base_q = _apply_visibility(db.query(MaintTicket), user_id, user_roles, db)
-
-    # ── by_status ─────────────────────────────────────────────────────────
-    status_rows = (
-        base_q.with_entities(MaintTicket.status, func.count(MaintTicket.id))
-        .group_by(MaintTicket.status)
-        .all()
+    # ── Todos los contadores: UNA sentencia sobre el CTE del conjunto visible ──
+    cond = None if FULL_ACCESS_ROLES & roles else _visibility_cond(db, user_id, roles)
+    visible = visible_tickets(cond)
+    resolved_30d = visible.c.resolved_at >= cutoff_30d
+    tally = Tally.run(
+        db, visible, ("status", "category_id", "priority"),
+        overdue=lambda c: count_if(c.due_at < now),
+        # tickets del usuario como solicitante sin calificar (el banner afecta solo
+        # sus propias acciones; lo propio siempre es visible)
+        unrated_mine=lambda c: count_if((c.requester_id == user_id) & c.rating_attention.is_(None)),
+        minutes_30d=lambda c: sum_if(c.time_invested_minutes, resolved_30d),
+        minutes_30d_n=lambda c: count_if(resolved_30d & c.time_invested_minutes.isnot(None)),
     )
-    by_status = {s: 0 for s in ALL_STATUSES}
-    for status, count in status_rows:
-        if status in by_status:
-            by_status[status] = count
 
-    # ── open_total ────────────────────────────────────────────────────────
+    # ── by_status / open_total / overdue / unrated_resolved ───────────────
+    counts = tally.by("status")
+    by_status = {s: counts.get(s, 0) for s in ALL_STATUSES}
     open_total = sum(by_status[s] for s in OPEN_STATUSES)
-
-    # ── overdue: open AND due_at < now ─────────────────────────────────────
-    overdue = (
-        _apply_visibility(db.query(MaintTicket), user_id, user_roles, db)
-        .filter(
-            MaintTicket.status.in_(OPEN_STATUSES),
-            MaintTicket.due_at < now,
-        )
-        .count()
-    )
-
-    # ── unrated_resolved: tickets del usuario como solicitante sin calificar
-    # (siempre global — el banner afecta solo las acciones del propio usuario)
-    unrated_resolved = (
-        db.query(MaintTicket)
-        .filter(
-            MaintTicket.requester_id == user_id,
-            MaintTicket.status.in_(['RESOLVED_SUCCESS', 'RESOLVED_FAILED']),
-            MaintTicket.rating_attention.is_(None),
-        )
-        .count()
-    )
+    overdue = tally.total("overdue", status=OPEN_STATUSES)
+    unrated_resolved = tally.total("unrated_mine", status=RESOLVED_STATUSES)
 
     # ── by_category ───────────────────────────────────────────────────────
-    # open count por categoría dentro del scope
-    open_by_cat_rows = (
-        _apply_visibility(db.query(MaintTicket), user_id, user_roles, db)
-        .with_entities(MaintTicket.category_id, func.count(MaintTicket.id))
-        .filter(MaintTicket.status.in_(OPEN_STATUSES))
-        .group_by(MaintTicket.category_id)
-        .all()
-    )
-    open_by_cat = {cat_id: cnt for cat_id, cnt in open_by_cat_rows}
-
-    total_by_cat_rows = (
-        _apply_visibility(db.query(MaintTicket), user_id, user_roles, db)
-        .with_entities(MaintTicket.category_id, func.count(MaintTicket.id))
-        .group_by(MaintTicket.category_id)
-        .all()
-    )
-    total_by_cat = {cat_id: cnt for cat_id, cnt in total_by_cat_rows}
+    open_by_cat = tally.by("category_id", status=OPEN_STATUSES)
+    total_by_cat = tally.by("category_id")
 
     categories = db.query(MaintCategory).filter_by(is_active=True).order_by(MaintCategory.display_order).all()
     by_category = [
@@ -194,30 +199,15 @@ def get_dashboard(db: Session, user_id: int, user_roles: list) -> dict:
     ]
 
     # ── by_priority: solo tickets abiertos en scope ────────────────────────
-    priority_rows = (
-        _apply_visibility(db.query(MaintTicket), user_id, user_roles, db)
-        .with_entities(MaintTicket.priority, func.count(MaintTicket.id))
-        .filter(MaintTicket.status.in_(OPEN_STATUSES))
-        .group_by(MaintTicket.priority)
-        .all()
-    )
-    by_priority = {"BAJA": 0, "MEDIA": 0, "ALTA": 0, "URGENTE": 0}
-    for priority, count in priority_rows:
-        if priority in by_priority:
-            by_priority[priority] = count
+    priority_counts = tally.by("priority", status=OPEN_STATUSES)
+    by_priority = {p: priority_counts.get(p, 0) for p in ("BAJA", "MEDIA", "ALTA", "URGENTE")}
 
     # ── avg_resolution_minutes_30d ─────────────────────────────────────────
-    avg_row = (
-        _apply_visibility(db.query(MaintTicket), user_id, user_roles, db)
-        .with_entities(func.avg(MaintTicket.time_invested_minutes))
-        .filter(
-            MaintTicket.status.in_(['RESOLVED_SUCCESS', 'RESOLVED_FAILED', 'CLOSED']),
-            MaintTicket.resolved_at >= cutoff_30d,
-            MaintTicket.time_invested_minutes.isnot(None),
-        )
-        .scalar()
+    closed = RESOLVED_STATUSES + ('CLOSED',)
+    minutes_n = tally.total("minutes_30d_n", status=closed)
+    avg_resolution_minutes_30d = (
+        round(float(tally.total("minutes_30d", status=closed)) / minutes_n) if minutes_n else None
     )
-    avg_resolution_minutes_30d = round(float(avg_row)) if avg_row is not None else None
 
     # ── top_technicians_30d: solo para admin/dispatcher ────────────────────
     top_technicians_30d = []
@@ -254,12 +244,18 @@ def get_dashboard(db: Session, user_id: int, user_roles: list) -> dict:
             ]
 
     # ── recent_activity: últimas 10 acciones dentro del scope ─────────────
+    # Ticket y autor en la misma consulta (antes 2 lazy loads por acción).
     log_q = (
         db.query(MaintTicketActionLog)
         .join(MaintTicket, MaintTicketActionLog.ticket_id == MaintTicket.id)
+        .options(
+            contains_eager(MaintTicketActionLog.ticket),
+            joinedload(MaintTicketActionLog.performed_by),
+        )
     )
-    # Aplicar visibilidad al join (re-filtrar sobre MaintTicket)
-    log_q = _apply_visibility_to_join(log_q, user_id, user_roles, db)
+    # Misma condición de visibilidad que los KPIs (ya resuelta arriba)
+    if cond is not None:
+        log_q = log_q.filter(cond)
     activity_rows = (
         log_q
         .order_by(MaintTicketActionLog.performed_at.desc())
@@ -316,22 +312,3 @@ def get_dashboard(db: Session, user_id: int, user_roles: list) -> dict:
         "activity_24h": activity_24h,
         "last_ticket": last_ticket,
     }
-
-
-def _apply_visibility_to_join(query, user_id: int, user_roles: list, db: Session):
-    """
-    Versión de _apply_visibility para queries que ya hacen join con MaintTicket.
-    Filtra sobre MaintTicket directamente (el join ya está hecho).
-
-    Antes tenía su propia lógica, más pobre que `_apply_visibility` (sin rama de
-    `maint_area_coordinator` ni subárbol, y tampoco incluía la propiedad) — por
-    eso `recent_activity` era un subconjunto distinto del resto del dashboard.
-    Ahora comparte `_visibility_cond` con `_apply_visibility`: misma condición,
-    una sola vez.
-    """
-    roles = set(user_roles)
-
-    if FULL_ACCESS_ROLES & roles:
-        return query
-
-    return query.filter(_visibility_cond(db, user_id, roles))
@@ -8,13 +8,17 @@ Provee dos niveles de información:
 Lógica de alcance:
   - Admin global (JWT role=="admin"): puede consultar cualquier depto o todos.
   - Usuario normal: limitado a los departamentos de sus puestos activos.
+
+Los KPIs salen de una sola sentencia con agregados condicionales sobre el CTE
+de los tickets de esos departamentos (ver dashboard_engine).
 """
 import logging
 from datetime import datetime, timedelta
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, joinedload
 
+from itcj2.apps.maint.services.dashboard_engine import Tally, count_if, visible_tickets
 from itcj2.apps.maint.utils.timezone_utils import now_local, ensure_local_timezone
 
 logger = logging.getLogger(__name__)
@@ -43,6 +47,34 @@ def _apply_dept_filter(query, dept_ids: list[int] | None):
     return query
 
 
+def _dept_cond(dept_ids: list[int] | None):
+    """Condición de departamento para `visible_tickets` (None = todos)."""
+    from itcj2.apps.maint.models.ticket import MaintTicket
+
+    return MaintTicket.requester_department_id.in_(dept_ids) if dept_ids else None
+
+
+def _summary_query(db: Session, dept_ids: list[int] | None):
+    """Query de tickets para las listas del dashboard, con lo que serializa
+    `_serialize_ticket_summary` cargado en la misma consulta (sin lazy loads)."""
+    from itcj2.apps.maint.models.ticket import MaintTicket
+
+    query = db.query(MaintTicket).options(
+        joinedload(MaintTicket.category),
+        joinedload(MaintTicket.requester),
+        joinedload(MaintTicket.requester_department),
+    )
+    return _apply_dept_filter(query, dept_ids)
+
+
+def _unassigned_cond(c):
+    """PENDING sin técnicos activos, sobre las columnas `c` del CTE."""
+    from itcj2.apps.maint.models.ticket_technician import MaintTicketTechnician
+
+    active = select(MaintTicketTechnician.ticket_id).where(MaintTicketTechnician.unassigned_at.is_(None))
+    return (c.status == "PENDING") & c.id.not_in(active)
+
+
 def _resolve_user_departments(db: Session, user_id: int) -> list[dict]:
     """
     Retorna [{id, code, name}] de los departamentos que CUENTAN para maint
@@ -344,61 +376,28 @@ def get_summary(
         is_admin_global=is_admin_global, dept_filter=dept_filter,
     )
 
-    base_q = _apply_dept_filter(db.query(MaintTicket), dept_ids)
-
-    # KPI: open_total (PENDING + ASSIGNED + IN_PROGRESS)
-    open_total = (
-        base_q.filter(MaintTicket.status.in_(OPEN_STATUSES))
-        .count()
-    )
-
-    # KPI: in_progress
-    in_progress = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(MaintTicket.status == "IN_PROGRESS")
-        .count()
-    )
-
-    # KPI: overdue (open AND due_at < now)
-    overdue = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(
-            MaintTicket.status.in_(OPEN_STATUSES),
-            MaintTicket.due_at < now,
-        )
-        .count()
+    # KPIs: una sola sentencia sobre el CTE de los deptos en alcance
+    visible = visible_tickets(_dept_cond(dept_ids))
+    tally = Tally.run(
+        db, visible, ("status",),
+        overdue=lambda c: count_if(c.due_at < now),
+        resolved_week=lambda c: count_if(c.resolved_at >= week_start),
+        unassigned=lambda c: count_if(_unassigned_cond(c)),
     )
+    open_total = tally.total(status=OPEN_STATUSES)
+    in_progress = tally.total(status="IN_PROGRESS")
+    overdue = tally.total("overdue", status=OPEN_STATUSES)
+    resolved_this_week = tally.total("resolved_week", status=RESOLVED_STATUSES + ("CLOSED",))
+    unassigned = tally.total("unassigned")
 
-    # KPI: resolved_this_week
-    resolved_this_week = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(
-            MaintTicket.status.in_(RESOLVED_STATUSES + ("CLOSED",)),
-            MaintTicket.resolved_at >= week_start,
-        )
-        .count()
-    )
+    # Lista: unassigned_tickets (máx 10, por priority desc + created_at asc)
+    from sqlalchemy import case as sa_case
 
-    # KPI: unassigned (PENDING sin técnicos activos)
-    # Subconsulta: ticket_ids que tienen al menos un técnico activo
     assigned_ticket_ids_sq = (
         db.query(MaintTicketTechnician.ticket_id)
         .filter(MaintTicketTechnician.unassigned_at.is_(None))
         .subquery()
     )
-    unassigned = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(
-            MaintTicket.status == "PENDING",
-            MaintTicket.id.not_in(
-                db.query(assigned_ticket_ids_sq.c.ticket_id)
-            ),
-        )
-        .count()
-    )
-
-    # Lista: unassigned_tickets (máx 10, por priority desc + created_at asc)
-    from sqlalchemy import case as sa_case
 
     priority_order = sa_case(
         (MaintTicket.priority == "URGENTE", 0),
@@ -409,7 +408,7 @@ def get_summary(
     )
 
     unassigned_rows = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
+        _summary_query(db, dept_ids)
         .filter(
             MaintTicket.status == "PENDING",
             MaintTicket.id.not_in(
@@ -423,7 +422,7 @@ def get_summary(
 
     # Lista: recent_open (últimos 5 abiertos por created_at desc)
     recent_open_rows = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
+        _summary_query(db, dept_ids)
         .filter(MaintTicket.status.in_(OPEN_STATUSES))
         .order_by(MaintTicket.created_at.desc())
         .limit(5)
@@ -482,91 +481,46 @@ def get_full(
         is_admin_global=is_admin_global, dept_filter=dept_filter,
     )
 
-    base_q = _apply_dept_filter(db.query(MaintTicket), dept_ids)
+    # ── Contadores: una sola sentencia sobre el CTE de los deptos en alcance ──
+    visible = visible_tickets(_dept_cond(dept_ids))
+    tally = Tally.run(
+        db, visible, ("status", "category_id", "resolved_by_id"),
+        overdue=lambda c: count_if(c.due_at < now),
+        resolved_week=lambda c: count_if(c.resolved_at >= week_start),
+        unassigned=lambda c: count_if(_unassigned_cond(c)),
+        minutes=lambda c: func.sum(c.time_invested_minutes),
+        minutes_n=lambda c: func.count(c.time_invested_minutes),
+        rated=lambda c: count_if(c.rating_attention.isnot(None)),
+        # on_time: resueltos con resolved_at <= due_at (o sin due_at)
+        on_time=lambda c: count_if(or_(c.due_at.is_(None), c.resolved_at <= c.due_at)),
+        late=lambda c: count_if(and_(c.due_at.isnot(None), c.resolved_at > c.due_at)),
+    )
+    closed = RESOLVED_STATUSES + ("CLOSED",)
 
     # ── by_status ────────────────────────────────────────────────────────────
-    status_rows = (
-        base_q.with_entities(MaintTicket.status, func.count(MaintTicket.id))
-        .group_by(MaintTicket.status)
-        .all()
-    )
-    by_status = {s: 0 for s in ALL_STATUSES}
-    for status, count in status_rows:
-        if status in by_status:
-            by_status[status] = count
+    counts = tally.by("status")
+    by_status = {s: counts.get(s, 0) for s in ALL_STATUSES}
 
     # ── KPIs básicos ─────────────────────────────────────────────────────────
     open_total = sum(by_status[s] for s in OPEN_STATUSES)
     in_progress = by_status.get("IN_PROGRESS", 0)
-
-    overdue = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(
-            MaintTicket.status.in_(OPEN_STATUSES),
-            MaintTicket.due_at < now,
-        )
-        .count()
-    )
-
-    resolved_this_week = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(
-            MaintTicket.status.in_(RESOLVED_STATUSES + ("CLOSED",)),
-            MaintTicket.resolved_at >= week_start,
-        )
-        .count()
-    )
-
-    # ── KPI: unassigned ──────────────────────────────────────────────────────
-    assigned_ticket_ids_sq = (
-        db.query(MaintTicketTechnician.ticket_id)
-        .filter(MaintTicketTechnician.unassigned_at.is_(None))
-        .subquery()
-    )
-    unassigned = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(
-            MaintTicket.status == "PENDING",
-            MaintTicket.id.not_in(
-                db.query(assigned_ticket_ids_sq.c.ticket_id)
-            ),
-        )
-        .count()
-    )
+    overdue = tally.total("overdue", status=OPEN_STATUSES)
+    resolved_this_week = tally.total("resolved_week", status=closed)
+    unassigned = tally.total("unassigned")
 
     # ── KPI: avg_resolution_hours ─────────────────────────────────────────────
-    avg_row = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .with_entities(func.avg(MaintTicket.time_invested_minutes))
-        .filter(
-            MaintTicket.status.in_(RESOLVED_STATUSES + ("CLOSED",)),
-            MaintTicket.time_invested_minutes.isnot(None),
-        )
-        .scalar()
+    minutes_n = tally.total("minutes_n", status=closed)
+    avg_resolution_hours = (
+        round(float(tally.total("minutes", status=closed)) / minutes_n / 60, 2) if minutes_n else None
     )
-    avg_resolution_hours = round(float(avg_row) / 60, 2) if avg_row is not None else None
 
     # ── KPI: rated_count, rated_pct ──────────────────────────────────────────
-    resolved_total = sum(by_status[s] for s in RESOLVED_STATUSES) + by_status.get("CLOSED", 0)
-    rated_count = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(
-            MaintTicket.status.in_(RESOLVED_STATUSES + ("CLOSED",)),
-            MaintTicket.rating_attention.isnot(None),
-        )
-        .count()
-    )
+    resolved_total = sum(by_status[s] for s in closed)
+    rated_count = tally.total("rated", status=closed)
     rated_pct = round((rated_count / resolved_total) * 100, 1) if resolved_total > 0 else 0.0
 
     # ── by_category ───────────────────────────────────────────────────────────
-    cat_rows = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(MaintTicket.status.in_(OPEN_STATUSES))
-        .with_entities(MaintTicket.category_id, func.count(MaintTicket.id))
-        .group_by(MaintTicket.category_id)
-        .all()
-    )
-    open_by_cat = {cat_id: cnt for cat_id, cnt in cat_rows}
+    open_by_cat = tally.by("category_id", status=OPEN_STATUSES)
 
     categories = (
         db.query(MaintCategory)
@@ -586,38 +540,21 @@ def get_full(
 
     # ── by_technician (top 10 por tickets activos) ────────────────────────────
     # Tickets activos por técnico en el scope de departamentos
-    active_tech_rows = (
-        db.query(MaintTicketTechnician.user_id, func.count(MaintTicketTechnician.id).label("active_count"))
-        .join(MaintTicket, MaintTicketTechnician.ticket_id == MaintTicket.id)
-        .filter(
+    active_tech_rows = db.execute(
+        select(MaintTicketTechnician.user_id, func.count(MaintTicketTechnician.id).label("active_count"))
+        .join(visible, MaintTicketTechnician.ticket_id == visible.c.id)
+        .where(
             MaintTicketTechnician.unassigned_at.is_(None),
-            MaintTicket.status.in_(OPEN_STATUSES),
+            visible.c.status.in_(OPEN_STATUSES),
         )
-    )
-    if dept_ids:
-        active_tech_rows = active_tech_rows.filter(
-            MaintTicket.requester_department_id.in_(dept_ids)
-        )
-    active_tech_rows = (
-        active_tech_rows
         .group_by(MaintTicketTechnician.user_id)
         .order_by(func.count(MaintTicketTechnician.id).desc())
         .limit(10)
-        .all()
-    )
+    ).all()
 
     # Tickets resueltos por técnico (resolved_by_id en el scope)
-    resolved_tech_rows = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(
-            MaintTicket.status.in_(RESOLVED_STATUSES + ("CLOSED",)),
-            MaintTicket.resolved_by_id.isnot(None),
-        )
-        .with_entities(MaintTicket.resolved_by_id, func.count(MaintTicket.id))
-        .group_by(MaintTicket.resolved_by_id)
-        .all()
-    )
-    resolved_by_tech = {uid: cnt for uid, cnt in resolved_tech_rows}
+    resolved_by_tech = tally.by("resolved_by_id", status=closed)
+    resolved_by_tech.pop(None, None)
 
     # Cargar nombres de usuarios
     tech_ids = {row.user_id for row in active_tech_rows} | set(resolved_by_tech.keys())
@@ -638,31 +575,15 @@ def get_full(
     ]
 
     # ── SLA breakdown ─────────────────────────────────────────────────────────
-    # on_time: tickets resueltos con resolved_at <= due_at (o sin due_at)
-    on_time = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(
-            MaintTicket.status.in_(RESOLVED_STATUSES + ("CLOSED",)),
-            (MaintTicket.due_at.is_(None)) | (MaintTicket.resolved_at <= MaintTicket.due_at),
-        )
-        .count()
-    )
+    on_time = tally.total("on_time", status=closed)
     # overdue_open: abiertos vencidos
     overdue_open = overdue
     # overdue_resolved: resueltos que se pasaron del SLA
-    overdue_resolved = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
-        .filter(
-            MaintTicket.status.in_(RESOLVED_STATUSES + ("CLOSED",)),
-            MaintTicket.due_at.isnot(None),
-            MaintTicket.resolved_at > MaintTicket.due_at,
-        )
-        .count()
-    )
+    overdue_resolved = tally.total("late", status=closed)
 
     # ── recent_open (últimos 10 abiertos) ────────────────────────────────────
     recent_open_rows = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
+        _summary_query(db, dept_ids)
         .filter(MaintTicket.status.in_(OPEN_STATUSES))
         .order_by(MaintTicket.created_at.desc())
         .limit(10)
@@ -671,7 +592,7 @@ def get_full(
 
     # ── overdue_tickets (máx 10, más antiguos primero) ───────────────────────
     overdue_rows = (
-        _apply_dept_filter(db.query(MaintTicket), dept_ids)
+        _summary_query(db, dept_ids)
         .filter(
             MaintTicket.status.in_(OPEN_STATUSES),
             MaintTicket.due_at < now,
@@ -1,8 +1,8 @@
 """
 Helper de correo electrónico para la app de Mantenimiento.
 
-Envía notificaciones transaccionales por email usando Microsoft Graph (cuenta
-propia de la app maint, almacenada bajo instance/apps/maint/email/).
+Notificaciones transaccionales por email vía Microsoft Graph (cuenta propia de
+la app maint, almacenada bajo instance/apps/maint/email/).
 
 == Cómo habilitar ==
 1. Ir a /itcj/config/email, localizar la app "maint" y hacer clic en "Conectar".
@@ -12,13 +12,11 @@ propia de la app maint, almacenada bajo instance/apps/maint/email/).
 Sin ese paso, todas las llamadas a send_* loguean un aviso y retornan False
 sin lanzar ninguna excepción, de modo que el flujo de tickets no se interrumpe.
 
-== Integración diferida ==
-Cuando se quiera activar emails en asignación, agregar junto a la llamada
-existente de MaintNotificationHelper.notify_technician_assigned(...):
-
-    MaintEmailHelper.send_assigned(db, ticket, technician)
-
-Del mismo modo para resolved, overdue y canceled.
+== Outbox ==
+Los send_* no hablan con Graph: agregan el correo a core_email_outbox en la
+sesión `db` del llamador (core/services/email_outbox.py). Los servicios de
+ticket los llaman antes de su COMMIT, así el correo existe si y solo si el
+cambio se guardó; la cola Celery `email` lo envía después, en lote.
 
 == Subjects desde BD ==
 El asunto (subject) de cada correo se resuelve via render_notification() usando
@@ -47,16 +45,16 @@ def _get_templates():
     return maint_templates
 
 
-def _acquire_token(ticket_number: str) -> str | None:
-    """Obtiene token de Graph para 'maint'. Loguea aviso si no está conectado."""
-    from itcj2.core.utils.msgraph_mail import acquire_token_silent
-    token = acquire_token_silent("maint")
-    if token is None:
+def _connected(ticket_number: str) -> bool:
+    """True si la app 'maint' tiene cuenta de correo. Loguea aviso si no."""
+    from itcj2.core.services.email_outbox import is_connected
+    if not is_connected("maint"):
         logger.warning(
             "Maint email account not connected — skipping send for ticket #%s",
             ticket_number,
         )
-    return token
+        return False
+    return True
 
 
 def _render(template_name: str, context: dict) -> str | None:
@@ -72,20 +70,13 @@ def _render(template_name: str, context: dict) -> str | None:
         return None
 
 
-def _send(token: str, subject: str, html: str, recipient_email: str) -> bool:
-    """Envía el correo. Retorna True en éxito (HTTP 200/202)."""
-    from itcj2.core.utils.msgraph_mail import graph_send_mail
+def _queue(db: Session, subject: str, html: str, recipient_email: str, ref: str) -> bool:
+    """Agrega el correo al outbox (se envía tras el COMMIT de `db`)."""
+    from itcj2.core.services.email_outbox import enqueue
     try:
-        r = graph_send_mail(token, subject, html, [recipient_email])
-        if r.status_code in (200, 202):
-            return True
-        logger.warning(
-            "graph_send_mail retornó %s para %s: %s",
-            r.status_code, recipient_email, r.text[:200],
-        )
-        return False
+        return enqueue(db, "maint", recipient_email, subject, html, ref=ref) is not None
     except Exception:
-        logger.exception("Error en graph_send_mail para %s", recipient_email)
+        logger.exception("Error encolando correo para %s", recipient_email)
         return False
 
 
@@ -94,6 +85,7 @@ class MaintEmailHelper:
 
     Todos los métodos son seguros: nunca lanzan excepciones — en caso de fallo
     loguean el error y retornan False para no interrumpir el flujo del ticket.
+    True significa "encolado en la transacción de `db`", no "entregado".
     """
 
     @staticmethod
@@ -108,8 +100,7 @@ class MaintEmailHelper:
                 )
                 return False
 
-            token = _acquire_token(ticket.ticket_number)
-            if token is None:
+            if not _connected(ticket.ticket_number):
                 return False
 
             html = _render("assigned.html", {
@@ -127,10 +118,10 @@ class MaintEmailHelper:
                 fallback_subject=f"[Mantenimiento ITCJ] Ticket #{ticket.ticket_number} asignado a ti",
                 fallback_body='',
             )['subject']
-            success = _send(token, subject, html, email)
+            success = _queue(db, subject, html, email, f"maint:ticket:{ticket.id}:assigned")
             if success:
                 logger.info(
-                    "[maint] send_assigned → %s para #%s",
+                    "[maint] send_assigned → %s para #%s (encolado)",
                     email, ticket.ticket_number,
                 )
             return success
@@ -154,8 +145,7 @@ class MaintEmailHelper:
                 )
                 return False
 
-            token = _acquire_token(ticket.ticket_number)
-            if token is None:
+            if not _connected(ticket.ticket_number):
                 return False
 
             html = _render("resolved.html", {
@@ -173,10 +163,10 @@ class MaintEmailHelper:
                 fallback_subject=f"[Mantenimiento ITCJ] Tu solicitud #{ticket.ticket_number} fue atendida",
                 fallback_body='',
             )['subject']
-            success = _send(token, subject, html, email)
+            success = _queue(db, subject, html, email, f"maint:ticket:{ticket.id}:resolved")
             if success:
                 logger.info(
-                    "[maint] send_resolved → %s para #%s",
+                    "[maint] send_resolved → %s para #%s (encolado)",
                     email, ticket.ticket_number,
                 )
             return success
@@ -199,8 +189,7 @@ class MaintEmailHelper:
                 )
                 return False
 
-            token = _acquire_token(ticket.ticket_number)
-            if token is None:
+            if not _connected(ticket.ticket_number):
                 return False
 
             html = _render("overdue.html", {
@@ -218,10 +207,10 @@ class MaintEmailHelper:
                 fallback_subject=f"[Mantenimiento ITCJ] URGENTE — Ticket #{ticket.ticket_number} ha vencido",
                 fallback_body='',
             )['subject']
-            success = _send(token, subject, html, email)
+            success = _queue(db, subject, html, email, f"maint:ticket:{ticket.id}:overdue")
             if success:
                 logger.info(
-                    "[maint] send_overdue → %s para #%s",
+                    "[maint] send_overdue → %s para #%s (encolado)",
                     email, ticket.ticket_number,
                 )
             return success
@@ -244,8 +233,7 @@ class MaintEmailHelper:
                 )
                 return False
 
-            token = _acquire_token(ticket.ticket_number)
-            if token is None:
+            if not _connected(ticket.ticket_number):
                 return False
 
             html = _render("canceled.html", {
@@ -263,10 +251,10 @@ class MaintEmailHelper:
                 fallback_subject=f"[Mantenimiento ITCJ] Ticket #{ticket.ticket_number} cancelado",
                 fallback_body='',
             )['subject']
-            success = _send(token, subject, html, email)
+            success = _queue(db, subject, html, email, f"maint:ticket:{ticket.id}:canceled")
             if success:
                 logger.info(
-                    "[maint] send_canceled → %s para #%s",
+                    "[maint] send_canceled → %s para #%s (encolado)",
                     email, ticket.ticket_number,
                 )
             return success
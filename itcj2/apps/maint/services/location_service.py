@@ -0,0 +1,125 @@
+"""
+Dimensión de ubicaciones de mantenimiento (``maint_locations``).
+
+`resolve_location_id` normaliza el texto libre del ticket, busca su fila y la
+crea si no existe (``INSERT ... ON CONFLICT DO NOTHING``: dos requests con la
+misma ubicación nueva no chocan). Lo llaman `ticket_service.create_ticket` y
+`update_pending_ticket`.
+
+`backfill` liga los tickets existentes: crea las ubicaciones distintas que
+falten y actualiza ``location_id`` por lotes de id con un ``UPDATE ... FROM``.
+También re-parsea edificio/salón de toda la dimensión, por si cambiaron las
+reglas de `location_parser`.
+"""
+import logging
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from itcj2.apps.maint.models.location import MaintLocation
+from itcj2.apps.maint.models.ticket import MaintTicket
+from itcj2.apps.maint.utils.location_parser import parse_building, parse_room
+
+logger = logging.getLogger(__name__)
+
+_table = MaintLocation.__table__
+
+# Tickets por UPDATE en el backfill
+_BACKFILL_BATCH = 5000
+# Blancos que se recortan de la llave. Explícitos para que `normalize` (Python)
+# y `_key_sql` (backfill) coincidan: ``str.strip()`` sin argumento quita
+# cualquier blanco Unicode y el ``trim()`` de Postgres solo espacios.
+_BLANKS = " \t\n\r\f\v"
+_KEY_MAX = 300
+
+
+def normalize(location: str | None) -> str | None:
+    """Llave de la dimensión: ``lower(btrim(location))``; None si queda vacía."""
+    if not location:
+        return None
+    key = location.strip(_BLANKS).lower()[:_KEY_MAX]
+    return key or None
+
+
+def _key_sql(column):
+    """`normalize` en SQL, para agrupar/ligar tickets sin traerlos a Python."""
+    return func.left(func.lower(func.btrim(column, _BLANKS)), _KEY_MAX)
+
+
+def _ensure(db: Session, keys) -> None:
+    """Crea las ubicaciones de `keys` que no existan.
+
+    Edificio y salón se derivan de la llave (no del texto original), así la
+    fila depende solo de la llave y el re-parseo del backfill es estable.
+    """
+    rows = [{'key': key, 'building': parse_building(key), 'room': parse_room(key)} for key in keys]
+    if rows:
+        db.execute(insert(_table).values(rows).on_conflict_do_nothing(index_elements=[_table.c.key]))
+
+
+def resolve_location_id(db: Session, location: str | None) -> int | None:
+    """Id de la ubicación de `location` (creándola si hace falta); None si está vacía."""
+    key = normalize(location)
+    if key is None:
+        return None
+    stmt = select(_table.c.id).where(_table.c.key == key)
+    location_id = db.execute(stmt).scalar()
+    if location_id is None:
+        _ensure(db, [key])
+        location_id = db.execute(stmt).scalar_one()
+    return location_id
+
+
+def backfill(db: Session, batch_size: int = _BACKFILL_BATCH) -> dict:
+    """Liga a la dimensión los tickets con ubicación y sin ``location_id``.
+
+    Hace commit por lote para no sostener candados sobre toda la tabla.
+    """
+    ticket_key = _key_sql(MaintTicket.location)
+
+    # 1) Ubicaciones distintas que aún no están en la dimensión
+    missing = db.execute(
+        select(ticket_key)
+        .outerjoin(MaintLocation, MaintLocation.key == ticket_key)
+        .where(MaintTicket.location.isnot(None), MaintLocation.id.is_(None))
+        .group_by(ticket_key)
+    ).scalars().all()
+    missing = [key for key in missing if key]
+    _ensure(db, missing)
+
+    # 2) Re-parseo de la dimensión completa (es pequeña: una fila por ubicación)
+    reparsed = 0
+    for loc in db.query(MaintLocation).all():
+        building, room = parse_building(loc.key), parse_room(loc.key)
+        if building != loc.building or room != loc.room:
+            loc.building, loc.room = building, room
+            reparsed += 1
+    db.commit()
+
+    # 3) location_id por rangos de id
+    bounds = db.execute(
+        select(func.min(MaintTicket.id), func.max(MaintTicket.id))
+        .where(MaintTicket.location.isnot(None), MaintTicket.location_id.is_(None))
+    ).one()
+    linked = 0
+    if bounds[0] is not None:
+        lo, hi = bounds
+        while lo <= hi:
+            result = db.execute(
+                update(MaintTicket)
+                .where(
+                    MaintTicket.id.between(lo, lo + batch_size - 1),
+                    MaintTicket.location_id.is_(None),
+                    MaintLocation.key == ticket_key,
+                )
+                .values(location_id=MaintLocation.id)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            linked += result.rowcount or 0
+            lo += batch_size
+
+    stats = {'created': len(missing), 'reparsed': reparsed, 'linked': linked}
+    logger.info("[maint-locations] backfill: %s", stats)
+    return stats
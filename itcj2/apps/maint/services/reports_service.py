@@ -5,9 +5,9 @@ Genera series de tiempo y agregados por período para consumo
 de gráficas en el módulo de reportes.
 """
 import logging
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
 
-from sqlalchemy import func, case, and_
+from sqlalchemy import func, case, and_, literal, literal_column, select
 from sqlalchemy.orm import Session
 
 from itcj2.apps.maint.utils.timezone_utils import now_local
@@ -21,14 +21,17 @@ RESOLVED_STATUSES = ("RESOLVED_SUCCESS", "RESOLVED_FAILED", "CLOSED")
 # Helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _date_range(from_date: date, to_date: date) -> list[date]:
-    """Genera lista de dates [from_date, …, to_date] inclusive."""
-    days = []
-    cur = from_date
-    while cur <= to_date:
-        days.append(cur)
-        cur += timedelta(days=1)
-    return days
+def _day_calendar(from_date: date, to_date: date):
+    """``generate_series`` diario [from_date, to_date] como FROM ``cal(day)``."""
+    return (
+        func.generate_series(
+            literal(_to_datetime_start(from_date)),
+            literal(_to_datetime_start(to_date)),
+            literal_column("interval '1 day'"),
+        )
+        .table_valued("day")
+        .render_derived(name="cal")
+    )
 
 
 def _to_datetime_start(d: date) -> datetime:
@@ -49,7 +52,12 @@ def get_tickets_time_series(
     to_date: date,
     category_id: int | None = None,
 ) -> dict:
-    """Serie de tiempo de tickets creados vs resueltos por día."""
+    """Serie de tiempo de tickets creados vs resueltos por día.
+
+    Una sola consulta: el calendario es un ``generate_series`` y los conteos
+    por día (creados por created_at, resueltos por resolved_at) se unen con
+    LEFT JOIN, así los días sin tickets salen en 0 desde SQL.
+    """
     from itcj2.apps.maint.models.ticket import MaintTicket
 
     dt_start = _to_datetime_start(from_date)
@@ -59,47 +67,48 @@ def get_tickets_time_series(
     if category_id:
         base_filter.append(MaintTicket.category_id == category_id)
 
-    # Creados por día
-    created_rows = (
-        db.query(
-            func.date(MaintTicket.created_at).label("day"),
-            func.count(MaintTicket.id).label("count"),
-        )
-        .filter(
+    created_day = func.date_trunc("day", MaintTicket.created_at)
+    created = (
+        select(created_day.label("day"), func.count(MaintTicket.id).label("n"))
+        .where(
             MaintTicket.created_at >= dt_start,
             MaintTicket.created_at <= dt_end,
             *base_filter,
         )
-        .group_by(func.date(MaintTicket.created_at))
-        .all()
+        .group_by(created_day)
+        .subquery("created")
     )
-    created_map = {str(row.day): row.count for row in created_rows}
 
     # Resueltos por día (fecha de resolved_at)
-    resolved_rows = (
-        db.query(
-            func.date(MaintTicket.resolved_at).label("day"),
-            func.count(MaintTicket.id).label("count"),
-        )
-        .filter(
+    resolved_day = func.date_trunc("day", MaintTicket.resolved_at)
+    resolved = (
+        select(resolved_day.label("day"), func.count(MaintTicket.id).label("n"))
+        .where(
             MaintTicket.status.in_(RESOLVED_STATUSES),
             MaintTicket.resolved_at >= dt_start,
             MaintTicket.resolved_at <= dt_end,
             *base_filter,
         )
-        .group_by(func.date(MaintTicket.resolved_at))
-        .all()
+        .group_by(resolved_day)
+        .subquery("resolved")
     )
-    resolved_map = {str(row.day): row.count for row in resolved_rows}
 
-    days = _date_range(from_date, to_date)
+    cal = _day_calendar(from_date, to_date)
+    rows = db.execute(
+        select(
+            cal.c.day,
+            func.coalesce(created.c.n, 0).label("created"),
+            func.coalesce(resolved.c.n, 0).label("resolved"),
+        )
+        .select_from(cal)
+        .outerjoin(created, created.c.day == cal.c.day)
+        .outerjoin(resolved, resolved.c.day == cal.c.day)
+        .order_by(cal.c.day)
+    ).all()
+
     data = [
-        {
-            "date": str(d),
-            "created": created_map.get(str(d), 0),
-            "resolved": resolved_map.get(str(d), 0),
-        }
-        for d in days
+        {"date": row.day.date().isoformat(), "created": row.created, "resolved": row.resolved}
+        for row in rows
     ]
 
     return {"range": {"from": str(from_date), "to": str(to_date)}, "data": data}
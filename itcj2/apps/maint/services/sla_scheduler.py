@@ -0,0 +1,258 @@
+"""
+Planificador de vencimientos SLA de Mantenimiento (event-driven).
+
+`sla_service.run_overdue_check` recorre TODOS los tickets abiertos buscando
+``due_at < now`` cada vez que corre el cron; entre corridas no pasa nada. Aquí
+cada ticket abierto con due_at vive en el ZSET de Redis ``maint:sla:v1:due``
+(miembro = id, score = epoch de su PRÓXIMA alerta: due_at, o la re-alerta
+diaria 24 h después de la última):
+
+- `schedule` se llama en la transacción que crea, cambia de prioridad, asigna,
+  resuelve o cancela el ticket. Calcula la entrada (ZADD, o ZREM si el ticket
+  ya no está abierto) y la aplica tras el COMMIT — un rollback no deja
+  entradas huérfanas —, igual que el outbox de correo.
+- `fire_due` (tarea ``maint_tasks.fire_sla_deadlines``) reclama con ZREM solo
+  las entradas vencidas, alerta con `sla_service.notify_overdue` y re-agenda la
+  siguiente alerta. El costo es proporcional a los tickets vencidos, no a los
+  abiertos.
+- Latencia: al agendar un vencimiento dentro de ``MAINT_SLA_WAKE_HORIZON`` se
+  encola un despertar con countdown exacto, así la alerta sale segundos después
+  del vencimiento; cada corrida de `fire_due` arma el siguiente. Un beat cada
+  10 minutos (``sync-tasks`` lo crea por defecto, ver
+  ``maint_tasks.PERIODIC_TASKS``) es la red de seguridad: con un horizonte
+  mayor a 10 minutos, todo vencimiento queda armado antes de cumplirse. Un beat
+  por minuto crearía ~1,440 TaskRun al día sin ganar precisión.
+- `resync` reconstruye el ZSET desde la BD (despliegue inicial, Redis vaciado)
+  y lo usa ``scripts/maint_sla_check.py --resync`` como reconciliación diaria.
+
+Sin Redis, `schedule` solo registra un warning: el cron de `run_overdue_check`
+sigue funcionando como antes.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+
+from itcj2.apps.maint.utils.timezone_utils import ensure_local_timezone, now_local
+
+logger = logging.getLogger(__name__)
+
+_KEY = "maint:sla:v1:due"
+_WAKE_KEY = "maint:sla:v1:wake:{}"
+_SESSION_KEY = "maint_sla"
+
+_OPEN_STATUSES = ('PENDING', 'ASSIGNED', 'IN_PROGRESS')
+_REALERT = timedelta(hours=24)
+# Entradas reclamadas por corrida de fire_due
+_FIRE_BATCH = 200
+# Si la alerta de un ticket falla, se reintenta en este lapso
+_RETRY_SECONDS = 300
+# Margen del despertar: que el worker vea el vencimiento ya cumplido
+_WAKE_GRACE = 1.0
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+def _redis():
+    from itcj2.core.utils.redis_conn import get_redis
+    return get_redis()
+
+
+def next_alert_at(ticket) -> datetime | None:
+    """Instante de la próxima alerta SLA del ticket; None si no le toca ninguna."""
+    if ticket.status not in _OPEN_STATUSES or ticket.due_at is None:
+        return None
+    when = ensure_local_timezone(ticket.due_at)
+    if ticket.sla_alert_sent_at is not None:
+        when = max(when, ensure_local_timezone(ticket.sla_alert_sent_at) + _REALERT)
+    return when
+
+
+# ---------------------------------------------------------------------------
+# Lado del request
+# ---------------------------------------------------------------------------
+def schedule(db: Session, ticket) -> None:
+    """Sincroniza la entrada del ticket en el ZSET tras el commit de `db`.
+
+    Llamar después de modificar status/due_at/sla_alert_sent_at y antes del
+    commit. Nunca lanza: un fallo aquí no debe tumbar la operación del ticket
+    (`resync` repara lo que se pierda).
+    """
+    try:
+        when = next_alert_at(ticket)
+        _stage(db, ticket.id, when.timestamp() if when is not None else None)
+    except Exception as e:
+        logger.warning("[maint-sla] no se pudo agendar el ticket %s: %s",
+                       getattr(ticket, 'id', None), e)
+
+
+def _stage(db: Session, ticket_id: int, score: float | None) -> None:
+    pending = db.info.setdefault(_SESSION_KEY, {})
+    # Listeners permanentes, como en el outbox de correo: la sesión se reutiliza
+    # tras cada commit (fire_due, requests con varios commits).
+    if not pending and not event.contains(db, "after_commit", _after_commit):
+        event.listen(db, "after_commit", _after_commit)
+        event.listen(db, "after_soft_rollback", _after_soft_rollback)
+    pending[ticket_id] = score
+
+
+def _after_commit(session) -> None:
+    pending = session.info.pop(_SESSION_KEY, None)
+    if pending:
+        _apply(pending)
+
+
+def _after_soft_rollback(session, previous_transaction) -> None:
+    # Como en el outbox: el rollback de un SAVEPOINT no descarta lo agendado
+    # por la transacción externa, que todavía puede commitear.
+    if previous_transaction.nested:
+        return
+    session.info.pop(_SESSION_KEY, None)
+
+
+def _apply(pending: dict) -> None:
+    adds = {str(tid): score for tid, score in pending.items() if score is not None}
+    removes = [str(tid) for tid, score in pending.items() if score is None]
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        if adds:
+            pipe.zadd(_KEY, adds)
+        if removes:
+            pipe.zrem(_KEY, *removes)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("[maint-sla] Redis no disponible al agendar %s: %s", sorted(pending), e)
+        return
+    if adds:
+        _arm(min(adds.values()))
+
+
+def _arm(score: float) -> None:
+    """Encola un despertar de fire_due para `score` si cae dentro del horizonte.
+
+    Un candado NX por segundo objetivo evita encolar un despertar por ticket
+    cuando muchos vencen a la vez.
+    """
+    delay = score - time.time()
+    if delay > _settings().MAINT_SLA_WAKE_HORIZON:
+        return  # lo recoge el beat
+    delay = max(delay, 0.0) + _WAKE_GRACE
+    try:
+        if not _redis().set(_WAKE_KEY.format(int(score)), "1", nx=True, ex=int(delay) + 60):
+            return
+        from itcj2.tasks.maint_tasks import fire_sla_deadlines
+        fire_sla_deadlines.apply_async(countdown=delay)
+    except Exception as e:
+        logger.debug("[maint-sla] no se pudo encolar el despertar (%s); queda el beat", e)
+
+
+# ---------------------------------------------------------------------------
+# Lado del worker
+# ---------------------------------------------------------------------------
+def _claim(now: datetime, limit: int) -> list[int]:
+    """Saca del ZSET las entradas vencidas. ZREM decide quién se queda cada una."""
+    r = _redis()
+    members = r.zrangebyscore(_KEY, "-inf", now.timestamp(), start=0, num=limit)
+    if not members:
+        return []
+    pipe = r.pipeline(transaction=False)
+    for m in members:
+        pipe.zrem(_KEY, m)
+    return [int(m) for m, removed in zip(members, pipe.execute()) if removed]
+
+
+def fire_due(db: Session, *, now: datetime | None = None, limit: int = _FIRE_BATCH) -> dict:
+    """Alerta los tickets cuya próxima alerta ya venció y re-agenda la siguiente.
+
+    Los tickets que ya no están abiertos simplemente salen del ZSET; las
+    entradas viejas (p.ej. due_at recalculado) se re-agendan a su nuevo
+    instante sin alertar.
+    """
+    from itcj2.apps.maint.models.ticket import MaintTicket
+    from itcj2.apps.maint.services.sla_service import notify_overdue
+
+    now = now or now_local()
+    claimed = _claim(now, limit)
+    stats = {'checked_at': now.isoformat(), 'claimed': len(claimed), 'found': 0, 'notified_total': 0}
+    if not claimed:
+        _arm_next()
+        return stats
+
+    try:
+        tickets = (
+            db.query(MaintTicket)
+            .options(selectinload(MaintTicket.technicians))
+            .filter(MaintTicket.id.in_(claimed))
+            .all()
+        )
+        for ticket in tickets:
+            when = next_alert_at(ticket)
+            if when is None:
+                continue
+            if when <= now:
+                try:
+                    stats['notified_total'] += notify_overdue(db, ticket)
+                    stats['found'] += 1
+                except Exception as exc:
+                    logger.exception("[maint-sla] Error notificando ticket vencido %s: %s", ticket.id, exc)
+                    _stage(db, ticket.id, now.timestamp() + _RETRY_SECONDS)
+                    continue
+            schedule(db, ticket)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # Devolver lo reclamado para no perder alertas si la BD falla
+        _apply({tid: now.timestamp() + _RETRY_SECONDS for tid in claimed})
+        raise
+
+    if len(claimed) == limit:
+        _arm(now.timestamp())  # quedan más vencidos: otra vuelta ya
+    else:
+        _arm_next()
+    if stats['found']:
+        logger.info("[maint-sla] %s", stats)
+    return stats
+
+
+def _arm_next() -> None:
+    try:
+        head = _redis().zrange(_KEY, 0, 0, withscores=True)
+    except Exception as e:
+        logger.debug("[maint-sla] sin Redis para leer el siguiente vencimiento (%s)", e)
+        return
+    if head:
+        _arm(head[0][1])
+
+
+def resync(db: Session) -> dict:
+    """Reconstruye el ZSET desde los tickets abiertos de la BD.
+
+    Agrega/actualiza la entrada de cada ticket abierto con due_at y quita las
+    de tickets que ya no lo están. No borra la clave completa: así no compite
+    con `schedule` de requests concurrentes.
+    """
+    from itcj2.apps.maint.models.ticket import MaintTicket
+
+    rows = (
+        db.query(MaintTicket.id, MaintTicket.status, MaintTicket.due_at, MaintTicket.sla_alert_sent_at)
+        .filter(MaintTicket.status.in_(_OPEN_STATUSES), MaintTicket.due_at.isnot(None))
+        .all()
+    )
+    wanted = {str(row.id): next_alert_at(row).timestamp() for row in rows}
+
+    r = _redis()
+    current = {m if isinstance(m, str) else m.decode() for m in r.zrange(_KEY, 0, -1)}
+    stale = current - wanted.keys()
+    pipe = r.pipeline(transaction=False)
+    if wanted:
+        pipe.zadd(_KEY, wanted)
+    if stale:
+        pipe.zrem(_KEY, *stale)
+    pipe.execute()
+    _arm_next()
+    return {'scheduled': len(wanted), 'removed': len(stale)}
@@ -13,6 +13,10 @@ Ciclo de vida (poll-driven, no event-driven):
 Este servicio se invoca desde un cron script externo (itcj2/scripts/maint_sla_check.py).
 Deliberadamente está separado de MaintNotificationHelper porque ese helper es
 event-driven; el SLA check es poll-driven.
+
+Las alertas al momento del vencimiento las dispara sla_scheduler.py (ZSET en
+Redis, costo proporcional a los vencidos) reutilizando `notify_overdue`;
+`run_overdue_check` queda como barrido de respaldo.
 """
 import logging
 from datetime import timedelta
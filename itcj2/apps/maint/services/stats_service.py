@@ -7,7 +7,7 @@ tiempos de transición, distribución de ratings y heatmaps.
 import logging
 from datetime import date, datetime, timedelta
 
-from sqlalchemy import func, case, and_, text
+from sqlalchemy import func, case, and_, literal, literal_column, select, text
 from sqlalchemy.orm import Session
 
 from itcj2.apps.maint.utils.timezone_utils import now_local
@@ -389,6 +389,19 @@ def get_ratings_detail(db: Session, from_date: date, to_date: date, category_id:
 # Heatmap
 # ─────────────────────────────────────────────────────────────────────────────
 
+def _month_calendar(dt_start: datetime, dt_end: datetime):
+    """``generate_series`` mensual [mes de dt_start, mes de dt_end] como FROM ``cal(month)``."""
+    return (
+        func.generate_series(
+            func.date_trunc("month", literal(dt_start)),
+            func.date_trunc("month", literal(dt_end)),
+            literal_column("interval '1 month'"),
+        )
+        .table_valued("month")
+        .render_derived(name="cal")
+    )
+
+
 def get_heatmap_by_location(
     db: Session,
     from_date: date,
@@ -396,9 +409,15 @@ def get_heatmap_by_location(
     category_id: int | None = None,
     top_n: int = 30,
 ) -> dict:
-    """Heatmap location × category_id con top N ubicaciones."""
+    """Heatmap location × category_id con top N ubicaciones.
+
+    Agrupa por ``location_id`` (índice created_at/location_id/category_id) y
+    el top N se recorta en SQL con una ventana sobre el total por ubicación;
+    la etiqueta es la llave normalizada de ``maint_locations``.
+    """
     from itcj2.apps.maint.models.ticket import MaintTicket
     from itcj2.apps.maint.models.category import MaintCategory
+    from itcj2.apps.maint.models.location import MaintLocation
 
     dt_start = _dt_start(from_date)
     dt_end = _dt_end(to_date)
@@ -406,48 +425,56 @@ def get_heatmap_by_location(
     base = [
         MaintTicket.created_at >= dt_start,
         MaintTicket.created_at <= dt_end,
-        MaintTicket.location.isnot(None),
+        MaintTicket.location_id.isnot(None),
     ]
     if category_id:
         base.append(MaintTicket.category_id == category_id)
 
-    rows = (
-        db.query(
-            func.lower(func.trim(MaintTicket.location)).label("loc"),
+    cnt = func.count(MaintTicket.id)
+    agg = (
+        select(
+            MaintTicket.location_id,
             MaintTicket.category_id,
-            func.count(MaintTicket.id).label("cnt"),
+            cnt.label("cnt"),
+            func.sum(cnt).over(partition_by=MaintTicket.location_id).label("loc_total"),
         )
-        .filter(*base)
-        .group_by(func.lower(func.trim(MaintTicket.location)), MaintTicket.category_id)
-        .all()
+        .where(*base)
+        .group_by(MaintTicket.location_id, MaintTicket.category_id)
+        .subquery()
     )
-
-    # Top N locations by total count
-    loc_totals: dict[str, int] = {}
-    for r in rows:
-        loc_totals[r.loc] = loc_totals.get(r.loc, 0) + r.cnt
-    top_locs = sorted(loc_totals, key=lambda l: loc_totals[l], reverse=True)[:top_n]
-    top_locs_set = set(top_locs)
-
-    # Categories in data
-    cat_ids_in = sorted({r.category_id for r in rows if r.loc in top_locs_set})
-    cats_map: dict[int, MaintCategory] = {}
-    if cat_ids_in:
-        cats = db.query(MaintCategory).filter(MaintCategory.id.in_(cat_ids_in)).all()
-        cats_map = {c.id: c for c in cats}
-
-    # Build cell map
+    ranked = select(
+        agg,
+        func.dense_rank().over(order_by=(agg.c.loc_total.desc(), agg.c.location_id)).label("rk"),
+    ).subquery()
+
+    rows = db.execute(
+        select(
+            MaintLocation.key.label("loc"),
+            ranked.c.category_id,
+            MaintCategory.name.label("category_name"),
+            ranked.c.cnt,
+        )
+        .join(MaintLocation, MaintLocation.id == ranked.c.location_id)
+        .outerjoin(MaintCategory, MaintCategory.id == ranked.c.category_id)
+        .where(ranked.c.rk <= top_n)
+        .order_by(ranked.c.rk, ranked.c.category_id)
+    ).all()
+
+    y_labels: list[str] = []  # ya vienen por total desc
+    cat_names: dict[int, str] = {}
     cell: dict[tuple[str, int], int] = {}
     for r in rows:
-        if r.loc in top_locs_set:
-            cell[(r.loc, r.category_id)] = r.cnt
+        if not y_labels or y_labels[-1] != r.loc:
+            y_labels.append(r.loc)
+        cat_names[r.category_id] = r.category_name or f"Cat {r.category_id}"
+        cell[(r.loc, r.category_id)] = r.cnt
 
-    x_labels = [cats_map[c].name if c in cats_map else f"Cat {c}" for c in cat_ids_in]
-    y_labels = top_locs  # already sorted by count desc
+    cat_ids_in = sorted(cat_names)
+    x_labels = [cat_names[c] for c in cat_ids_in]
 
     matrix = [
         [cell.get((loc, cat_id), 0) for cat_id in cat_ids_in]
-        for loc in top_locs
+        for loc in y_labels
     ]
 
     return {
@@ -464,9 +491,16 @@ def get_heatmap_by_building(
     to_date: date,
     category_id: int | None = None,
 ) -> dict:
-    """Heatmap building × month-of-created_at."""
+    """Heatmap building × month-of-created_at.
+
+    El edificio viene ya parseado en ``maint_locations``; los meses salen de un
+    ``generate_series`` en la misma consulta, así el eje X es el calendario
+    completo del rango (los meses sin tickets quedan en 0). Tickets sin
+    ubicación (o aún sin ligar por ``maint backfill-locations``) cuentan como
+    "Sin clasificar".
+    """
     from itcj2.apps.maint.models.ticket import MaintTicket
-    from itcj2.apps.maint.utils.location_parser import parse_building
+    from itcj2.apps.maint.models.location import MaintLocation
 
     dt_start = _dt_start(from_date)
     dt_end = _dt_end(to_date)
@@ -478,32 +512,32 @@ def get_heatmap_by_building(
     if category_id:
         base.append(MaintTicket.category_id == category_id)
 
-    rows = (
-        db.query(
-            MaintTicket.location,
-            func.to_char(MaintTicket.created_at, "YYYY-MM").label("month"),
-            func.count(MaintTicket.id).label("cnt"),
-        )
-        .filter(*base)
-        .group_by(MaintTicket.location, func.to_char(MaintTicket.created_at, "YYYY-MM"))
-        .all()
+    month = func.date_trunc("month", MaintTicket.created_at)
+    building = func.coalesce(MaintLocation.building, "Sin clasificar")
+    agg = (
+        select(month.label("month"), building.label("building"), func.count(MaintTicket.id).label("cnt"))
+        .outerjoin(MaintLocation, MaintLocation.id == MaintTicket.location_id)
+        .where(*base)
+        .group_by(month, building)
+        .subquery()
     )
-
-    # Aggregate into building → month → count
+    cal = _month_calendar(dt_start, dt_end)
+    rows = db.execute(
+        select(func.to_char(cal.c.month, "YYYY-MM").label("month"), agg.c.building, agg.c.cnt)
+        .select_from(cal)
+        .outerjoin(agg, agg.c.month == cal.c.month)
+        .order_by(cal.c.month)
+    ).all()
+
+    x_labels: list[str] = []
     cell: dict[tuple[str, str], int] = {}
-    months_set: set[str] = set()
-    buildings_set: set[str] = set()
-
     for r in rows:
-        building = parse_building(r.location)
-        month = r.month
-        months_set.add(month)
-        buildings_set.add(building)
-        key = (building, month)
-        cell[key] = cell.get(key, 0) + r.cnt
-
-    x_labels = sorted(months_set)
-    y_labels = sorted(buildings_set, key=lambda b: (b == "Sin clasificar", b))
+        if not x_labels or x_labels[-1] != r.month:
+            x_labels.append(r.month)
+        if r.building is not None:
+            cell[(r.building, r.month)] = r.cnt
+
+    y_labels = sorted({b for b, _ in cell}, key=lambda b: (b == "Sin clasificar", b))
 
     matrix = [
         [cell.get((building, month), 0) for month in x_labels]
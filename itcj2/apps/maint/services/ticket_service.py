@@ -11,6 +11,7 @@ from itcj2.apps.maint.models.category import MaintCategory
 from itcj2.apps.maint.models.comment import MaintComment
 from itcj2.apps.maint.models.status_log import MaintStatusLog
 from itcj2.apps.maint.models.action_log import MaintTicketActionLog
+from itcj2.apps.maint.services import location_service, sla_scheduler
 from itcj2.apps.maint.utils.ticket_number_generator import generate_ticket_number
 from itcj2.apps.maint.utils.timezone_utils import now_local, ensure_local_timezone
 from itcj2.core.models.user import User
@@ -119,6 +120,7 @@ def create_ticket(
         title=title.strip(),
         description=description.strip(),
         location=location.strip() if location else None,
+        location_id=location_service.resolve_location_id(db, location),
         custom_fields=custom_fields or {},
         status='PENDING',
         due_at=due_at,
@@ -141,6 +143,7 @@ def create_ticket(
         performed_by_id=created_by,
         detail={'ticket_number': ticket_number},
     ))
+    sla_scheduler.schedule(db, ticket)
 
     try:
         db.commit()
@@ -364,6 +367,7 @@ def update_pending_ticket(
         ticket.priority = priority
         # Recalcular due_at con la nueva prioridad
         ticket.due_at = now_local() + timedelta(hours=get_sla_hours(priority))
+        sla_scheduler.schedule(db, ticket)
 
     if title is not None:
         ticket.title = title.strip()
@@ -373,6 +377,7 @@ def update_pending_ticket(
 
     if location is not None:
         ticket.location = location.strip() if location.strip() else None
+        ticket.location_id = location_service.resolve_location_id(db, location)
 
     if custom_fields is not None:
         ticket.custom_fields = custom_fields
@@ -494,30 +499,32 @@ def resolve_ticket(
     ))
 
     # ── Consumo de materiales del almacén (soft-fail) ─────────────────────
+    # Todos en un solo consumo FIFO; si alguno falla se reintenta renglón por
+    # renglón para aplicar los válidos y reportar los demás.
     warehouse_warnings = []
     if materials_used:
         from itcj2.apps.warehouse.services import fifo_service
-        for mat in materials_used:
+        lines = [fifo_service.ConsumeLine(m.product_id, m.quantity, m.notes) for m in materials_used]
+        batches = [lines]
+        consumed = []
+        while batches:
+            batch = batches.pop(0)
             sp = db.begin_nested()
             try:
-                fifo_service.consume(
+                fifo_service.consume_many(
                     db=db,
-                    product_id=mat.product_id,
-                    quantity=mat.quantity,
+                    lines=batch,
                     source_app='maint',
                     source_ticket_id=ticket_id,
                     performed_by_id=resolved_by_id,
-                    notes=mat.notes,
                 )
-                db.add(MaintTicketActionLog(
-                    ticket_id=ticket_id,
-                    action='WAREHOUSE_MATERIAL_ADDED',
-                    performed_by_id=resolved_by_id,
-                    detail={'product_id': mat.product_id, 'quantity': str(mat.quantity)},
-                ))
                 sp.commit()
+                consumed.extend(batch)
             except Exception as mat_err:
                 sp.rollback()
+                if len(batch) > 1:
+                    batches = [[line] for line in batch] + batches
+                    continue
                 if hasattr(mat_err, 'detail') and isinstance(mat_err.detail, dict):
                     msg = mat_err.detail.get('message', str(mat_err))
                 elif hasattr(mat_err, 'detail') and isinstance(mat_err.detail, str):
@@ -527,8 +534,21 @@ def resolve_ticket(
                 warehouse_warnings.append(msg)
                 logger.warning(
                     "[maint] Warehouse consume failed for ticket %s product %s: %s",
-                    ticket_id, mat.product_id, msg,
+                    ticket_id, batch[0].product_id, msg,
                 )
+        for line in consumed:
+            db.add(MaintTicketActionLog(
+                ticket_id=ticket_id,
+                action='WAREHOUSE_MATERIAL_ADDED',
+                performed_by_id=resolved_by_id,
+                detail={'product_id': line.product_id, 'quantity': str(line.quantity)},
+            ))
+
+    # U10: email al solicitante pidiendo evaluación, en la misma transacción
+    # (outbox; no-op si la cuenta de correo de maint no está conectada).
+    from itcj2.apps.maint.services.email_helper import MaintEmailHelper
+    MaintEmailHelper.send_resolved(db, ticket)
+    sla_scheduler.schedule(db, ticket)
 
     try:
         db.commit()
@@ -659,6 +679,13 @@ def cancel_ticket(
         detail={'reason': reason} if reason else None,
     ))
 
+    # U10/M7: email al creador con el motivo, en la misma transacción (outbox;
+    # no-op si la cuenta de correo no está conectada o si él mismo canceló).
+    if user_id != ticket.requester_id and ticket.requester:
+        from itcj2.apps.maint.services.email_helper import MaintEmailHelper
+        MaintEmailHelper.send_canceled(db, ticket, ticket.requester)
+    sla_scheduler.schedule(db, ticket)
+
     try:
         db.commit()
         logger.info(f"Ticket {ticket.ticket_number} cancelado por usuario {user_id}")
@@ -53,6 +53,15 @@
         _initReturnModal();
     });
 
+    // Las fotos subidas se procesan en la cola `media`; al terminar llega
+    // media_ready (puente notif:push del FAB) y se recarga para ver la miniatura.
+    document.addEventListener('notif:push', function (e) {
+        var d = e && e.detail;
+        if (d && d.type === 'media_ready' && d.app === 'maint' && d.ticket_id === ctx.ticketId) {
+            _reload();
+        }
+    });
+
     function _loadTicket() {
         MaintUtils.api.fetch(API_BASE + '/tickets/' + ctx.ticketId)
             .then(function (data) {
@@ -335,7 +344,7 @@
             var isImage = a.filename && /\.(jpe?g|png|gif|webp)$/i.test(a.filename);
             if (isImage) {
                 return '<a href="' + downloadUrl + '" target="_blank" class="mn-attach-thumb" title="' + _esc(a.filename || '') + '">' +
-                    '<img src="' + downloadUrl + '" alt="' + _esc(a.filename || '') + '" loading="lazy">' +
+                    '<img src="' + downloadUrl + '?size=thumb" alt="' + _esc(a.filename || '') + '" loading="lazy">' +
                 '</a>';
             }
             if (isPdf) {
@@ -450,7 +459,7 @@
                         if (a.is_purged) return '<span class="text-muted small"><i class="bi bi-file-earmark-x me-1"></i>Archivo eliminado</span>';
                         var url = '/api/maint/v2/attachments/' + a.id + '/download';
                         var isImg = a.filename && /\.(jpe?g|png|gif|webp)$/i.test(a.filename);
-                        if (isImg) return '<a href="' + url + '" target="_blank"><img src="' + url + '" style="max-height:80px;max-width:100px;border-radius:4px;object-fit:cover;" alt="' + _esc(a.filename || '') + '" loading="lazy"></a>';
+                        if (isImg) return '<a href="' + url + '" target="_blank"><img src="' + url + '?size=thumb" style="max-height:80px;max-width:100px;border-radius:4px;object-fit:cover;" alt="' + _esc(a.filename || '') + '" loading="lazy"></a>';
                         return '<a href="' + url + '" target="_blank" class="small"><i class="bi bi-paperclip me-1"></i>' + _esc(a.filename || 'Archivo') + '</a>';
                     });
                     attachHtml = '<div class="d-flex flex-wrap gap-2 mt-2">' + items.join('') + '</div>';
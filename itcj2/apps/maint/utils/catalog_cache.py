@@ -7,20 +7,48 @@ Proporciona acceso rápido a:
 - MaintServiceOrigin     → get_service_origins / get_service_origin_codes
 - MaintArea              → get_areas / get_area_codes / get_area_by_code / invalidate_areas
 
-Cada catálogo tiene degradación defensiva a valores hardcoded cuando la
-tabla no existe o la BD no está disponible. El cache es de módulo (no
-lru_cache) para permitir invalidación explícita tras cada escritura.
+- MaintNotificationTemplate → get_notification_template / get_notification_templates
+
+Cada catálogo es un `Catalog` de core/services/catalog_cache.py (snapshot
+inmutable por proceso, invalidación propagada a todos los procesos vía Redis);
+los loaders abren su propia sesión efímera. Cada catálogo tiene degradación
+defensiva a valores hardcoded cuando la tabla no existe o la BD no está
+disponible: el error no se cachea y se reintenta en el siguiente acceso.
+
+Los getters devuelven copias (list/set) del snapshot; los dicts de cada fila
+son compartidos y no deben modificarse.
 """
 import logging
-from typing import Optional
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+from itcj2.core.services.catalog_cache import Catalog
 
 logger = logging.getLogger(__name__)
 
-# ==================== CACHE DE MÓDULO ====================
 
-_priorities_cache: Optional[list] = None   # lista de dicts raw
-_priority_codes_cache: Optional[set] = None
-_sla_hours_cache: Optional[dict] = None    # code -> sla_hours
+class _Rows(NamedTuple):
+    """Snapshot de un catálogo: filas ordenadas, codes activos e índice por code."""
+    rows: tuple
+    active_codes: frozenset
+    by_code: MappingProxyType
+
+
+def _index(rows: list) -> _Rows:
+    return _Rows(
+        rows=tuple(rows),
+        active_codes=frozenset(r["code"] for r in rows if r["is_active"]),
+        by_code=MappingProxyType({r["code"]: r for r in rows}),
+    )
+
+
+def _snapshot(catalog: Catalog, what: str) -> Optional[_Rows]:
+    """Snapshot vigente (cargando si hace falta) o None si la BD falla."""
+    try:
+        return catalog.get()
+    except Exception as exc:
+        logger.warning(f"catalog_cache: no se pudo cargar {what} desde BD ({exc!r}); usando fallback")
+        return None
 
 
 def _fallback_sla_hours() -> dict:
@@ -67,26 +95,8 @@ def _row_to_dict(p) -> dict:
     }
 
 
-def _ensure_cache() -> list:
-    """
-    Rellena el cache si está vacío.  Degrada silenciosamente si la BD falla.
-    Retorna la lista (puede estar vacía si la BD falla).
-    """
-    global _priorities_cache, _priority_codes_cache, _sla_hours_cache
-
-    if _priorities_cache is not None:
-        return _priorities_cache
-
-    try:
-        rows = _load_from_db()
-        _priorities_cache = rows
-        _priority_codes_cache = {r["code"] for r in rows if r["is_active"]}
-        _sla_hours_cache = {r["code"]: r["sla_hours"] for r in rows}
-        return _priorities_cache
-    except Exception as exc:
-        logger.warning(f"catalog_cache: no se pudo cargar prioridades desde BD ({exc!r}); usando fallback")
-        # Dejar cache en None para que se reintente en el siguiente request
-        return []
+# El lambda resuelve `_load_from_db` en cada carga (los tests lo parchean).
+PRIORITIES = Catalog("maint.priorities", lambda _db: _index(_load_from_db()), own_session=True)
 
 
 # ==================== API PÚBLICA ====================
@@ -96,9 +106,9 @@ def get_priorities(db=None) -> list:
     Retorna todas las prioridades ordenadas por display_order como lista de dicts.
     `db` se acepta por compatibilidad pero no se usa (el cache usa sesión efímera propia).
     """
-    rows = _ensure_cache()
-    if rows:
-        return rows
+    snap = _snapshot(PRIORITIES, "prioridades")
+    if snap and snap.rows:
+        return list(snap.rows)
     # Fallback: convertir SLA_HOURS a formato dict mínimo
     fallback = _fallback_sla_hours()
     return [
@@ -116,14 +126,14 @@ def get_priority_codes(db=None) -> set:
 
     Ojo: se comprueba la verdad del set (no solo `is not None`). Si la tabla
     `maint_priority` existe pero está vacía (BD recién creada, sin el DML de
-    catálogos todavía cargado), `_ensure_cache()` puebla `_priority_codes_cache`
-    con un `set()` vacío — que no es `None` — y esa rama saltaba el fallback,
+    catálogos todavía cargado), el snapshot trae un conjunto de codes vacío
+    — que no es `None` — y esa rama saltaba el fallback,
     dejando `create_ticket` incapaz de validar CUALQUIER prioridad. Un `set()`
     vacío debe degradar al fallback igual que si la carga hubiera fallado.
     """
-    _ensure_cache()
-    if _priority_codes_cache:
-        return _priority_codes_cache
+    snap = _snapshot(PRIORITIES, "prioridades")
+    if snap and snap.active_codes:
+        return set(snap.active_codes)
     return set(_fallback_sla_hours().keys())
 
 
@@ -132,29 +142,21 @@ def get_sla_hours(code: str, db=None) -> int:
     Retorna las horas SLA para el code dado.
     Si no existe en cache ni en fallback retorna 72 (MEDIA por defecto).
     """
-    _ensure_cache()
-    if _sla_hours_cache:
-        if code in _sla_hours_cache:
-            return _sla_hours_cache[code]
+    snap = _snapshot(PRIORITIES, "prioridades")
+    if snap and code in snap.by_code:
+        return snap.by_code[code]["sla_hours"]
     # Fallback al hardcoded
     fallback = _fallback_sla_hours()
     return fallback.get(code, 72)
 
 
 def invalidate_priorities() -> None:
-    """Limpia el cache para que se recargue en el siguiente acceso."""
-    global _priorities_cache, _priority_codes_cache, _sla_hours_cache
-    _priorities_cache = None
-    _priority_codes_cache = None
-    _sla_hours_cache = None
-    logger.debug("catalog_cache: cache de prioridades invalidado")
+    """Invalida el cache (en todos los procesos) para que se recargue en el siguiente acceso."""
+    PRIORITIES.invalidate()
 
 
 # ==================== MAINT TYPES ====================
 
-_maint_types_cache: Optional[list] = None
-_maint_type_codes_cache: Optional[set] = None
-
 _FALLBACK_MAINT_TYPE_CODES = {'PREVENTIVO', 'CORRECTIVO'}
 
 
@@ -189,23 +191,9 @@ def _maint_type_to_dict(m) -> dict:
     }
 
 
-def _ensure_maint_types_cache() -> list:
-    """Rellena el cache si está vacío. Degrada silenciosamente si la BD falla."""
-    global _maint_types_cache, _maint_type_codes_cache
-
-    if _maint_types_cache is not None:
-        return _maint_types_cache
-
-    try:
-        rows = _load_maint_types_from_db()
-        _maint_types_cache = rows
-        _maint_type_codes_cache = {r["code"] for r in rows if r["is_active"]}
-        return _maint_types_cache
-    except Exception as exc:
-        logger.warning(
-            f"catalog_cache: no se pudo cargar maint_types desde BD ({exc!r}); usando fallback"
-        )
-        return []
+MAINT_TYPES = Catalog(
+    "maint.maint_types", lambda _db: _index(_load_maint_types_from_db()), own_session=True,
+)
 
 
 def get_maint_types(db=None) -> list:
@@ -213,9 +201,9 @@ def get_maint_types(db=None) -> list:
     Retorna todos los tipos de mantenimiento ordenados por display_order.
     `db` se acepta por compatibilidad pero no se usa.
     """
-    rows = _ensure_maint_types_cache()
-    if rows:
-        return rows
+    snap = _snapshot(MAINT_TYPES, "maint_types")
+    if snap and snap.rows:
+        return list(snap.rows)
     # Fallback mínimo cuando la BD no está disponible
     return [
         {"id": None, "code": c, "label": c.capitalize(),
@@ -229,25 +217,19 @@ def get_maint_type_codes(db=None) -> set:
     Retorna el set de codes ACTIVOS de tipos de mantenimiento.
     Fallback: {'PREVENTIVO', 'CORRECTIVO'}.
     """
-    _ensure_maint_types_cache()
-    if _maint_type_codes_cache is not None:
-        return _maint_type_codes_cache
+    snap = _snapshot(MAINT_TYPES, "maint_types")
+    if snap is not None:
+        return set(snap.active_codes)
     return set(_FALLBACK_MAINT_TYPE_CODES)
 
 
 def invalidate_maint_types() -> None:
-    """Limpia el cache de tipos de mantenimiento para que se recargue."""
-    global _maint_types_cache, _maint_type_codes_cache
-    _maint_types_cache = None
-    _maint_type_codes_cache = None
-    logger.debug("catalog_cache: cache de maint_types invalidado")
+    """Invalida el cache de tipos de mantenimiento para que se recargue."""
+    MAINT_TYPES.invalidate()
 
 
 # ==================== SERVICE ORIGINS ====================
 
-_service_origins_cache: Optional[list] = None
-_service_origin_codes_cache: Optional[set] = None
-
 _FALLBACK_SERVICE_ORIGIN_CODES = {'INTERNO', 'EXTERNO'}
 
 
@@ -282,23 +264,9 @@ def _service_origin_to_dict(s) -> dict:
     }
 
 
-def _ensure_service_origins_cache() -> list:
-    """Rellena el cache si está vacío. Degrada silenciosamente si la BD falla."""
-    global _service_origins_cache, _service_origin_codes_cache
-
-    if _service_origins_cache is not None:
-        return _service_origins_cache
-
-    try:
-        rows = _load_service_origins_from_db()
-        _service_origins_cache = rows
-        _service_origin_codes_cache = {r["code"] for r in rows if r["is_active"]}
-        return _service_origins_cache
-    except Exception as exc:
-        logger.warning(
-            f"catalog_cache: no se pudo cargar service_origins desde BD ({exc!r}); usando fallback"
-        )
-        return []
+SERVICE_ORIGINS = Catalog(
+    "maint.service_origins", lambda _db: _index(_load_service_origins_from_db()), own_session=True,
+)
 
 
 def get_service_origins(db=None) -> list:
@@ -306,9 +274,9 @@ def get_service_origins(db=None) -> list:
     Retorna todos los orígenes de servicio ordenados por display_order.
     `db` se acepta por compatibilidad pero no se usa.
     """
-    rows = _ensure_service_origins_cache()
-    if rows:
-        return rows
+    snap = _snapshot(SERVICE_ORIGINS, "service_origins")
+    if snap and snap.rows:
+        return list(snap.rows)
     # Fallback mínimo cuando la BD no está disponible
     return [
         {"id": None, "code": c, "label": c.capitalize(),
@@ -322,25 +290,19 @@ def get_service_origin_codes(db=None) -> set:
     Retorna el set de codes ACTIVOS de orígenes de servicio.
     Fallback: {'INTERNO', 'EXTERNO'}.
     """
-    _ensure_service_origins_cache()
-    if _service_origin_codes_cache is not None:
-        return _service_origin_codes_cache
+    snap = _snapshot(SERVICE_ORIGINS, "service_origins")
+    if snap is not None:
+        return set(snap.active_codes)
     return set(_FALLBACK_SERVICE_ORIGIN_CODES)
 
 
 def invalidate_service_origins() -> None:
-    """Limpia el cache de orígenes de servicio para que se recargue."""
-    global _service_origins_cache, _service_origin_codes_cache
-    _service_origins_cache = None
-    _service_origin_codes_cache = None
-    logger.debug("catalog_cache: cache de service_origins invalidado")
+    """Invalida el cache de orígenes de servicio para que se recargue."""
+    SERVICE_ORIGINS.invalidate()
 
 
 # ==================== AREAS ====================
 
-_areas_cache: Optional[list] = None
-_area_codes_cache: Optional[set] = None
-
 _FALLBACK_AREA_CODES = {
     'TRANSPORT', 'ELECTRICAL', 'CARPENTRY', 'AC', 'GARDENING', 'GENERAL', 'PAINTING',
 }
@@ -380,23 +342,7 @@ def _area_to_dict(a) -> dict:
     }
 
 
-def _ensure_areas_cache() -> list:
-    """Rellena el cache si está vacío. Degrada silenciosamente si la BD falla."""
-    global _areas_cache, _area_codes_cache
-
-    if _areas_cache is not None:
-        return _areas_cache
-
-    try:
-        rows = _load_areas_from_db()
-        _areas_cache = rows
-        _area_codes_cache = {r["code"] for r in rows if r["is_active"]}
-        return _areas_cache
-    except Exception as exc:
-        logger.warning(
-            f"catalog_cache: no se pudo cargar areas desde BD ({exc!r}); usando fallback"
-        )
-        return []
+AREAS = Catalog("maint.areas", lambda _db: _index(_load_areas_from_db()), own_session=True)
 
 
 def get_areas(db=None) -> list:
@@ -405,9 +351,9 @@ def get_areas(db=None) -> list:
     `db` se acepta por compatibilidad pero no se usa (el cache usa sesión efímera propia).
     Fallback defensivo si BD/tabla falla.
     """
-    rows = _ensure_areas_cache()
-    if rows:
-        return rows
+    snap = _snapshot(AREAS, "areas")
+    if snap and snap.rows:
+        return list(snap.rows)
     # Fallback mínimo cuando la BD no está disponible
     return [
         {
@@ -429,9 +375,9 @@ def get_area_codes(db=None) -> set:
     Retorna el set de codes ACTIVOS de áreas técnicas.
     Fallback: {'TRANSPORT','ELECTRICAL','CARPENTRY','AC','GARDENING','GENERAL','PAINTING'}.
     """
-    _ensure_areas_cache()
-    if _area_codes_cache is not None:
-        return _area_codes_cache
+    snap = _snapshot(AREAS, "areas")
+    if snap is not None:
+        return set(snap.active_codes)
     return set(_FALLBACK_AREA_CODES)
 
 
@@ -440,28 +386,17 @@ def get_area_by_code(code: str, db=None) -> Optional[dict]:
     Retorna el dict del área con el code indicado, o None si no existe.
     Busca en el cache (cargando si es necesario); no lanza excepción.
     """
-    try:
-        rows = _ensure_areas_cache()
-        for row in rows:
-            if row["code"] == code:
-                return row
-    except Exception as exc:
-        logger.warning(f"catalog_cache: error buscando área '{code}' ({exc!r})")
-    return None
+    snap = _snapshot(AREAS, "areas")
+    return snap.by_code.get(code) if snap else None
 
 
 def invalidate_areas() -> None:
-    """Limpia el cache de áreas para que se recargue en el siguiente acceso."""
-    global _areas_cache, _area_codes_cache
-    _areas_cache = None
-    _area_codes_cache = None
-    logger.debug("catalog_cache: cache de areas invalidado")
+    """Invalida el cache de áreas para que se recargue en el siguiente acceso."""
+    AREAS.invalidate()
 
 
 # ==================== NOTIFICATION TEMPLATES ====================
 
-_notification_templates_cache: Optional[list] = None
-
 
 def _load_notification_templates_from_db() -> list:
     """
@@ -496,22 +431,11 @@ def _notification_template_to_dict(t) -> dict:
     }
 
 
-def _ensure_notification_templates_cache() -> list:
-    """Rellena el cache si está vacío. Degrada silenciosamente si la BD falla."""
-    global _notification_templates_cache
-
-    if _notification_templates_cache is not None:
-        return _notification_templates_cache
-
-    try:
-        rows = _load_notification_templates_from_db()
-        _notification_templates_cache = rows
-        return _notification_templates_cache
-    except Exception as exc:
-        logger.warning(
-            f"catalog_cache: no se pudo cargar notification_templates desde BD ({exc!r}); sin plantillas"
-        )
-        return []
+NOTIFICATION_TEMPLATES = Catalog(
+    "maint.notification_templates",
+    lambda _db: _index(_load_notification_templates_from_db()),
+    own_session=True,
+)
 
 
 def get_notification_template(code: str, db=None) -> Optional[dict]:
@@ -521,16 +445,9 @@ def get_notification_template(code: str, db=None) -> Optional[dict]:
     `db` se acepta por compatibilidad pero no se usa (sesión efímera propia).
     Nunca lanza excepción.
     """
-    try:
-        rows = _ensure_notification_templates_cache()
-        for row in rows:
-            if row["code"] == code:
-                if row["is_active"]:
-                    return row
-                return None
-    except Exception as exc:
-        logger.warning(f"catalog_cache: error buscando notification_template '{code}' ({exc!r})")
-    return None
+    snap = _snapshot(NOTIFICATION_TEMPLATES, "notification_templates")
+    row = snap.by_code.get(code) if snap else None
+    return row if row and row["is_active"] else None
 
 
 def get_notification_templates(db=None) -> list:
@@ -540,15 +457,10 @@ def get_notification_templates(db=None) -> list:
     `db` se acepta por compatibilidad pero no se usa.
     Nunca lanza excepción.
     """
-    try:
-        return _ensure_notification_templates_cache()
-    except Exception as exc:
-        logger.warning(f"catalog_cache: error cargando notification_templates ({exc!r})")
-        return []
+    snap = _snapshot(NOTIFICATION_TEMPLATES, "notification_templates")
+    return list(snap.rows) if snap else []
 
 
 def invalidate_notification_templates() -> None:
-    """Limpia el cache de plantillas de notificación para que se recargue en el siguiente acceso."""
-    global _notification_templates_cache
-    _notification_templates_cache = None
-    logger.debug("catalog_cache: cache de notification_templates invalidado")
+    """Invalida el cache de plantillas de notificación para que se recargue en el siguiente acceso."""
+    NOTIFICATION_TEMPLATES.invalidate()
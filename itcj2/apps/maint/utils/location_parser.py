@@ -1,8 +1,10 @@
 """
 Utilidades de parsing de ubicación para mantenimiento.
 
-Extrae el identificador de edificio/área a partir del campo libre `location`
-de un ticket para agrupar heatmaps por edificio.
+Extrae el identificador de edificio/área (y el resto como salón/espacio) a
+partir del campo libre `location` de un ticket. El resultado se guarda en la
+dimensión ``maint_locations`` (services/location_service.py) al crear/editar
+el ticket, así los heatmaps agrupan por llave foránea y no por texto.
 """
 import re
 
@@ -17,6 +19,9 @@ _BUILDING_PATTERN = re.compile(
 
 _NO_BUILDING = "Sin clasificar"
 
+# Separadores entre el edificio y el resto de la ubicación
+_ROOM_SEPARATORS = " \t,;:-\u2013\u2014/"
+
 
 def parse_building(location: str | None) -> str:
     """Extrae el token de edificio de una cadena de ubicación libre.
@@ -37,3 +42,22 @@ def parse_building(location: str | None) -> str:
     if not m:
         return _NO_BUILDING
     return m.group(1).title()
+
+
+def parse_room(location: str | None) -> str | None:
+    """Resto de la ubicación después del token de edificio (salón, piso...).
+
+    Devuelve None si no se reconoce edificio o no queda nada después.
+
+    Ejemplos:
+        "Edificio A, Aula 12"   → "Aula 12"
+        "Lab Redes piso 2"      → "piso 2"
+        "Biblioteca"            → None
+    """
+    if not location:
+        return None
+    m = _BUILDING_PATTERN.match(location.strip())
+    if not m:
+        return None
+    rest = location.strip()[m.end():].strip(_ROOM_SEPARATORS)
+    return rest or None
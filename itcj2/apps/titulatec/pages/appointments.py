@@ -12,8 +12,9 @@ import logging
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, Form, Request
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import Response
 
+from itcj2.core.services import file_delivery
 from itcj2.dependencies import require_page_app
 from itcj2.apps.titulatec.pages.nav import render_titulatec
 
@@ -470,5 +471,5 @@ async def document_file(
         db.close()
     if not path.exists():
         return Response(status_code=404)
-    return FileResponse(str(path), media_type=mime,
-                        headers={"Content-Disposition": f'inline; filename="{original}"'})
+    return file_delivery.send_file(request, path, media_type=mime, filename=original or type_code,
+                                   disposition="inline")
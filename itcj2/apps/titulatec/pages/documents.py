@@ -2,8 +2,9 @@
 import logging
 
 from fastapi import APIRouter, Depends, Request
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import Response
 
+from itcj2.core.services import file_delivery
 from itcj2.dependencies import require_page_app
 from itcj2.apps.titulatec.pages.nav import render_titulatec
 
@@ -157,6 +158,5 @@ async def document_file(process_id: int, type_code: str, request: Request, downl
         db.close()
     if not path.exists():
         return Response(status_code=404)
-    disp = "attachment" if download else "inline"
-    return FileResponse(str(path), media_type=mime,
-                        headers={"Content-Disposition": f'{disp}; filename="{original or type_code}"'})
+    return file_delivery.send_file(request, path, media_type=mime, filename=original or type_code,
+                                   disposition="attachment" if download else "inline")
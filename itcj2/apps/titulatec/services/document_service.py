@@ -110,6 +110,18 @@ class DocumentService:
             )
             db.add(doc)
 
+        if meta["compress"]:
+            from itcj2.core.services import media_jobs
+
+            db.flush()
+            media_jobs.enqueue(db, {
+                "kind": "titulatec",
+                "path": str(storage.abs_path(meta["file_path"])),
+                "ext": meta["ext"],
+                "document_id": doc.id,
+                "file_path": meta["file_path"],
+            })
+
         db.commit()
         db.refresh(doc)
         return doc
@@ -2,7 +2,8 @@
 
 Estructura: instance/apps/titulatec/{period_code}/{control_number}/documents/{type_code}.{ext}
 - Solo se conserva la última versión (nombre fijo por tipo → sobreescribe).
-- Imágenes: se comprimen con Pillow. PDFs: se valida tamaño (no se recomprime).
+- Imágenes: se guardan crudas y las recomprime la cola ``media`` (ver
+  core/services/media_jobs.py). PDFs: se valida tamaño (no se recomprime).
 """
 from __future__ import annotations
 
@@ -43,13 +44,13 @@ def _ext_of(filename: str) -> str:
     return (os.path.splitext(filename or "")[1].lstrip(".") or "").lower()
 
 
-def _compress_image(raw: bytes, ext: str) -> tuple[bytes, str]:
+def compress_image(raw: bytes, ext: str) -> tuple[bytes, str]:
     """Comprime una imagen: limita dimensión y recodifica. Devuelve (bytes, ext_final)."""
-    from PIL import Image, ImageOps
+    from itcj2.core.services import media_service
 
-    img = Image.open(io.BytesIO(raw))
-    img = ImageOps.exif_transpose(img)  # respeta orientación EXIF
-    img.thumbnail((_MAX_IMAGE_DIM, _MAX_IMAGE_DIM))
+    # Decodificación compartida (draft + orientación EXIF). PNG/WebP conservan
+    # transparencia; el JPEG la aplana sobre blanco.
+    img = media_service.open_image(raw, _MAX_IMAGE_DIM, flatten=ext not in ("png", "webp"))
 
     out = io.BytesIO()
     if ext == "png":
@@ -58,9 +59,6 @@ def _compress_image(raw: bytes, ext: str) -> tuple[bytes, str]:
     if ext == "webp":
         img.save(out, format="WEBP", quality=_JPEG_QUALITY, method=6)
         return out.getvalue(), "webp"
-    # jpg/jpeg → JPEG (aplana transparencia)
-    if img.mode in ("RGBA", "P", "LA"):
-        img = img.convert("RGB")
     img.save(out, format="JPEG", quality=_JPEG_QUALITY, optimize=True)
     return out.getvalue(), "jpg"
 
@@ -69,6 +67,17 @@ class StorageError(Exception):
     pass
 
 
+def _verify_image(raw: bytes) -> None:
+    """Valida solo cabeceras (barato); la compresión la hace la cola `media`."""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            img.verify()
+    except Exception:
+        raise StorageError("La imagen está dañada o no es válida.")
+
+
 def save_document(
     *,
     raw: bytes,
@@ -81,9 +90,11 @@ def save_document(
 ) -> dict:
     """Guarda (sobreescribe) un documento. Devuelve metadata para el modelo Document.
 
-    file_kind: 'pdf' | 'image'. Valida extensión y tamaño; comprime imágenes.
+    file_kind: 'pdf' | 'image'. Valida extensión y tamaño. Las imágenes se
+    escriben tal cual: el llamador encola su compresión (``compress=True``).
     El nombre en disco es fijo: ``{type_code}.{ext}`` (solo última versión).
-    Retorna: {file_path (relativo a TITULATEC_UPLOAD_PATH), original_name, mime_type, size_bytes}.
+    Retorna: {file_path (relativo a TITULATEC_UPLOAD_PATH), original_name, mime_type,
+    size_bytes, compress, ext}.
     """
     settings = get_settings()
     ext = _ext_of(original_name)
@@ -94,14 +105,15 @@ def save_document(
         if len(raw) > settings.TITULATEC_MAX_PDF_SIZE:
             mb = settings.TITULATEC_MAX_PDF_SIZE // (1024 * 1024)
             raise StorageError(f"El PDF excede el tamaño máximo ({mb} MB).")
-        data, final_ext, mime = raw, "pdf", "application/pdf"
+        final_ext, mime = "pdf", "application/pdf"
     elif file_kind == "image":
         if ext not in _IMAGE_EXTS:
             raise StorageError("Formato de imagen no permitido (jpg, png, webp).")
         if len(raw) > settings.TITULATEC_MAX_IMAGE_SIZE:
             mb = settings.TITULATEC_MAX_IMAGE_SIZE // (1024 * 1024)
             raise StorageError(f"La imagen excede el tamaño máximo ({mb} MB).")
-        data, final_ext = _compress_image(raw, ext)
+        _verify_image(raw)
+        final_ext = "jpg" if ext == "jpeg" else ext
         mime = f"image/{'jpeg' if final_ext == 'jpg' else final_ext}"
     else:
         raise StorageError(f"file_kind inválido: {file_kind}")
@@ -111,14 +123,16 @@ def save_document(
     for prev in target.parent.glob(f"{type_code}.*"):
         if prev != target:
             prev.unlink(missing_ok=True)
-    target.write_bytes(data)
+    target.write_bytes(raw)
 
     rel = target.relative_to(_base()).as_posix()
     return {
         "file_path": rel,
         "original_name": original_name,
         "mime_type": mime,
-        "size_bytes": len(data),
+        "size_bytes": len(raw),
+        "compress": file_kind == "image",
+        "ext": final_ext,
     }
 
 
@@ -4,10 +4,9 @@ Fuente: itcj/apps/vistetec/routes/api/garments.py
 """
 import logging
 import os
-from typing import Optional
+from typing import Literal, Optional
 
 from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Form
-from fastapi.responses import FileResponse
 from itcj2.dependencies import DbSession, require_perms
 
 router = APIRouter(tags=["vistetec-garments"])
@@ -163,6 +162,8 @@ def withdraw_garment(
 @router.get("/image/{image_path:path}")
 def serve_garment_image(
     image_path: str,
+    request: Request,
+    size: Literal["thumb", "medium", "full"] | None = None,
     user: dict = require_perms("vistetec", ["vistetec.catalog.api.list"]),
     db: DbSession = None,
 ):
@@ -205,4 +206,12 @@ def serve_garment_image(
     if not full_path.is_file():
         raise not_found
 
-    return FileResponse(full_path)
+    # ?size= elige la variante que escribió media_service (el catálogo pide
+    # medium, las miniaturas thumb). Fotos previas al pipeline: el original.
+    from itcj2.core.services import file_delivery, media_service
+    if size:
+        return media_service.variant_response(
+            request, str(full_path), media_service.sibling_variants(str(full_path)), size,
+        )
+
+    return file_delivery.send_file(request, full_path, disposition=None)
@@ -9,24 +9,13 @@ from itcj2.apps.vistetec.models.appointment import VTAppointment as Appointment
 from itcj2.apps.vistetec.models.garment import Garment
 from itcj2.apps.vistetec.models.slot_volunteer import SlotVolunteer
 from itcj2.apps.vistetec.models.time_slot import VTTimeSlot as TimeSlot
+from itcj2.core.services import sequence_service
 
 
 def _generate_code(db: Session) -> str:
     """Genera código único para cita: CIT-YYYY-NNNN."""
-    year = datetime.now().year
-    prefix = f"CIT-{year}-"
-
-    last = db.query(Appointment).filter(
-        Appointment.code.like(f"{prefix}%")
-    ).order_by(Appointment.id.desc()).first()
-
-    if last:
-        last_num = int(last.code.split('-')[-1])
-        new_num = last_num + 1
-    else:
-        new_num = 1
-
-    return f"{prefix}{new_num:04d}"
+    seq = sequence_service.Sequence("vistetec.appointment_code", "CIT-{year}-{n:04d}", Appointment.code)
+    return sequence_service.next_number(db, seq)
 
 
 def _verify_volunteer_for_slot(db: Session, slot_id: int, volunteer_id: int) -> bool:
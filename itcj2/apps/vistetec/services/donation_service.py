@@ -1,5 +1,4 @@
 """Servicio para gestión de donaciones."""
-from datetime import datetime
 from typing import Optional
 
 from sqlalchemy import func
@@ -7,25 +6,14 @@ from sqlalchemy.orm import Session
 
 from itcj2.apps.vistetec.models.donation import VTDonation as Donation
 from itcj2.apps.vistetec.models.garment import Garment
+from itcj2.core.services import sequence_service
 from itcj2.models.base import paginate
 
 
 def _generate_code(db: Session) -> str:
     """Genera código único para donación: DON-YYYY-NNNN."""
-    year = datetime.now().year
-    prefix = f"DON-{year}-"
-
-    last = db.query(Donation).filter(
-        Donation.code.like(f"{prefix}%")
-    ).order_by(Donation.id.desc()).first()
-
-    if last:
-        last_num = int(last.code.split('-')[-1])
-        new_num = last_num + 1
-    else:
-        new_num = 1
-
-    return f"{prefix}{new_num:04d}"
+    seq = sequence_service.Sequence("vistetec.donation_code", "DON-{year}-{n:04d}", Donation.code)
+    return sequence_service.next_number(db, seq)
 
 
 def get_donations(
@@ -6,30 +6,14 @@ from sqlalchemy.orm import Session
 
 from itcj2.apps.vistetec.models.garment import Garment
 from itcj2.apps.vistetec.services import image_service
+from itcj2.core.services import sequence_service
 from itcj2.models.base import paginate
 
 
 def _generate_code(db: Session) -> str:
     """Genera un código secuencial: PRD-YYYY-NNNN."""
-    year = datetime.now().year
-    prefix = f'PRD-{year}-'
-
-    last = (
-        db.query(Garment)
-        .filter(Garment.code.like(f'{prefix}%'))
-        .order_by(Garment.code.desc())
-        .first()
-    )
-
-    if last:
-        try:
-            seq = int(last.code.split('-')[-1]) + 1
-        except (ValueError, IndexError):
-            seq = 1
-    else:
-        seq = 1
-
-    return f'{prefix}{seq:04d}'
+    seq = sequence_service.Sequence("vistetec.garment_code", "PRD-{year}-{n:04d}", Garment.code)
+    return sequence_service.next_number(db, seq)
 
 
 def create_garment(db: Session, data, image_file=None, registered_by_id=None):
@@ -52,7 +36,7 @@ def create_garment(db: Session, data, image_file=None, registered_by_id=None):
     )
 
     if image_file:
-        garment.image_path = image_service.save_garment_image(image_file, garment.code)
+        garment.image_path = image_service.save_garment_image(db, image_file, garment.code)
 
     db.add(garment)
     db.commit()
@@ -76,7 +60,7 @@ def update_garment(db: Session, garment_id, data, image_file=None):
 
     if image_file:
         image_service.delete_garment_image(garment.image_path)
-        garment.image_path = image_service.save_garment_image(image_file, garment.code)
+        garment.image_path = image_service.save_garment_image(db, image_file, garment.code)
 
     db.commit()
     return garment
@@ -1,13 +1,14 @@
 """Servicio de manejo de imágenes de prendas."""
-import io
 import logging
 import os
 import uuid
 from datetime import datetime
 
-from PIL import Image, ExifTags
+from PIL import Image
 from werkzeug.utils import secure_filename
 
+from itcj2.core.services import media_jobs, media_service
+
 logger = logging.getLogger(__name__)
 
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'webp'}
@@ -17,60 +18,14 @@ def _allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def _compress_image(file, max_dimension=1920, quality=85):
+def save_garment_image(db, file, garment_code):
     """
-    Comprime y redimensiona una imagen con Pillow.
+    Guarda la imagen de una prenda en el filesystem. El crudo queda en su ruta
+    final y la cola `media` lo recomprime y escribe las variantes thumb/medium/full
+    al lado cuando `db` hace commit (ver core/services/media_jobs.py).
 
-    Returns:
-        tuple: (io.BytesIO con bytes comprimidos, extension str)
-    """
-    img = Image.open(file)
-
-    try:
-        orientation_key = None
-        for key, val in ExifTags.TAGS.items():
-            if val == 'Orientation':
-                orientation_key = key
-                break
-        if orientation_key:
-            exif = img._getexif()
-            if exif and orientation_key in exif:
-                orient = exif[orientation_key]
-                if orient == 3:
-                    img = img.rotate(180, expand=True)
-                elif orient == 6:
-                    img = img.rotate(270, expand=True)
-                elif orient == 8:
-                    img = img.rotate(90, expand=True)
-    except (AttributeError, KeyError, IndexError):
-        pass
-
-    if img.mode in ('RGBA', 'P', 'LA'):
-        if img.mode == 'P':
-            img = img.convert('RGBA')
-        background = Image.new('RGB', img.size, (255, 255, 255))
-        background.paste(img, mask=img.split()[-1] if 'A' in img.mode else None)
-        img = background
-    elif img.mode != 'RGB':
-        img = img.convert('RGB')
-
-    width, height = img.size
-    if width > max_dimension or height > max_dimension:
-        ratio = min(max_dimension / width, max_dimension / height)
-        new_size = (round(width * ratio), round(height * ratio))
-        img = img.resize(new_size, Image.LANCZOS)
-
-    output = io.BytesIO()
-    img.save(output, format='JPEG', quality=quality, optimize=True)
-    output.seek(0)
-
-    return output, 'jpg'
-
-
-def save_garment_image(file, garment_code):
-    """
-    Guarda la imagen de una prenda en el filesystem.
-    Comprime automáticamente con Pillow antes de guardar.
+    El nombre lleva un sufijo aleatorio: al reemplazar la foto cambia la URL, así
+    que las variantes se pueden servir con caché inmutable.
 
     Returns:
         str: Ruta relativa de la imagen guardada.
@@ -102,14 +57,9 @@ def save_garment_image(file, garment_code):
         max_mb = max_size / (1024 * 1024)
         raise ValueError(f'El archivo excede el tamaño máximo de {max_mb:.0f} MB.')
 
-    try:
-        compressed, ext = _compress_image(raw)
-    except Exception as e:
-        raise ValueError(f'Error al procesar la imagen: {str(e)}')
-
     now = datetime.now()
     safe_code = secure_filename(garment_code)
-    filename = f'{safe_code}.{ext}'
+    filename = f'{safe_code}-{uuid.uuid4().hex[:8]}.jpg'
     relative_dir = os.path.join(str(now.year), f'{now.month:02d}')
     relative_path = os.path.join(relative_dir, filename)
 
@@ -117,9 +67,16 @@ def save_garment_image(file, garment_code):
     full_dir = os.path.join(upload_path, relative_dir)
     os.makedirs(full_dir, exist_ok=True)
 
+    # Solo cabeceras (barato): el decode completo lo hace el worker.
+    try:
+        with Image.open(raw) as img:
+            img.verify()
+    except Exception as e:
+        raise ValueError(f'Error al procesar la imagen: {str(e)}')
+
     full_path = os.path.join(upload_path, relative_path)
-    with open(full_path, 'wb') as f:
-        f.write(compressed.read())
+    media_jobs.write_raw(raw, full_path)
+    media_jobs.enqueue(db, {"kind": "garment", "path": full_path})
 
     return relative_path
 
@@ -147,6 +104,7 @@ def delete_garment_image(relative_path):
         logger.warning("delete_garment_image: ruta fuera del directorio de uploads: %r", relative_path)
         return
 
+    media_service.remove_variants(str(full_path), media_service.sibling_variants(str(full_path)))
     if full_path.is_file():
         os.remove(full_path)
 
@@ -102,7 +102,7 @@
             const statusInfo = STATUSES[g.status] || { label: g.status, class: '' };
             const condLabel = CONDITIONS[g.condition] || g.condition;
             const imgHtml = g.image_path
-                ? `<img src="/api/vistetec/v2/garments/image/${escapeAttr(g.image_path)}" class="garment-thumb" alt="">`
+                ? `<img src="/api/vistetec/v2/garments/image/${escapeAttr(g.image_path)}?size=thumb" class="garment-thumb" alt="">`
                 : '<div class="garment-thumb-placeholder"><i class="bi bi-image"></i></div>';
 
             return `
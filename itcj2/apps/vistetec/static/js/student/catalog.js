@@ -78,7 +78,7 @@
         showEmpty(false);
         grid.innerHTML = items.map(g => {
             const imageHtml = g.image_path
-                ? `<img src="/api/vistetec/v2/garments/image/${g.image_path}" class="card-img-top" alt="${g.name}" loading="lazy">`
+                ? `<img src="/api/vistetec/v2/garments/image/${g.image_path}?size=medium" class="card-img-top" alt="${g.name}" loading="lazy">`
                 : `<div class="card-img-placeholder"><i class="bi bi-image"></i></div>`;
 
             const condLabel = conditionLabels[g.condition] || g.condition;
@@ -57,7 +57,7 @@
         // Imagen
         if (g.image_path) {
             const img = document.getElementById('garmentImage');
-            img.src = `${API_BASE}/garments/image/${g.image_path}`;
+            img.src = `${API_BASE}/garments/image/${g.image_path}?size=full`;
             img.classList.remove('d-none');
             document.getElementById('noImageIcon').classList.add('d-none');
         }
@@ -69,7 +69,7 @@
                 : 'Sin horario';
 
             const imageHtml = garment.image_path
-                ? `<img src="/api/vistetec/v2/garments/image/${garment.image_path}" class="garment-thumb" alt="${garment.name}">`
+                ? `<img src="/api/vistetec/v2/garments/image/${garment.image_path}?size=thumb" class="garment-thumb" alt="${garment.name}">`
                 : `<div class="garment-thumb-placeholder"><i class="bi bi-image text-muted"></i></div>`;
 
             const canCancel = a.status === 'scheduled';
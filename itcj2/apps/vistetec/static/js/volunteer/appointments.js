@@ -88,7 +88,7 @@
             : '';
 
         const imageHtml = garment.image_path
-            ? `<img src="${API_BASE}/garments/image/${garment.image_path}" class="garment-mini" alt="">`
+            ? `<img src="${API_BASE}/garments/image/${garment.image_path}?size=thumb" class="garment-mini" alt="">`
             : `<div class="garment-mini-placeholder"><i class="bi bi-image text-muted"></i></div>`;
 
         const statusLabel = statusLabels[a.status] || a.status;
@@ -814,7 +814,7 @@
             document.getElementById('attendInfo').innerHTML = `
                 <div class="d-flex gap-3 align-items-center">
                     ${garment.image_path
-                    ? `<img src="${API_BASE}/garments/image/${garment.image_path}" class="garment-mini" alt="">`
+                    ? `<img src="${API_BASE}/garments/image/${garment.image_path}?size=thumb" class="garment-mini" alt="">`
                     : `<div class="garment-mini-placeholder"><i class="bi bi-image text-muted"></i></div>`}
                     <div>
                         <h6 class="fw-bold mb-1">${escapeHtml(garment.name || 'Prenda')}</h6>
@@ -1,6 +1,7 @@
 """
 Warehouse — Consume API (llamado por apps consumidoras)
 POST   /consume
+POST   /consume/batch
 GET    /ticket-materials/{source_app}/{source_ticket_id}
 DELETE /ticket-materials/{source_app}/{source_ticket_id}/{product_id}
 """
@@ -9,7 +10,7 @@ import logging
 from fastapi import APIRouter, HTTPException
 
 from itcj2.dependencies import DbSession, require_perms
-from itcj2.apps.warehouse.schemas.consume import ConsumeRequest
+from itcj2.apps.warehouse.schemas.consume import ConsumeBatchRequest, ConsumeRequest
 
 router = APIRouter(tags=["warehouse-consume"])
 logger = logging.getLogger(__name__)
@@ -57,6 +58,38 @@ def consume_material(
     }
 
 
+@router.post("/consume/batch", status_code=201)
+def consume_materials_batch(
+    body: ConsumeBatchRequest,
+    user: dict = require_perms("warehouse", ["warehouse.api.consume"]),
+    db: DbSession = None,
+):
+    """
+    Consume varios productos para un ticket en una sola transacción FIFO.
+    Si algún renglón no tiene stock no se consume ninguno.
+    """
+    from itcj2.apps.warehouse.services.fifo_service import ConsumeLine, consume_many
+
+    user_id = int(user["sub"])
+    try:
+        movements = consume_many(
+            db=db,
+            lines=[ConsumeLine(line.product_id, line.quantity, line.notes) for line in body.lines],
+            source_app=body.source_app,
+            source_ticket_id=body.source_ticket_id,
+            performed_by_id=user_id,
+        )
+        db.commit()
+    except ValueError as exc:
+        raise HTTPException(400, detail={"error": "insufficient_stock", "message": str(exc)})
+
+    return {
+        "message": "Materiales consumidos exitosamente",
+        "movements_count": len(movements),
+        "products_count": len({m.product_id for m in movements}),
+    }
+
+
 @router.get("/ticket-materials/{source_app}/{source_ticket_id}")
 def get_ticket_materials(
     source_app: str,
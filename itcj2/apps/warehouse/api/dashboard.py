@@ -27,7 +27,6 @@ def get_dashboard(
     from itcj2.apps.warehouse.models.movement import WarehouseMovement
     from itcj2.apps.warehouse.models.stock_entry import WarehouseStockEntry
     from itcj2.apps.warehouse.services.product_service import get_products_below_restock
-    from itcj2.apps.warehouse.services.utils import get_stock_totals
 
     department_code = resolve_dept_code(db, user, dept)
 
@@ -47,14 +46,10 @@ def get_dashboard(
         )
     total_categories = cat_q.count()
 
-    # Stock total y valor
-    all_products = product_q.all()
-    product_ids = [p.id for p in all_products]
-    stock_map = get_stock_totals(db, product_ids)
-
+    # Valor total del stock (totales materializados por producto)
     from decimal import Decimal
-    total_stock_value = sum(
-        stock_map.get(pid, {}).get("total_value", Decimal("0")) for pid in product_ids
+    total_stock_value = (
+        product_q.with_entities(func.sum(WarehouseProduct.stock_value)).scalar() or Decimal("0")
     )
 
     # Productos bajo restock
@@ -5,6 +5,7 @@ from .product import WarehouseProduct
 from .stock_entry import WarehouseStockEntry
 from .movement import WarehouseMovement, MOVEMENT_TYPES
 from .ticket_material import WarehouseTicketMaterial
+from .consumption_daily import WarehouseConsumptionDaily
 
 __all__ = [
     "WarehouseCategory",
@@ -14,4 +15,5 @@ __all__ = [
     "WarehouseMovement",
     "MOVEMENT_TYPES",
     "WarehouseTicketMaterial",
+    "WarehouseConsumptionDaily",
 ]
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer, Numeric
+from sqlalchemy.sql import text
+
+from itcj2.models.base import Base
+
+
+class WarehouseConsumptionDaily(Base):
+    """
+    Consumo neto por producto y día (CONSUMED + ADJUSTED_OUT − reversiones).
+
+    Lo mantiene restock_service.record_consumption en la misma transacción que
+    el consumo/ajuste/reversión; el punto de restock sale de la suma de los
+    últimos RESTOCK_WINDOW_DAYS días sin leer el historial de movimientos.
+    """
+
+    __tablename__ = "warehouse_consumption_daily"
+
+    product_id = Column(
+        Integer, ForeignKey("warehouse_products.id"), primary_key=True
+    )
+    day = Column(Date, primary_key=True)
+    quantity = Column(Numeric(12, 2), nullable=False, server_default=text("0"))
+
+    def __repr__(self) -> str:
+        return f"<WarehouseConsumptionDaily product={self.product_id} {self.day}: {self.quantity}>"
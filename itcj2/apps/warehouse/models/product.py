@@ -15,8 +15,9 @@ class WarehouseProduct(Base):
     Producto del almacén global.
 
     El código (WAR-001) se genera en el service al crear.
-    El total_stock y demás propiedades calculadas requieren que
-    la relación stock_entries esté cargada (usar eager loading en el service).
+    stock_on_hand/stock_value son los totales materializados de los lotes
+    disponibles (ver utils.apply_stock_delta). Las propiedades total_stock y
+    demás calculadas requieren que la relación stock_entries esté cargada.
     """
 
     __tablename__ = "warehouse_products"
@@ -33,6 +34,12 @@ class WarehouseProduct(Base):
     icon = Column(String(50), nullable=False, server_default=text("'bi-box'"))
     is_active = Column(Boolean, nullable=False, server_default=text("TRUE"))
 
+    # ── Stock materializado ──────────────────────────────────────────────────
+    # SUM(quantity_remaining) y SUM(quantity_remaining × unit_cost) de los
+    # lotes no anulados; se actualizan en la misma transacción que el lote.
+    stock_on_hand = Column(Numeric(12, 2), nullable=False, server_default=text("0"))
+    stock_value = Column(Numeric(18, 6), nullable=False, server_default=text("0"))
+
     # ── Restock ──────────────────────────────────────────────────────────────
     restock_point_auto = Column(
         Numeric(10, 2), nullable=False, server_default=text("0")
@@ -43,6 +50,9 @@ class WarehouseProduct(Base):
     )
     last_restock_calc_at = Column(DateTime, nullable=True)
     restock_alert_sent_at = Column(DateTime, nullable=True)
+    # Stock disponible <= punto de restock; lo mantiene restock_service.refresh
+    # (badge de navegación sin recalcular el catálogo)
+    below_restock = Column(Boolean, nullable=False, server_default=text("FALSE"))
 
     # ── Auditoría ─────────────────────────────────────────────────────────────
     created_by_id = Column(
@@ -66,6 +76,22 @@ class WarehouseProduct(Base):
         ),
         Index("ix_warehouse_products_dept_active", "department_code", "is_active"),
         Index("ix_warehouse_products_code", "code"),
+        Index(
+            "ix_warehouse_products_below_restock", "department_code",
+            postgresql_where=text("below_restock AND is_active"),
+        ),
+        # Autocomplete de materiales: prefijo de nombre o código con stock
+        Index(
+            "ix_warehouse_products_available_name", "department_code",
+            func.lower(name).label("lower_name"),
+            postgresql_ops={"lower_name": "text_pattern_ops"},
+            postgresql_where=text("is_active AND stock_on_hand > 0"),
+        ),
+        Index(
+            "ix_warehouse_products_available_code", "department_code", "code",
+            postgresql_ops={"code": "text_pattern_ops"},
+            postgresql_where=text("is_active AND stock_on_hand > 0"),
+        ),
     )
 
     # ── Propiedades calculadas (requieren stock_entries cargado) ──────────────
@@ -30,6 +30,16 @@ class MaterialUseRequest(BaseModel):
     notes: Optional[str] = None
 
 
+class ConsumeBatchRequest(BaseModel):
+    """
+    Consumo FIFO de varios productos para un ticket en una sola transacción
+    (todo o nada). Renglones repetidos del mismo producto se suman.
+    """
+    source_app: SourceApp
+    source_ticket_id: int
+    lines: list[MaterialUseRequest] = Field(min_length=1, max_length=100)
+
+
 class WarehouseTicketMaterialOut(BaseModel):
     id: int
     source_app: str
@@ -86,48 +86,20 @@ def check_and_alert(db: Session, product_id: int) -> bool:
 def get_nav_badge_count(db: Session, department_code: Optional[str]) -> int:
     """
     Cuenta de productos bajo el punto de restock para mostrar en el badge de navegación.
-    Query eficiente que evita cargar todos los productos.
+
+    Un solo COUNT sobre la bandera ``below_restock`` (índice parcial por
+    departamento), que mantiene `restock_service.refresh` en cada cambio de
+    stock, override o tiempo de entrega.
     """
     from itcj2.apps.warehouse.models.product import WarehouseProduct
-    from itcj2.apps.warehouse.models.stock_entry import WarehouseStockEntry
 
-    # Stock disponible por producto (solo activos y no anulados)
-    stock_subq = (
-        db.query(
-            WarehouseStockEntry.product_id,
-            func.sum(WarehouseStockEntry.quantity_remaining).label("total_stock"),
-        )
-        .filter(
-            WarehouseStockEntry.is_exhausted == False,
-            WarehouseStockEntry.voided == False,
-        )
-        .group_by(WarehouseStockEntry.product_id)
-        .subquery()
+    query = db.query(func.count(WarehouseProduct.id)).filter(
+        WarehouseProduct.is_active == True,  # noqa: E712
+        WarehouseProduct.below_restock == True,  # noqa: E712
     )
-
-    query = db.query(WarehouseProduct).outerjoin(
-        stock_subq, stock_subq.c.product_id == WarehouseProduct.id
-    ).filter(WarehouseProduct.is_active == True)
-
     if department_code:
         query = query.filter(WarehouseProduct.department_code == department_code)
-
-    products = query.all()
-
-    count = 0
-    for p in products:
-        restock_point = (
-            p.restock_point_override
-            if p.restock_point_override is not None
-            else p.restock_point_auto
-        )
-        # Para el badge solo nos importa si está bajo restock
-        stock_map = get_stock_totals(db, [p.id])
-        total_stock = stock_map.get(p.id, {}).get("total_stock", Decimal("0"))
-        if total_stock <= restock_point:
-            count += 1
-
-    return count
+    return query.scalar() or 0
 
 
 def _get_warehouse_admins_for_dept(db: Session, department_code: str) -> list[int]:
@@ -2,32 +2,74 @@
 Servicio FIFO del almacén global.
 
 Este es el contrato público para apps consumidoras (helpdesk, maint).
-No exponer detalles internos — solo consume(), revert_consumption() y adjust_stock().
+No exponer detalles internos — solo consume(), consume_many(),
+revert_consumption() y adjust_stock().
 
 Uso desde apps externas:
-    from itcj2.apps.warehouse.services.fifo_service import consume, revert_consumption
+    from itcj2.apps.warehouse.services.fifo_service import consume, consume_many, revert_consumption
+
+`consume_many` consume varios productos en un pase (un ticket cerrado con diez
+materiales):
+
+- bloquea los lotes de todos los productos en un solo ``SELECT ... FOR UPDATE``
+  ordenado por (product_id, purchase_date, id): dos consumos concurrentes
+  toman los candados en el mismo orden y no se bloquean mutuamente;
+- reparte cada producto con un ``UPDATE ... RETURNING`` cuya subconsulta usa
+  la suma acumulada (ventana sobre purchase_date) para saber cuánto toca a
+  cada lote — sin iterar lotes en Python;
+- inserta movimientos y hace upsert de WarehouseTicketMaterial en bloque;
+- descuenta cantidad y valor de los totales materializados del producto
+  (``stock_on_hand``/``stock_value``) en la misma transacción;
+- suma lo consumido al agregado diario (``warehouse_consumption_daily``) del
+  que sale el punto de restock;
+- la alerta de stock bajo y el recálculo del punto de restock se encolan tras
+  el commit (``warehouse_tasks.refresh_stock_signals``) en vez de correr
+  dentro de la transacción del consumo.
 """
 import logging
+from datetime import date, timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import NamedTuple, Optional, Sequence
 
 from fastapi import HTTPException
+from sqlalchemy import case, event, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from itcj2.apps.warehouse.models.movement import WarehouseMovement, MOVEMENT_TYPES
 from itcj2.apps.warehouse.models.stock_entry import WarehouseStockEntry
 from itcj2.apps.warehouse.models.ticket_material import WarehouseTicketMaterial
+from itcj2.apps.warehouse.services.utils import apply_stock_delta
 
 logger = logging.getLogger(__name__)
 
 _VALID_SOURCE_APPS = frozenset({"helpdesk", "maint"})
 
+# Productos cuyo stock cambió en la transacción (alerta/restock tras el commit)
+_SESSION_KEY = "warehouse_stock_signals"
+
+
+class ConsumeLine(NamedTuple):
+    """Renglón de consumo: producto, cantidad (> 0) y nota opcional."""
+    product_id: int
+    quantity: Decimal
+    notes: Optional[str] = None
+
 
 def _validate_source_app(source_app: str) -> None:
     if source_app not in _VALID_SOURCE_APPS:
         raise ValueError(f"source_app inválido: '{source_app}'. Debe ser 'helpdesk' o 'maint'.")
 
 
+def _available_filter():
+    E = WarehouseStockEntry
+    return (
+        E.is_exhausted == False,  # noqa: E712
+        E.voided == False,  # noqa: E712
+        E.quantity_remaining > 0,
+    )
+
+
 def consume(
     db: Session,
     product_id: int,
@@ -40,12 +82,7 @@ def consume(
     """
     Consume stock de un producto usando lógica FIFO.
 
-    Itera los lotes disponibles ordenados por purchase_date ASC,
-    desconta la cantidad solicitada distribuyendo entre lotes.
-
-    Hace upsert en WarehouseTicketMaterial para acumular el consumo por ticket.
-    Después del consumo dispara check_and_alert y recalcula el restock_point.
-
+    Atajo de `consume_many` para un solo producto (mismas garantías y errores).
     El caller debe hacer db.commit() al finalizar.
 
     Args:
@@ -64,108 +101,245 @@ def consume(
         ValueError: Si el stock es insuficiente o source_app inválido.
         HTTPException 404: Si el producto no existe.
     """
+    return consume_many(
+        db,
+        [ConsumeLine(product_id, quantity, notes)],
+        source_app=source_app,
+        source_ticket_id=source_ticket_id,
+        performed_by_id=performed_by_id,
+    )
+
+
+def consume_many(
+    db: Session,
+    lines: Sequence[ConsumeLine],
+    source_app: str,
+    source_ticket_id: int,
+    performed_by_id: int,
+) -> list[WarehouseMovement]:
+    """
+    Consume varios productos con lógica FIFO en un solo pase (todo o nada).
+
+    Renglones repetidos del mismo producto se suman. Los movimientos salen en
+    orden (producto, lote FIFO). La alerta de stock bajo y el recálculo del
+    restock se encolan cuando la sesión hace commit.
+
+    El caller debe hacer db.commit() al finalizar.
+
+    Raises:
+        ValueError: Si algún producto no tiene stock suficiente o source_app inválido.
+        HTTPException 404: Si algún producto no existe o está inactivo.
+    """
     _validate_source_app(source_app)
 
     from itcj2.apps.warehouse.models.product import WarehouseProduct
 
-    product = db.get(WarehouseProduct, product_id)
-    if not product or not product.is_active:
-        raise HTTPException(
-            404, detail={"error": "not_found", "message": f"Producto {product_id} no encontrado o inactivo"}
-        )
+    wanted: dict[int, Decimal] = {}
+    notes: dict[int, Optional[str]] = {}
+    for line in lines:
+        wanted[line.product_id] = wanted.get(line.product_id, Decimal("0")) + Decimal(line.quantity)
+        if line.notes and not notes.get(line.product_id):
+            notes[line.product_id] = line.notes
+    if not wanted:
+        return []
+    product_ids = sorted(wanted)
+
+    products = {
+        p.id: p
+        for p in db.query(WarehouseProduct).filter(WarehouseProduct.id.in_(product_ids)).all()
+    }
+    for product_id in product_ids:
+        product = products.get(product_id)
+        if not product or not product.is_active:
+            raise HTTPException(
+                404, detail={"error": "not_found", "message": f"Producto {product_id} no encontrado o inactivo"}
+            )
 
-    # ── Obtener lotes disponibles en orden FIFO ────────────────────────────
-    entries = (
-        db.query(WarehouseStockEntry)
-        .filter(
-            WarehouseStockEntry.product_id == product_id,
-            WarehouseStockEntry.is_exhausted == False,
-            WarehouseStockEntry.voided == False,
-            WarehouseStockEntry.quantity_remaining > 0,
-        )
-        .order_by(WarehouseStockEntry.purchase_date.asc())
+    # ── Bloqueo de lotes en orden determinista ─────────────────────────────
+    E = WarehouseStockEntry
+    locked = db.execute(
+        select(E.id, E.product_id, E.quantity_remaining, E.unit_cost)
+        .where(E.product_id.in_(product_ids), *_available_filter())
+        .order_by(E.product_id, E.purchase_date, E.id)
         .with_for_update()  # Lock para evitar race conditions en consumo concurrente
-        .all()
+    ).all()
+
+    before = {row.id: row.quantity_remaining for row in locked}
+    unit_cost = {row.id: row.unit_cost for row in locked}
+    available: dict[int, Decimal] = {}
+    for row in locked:
+        available[row.product_id] = available.get(row.product_id, Decimal("0")) + row.quantity_remaining
+
+    shortages = []
+    for product_id in product_ids:
+        product = products[product_id]
+        total_available = available.get(product_id, Decimal("0"))
+        if total_available < wanted[product_id]:
+            shortages.append(
+                f"Stock insuficiente para '{product.name}'. "
+                f"Disponible: {total_available} {product.unit_of_measure}, "
+                f"solicitado: {wanted[product_id]} {product.unit_of_measure}."
+            )
+    if shortages:
+        raise ValueError(" ".join(shortages))
+
+    # ── Reparto FIFO: un UPDATE ... RETURNING por producto ─────────────────
+    rows = []
+    for product_id in product_ids:
+        for entry_id, remaining in _allocate(db, product_id, wanted[product_id]):
+            rows.append({
+                "product_id": product_id,
+                "entry_id": entry_id,
+                "movement_type": "CONSUMED",
+                "quantity": before[entry_id] - remaining,
+                "source_app": source_app,
+                "source_ticket_id": source_ticket_id,
+                "performed_by_id": performed_by_id,
+                "notes": notes.get(product_id),
+            })
+    lock_order = {entry_id: i for i, entry_id in enumerate(before)}
+    rows.sort(key=lambda r: lock_order[r["entry_id"]])
+
+    movements = list(db.scalars(insert(WarehouseMovement).returning(WarehouseMovement), rows))
+
+    value = {product_id: Decimal("0") for product_id in product_ids}
+    for r in rows:
+        value[r["product_id"]] += r["quantity"] * unit_cost[r["entry_id"]]
+    apply_stock_delta(db, {product_id: (-wanted[product_id], -value[product_id]) for product_id in product_ids})
+
+    # ── Upsert WarehouseTicketMaterial ─────────────────────────────────────
+    tm = WarehouseTicketMaterial.__table__
+    stmt = pg_insert(tm).values([
+        {
+            "source_app": source_app,
+            "source_ticket_id": source_ticket_id,
+            "product_id": product_id,
+            "quantity_used": wanted[product_id],
+            "added_by_id": performed_by_id,
+            "notes": notes.get(product_id),
+        }
+        for product_id in product_ids
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[tm.c.source_app, tm.c.source_ticket_id, tm.c.product_id],
+        set_={"quantity_used": tm.c.quantity_used + stmt.excluded.quantity_used},
+    ))
+
+    # Mismo día que el movimiento (la reversión resta por performed_at)
+    from itcj2.apps.warehouse.services.restock_service import record_consumption
+    record_consumption(db, [(m.product_id, m.performed_at.date(), m.quantity) for m in movements])
+
+    # Lotes/materiales ya cargados en la sesión quedan viejos tras el SQL directo
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, (WarehouseStockEntry, WarehouseTicketMaterial)):
+            db.expire(obj)
+
+    _stage_signals(db, product_ids)
+
+    logger.info(
+        "FIFO consume: productos=%s lotes=%s app=%s ticket=%s por=%s",
+        {pid: str(qty) for pid, qty in wanted.items()}, len(movements),
+        source_app, source_ticket_id, performed_by_id,
     )
+    return movements
+
+
+def _allocate(db: Session, product_id: int, quantity: Decimal) -> list[tuple[int, Decimal]]:
+    """Descuenta `quantity` de los lotes del producto en orden FIFO.
 
-    total_available = sum(e.quantity_remaining for e in entries)
-    if total_available < quantity:
-        raise ValueError(
-            f"Stock insuficiente para '{product.name}'. "
-            f"Disponible: {total_available} {product.unit_of_measure}, "
-            f"solicitado: {quantity} {product.unit_of_measure}."
+    Para cada lote, ``antes`` = lo disponible en los lotes anteriores (suma
+    acumulada menos el propio); le toca ``min(restante, quantity - antes)``
+    acotado a 0. Devuelve (entry_id, quantity_remaining nuevo) de los lotes
+    tocados. Los lotes ya están bloqueados por `consume_many`.
+    """
+    E = WarehouseStockEntry
+    qty = literal(quantity, E.quantity_remaining.type)
+    prior = func.sum(E.quantity_remaining).over(order_by=(E.purchase_date, E.id)) - E.quantity_remaining
+    alloc = (
+        select(
+            E.id.label("entry_id"),
+            case(
+                (prior >= qty, 0),
+                (prior + E.quantity_remaining <= qty, E.quantity_remaining),
+                else_=qty - prior,
+            ).label("take"),
+        )
+        .where(E.product_id == product_id, *_available_filter())
+        .subquery("alloc")
+    )
+    return db.execute(
+        update(E)
+        .where(E.id == alloc.c.entry_id, alloc.c.take > 0)
+        .values(
+            quantity_remaining=E.quantity_remaining - alloc.c.take,
+            is_exhausted=E.quantity_remaining == alloc.c.take,
         )
+        .returning(E.id, E.quantity_remaining)
+        .execution_options(synchronize_session=False)
+    ).all()
 
-    # ── Consumo FIFO ───────────────────────────────────────────────────────
-    movements = []
-    remaining = quantity
 
-    for entry in entries:
-        if remaining <= 0:
-            break
+# ─────────────────────────────────────────────────────────────────────────────
+# Alertas y restock diferidos
+# ─────────────────────────────────────────────────────────────────────────────
 
-        to_consume = min(entry.quantity_remaining, remaining)
-        entry.quantity_remaining -= to_consume
-        remaining -= to_consume
+def _stage_signals(db: Session, product_ids) -> None:
+    pending = db.info.setdefault(_SESSION_KEY, set())
+    # Listeners permanentes, como en el outbox de correo (sesiones reutilizadas)
+    if not pending and not event.contains(db, "after_commit", _after_commit):
+        event.listen(db, "after_commit", _after_commit)
+        event.listen(db, "after_soft_rollback", _after_soft_rollback)
+    pending.update(product_ids)
 
-        if entry.quantity_remaining == 0:
-            entry.is_exhausted = True
 
-        movement = WarehouseMovement(
-            product_id=product_id,
-            entry_id=entry.id,
-            movement_type="CONSUMED",
-            quantity=to_consume,
-            source_app=source_app,
-            source_ticket_id=source_ticket_id,
-            performed_by_id=performed_by_id,
-            notes=notes,
+def _after_commit(session) -> None:
+    product_ids = session.info.pop(_SESSION_KEY, None)
+    if not product_ids:
+        return
+    try:
+        from itcj2.tasks.warehouse_tasks import refresh_stock_signals
+        refresh_stock_signals.apply_async(kwargs={"product_ids": sorted(product_ids)})
+    except Exception as e:
+        logger.warning(
+            "No se pudo encolar alerta/restock de productos %s (%s); queda para el recálculo programado",
+            sorted(product_ids), e,
         )
-        db.add(movement)
-        movements.append(movement)
 
-    # ── Upsert WarehouseTicketMaterial ─────────────────────────────────────
-    existing_tm = (
-        db.query(WarehouseTicketMaterial)
-        .filter_by(
-            source_app=source_app,
-            source_ticket_id=source_ticket_id,
-            product_id=product_id,
-        )
-        .first()
-    )
 
-    if existing_tm:
-        existing_tm.quantity_used += quantity
-    else:
-        db.add(
-            WarehouseTicketMaterial(
-                source_app=source_app,
-                source_ticket_id=source_ticket_id,
-                product_id=product_id,
-                quantity_used=quantity,
-                added_by_id=performed_by_id,
-                notes=notes,
-            )
-        )
+def _after_soft_rollback(session, previous_transaction) -> None:
+    # El rollback de un SAVEPOINT (p.ej. un renglón fallido en resolve_ticket)
+    # no descarta los productos de los renglones que sí se van a commitear.
+    if previous_transaction.nested:
+        return
+    session.info.pop(_SESSION_KEY, None)
 
-    db.flush()
 
-    # ── Post-consume: alertas y restock ───────────────────────────────────
-    try:
-        from itcj2.apps.warehouse.services.alert_service import check_and_alert
-        from itcj2.apps.warehouse.services.restock_service import calculate_restock_point
-        check_and_alert(db, product_id)
-        calculate_restock_point(db, product_id)
-    except Exception:
-        logger.exception("Error en post-consume triggers para producto %s", product_id)
-        # No propagar — el consumo ya ocurrió
+def refresh_stock_signals(db: Session, product_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Recálculo del punto de restock + alerta de stock bajo, con commit propio.
+
+    El recálculo es una sola sentencia sobre los agregados de consumo
+    (`restock_service.refresh`); la alerta solo corre para los productos que
+    quedaron bajo restock, con commit por producto para que un error no tire
+    los demás. Sin `product_ids` procesa todos los productos activos
+    (recálculo programado) y purga agregados viejos.
+    Devuelve el número de productos recalculados.
+    """
+    from itcj2.apps.warehouse.services import alert_service, restock_service
 
-    logger.info(
-        "FIFO consume: producto=%s qty=%s app=%s ticket=%s por=%s",
-        product_id, quantity, source_app, source_ticket_id, performed_by_id,
-    )
-    return movements
+    flags = restock_service.refresh(db, product_ids)
+    if product_ids is None:
+        restock_service.purge_old_consumption(db)
+    db.commit()
+
+    for product_id in sorted(pid for pid, below in flags.items() if below):
+        try:
+            alert_service.check_and_alert(db, product_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Error en alerta de stock bajo para producto %s", product_id)
+    return len(flags)
 
 
 def revert_consumption(
@@ -225,6 +399,7 @@ def revert_consumption(
         latest_entry.quantity_remaining += quantity_to_return
         if latest_entry.is_exhausted:
             latest_entry.is_exhausted = False
+        apply_stock_delta(db, {product_id: (quantity_to_return, quantity_to_return * latest_entry.unit_cost)})
 
         movement = WarehouseMovement(
             product_id=product_id,
@@ -238,6 +413,8 @@ def revert_consumption(
         )
         db.add(movement)
 
+    _unrecord_consumption(db, source_app, source_ticket_id, product_id, quantity_to_return)
+
     db.delete(ticket_material)
     db.flush()
 
@@ -254,6 +431,45 @@ def revert_consumption(
     return ticket_material
 
 
+def _unrecord_consumption(
+    db: Session,
+    source_app: str,
+    source_ticket_id: int,
+    product_id: int,
+    quantity: Decimal,
+) -> None:
+    """Resta `quantity` del agregado diario, en los días de los consumos del ticket.
+
+    Se descuenta de los movimientos CONSUMED más recientes hacia atrás (lo que
+    queda en el material es lo consumido desde la última reversión). Los días
+    fuera de la ventana de restock ya no cuentan y se dejan como están.
+    """
+    from itcj2.apps.warehouse.services.restock_service import RESTOCK_WINDOW_DAYS, record_consumption
+
+    M = WarehouseMovement
+    consumed = db.execute(
+        select(M.performed_at, M.quantity)
+        .where(
+            M.source_app == source_app,
+            M.source_ticket_id == source_ticket_id,
+            M.product_id == product_id,
+            M.movement_type == "CONSUMED",
+        )
+        .order_by(M.performed_at.desc(), M.id.desc())
+    ).all()
+
+    cutoff = date.today() - timedelta(days=RESTOCK_WINDOW_DAYS)
+    rows = []
+    remaining = quantity
+    for performed_at, qty in consumed:
+        if remaining <= 0 or performed_at.date() <= cutoff:
+            break
+        take = min(qty, remaining)
+        rows.append((product_id, performed_at.date(), -take))
+        remaining -= take
+    record_consumption(db, rows)
+
+
 def adjust_stock(
     db: Session,
     product_id: int,
@@ -288,7 +504,6 @@ def adjust_stock(
 
     if adjust_type == "IN":
         # Ajuste positivo: crear entrada de stock con fecha de hoy
-        from datetime import date
         from itcj2.apps.warehouse.models.stock_entry import WarehouseStockEntry
 
         entry = WarehouseStockEntry(
@@ -314,6 +529,7 @@ def adjust_stock(
         )
         db.add(movement)
         db.flush()
+        apply_stock_delta(db, {product_id: (quantity, Decimal("0"))})
 
     else:  # OUT — consume FIFO pero con tipo ADJUSTED_OUT
         entries = get_available_entries(db, product_id)
@@ -327,6 +543,7 @@ def adjust_stock(
             )
 
         remaining = quantity
+        value = Decimal("0")
         last_movement = None
 
         for entry in entries:
@@ -336,6 +553,7 @@ def adjust_stock(
             to_consume = min(entry.quantity_remaining, remaining)
             entry.quantity_remaining -= to_consume
             remaining -= to_consume
+            value += to_consume * entry.unit_cost
 
             if entry.quantity_remaining == 0:
                 entry.is_exhausted = True
@@ -352,6 +570,10 @@ def adjust_stock(
 
         db.flush()
         movement = last_movement
+        apply_stock_delta(db, {product_id: (-quantity, -value)})
+
+        from itcj2.apps.warehouse.services.restock_service import record_consumption
+        record_consumption(db, [(product_id, date.today(), quantity)])
 
     try:
         from itcj2.apps.warehouse.services.alert_service import check_and_alert
@@ -10,22 +10,18 @@ from sqlalchemy.orm import Session
 
 from itcj2.apps.warehouse.models.product import WarehouseProduct
 from itcj2.apps.warehouse.models.stock_entry import WarehouseStockEntry
-from itcj2.apps.warehouse.services.utils import enrich_product, get_stock_totals
+from itcj2.apps.warehouse.services import restock_service
+from itcj2.apps.warehouse.services.utils import enrich_product
+from itcj2.core.services import sequence_service
 
 logger = logging.getLogger(__name__)
 
+_PRODUCT_CODE = sequence_service.Sequence("warehouse.product_code", "WAR-{n:03d}", WarehouseProduct.code)
 
-def _next_product_code(db: Session) -> str:
-    """Genera el siguiente código WAR-XXX, garantizando unicidad."""
-    count = db.query(func.count(WarehouseProduct.id)).scalar() or 0
-    candidate = f"WAR-{count + 1:03d}"
-
-    # Asegurar unicidad por si hay saltos en IDs
-    while db.query(WarehouseProduct).filter_by(code=candidate).first():
-        count += 1
-        candidate = f"WAR-{count + 1:03d}"
 
-    return candidate
+def _next_product_code(db: Session) -> str:
+    """Genera el siguiente código WAR-XXX (contador global, ver sequence_service)."""
+    return sequence_service.next_number(db, _PRODUCT_CODE)
 
 
 # ── Consultas ─────────────────────────────────────────────────────────────────
@@ -37,7 +33,7 @@ def list_products(
     search: Optional[str] = None,
     subcategory_id: Optional[int] = None,
 ) -> list[dict]:
-    """Lista productos enriquecidos con datos de stock calculados en SQL."""
+    """Lista productos enriquecidos con su stock materializado."""
     query = db.query(WarehouseProduct)
 
     if department_code is not None:
@@ -56,9 +52,7 @@ def list_products(
         query = query.filter(WarehouseProduct.subcategory_id == subcategory_id)
 
     products = query.order_by(WarehouseProduct.name).all()
-    stock_map = get_stock_totals(db, [p.id for p in products])
-
-    return [enrich_product(p, stock_map) for p in products]
+    return [enrich_product(p) for p in products]
 
 
 def get_product(db: Session, product_id: int) -> WarehouseProduct:
@@ -69,9 +63,13 @@ def get_product(db: Session, product_id: int) -> WarehouseProduct:
 
 
 def get_product_with_stock(db: Session, product_id: int) -> dict:
-    product = get_product(db, product_id)
-    stock_map = get_stock_totals(db, [product_id])
-    return enrich_product(product, stock_map)
+    return enrich_product(get_product(db, product_id))
+
+
+def _prefix_pattern(term: str) -> str:
+    """Patrón LIKE de prefijo con los comodines del término escapados."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
 
 
 def get_available_for_autocomplete(
@@ -83,38 +81,37 @@ def get_available_for_autocomplete(
     """
     Retorna productos con stock > 0 para el autocomplete en tickets.
     Filtrado por dept automáticamente.
+
+    Una sola consulta por prefijo de nombre (sin distinguir mayúsculas) o de
+    código sobre el stock materializado; la cubren los índices parciales
+    ``ix_warehouse_products_available_*`` (``text_pattern_ops``).
     """
-    query = db.query(WarehouseProduct).filter(WarehouseProduct.is_active == True)
+    P = WarehouseProduct
+    query = db.query(
+        P.id, P.code, P.name, P.unit_of_measure, P.stock_on_hand, P.department_code,
+    ).filter(P.is_active == True, P.stock_on_hand > 0)  # noqa: E712
 
     if department_code is not None:
-        query = query.filter(WarehouseProduct.department_code == department_code)
+        query = query.filter(P.department_code == department_code)
 
-    if search:
-        term = f"%{search.strip()}%"
+    term = search.strip() if search else ""
+    if term:
         query = query.filter(
-            WarehouseProduct.name.ilike(term) | WarehouseProduct.code.ilike(term)
+            func.lower(P.name).like(_prefix_pattern(term.lower()), escape="\\")
+            | P.code.like(_prefix_pattern(term.upper()), escape="\\")
         )
 
-    products = query.order_by(WarehouseProduct.name).limit(limit * 3).all()  # 3x para filtrar con stock
-    stock_map = get_stock_totals(db, [p.id for p in products])
-
-    result = []
-    for p in products:
-        stock_info = stock_map.get(p.id, {"total_stock": Decimal("0"), "total_value": Decimal("0")})
-        total_stock = stock_info["total_stock"]
-        if total_stock > 0:
-            result.append({
-                "id": p.id,
-                "code": p.code,
-                "name": p.name,
-                "unit_of_measure": p.unit_of_measure,
-                "total_stock": total_stock,
-                "department_code": p.department_code,
-            })
-        if len(result) >= limit:
-            break
-
-    return result
+    return [
+        {
+            "id": row.id,
+            "code": row.code,
+            "name": row.name,
+            "unit_of_measure": row.unit_of_measure,
+            "total_stock": row.stock_on_hand,
+            "department_code": row.department_code,
+        }
+        for row in query.order_by(P.name).limit(limit)
+    ]
 
 
 def get_products_below_restock(
@@ -151,6 +148,8 @@ def create_product(db: Session, data, created_by_id: int) -> WarehouseProduct:
     )
     db.add(product)
     db.flush()
+    # Sin stock ni consumo arranca bajo restock (0 <= 0)
+    restock_service.refresh(db, [product.id])
     logger.info("Producto '%s' (%s) creado por usuario %s", product.name, product.code, created_by_id)
     return product
 
@@ -179,6 +178,8 @@ def update_product(db: Session, product_id: int, data) -> WarehouseProduct:
 
     product.updated_at = datetime.now()
     db.flush()
+    if data.restock_lead_time_days is not None:
+        restock_service.refresh(db, [product.id])
     return product
 
 
@@ -198,4 +199,5 @@ def set_restock_override(
     product.restock_point_override = override_value
     product.updated_at = datetime.now()
     db.flush()
+    restock_service.refresh(db, [product.id])
     return product
@@ -1,61 +1,144 @@
-"""Cálculo del punto de restock automático (rolling 90 días)."""
+"""Cálculo del punto de restock automático (rolling 90 días).
+
+El consumo se lleva incrementalmente en ``warehouse_consumption_daily`` (una
+fila por producto y día): `record_consumption` lo suman consumo y ajuste, y
+lo restan las reversiones. `refresh` recalcula el punto de restock y la
+bandera ``below_restock`` de los productos pedidos (o del catálogo completo)
+en un solo ``UPDATE ... FROM`` sobre esos agregados y el stock materializado
+del producto, sin leer el historial de movimientos ni iterar productos en Python.
+"""
 import logging
-import math
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import Iterable, Optional, Sequence
 
-from sqlalchemy import func
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+RESTOCK_WINDOW_DAYS = 90
+# Días extra de cobertura sobre el tiempo de entrega del proveedor
+SAFETY_DAYS = 3
+# Filas de agregado que se conservan más allá de la ventana (reversiones tardías)
+_RETENTION_DAYS = RESTOCK_WINDOW_DAYS + 30
 
-def calculate_restock_point(db: Session, product_id: int) -> None:
-    """
-    Recalcula el punto de restock automático para un producto.
-
-    Fórmula:
-        avg_daily = SUM(quantity consumida en 90 días) / 90
-        restock_auto = ceil(avg_daily × (lead_time_days + 3))
-        - Mínimo 1 si hay consumo; 0 si no hay consumo en 90 días.
 
-    Actualiza product.restock_point_auto y product.last_restock_calc_at.
-    No hace commit — el caller debe hacerlo.
+def record_consumption(db: Session, rows: Iterable[tuple[int, date, Decimal]]) -> None:
+    """
+    Suma (product_id, día, cantidad) al agregado diario; cantidades negativas restan.
+    No hace commit — va en la transacción del movimiento.
     """
-    from itcj2.apps.warehouse.models.product import WarehouseProduct
-    from itcj2.apps.warehouse.models.movement import WarehouseMovement
+    from itcj2.apps.warehouse.models.consumption_daily import WarehouseConsumptionDaily
 
-    product = db.get(WarehouseProduct, product_id)
-    if not product:
+    merged: dict[tuple[int, date], Decimal] = {}
+    for product_id, day, quantity in rows:
+        merged[(product_id, day)] = merged.get((product_id, day), Decimal("0")) + quantity
+    if not merged:
         return
 
-    ninety_days_ago = datetime.now() - timedelta(days=90)
+    table = WarehouseConsumptionDaily.__table__
+    stmt = pg_insert(table).values([
+        {"product_id": product_id, "day": day, "quantity": quantity}
+        for (product_id, day), quantity in sorted(merged.items())
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.product_id, table.c.day],
+        set_={"quantity": table.c.quantity + stmt.excluded.quantity},
+    ))
+
+
+def refresh(
+    db: Session,
+    product_ids: Optional[Sequence[int]] = None,
+    department_code: Optional[str] = None,
+) -> dict[int, bool]:
+    """
+    Recalcula restock_point_auto y below_restock en una sola sentencia.
 
-    total_consumed = (
-        db.query(func.sum(WarehouseMovement.quantity))
-        .filter(
-            WarehouseMovement.product_id == product_id,
-            WarehouseMovement.movement_type.in_(["CONSUMED", "ADJUSTED_OUT"]),
-            WarehouseMovement.performed_at >= ninety_days_ago,
+    Fórmula:
+        consumo = SUM(consumo diario de los últimos 90 días, hoy incluido)
+        restock_auto = max(1, ceil(consumo × (lead_time_days + 3) / 90)); 0 sin consumo.
+        below_restock = stock_on_hand <= COALESCE(override, restock_auto)
+
+    Sin `product_ids` procesa los productos activos (del departamento, si se
+    indica). Devuelve {product_id: below_restock}. No hace commit.
+    """
+    from itcj2.apps.warehouse.models.consumption_daily import WarehouseConsumptionDaily as D
+    from itcj2.apps.warehouse.models.product import WarehouseProduct as P
+
+    if product_ids is not None and not product_ids:
+        return {}
+
+    cutoff = date.today() - timedelta(days=RESTOCK_WINDOW_DAYS)
+    consumed = (
+        select(D.product_id, func.sum(D.quantity).label("qty"))
+        .where(D.day > cutoff)
+        .group_by(D.product_id)
+        .subquery("consumed")
+    )
+    src = (
+        select(
+            P.id.label("product_id"),
+            func.coalesce(consumed.c.qty, 0).label("consumed"),
         )
-        .scalar()
-        or Decimal("0")
+        .outerjoin(consumed, consumed.c.product_id == P.id)
     )
-
-    if total_consumed > 0:
-        avg_daily = float(total_consumed) / 90.0
-        restock_auto = math.ceil(avg_daily * (product.restock_lead_time_days + 3))
-        restock_auto = max(1, restock_auto)
+    if product_ids is not None:
+        src = src.where(P.id.in_(product_ids))
     else:
-        restock_auto = 0
+        src = src.where(P.is_active == True)  # noqa: E712
+    if department_code:
+        src = src.where(P.department_code == department_code)
+    src = src.subquery("src")
+
+    needed = src.c.consumed * (P.restock_lead_time_days + SAFETY_DAYS) / RESTOCK_WINDOW_DAYS
+    auto = case(
+        (src.c.consumed <= 0, 0),
+        (needed <= 1, 1),
+        else_=func.ceil(needed),
+    )
+    rows = db.execute(
+        update(P)
+        .where(P.id == src.c.product_id)
+        .values(
+            restock_point_auto=auto,
+            below_restock=P.stock_on_hand <= func.coalesce(P.restock_point_override, auto),
+            last_restock_calc_at=datetime.now(),
+        )
+        .returning(P.id, P.below_restock)
+        .execution_options(synchronize_session=False)
+    ).all()
 
-    product.restock_point_auto = Decimal(str(restock_auto))
-    product.last_restock_calc_at = datetime.now()
+    # Productos ya cargados en la sesión quedan viejos tras el SQL directo
+    refreshed = {product_id: bool(below) for product_id, below in rows}
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, P) and obj.id in refreshed:
+            db.expire(obj)
 
-    logger.debug(
-        "Restock recalculado: producto=%s consumido_90d=%s auto=%s",
-        product_id, total_consumed, restock_auto,
+    logger.debug("Restock recalculado: %s productos (%s bajo restock)",
+                 len(refreshed), sum(refreshed.values()))
+    return refreshed
+
+
+def calculate_restock_point(db: Session, product_id: int) -> None:
+    """
+    Recalcula el punto de restock automático (y below_restock) de un producto.
+    No hace commit — el caller debe hacerlo.
+    """
+    refresh(db, [product_id])
+
+
+def purge_old_consumption(db: Session) -> int:
+    """Borra agregados diarios fuera de la ventana de retención. No hace commit."""
+    from itcj2.apps.warehouse.models.consumption_daily import WarehouseConsumptionDaily
+
+    cutoff = date.today() - timedelta(days=_RETENTION_DAYS)
+    return (
+        db.query(WarehouseConsumptionDaily)
+        .filter(WarehouseConsumptionDaily.day < cutoff)
+        .delete(synchronize_session=False)
     )
 
 
@@ -67,22 +150,9 @@ def recalculate_all(db: Session, department_code: Optional[str] = None) -> int:
     Returns:
         Número de productos procesados.
     """
-    from itcj2.apps.warehouse.models.product import WarehouseProduct
-
-    query = db.query(WarehouseProduct).filter(WarehouseProduct.is_active == True)
-    if department_code:
-        query = query.filter(WarehouseProduct.department_code == department_code)
-
-    products = query.all()
-    count = 0
-
-    for product in products:
-        try:
-            calculate_restock_point(db, product.id)
-            count += 1
-        except Exception:
-            logger.exception("Error calculando restock para producto %s", product.id)
-
+    count = len(refresh(db, department_code=department_code))
+    if department_code is None:
+        purge_old_consumption(db)
     db.commit()
     logger.info("Recalculo masivo de restock: %s productos procesados (dept=%s)", count, department_code)
     return count
@@ -8,6 +8,8 @@ from sqlalchemy.orm import Session
 
 from itcj2.apps.warehouse.models.movement import WarehouseMovement
 from itcj2.apps.warehouse.models.stock_entry import WarehouseStockEntry
+from itcj2.apps.warehouse.services import restock_service
+from itcj2.apps.warehouse.services.utils import apply_stock_delta
 from itcj2.models.base import paginate
 
 logger = logging.getLogger(__name__)
@@ -103,6 +105,8 @@ def register_entry(db: Session, data, registered_by_id: int) -> WarehouseStockEn
     )
     db.add(movement)
     db.flush()
+    apply_stock_delta(db, {data.product_id: (entry.quantity_remaining, entry.quantity_remaining * entry.unit_cost)})
+    restock_service.refresh(db, [data.product_id])
 
     logger.info(
         "Entrada de stock registrada: producto=%s cantidad=%s folio=%s por usuario=%s",
@@ -152,6 +156,65 @@ def void_entry(
     )
     db.add(movement)
     db.flush()
+    apply_stock_delta(db, {entry.product_id: (-entry.quantity_remaining, -entry.quantity_remaining * entry.unit_cost)})
+    restock_service.refresh(db, [entry.product_id])
 
     logger.info("Entrada %s anulada por usuario %s", entry_id, voided_by_id)
     return entry
+
+
+def check_stock_totals(db: Session, fix: bool = False) -> list[dict]:
+    """
+    Compara stock_on_hand/stock_value de cada producto contra la suma de sus
+    lotes no anulados (una sola consulta agregada).
+
+    Con `fix=True` corrige los productos descuadrados (y su bandera de
+    restock) y hace commit. Devuelve los descuadres encontrados.
+    """
+    from sqlalchemy import func, select, update
+    from itcj2.apps.warehouse.models.product import WarehouseProduct as P
+
+    E = WarehouseStockEntry
+    lots = (
+        select(
+            E.product_id,
+            func.sum(E.quantity_remaining).label("qty"),
+            func.sum(E.quantity_remaining * E.unit_cost).label("value"),
+        )
+        .where(E.voided == False)  # noqa: E712
+        .group_by(E.product_id)
+        .subquery("lots")
+    )
+    expected_qty = func.coalesce(lots.c.qty, 0)
+    expected_value = func.coalesce(lots.c.value, 0)
+    rows = db.execute(
+        select(P.id, P.code, P.stock_on_hand, P.stock_value,
+               expected_qty.label("expected_stock"), expected_value.label("expected_value"))
+        .outerjoin(lots, lots.c.product_id == P.id)
+        .where((P.stock_on_hand != expected_qty) | (P.stock_value != expected_value))
+        .order_by(P.id)
+    ).all()
+
+    drift = [
+        {
+            "product_id": row.id,
+            "code": row.code,
+            "stock_on_hand": row.stock_on_hand,
+            "expected_stock": row.expected_stock,
+            "stock_value": row.stock_value,
+            "expected_value": row.expected_value,
+        }
+        for row in rows
+    ]
+    if fix and drift:
+        for item in drift:
+            db.execute(
+                update(P)
+                .where(P.id == item["product_id"])
+                .values(stock_on_hand=item["expected_stock"], stock_value=item["expected_value"])
+                .execution_options(synchronize_session=False)
+            )
+        restock_service.refresh(db, [item["product_id"] for item in drift])
+        db.commit()
+        logger.warning("Totales de stock corregidos en %s productos", len(drift))
+    return drift
@@ -49,47 +49,73 @@ def resolve_dept_code(db: Session, user: dict, dept_override: Optional[str] = No
 
 def get_stock_totals(db: Session, product_ids: list[int]) -> dict:
     """
-    Calcula stock disponible y valor total por producto en una sola query.
+    Stock disponible y valor total por producto, leídos de los totales
+    materializados en warehouse_products (sin sumar lotes).
     Retorna dict[product_id → {total_stock, total_value}].
     """
     if not product_ids:
         return {}
 
-    from sqlalchemy import func
-    from itcj2.apps.warehouse.models.stock_entry import WarehouseStockEntry
+    from itcj2.apps.warehouse.models.product import WarehouseProduct
 
     rows = (
-        db.query(
-            WarehouseStockEntry.product_id,
-            func.sum(WarehouseStockEntry.quantity_remaining).label("total_stock"),
-            func.sum(
-                WarehouseStockEntry.quantity_remaining * WarehouseStockEntry.unit_cost
-            ).label("total_value"),
-        )
-        .filter(
-            WarehouseStockEntry.product_id.in_(product_ids),
-            WarehouseStockEntry.is_exhausted == False,
-            WarehouseStockEntry.voided == False,
-        )
-        .group_by(WarehouseStockEntry.product_id)
+        db.query(WarehouseProduct.id, WarehouseProduct.stock_on_hand, WarehouseProduct.stock_value)
+        .filter(WarehouseProduct.id.in_(product_ids))
         .all()
     )
 
     return {
-        row.product_id: {
-            "total_stock": row.total_stock or Decimal("0"),
-            "total_value": row.total_value or Decimal("0"),
+        row.id: {
+            "total_stock": row.stock_on_hand or Decimal("0"),
+            "total_value": row.stock_value or Decimal("0"),
         }
         for row in rows
     }
 
 
-def enrich_product(product, stock_map: dict) -> dict:
+def apply_stock_delta(db: Session, deltas: dict[int, tuple[Decimal, Decimal]]) -> None:
+    """
+    Suma {product_id: (cantidad, valor)} a los totales materializados.
+
+    ``SET stock_on_hand = stock_on_hand + :delta`` (sin leer antes), en la
+    transacción del movimiento: dos operaciones concurrentes no se pisan.
+    No hace commit.
+    """
+    if not deltas:
+        return
+
+    from sqlalchemy import bindparam, update
+    from itcj2.apps.warehouse.models.product import WarehouseProduct
+
+    t = WarehouseProduct.__table__
+    db.execute(
+        update(t)
+        .where(t.c.id == bindparam("pid"))
+        .values(
+            stock_on_hand=t.c.stock_on_hand + bindparam("d_qty", type_=t.c.stock_on_hand.type),
+            stock_value=t.c.stock_value + bindparam("d_value", type_=t.c.stock_value.type),
+        ),
+        [
+            {"pid": pid, "d_qty": qty, "d_value": value}
+            for pid, (qty, value) in sorted(deltas.items())
+        ],
+    )
+    # Productos ya cargados en la sesión quedan viejos tras el SQL directo
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, WarehouseProduct) and obj.id in deltas:
+            db.expire(obj, ["stock_on_hand", "stock_value"])
+
+
+def enrich_product(product, stock_map: Optional[dict] = None) -> dict:
     """
     Convierte un WarehouseProduct en dict con campos de stock calculados.
     Usado por product_service para devolver WarehouseProductWithStockOut.
+    Sin `stock_map` toma los totales materializados del propio producto.
     """
-    stock = stock_map.get(product.id, {"total_stock": Decimal("0"), "total_value": Decimal("0")})
+    if stock_map is None:
+        stock = {"total_stock": product.stock_on_hand, "total_value": product.stock_value}
+    else:
+        stock = stock_map.get(product.id, {"total_stock": Decimal("0"), "total_value": Decimal("0")})
     total_stock = stock["total_stock"]
     restock_point = (
         product.restock_point_override
@@ -25,6 +25,11 @@ def create_celery_app() -> Celery:
             "itcj2.tasks.helpdesk_tasks",
             "itcj2.tasks.notification_tasks",
             "itcj2.tasks.mundial_tasks",
+            "itcj2.tasks.agendatec_tasks",
+            "itcj2.tasks.media_tasks",
+            "itcj2.tasks.email_tasks",
+            "itcj2.tasks.maint_tasks",
+            "itcj2.tasks.warehouse_tasks",
         ],
     )
 
@@ -48,10 +53,15 @@ def create_celery_app() -> Celery:
             "default": {"exchange": "default", "routing_key": "default"},
             "reports": {"exchange": "reports", "routing_key": "reports"},
             "notifications": {"exchange": "notifications", "routing_key": "notifications"},
+            "media": {"exchange": "media", "routing_key": "media"},
+            "email": {"exchange": "email", "routing_key": "email"},
         },
         task_routes={
             "itcj2.tasks.helpdesk_tasks.export_inventory_report": {"queue": "reports"},
+            "itcj2.tasks.agendatec_tasks.export_requests_report": {"queue": "reports"},
             "itcj2.tasks.notification_tasks.send_mass_notification": {"queue": "notifications"},
+            "itcj2.tasks.media_tasks.process_media": {"queue": "media"},
+            "itcj2.tasks.email_tasks.drain_email_outbox": {"queue": "email"},
         },
     )
 
@@ -23,35 +23,19 @@ def sync_tasks():
     """Sincroniza las TaskDefinition del código con la base de datos.
 
     Lee los metadatos TASK_DEFINITIONS de cada módulo de tareas y los
-    inserta/actualiza en la tabla core_task_definitions.
+    inserta/actualiza en la tabla core_task_definitions. Además crea los
+    schedules por defecto de PERIODIC_TASKS que aún no existan (por nombre);
+    los existentes no se tocan para respetar lo editado/pausado en la UI.
     """
     from itcj2.database import SessionLocal
-    from itcj2.core.models.task_models import TaskDefinition
-
-    # Importar módulos de tareas para acceder a sus TASK_DEFINITIONS
-    task_modules = []
-    try:
-        from itcj2.tasks import helpdesk_tasks
-        task_modules.append(helpdesk_tasks)
-    except ImportError as e:
-        click.echo(f"  Advertencia: no se pudo importar helpdesk_tasks: {e}", err=True)
-
-    try:
-        from itcj2.tasks import notification_tasks
-        task_modules.append(notification_tasks)
-    except ImportError:
-        pass  # Aún no implementado en fase 1
-
-    try:
-        from itcj2.tasks import mundial_tasks
-        task_modules.append(mundial_tasks)
-    except ImportError:
-        pass
+    from itcj2.core.models.task_models import PeriodicTask, TaskDefinition
+    from itcj2.tasks import load_task_modules
 
     all_definitions = []
-    for module in task_modules:
-        defs = getattr(module, "TASK_DEFINITIONS", [])
-        all_definitions.extend(defs)
+    all_periodic = []
+    for module in load_task_modules():
+        all_definitions.extend(getattr(module, "TASK_DEFINITIONS", []))
+        all_periodic.extend(getattr(module, "PERIODIC_TASKS", []))
 
     if not all_definitions:
         click.echo("No se encontraron definiciones de tareas.")
@@ -71,7 +55,20 @@ def sync_tasks():
                 created += 1
         db.commit()
 
-    click.echo(f"sync-tasks completado: {created} creadas, {updated} actualizadas.")
+        scheduled = 0
+        for spec in all_periodic:
+            if db.query(PeriodicTask).filter_by(name=spec["name"]).first():
+                continue
+            pt = PeriodicTask(**spec)
+            pt.next_run_at = pt.compute_next_run()
+            db.add(pt)
+            scheduled += 1
+        db.commit()
+
+    click.echo(
+        f"sync-tasks completado: {created} creadas, {updated} actualizadas, "
+        f"{scheduled} schedules nuevos."
+    )
 
 
 @celery_cli.command("run")
@@ -703,6 +703,86 @@ def mundial_refresh_command(hard: bool):
     click.echo("\n🎉 Cache refrescado.")
 
 
+@click.command("reshard-storage")
+@click.option("--dry-run", is_flag=True, default=False,
+              help="Solo cuenta lo que se movería; no toca archivos ni BD.")
+@click.option("--batch-size", default=200, show_default=True,
+              help="Filas por lote (un UPDATE y un commit por lote).")
+def reshard_storage_command(dry_run: bool, batch_size: int):
+    """Mueve los uploads existentes al layout con shards (o a S3 si STORAGE_BACKEND=s3).
+
+    Se puede correr con el sistema en línea: cada lote copia, actualiza rutas,
+    hace commit y solo después borra los originales. Idempotente.
+    """
+    from itcj2.core.services import storage_reshard
+
+    click.echo(f"📦 Reubicando uploads ({'dry-run' if dry_run else 'en línea'})...")
+    db = _get_session()
+    try:
+        results = storage_reshard.reshard(
+            db, dry_run=dry_run, batch=batch_size, echo=lambda m: click.echo(f"   🔄 {m}"))
+    finally:
+        db.close()
+
+    for name, stats in results.items():
+        verb = "por mover" if dry_run else "movidos"
+        click.echo(f"\n   {name}: {stats.moved} {verb}, {stats.skipped} ya en su lugar, "
+                   f"{stats.missing} sin archivo")
+        for line in stats.conflicts:
+            click.echo(f"      ⚠️  destino ocupado: {line}")
+        for line in stats.errors:
+            click.echo(f"      ❌ {line}")
+
+    click.echo("\n🎉 Reubicación terminada.")
+
+
+@click.command("closures")
+@click.option("--add", "add_name", default=None, metavar="NOMBRE",
+              help="Dar de alta el rango como inhábil con este nombre.")
+@click.option("--remove", is_flag=True, default=False, help="Quitar los días inhábiles del rango.")
+@click.option("--from", "first", default=None, metavar="AAAA-MM-DD", help="Primer día del rango.")
+@click.option("--to", "last", default=None, metavar="AAAA-MM-DD",
+              help="Último día del rango (default: igual a --from).")
+def closures_command(add_name: str | None, remove: bool, first: str | None, last: str | None):
+    """Lista o edita el calendario de días inhábiles (horas hábiles del SLA y estadísticas).
+
+    Sin opciones lista los días registrados desde hoy.
+    """
+    from datetime import date
+
+    from itcj2.core.models.business_closure import BusinessClosure
+    from itcj2.core.services import business_time
+
+    db = _get_session()
+    try:
+        if add_name or remove:
+            if not first:
+                raise click.UsageError("--from es obligatorio con --add/--remove")
+            start = date.fromisoformat(first)
+            end = date.fromisoformat(last) if last else start
+            if add_name:
+                count = business_time.add_closures(db, start, end, add_name)
+                click.echo(f"✅ {count} día(s) inhábil(es) agregados ({start} → {end}).")
+            else:
+                count = business_time.remove_closures(db, start, end)
+                click.echo(f"🗑️  {count} día(s) inhábil(es) eliminados ({start} → {end}).")
+            return
+
+        since = date.fromisoformat(first) if first else date.today()
+        rows = (
+            db.query(BusinessClosure)
+            .filter(BusinessClosure.day >= since)
+            .order_by(BusinessClosure.day)
+            .all()
+        )
+        if not rows:
+            click.echo(f"Sin días inhábiles registrados desde {since}.")
+        for row in rows:
+            click.echo(f"   {row.day.isoformat()}  {row.name}")
+    finally:
+        db.close()
+
+
 @click.group("core")
 def core_cli():
     """Comandos CLI del módulo core."""
@@ -719,3 +799,5 @@ core_cli.add_command(init_config_2026_07_command)
 core_cli.add_command(fix_org_scope_2026_08_command)
 core_cli.add_command(new_theme_mundial_command)
 core_cli.add_command(mundial_refresh_command)
+core_cli.add_command(reshard_storage_command)
+core_cli.add_command(closures_command)
@@ -5,6 +5,7 @@ Comandos CLI de Mantenimiento para itcj2.
 Comandos:
     maint init-maint    Registra la app, permisos, roles y categorías base.
     maint seed-config   Carga SQLs de configuración desde database/DML/maint/config/*.sql.
+    maint backfill-locations  Liga los tickets existentes a la dimensión maint_locations.
 """
 from pathlib import Path
 
@@ -159,3 +160,32 @@ def init_maint_command():
     except Exception as e:
         click.echo(f"\n💥 Error durante la inicialización: {e}")
         raise
+
+
+@maint_cli.command("backfill-locations")
+@click.option("--batch-size", default=5000, show_default=True, help="Tickets por UPDATE.")
+def backfill_locations_command(batch_size: int):
+    """Liga los tickets con ubicación a la dimensión maint_locations.
+
+    Crea las ubicaciones distintas que falten, re-parsea edificio/salón de
+    toda la dimensión (útil si cambian las reglas de location_parser) y llena
+    maint_tickets.location_id por lotes. Idempotente: solo toca tickets con
+    location_id NULL.
+    """
+    from itcj2.apps.maint.services import location_service
+    from itcj2.database import SessionLocal
+
+    click.echo("📍 Ligando ubicaciones de tickets de Mantenimiento...")
+    db = SessionLocal()
+    try:
+        stats = location_service.backfill(db, batch_size=batch_size)
+        click.echo(f"   Ubicaciones nuevas:       {stats['created']}")
+        click.echo(f"   Ubicaciones re-parseadas: {stats['reparsed']}")
+        click.echo(f"   Tickets ligados:          {stats['linked']}")
+        click.echo("🎉 backfill-locations completado.")
+    except Exception as e:
+        db.rollback()
+        click.echo(f"\n💥 Error durante backfill-locations: {e}")
+        raise
+    finally:
+        db.close()
@@ -6,6 +6,7 @@ Comandos:
     warehouse init-warehouse       Registra la app y carga los permisos base.
     warehouse warehouse-helpdesk   Asigna permisos a roles de Helpdesk.
     warehouse warehouse-maint      Asigna permisos a roles de Mantenimiento.
+    warehouse check-stock          Verifica los totales de stock materializados.
 """
 from pathlib import Path
 
@@ -93,3 +94,40 @@ def warehouse_maint_command():
     except Exception as e:
         click.echo(f"\n💥 Error durante la asignación: {e}")
         raise
+
+
+@warehouse_cli.command("check-stock")
+@click.option("--fix", is_flag=True, help="Corrige los productos descuadrados.")
+def check_stock_command(fix: bool):
+    """Verifica stock_on_hand/stock_value de cada producto contra sus lotes.
+
+    Sin --fix solo reporta y sale con código 1 si hay descuadres (apto para
+    cron/monitoreo). Con --fix los corrige desde la suma de lotes no anulados.
+    """
+    from itcj2.apps.warehouse.services.stock_service import check_stock_totals
+    from itcj2.database import SessionLocal
+
+    click.echo("📦 Verificando totales de stock del almacén...")
+    db = SessionLocal()
+    try:
+        drift = check_stock_totals(db, fix=fix)
+    except Exception as e:
+        db.rollback()
+        click.echo(f"\n💥 Error durante check-stock: {e}")
+        raise
+    finally:
+        db.close()
+
+    if not drift:
+        click.echo("✅ Todos los productos cuadran con sus lotes.")
+        return
+    for item in drift:
+        click.echo(
+            f"   ⚠️  {item['code']}: stock {item['stock_on_hand']} (lotes: {item['expected_stock']}), "
+            f"valor {item['stock_value']} (lotes: {item['expected_value']})"
+        )
+    if fix:
+        click.echo(f"🎉 {len(drift)} productos corregidos.")
+    else:
+        click.echo(f"\n💥 {len(drift)} productos descuadrados; ejecuta con --fix para corregirlos.")
+        raise SystemExit(1)
@@ -44,6 +44,92 @@ class Settings(BaseSettings):
     # invalidación; bajar para refrescar más rápido a costa de más misses.
     AUTHZ_CACHE_TTL: int = 300
 
+    # Profiler de queries por request (core/services/query_profiler.py). Cuenta
+    # statements y tiempo en BD por ruta; fuera de producción añade Server-Timing.
+    # Se loguea WARNING al pasar cualquiera de los umbrales; el agregado por ruta
+    # se vuelca a Redis (qprof:v1:*) cada FLUSH_SECONDS por worker.
+    QUERY_PROFILER_ENABLED: bool = True
+    QUERY_PROFILER_LOG_QUERIES: int = 40
+    QUERY_PROFILER_LOG_DB_MS: int = 500
+    QUERY_PROFILER_FLUSH_SECONDS: int = 10
+    QUERY_PROFILER_RETENTION_SECONDS: int = 7 * 24 * 3600
+
+    # Métricas estilo Prometheus (core/services/metrics.py) en GET /metrics. Cada
+    # proceso acumula en memoria y vuelca a Redis (metrics:v1:*) cada
+    # FLUSH_SECONDS. METRICS_TOKEN es el Bearer que usa el scraper; vacío =
+    # fail-closed (404), igual que DEPLOY_SECRET.
+    METRICS_ENABLED: bool = True
+    METRICS_FLUSH_SECONDS: int = 15
+    METRICS_TOKEN: str = ""
+
+    # Procesamiento de uploads (core/services/media_jobs.py). Con ASYNC el request
+    # deja el crudo en STAGING y la cola Celery `media` recomprime; en False (o si
+    # el broker no responde) se procesa en línea como antes.
+    MEDIA_ASYNC_ENABLED: bool = True
+    MEDIA_STAGING_PATH: str = os.path.join(os.path.abspath("instance"), "staging", "media")
+
+    # Conversión a PDF (core/services/office_converter.py): soffice residentes por
+    # proceso, arrancados bajo demanda. UNO_PYTHON es el intérprete con python3-uno
+    # (si no existe se cae al CLI de siempre con perfil persistente por slot).
+    OFFICE_CONVERTER_POOL_SIZE: int = 2
+    OFFICE_CONVERTER_MAX_JOBS: int = 200
+    OFFICE_CONVERTER_TIMEOUT: int = 60
+    OFFICE_UNO_PYTHON: str = "/usr/bin/python3"
+
+    # Caché de formatos generados de helpdesk (services/document_cache.py): DOCX y
+    # PDF por (plantilla, tipo, ticket, updated_at), LRU por tamaño total.
+    HELPDESK_DOC_CACHE_PATH: str = os.path.join(os.path.abspath("instance"), "cache", "helpdesk_docs")
+    HELPDESK_DOC_CACHE_MAX_MB: int = 512
+
+    # Descargas (core/services/file_delivery.py): con nginx delante y instance/
+    # montado en /www/instance, el backend solo autoriza y responde con
+    # X-Accel-Redirect; nginx sirve los bytes (Range, ETag, gzip_static).
+    FILE_ACCEL_ENABLED: bool = False
+
+    # Purga de adjuntos vencidos (core/services/file_purge.py): filas por lote
+    # (keyset sobre auto_delete_at, id) e hilos que borran archivos en paralelo.
+    ATTACHMENT_CLEANUP_CHUNK: int = 500
+    ATTACHMENT_CLEANUP_WORKERS: int = 8
+
+    # Almacenamiento de uploads (core/services/file_storage.py): "local" (rutas
+    # con shard bajo instance/) o "s3" (cualquier compatible; en desarrollo el
+    # MinIO del perfil `s3` del compose). URL_TTL: vigencia de las URLs firmadas
+    # de descarga, en segundos.
+    STORAGE_BACKEND: str = "local"
+    STORAGE_S3_BUCKET: str = "itcj-uploads"
+    STORAGE_S3_ENDPOINT_URL: str = ""
+    STORAGE_S3_ACCESS_KEY: str = ""
+    STORAGE_S3_SECRET_KEY: str = ""
+    STORAGE_S3_REGION: str = "us-east-1"
+    STORAGE_S3_URL_TTL: int = 300
+
+    # Outbox de correo (core/services/email_outbox.py): los correos se guardan en
+    # la misma transacción que el cambio que los origina y la cola Celery `email`
+    # los envía a Graph en lotes de /$batch. En False (o sin broker) se drenan en
+    # línea tras el commit. BATCH: filas por transacción del drenado; reintentos
+    # con backoff exponencial desde RETRY_SECONDS hasta MAX_ATTEMPTS.
+    EMAIL_OUTBOX_ASYNC_ENABLED: bool = True
+    EMAIL_OUTBOX_BATCH: int = 100
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 6
+    EMAIL_OUTBOX_RETRY_SECONDS: int = 30
+
+    # Caché de catálogos (core/services/catalog_cache.py): cada proceso relee
+    # las generaciones en Redis como mucho cada CHECK_MS (además del pub/sub);
+    # sin Redis, los snapshots caducan a los FALLBACK_TTL segundos.
+    CATALOG_CACHE_CHECK_MS: int = 500
+    CATALOG_CACHE_FALLBACK_TTL: int = 30
+
+    # Vencimientos SLA de maint (apps/maint/services/sla_scheduler.py): ZSET en
+    # Redis con la próxima alerta de cada ticket abierto. Los vencimientos a
+    # menos de WAKE_HORIZON segundos encolan un despertar exacto; el resto lo
+    # recoge el beat de fire_sla_deadlines.
+    MAINT_SLA_WAKE_HORIZON: int = 3600
+
+    # Historial de solicitudes por alumno (AgendaTec, GET /requests/mine) en
+    # Redis. Se invalida al crear/cancelar/cambiar estado; el TTL solo cubre
+    # cambios de nombre/estado de períodos pasados.
+    AGENDATEC_STUDENT_HISTORY_TTL: int = 300
+
     # Presencia (core-config-revamp F6) — ventana en segundos para considerar
     # "activo" a un usuario en los sorted-sets presence:notify:*. La poda ocurre
     # EN LECTURA (presence_service.get_counts); no hay heartbeat.
@@ -113,6 +199,11 @@ class Settings(BaseSettings):
     TITULATEC_IDLE_WARN_DAYS: int = 7    # ámbar a partir de aquí
     TITULATEC_IDLE_CRIT_DAYS: int = 14   # rojo (atorado) a partir de aquí
 
+    # AgendaTec — reporte XLSX de solicitudes. Por encima de este número de filas
+    # la exportación se encola en Celery (cola `reports`) en vez de generarse
+    # dentro de la request HTTP.
+    AGENDATEC_REPORT_ASYNC_ROWS: int = 5000
+
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
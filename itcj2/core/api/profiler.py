@@ -0,0 +1,43 @@
+"""
+Profiler API v2 — Top de rutas por queries y tiempo en BD.
+
+Lee el agregado que `core/services/query_profiler` vuelca a Redis desde todos
+los workers (con hasta QUERY_PROFILER_FLUSH_SECONDS de desfase).
+Requiere core.config.admin (solo super-admin).
+Prefijo: /api/core/v2/profiler
+"""
+import logging
+from typing import Literal
+
+from fastapi import APIRouter, Query
+
+from itcj2.core.services import query_profiler
+from itcj2.dependencies import require_perms
+
+router = APIRouter(tags=["core-profiler"])
+logger = logging.getLogger(__name__)
+
+_ADMIN_PERM = require_perms("itcj", ["core.config.admin"])
+
+SortKey = Literal[
+    "queries", "db_ms", "requests", "dups", "max_queries",
+    "queries_per_request", "db_ms_per_request",
+]
+
+
+@router.get("/routes")
+def list_top_routes(
+    sort: SortKey = Query("queries"),
+    limit: int = Query(20, ge=1, le=200),
+    user: dict = _ADMIN_PERM,
+):
+    """Top-N rutas con sus totales, promedios y los statements más repetidos."""
+    return {"success": True, "data": query_profiler.top_routes(sort=sort, limit=limit)}
+
+
+@router.delete("/routes")
+def reset_routes(user: dict = _ADMIN_PERM):
+    """Borra el agregado (p. ej. antes de medir un cambio)."""
+    deleted = query_profiler.reset()
+    logger.info("Profiler de queries reiniciado por usuario %s (%d claves)", user.get("sub"), deleted)
+    return {"success": True, "data": {"deleted": deleted}}
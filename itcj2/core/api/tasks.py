@@ -105,14 +105,17 @@ def sync_definitions(
 ):
     """Sincroniza las TaskDefinition en la DB con las registradas en el código.
 
-    Importa TASK_DEFINITIONS de todos los módulos de tareas conocidos e
-    inserta/actualiza los registros correspondientes.
+    Importa TASK_DEFINITIONS de los módulos de `itcj2.tasks.TASK_MODULES` (los
+    mismos que `celery sync-tasks`) e inserta/actualiza los registros
+    correspondientes.
     """
     from itcj2.core.models.task_models import TaskDefinition
-    from itcj2.tasks.helpdesk_tasks import TASK_DEFINITIONS as hd_defs
-    from itcj2.tasks.notification_tasks import TASK_DEFINITIONS as notif_defs
+    from itcj2.tasks import load_task_modules
 
-    all_defs = hd_defs + notif_defs
+    all_defs = [
+        defn for module in load_task_modules()
+        for defn in getattr(module, "TASK_DEFINITIONS", [])
+    ]
     created = 0
     updated = 0
 
@@ -16,6 +16,9 @@ from .department import Department
 from .notification import Notification
 from .position import Position, UserPosition, PositionAppRole, PositionAppPerm, ProgramPosition
 from .task_models import TaskDefinition, PeriodicTask, TaskRun
+from .sequence import SequenceCounter
+from .email_outbox import EmailOutbox
+from .business_closure import BusinessClosure
 
 __all__ = [
     "Role", "User", "App", "Permission", "RolePermission",
@@ -24,4 +27,5 @@ __all__ = [
     "Notification", "Position", "UserPosition", "PositionAppRole",
     "PositionAppPerm", "ProgramPosition",
     "TaskDefinition", "PeriodicTask", "TaskRun",
+    "SequenceCounter", "EmailOutbox", "BusinessClosure",
 ]
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Date, DateTime, Integer, String
+from sqlalchemy.sql import func
+
+from itcj2.models.base import Base
+
+
+class BusinessClosure(Base):
+    """
+    Días inhábiles institucionales (festivos, vacaciones, cierres).
+
+    Un registro por día. El motor de horas hábiles
+    (core/services/business_time.py) los descuenta del horario laboral
+    Lun-Vie 8-18; los fines de semana ya son inhábiles y no hace falta darlos
+    de alta.
+    """
+    __tablename__ = "core_business_closures"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False, unique=True)
+    name = Column(String(150), nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def to_dict(self):
+        return {"id": self.id, "day": self.day.isoformat(), "name": self.name}
@@ -0,0 +1,40 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, SmallInteger, String, Text
+from sqlalchemy.sql import func, text
+
+from itcj2.models.base import Base
+
+
+class EmailOutbox(Base):
+    """
+    Correos pendientes de envío (ver core/services/email_outbox.py).
+
+    Se insertan en la misma transacción que el cambio que los origina (ticket
+    asignado, resuelto, ...): si el request hace rollback, el correo no existe.
+    La cola Celery `email` los drena y los envía a Graph en lotes.
+
+    status: pending → sent | failed (agotó EMAIL_OUTBOX_MAX_ATTEMPTS o Graph lo
+    rechazó de forma definitiva).
+    """
+    __tablename__ = "core_email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    app_key = Column(String(32), nullable=False)
+    recipients = Column(JSON, nullable=False)
+    subject = Column(String(255), nullable=False)
+    html = Column(Text, nullable=False)
+    # Origen legible para soporte, p.ej. "maint:ticket:123:assigned".
+    ref = Column(String(100), nullable=True)
+    status = Column(String(10), nullable=False, default="pending")
+    attempts = Column(SmallInteger, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_core_email_outbox_due",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Column, DateTime, String
+from sqlalchemy.sql import func
+
+from itcj2.models.base import Base
+
+
+class SequenceCounter(Base):
+    """
+    Contadores de folios/números consecutivos (ver core/services/sequence_service.py).
+
+    Una fila por (nombre, ámbito), p.ej. ("helpdesk.inventory_number", "3:2026").
+    Reservar es un UPDATE ... RETURNING sobre la fila: el candado de fila
+    serializa a los concurrentes y un rollback devuelve los números (sin huecos).
+    """
+    __tablename__ = "core_sequence_counters"
+
+    name = Column(String(60), primary_key=True)
+    scope = Column(String(60), primary_key=True, default="")
+    last_value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -53,3 +53,7 @@ core_router.include_router(tasks_router, prefix="/tasks")
 # Mundial 2026: partidos (tema visual)
 from .api.mundial import router as mundial_router
 core_router.include_router(mundial_router, prefix="/mundial")
+
+# Profiler: top de rutas por queries / tiempo en BD (agregado de todos los workers)
+from .api.profiler import router as profiler_router
+core_router.include_router(profiler_router, prefix="/profiler")
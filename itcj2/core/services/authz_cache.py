@@ -9,6 +9,8 @@ Diseño — un wrapper cacheado POR FUNCIÓN (no un bundle unificado):
     cached_roles(...)          -> envuelve authz_service.user_roles_in_app
     cached_perms(...)          -> envuelve authz_service.get_user_permissions_for_app
     cached_has_assignment(...) -> envuelve authz_service.has_any_assignment
+    cached_scope(...)          -> alcance de visibilidad ya resuelto por una app
+                                  (p.ej. áreas/deptos del dashboard de maint)
 
 Cada wrapper, en MISS, llama exactamente a la misma función de authz_service
 que la dependencia usaba antes. Esto preserva el comportamiento (y los mocks de
@@ -25,7 +27,7 @@ Propiedades:
   NUNCA bloquea ni rompe la autorización (peor caso = lento, no inseguro).
 - **Invalidación explícita** en cada mutación de roles/permisos/puestos.
 
-Claves: ``authz:v1:{kind}:{app_key}:{user_id}`` con kind ∈ {roles, perms, has}.
+Claves: ``authz:v1:{kind}:{app_key}:{user_id}`` con kind ∈ {roles, perms, has, scope}.
 """
 from __future__ import annotations
 
@@ -39,7 +41,7 @@ logger = logging.getLogger(__name__)
 
 # Prefijo versionado: subir a v2 invalida TODO de golpe si cambia el formato.
 _PREFIX = "authz:v1"
-_KINDS = ("roles", "perms", "has")
+_KINDS = ("roles", "perms", "has", "scope")
 
 
 def _ttl() -> int:
@@ -118,6 +120,16 @@ def cached_has_assignment(db: Session, user_id: int, app_key: str) -> bool:
     ))
 
 
+def cached_scope(user_id: int, app_key: str, compute: Callable[[], dict]) -> dict:
+    """Alcance de visibilidad resuelto por la app (dict JSON-serializable).
+
+    Lo arma la propia app a partir de roles, puestos y sus tablas de áreas; se
+    invalida con el resto del caché del usuario y con `invalidate_user_scope`
+    cuando cambian esas tablas.
+    """
+    return _get_or_set("scope", app_key, user_id, compute)
+
+
 # ---------------------------------------------------------------------------
 # Mapa de descendientes de departamentos (global, no por usuario)
 # ---------------------------------------------------------------------------
@@ -151,12 +163,16 @@ def cached_descendants_map(db: Session) -> dict[int, set]:
 
 
 def invalidate_dept_map() -> None:
-    """Borra el cache del mapa de descendientes (create/update/deactivate de dept)."""
+    """Borra el cache del mapa de descendientes (create/update/deactivate de dept).
+
+    También los `cached_scope` de todas las apps: guardan los dept_ids del
+    subárbol ya expandidos con este mapa y quedarían viejos hasta su TTL.
+    """
     r = _redis()
     if r is None:
         return
     try:
-        r.delete(_DEPTMAP_KEY)
+        r.delete(_DEPTMAP_KEY, *r.scan_iter(match=f"{_PREFIX}:scope:*", count=1000))
     except Exception as e:
         logger.warning("authz_cache: invalidate_dept_map err (%s)", e)
 
@@ -175,6 +191,17 @@ def invalidate_user_app(user_id: int, app_key: str) -> None:
         logger.warning("authz_cache: invalidate_user_app(%s,%s) err (%s)", user_id, app_key, e)
 
 
+def invalidate_user_scope(user_id: int, app_key: str) -> None:
+    """Borra solo el alcance cacheado (cambian las áreas de técnico/coordinador)."""
+    r = _redis()
+    if r is None:
+        return
+    try:
+        r.delete(_key("scope", app_key, user_id))
+    except Exception as e:
+        logger.warning("authz_cache: invalidate_user_scope(%s,%s) err (%s)", user_id, app_key, e)
+
+
 def invalidate_user(user_id: int) -> None:
     """Borra el caché de un usuario en TODAS las apps.
 
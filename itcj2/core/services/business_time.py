@@ -0,0 +1,219 @@
+"""Horas hábiles (Lun-Vie 8:00-18:00 menos días inhábiles) en O(1) por intervalo.
+
+`helpdesk.utils.time_calculator.calculate_business_hours` recorría el
+intervalo día por día en un ``while`` con conversiones de zona horaria: un
+ticket abierto meses costaba cientos de iteraciones, y las estadísticas lo
+pagaban por cada ticket.
+
+Aquí las horas hábiles entre A y B son ``H(B) - H(A)``, donde ``H(t)`` son los
+segundos hábiles acumulados desde un lunes de referencia hasta `t`:
+
+- semanas completas × 5 días × 10 h,
+- más los días laborables completos de la semana en curso (``min(resto, 5)``),
+- más la fracción del día de `t` recortada a [8:00, 18:00] si es laborable,
+- menos un día completo por cada día inhábil anterior (búsqueda binaria en la
+  lista ordenada) y sin fracción si el propio día es inhábil.
+
+Todo es hora de pared local (como el cálculo anterior): un día laborable vale
+siempre 10 h, también en los cambios de horario.
+
+`business_hours(starts, ends)` hace lo mismo vectorizado con NumPy para las
+estadísticas. Los días inhábiles viven en ``core_business_closures`` y se
+cachean con `catalog_cache` (invalidación entre procesos).
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from itcj2.core.services.catalog_cache import Catalog
+from itcj2.core.utils.timezone import APP_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+WORK_START = 8 * 3600
+WORK_END = 18 * 3600
+DAY_SECONDS = WORK_END - WORK_START
+WEEK_SECONDS = 5 * DAY_SECONDS
+
+# Lunes de referencia: 1970-01-05, cuatro días después de la época Unix
+# (que cayó en jueves); así el índice de día también sirve para datetime64.
+_MONDAY0 = date(1970, 1, 5).toordinal()
+_EPOCH_TO_MONDAY0 = 4
+_US = 1_000_000
+
+# Sin BD (pruebas unitarias, arranque) no se reintenta en cada llamada
+_RETRY_SECONDS = 30.0
+_retry_at = 0.0
+
+
+class Closures(NamedTuple):
+    """Días inhábiles laborables como índices de día, ordenados."""
+    days: tuple[int, ...]
+    array: np.ndarray
+
+
+NO_CLOSURES = Closures((), np.empty(0, dtype=np.int64))
+
+
+def day_index(d: date) -> int:
+    """Días desde el lunes de referencia."""
+    return d.toordinal() - _MONDAY0
+
+
+def make_closures(days) -> Closures:
+    """Closures a partir de fechas; los fines de semana se ignoran (ya son inhábiles)."""
+    idx = sorted({day_index(d) for d in days if d.weekday() < 5})
+    return Closures(tuple(idx), np.array(idx, dtype=np.int64))
+
+
+def _load_closures(db: Session) -> Closures:
+    from itcj2.core.models.business_closure import BusinessClosure
+    return make_closures(day for (day,) in db.query(BusinessClosure.day))
+
+
+CLOSURES = Catalog("core.business_closures", _load_closures)
+
+
+def get_closures(db: Session | None = None) -> Closures:
+    """Días inhábiles vigentes. Si la BD no responde, se calcula sin ellos."""
+    global _retry_at
+    snapshot = CLOSURES.peek()
+    if time.monotonic() < _retry_at:
+        return snapshot or NO_CLOSURES
+    try:
+        return CLOSURES.get(db)
+    except Exception as e:
+        _retry_at = time.monotonic() + _RETRY_SECONDS
+        logger.warning("business_time: no se pudieron leer los días inhábiles (%s)", e)
+        return snapshot or NO_CLOSURES
+
+
+def invalidate_closures() -> None:
+    CLOSURES.invalidate()
+
+
+# ---------------------------------------------------------------------------
+# Escalar
+# ---------------------------------------------------------------------------
+def _wall(dt: datetime) -> datetime:
+    """Hora de pared local naive (naive se asume ya local)."""
+    if dt.tzinfo is not None:
+        from zoneinfo import ZoneInfo
+        dt = dt.astimezone(ZoneInfo(APP_TIMEZONE)).replace(tzinfo=None)
+    return dt
+
+
+def _cumulative(dt: datetime, closed: tuple[int, ...]) -> float:
+    d = day_index(dt.date())
+    weeks, rem = divmod(d, 7)
+    before = bisect.bisect_left(closed, d)
+    total = weeks * WEEK_SECONDS + (min(rem, 5) - before) * DAY_SECONDS
+    if rem < 5 and not (before < len(closed) and closed[before] == d):
+        secs = dt.hour * 3600 + dt.minute * 60 + dt.second + dt.microsecond / _US
+        total += min(max(secs - WORK_START, 0), DAY_SECONDS)
+    return total
+
+
+def business_seconds(start: datetime, end: datetime, closures: Closures | None = None) -> float:
+    """Segundos hábiles entre `start` y `end` (0 si falta alguno o end <= start)."""
+    if not start or not end:
+        return 0.0
+    closed = (closures if closures is not None else get_closures()).days
+    seconds = _cumulative(_wall(end), closed) - _cumulative(_wall(start), closed)
+    return max(seconds, 0.0)
+
+
+def hours_between(start: datetime, end: datetime, closures: Closures | None = None) -> float:
+    """Horas hábiles entre `start` y `end`, sin redondear."""
+    return business_seconds(start, end, closures) / 3600
+
+
+# ---------------------------------------------------------------------------
+# Vectorizado
+# ---------------------------------------------------------------------------
+def _to_wall64(values) -> np.ndarray:
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        return values.astype("datetime64[us]")
+    return np.array(
+        [np.datetime64(_wall(v), "us") if v is not None else np.datetime64("NaT", "us") for v in values],
+        dtype="datetime64[us]",
+    )
+
+
+def _cumulative_np(t: np.ndarray, closed: np.ndarray) -> np.ndarray:
+    days = t.astype("datetime64[D]")
+    micros = (t - days).astype(np.int64)
+    d = days.astype(np.int64) - _EPOCH_TO_MONDAY0
+    weeks, rem = np.divmod(d, 7)
+    total = (weeks * WEEK_SECONDS + np.minimum(rem, 5) * DAY_SECONDS) * _US
+    partial = np.clip(micros - WORK_START * _US, 0, DAY_SECONDS * _US)
+    workday = rem < 5
+    if closed.size:
+        before = np.searchsorted(closed, d, side="left")
+        total -= before * DAY_SECONDS * _US
+        workday &= closed[np.minimum(before, closed.size - 1)] != d
+    return total + np.where(workday, partial, 0)
+
+
+def business_hours(starts: Sequence | np.ndarray, ends: Sequence | np.ndarray,
+                   closures: Closures | None = None, db: Session | None = None) -> np.ndarray:
+    """Horas hábiles por par (start, end); NaN donde falta alguno.
+
+    Acepta listas de datetime (aware o naive local, None permitido) o arreglos
+    ``datetime64`` ya en hora local.
+    """
+    closed = (closures if closures is not None else get_closures(db)).array
+    s = _to_wall64(starts)
+    e = _to_wall64(ends)
+    missing = np.isnat(s) | np.isnat(e)
+    zero = np.datetime64(0, "us")
+    s = np.where(missing, zero, s)
+    e = np.where(missing, zero, e)
+    micros = np.maximum(_cumulative_np(e, closed) - _cumulative_np(s, closed), 0)
+    hours = micros / (3600 * _US)
+    hours[missing] = np.nan
+    return hours
+
+
+# ---------------------------------------------------------------------------
+# Calendario
+# ---------------------------------------------------------------------------
+def add_closures(db: Session, first: date, last: date, name: str) -> int:
+    """Da de alta los días inhábiles de `first` a `last` (inclusive). Devuelve cuántos."""
+    from itcj2.core.models.business_closure import BusinessClosure
+
+    existing = {
+        day for (day,) in db.query(BusinessClosure.day).filter(BusinessClosure.day.between(first, last))
+    }
+    added = 0
+    day = first
+    while day <= last:
+        if day not in existing:
+            db.add(BusinessClosure(day=day, name=name))
+            added += 1
+        day += timedelta(days=1)
+    db.commit()
+    if added:
+        invalidate_closures()
+    return added
+
+
+def remove_closures(db: Session, first: date, last: date) -> int:
+    from itcj2.core.models.business_closure import BusinessClosure
+
+    removed = (
+        db.query(BusinessClosure)
+        .filter(BusinessClosure.day.between(first, last))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    if removed:
+        invalidate_closures()
+    return removed
@@ -0,0 +1,207 @@
+"""Caché de catálogos por proceso con invalidación entre procesos vía Redis.
+
+Los catálogos de configuración (prioridades, estados, áreas, plantillas, ...)
+se leen en casi cada request y cambian muy rara vez. Antes cada app los
+guardaba en globals de módulo y la invalidación solo llegaba al worker que hizo
+el cambio: los otros 3 workers HTTP, el proceso de sockets y Celery seguían con
+la copia vieja hasta reiniciar.
+
+Diseño:
+
+- Cada `Catalog` guarda en el proceso un snapshot inmutable (el valor que
+  devuelve su loader; por convención tuplas, frozensets y MappingProxyType)
+  junto con la *generación* con la que se cargó. Leerlo no toca Redis ni BD.
+- La generación vive en Redis, en un solo hash ``catalog:v1:gen`` (campo por
+  catálogo). Cada proceso lo relee con un HGETALL como mucho una vez cada
+  ``CATALOG_CACHE_CHECK_MS``; si la de un catálogo cambió, lo recarga en el
+  siguiente acceso. La generación se lee ANTES de cargar: un cambio que llegue
+  durante la carga deja el snapshot marcado como viejo.
+- `invalidate` descarta la copia local, hace HINCRBY de la generación y la
+  publica en el canal ``catalog:v1:invalidate``. Un hilo daemon por proceso
+  escucha ese canal y actualiza la generación al instante, así que todos los
+  procesos convergen en milisegundos; el sondeo queda como red de seguridad si
+  se pierde un mensaje.
+- Fail-open: sin Redis los snapshots caducan por edad
+  (``CATALOG_CACHE_FALLBACK_TTL``), como un caché TTL por proceso, y la
+  invalidación al menos alcanza al proceso que hizo el cambio.
+
+Uso::
+
+    PRIORITIES = Catalog("helpdesk.priorities", _load_priorities)
+    PRIORITIES.get(db)        # snapshot (carga si hace falta)
+    PRIORITIES.invalidate()   # tras cualquier escritura, después del commit
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+_GEN_KEY = "catalog:v1:gen"
+_CHANNEL = "catalog:v1:invalidate"
+# Tras un error de Redis no se reintenta durante este lapso (no pagar un
+# timeout de conexión en cada request con Redis caído).
+_REDIS_BACKOFF = 5.0
+
+_lock = threading.Lock()
+_generations: dict[str, int] = {}
+_checked_at = 0.0
+_redis_ok = True
+_redis_retry_at = 0.0
+_listener_pid: int | None = None
+
+_registry: dict[str, "Catalog"] = {}
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+def _redis():
+    from itcj2.core.utils.redis_conn import get_redis
+    return get_redis()
+
+
+def _redis_failed(e: Exception) -> None:
+    global _redis_ok, _redis_retry_at
+    if _redis_ok:
+        logger.warning("catalog_cache: Redis no disponible (%s); caducidad por edad", e)
+    _redis_ok = False
+    _redis_retry_at = time.monotonic() + _REDIS_BACKOFF
+
+
+def _refresh_generations() -> bool:
+    """Relee las generaciones si toca. False si Redis no está disponible."""
+    global _checked_at, _redis_ok
+    now = time.monotonic()
+    if not _redis_ok and now < _redis_retry_at:
+        return False
+    if now - _checked_at < _settings().CATALOG_CACHE_CHECK_MS / 1000:
+        return _redis_ok
+    _ensure_listener()
+    try:
+        raw = _redis().hgetall(_GEN_KEY)
+    except Exception as e:
+        _redis_failed(e)
+        return False
+    with _lock:
+        # Se reemplaza completo: si Redis perdió el hash, todo vuelve a 0 y los
+        # snapshots con otra generación se recargan una vez.
+        _generations.clear()
+        _generations.update((name, int(gen)) for name, gen in raw.items())
+        _checked_at = now
+    _redis_ok = True
+    return True
+
+
+def _on_message(data) -> None:
+    try:
+        msg = json.loads(data)
+        with _lock:
+            _generations[msg["name"]] = int(msg["gen"])
+    except Exception as e:
+        logger.debug("catalog_cache: mensaje inválido en %s (%s)", _CHANNEL, e)
+
+
+def _listen() -> None:
+    while True:
+        try:
+            pubsub = _redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(_CHANNEL)
+            for message in pubsub.listen():
+                if message.get("type") == "message":
+                    _on_message(message["data"])
+        except Exception as e:
+            logger.debug("catalog_cache: suscripción a %s caída (%s); reintento", _CHANNEL, e)
+        time.sleep(_REDIS_BACKOFF)
+
+
+def _ensure_listener() -> None:
+    """Arranca (una vez por proceso) el hilo suscrito a las invalidaciones.
+
+    Se compara el pid porque los workers prefork de Celery heredan el módulo
+    ya importado del padre, pero no sus hilos.
+    """
+    global _listener_pid
+    pid = os.getpid()
+    if _listener_pid == pid:
+        return
+    with _lock:
+        if _listener_pid == pid:
+            return
+        _listener_pid = pid
+    threading.Thread(target=_listen, name="catalog-invalidate", daemon=True).start()
+
+
+class Catalog:
+    """Un catálogo cacheado. `loader(db)` devuelve el snapshot completo.
+
+    `db` puede ser None: el loader (o `get`) abre entonces una sesión efímera.
+    Si el loader lanza, no se cachea nada y la excepción sube al llamador.
+    """
+
+    def __init__(self, name: str, loader: Callable[[Any], Any], *, own_session: bool = False):
+        self.name = name
+        self.loader = loader
+        # True si el loader abre su propia sesión (no necesita `db`).
+        self.own_session = own_session
+        self._snapshot: tuple[int, float, Any] | None = None   # (gen, cargado en, valor)
+        _registry[name] = self
+
+    def _fresh(self, snap) -> bool:
+        if _refresh_generations():
+            return snap[0] == _generations.get(self.name, 0)
+        return time.monotonic() - snap[1] < _settings().CATALOG_CACHE_FALLBACK_TTL
+
+    def peek(self):
+        """Valor en memoria sin validar ni cargar (None si no hay)."""
+        snap = self._snapshot
+        return snap[2] if snap else None
+
+    def get(self, db=None):
+        snap = self._snapshot
+        if snap is not None and self._fresh(snap):
+            return snap[2]
+
+        _refresh_generations()
+        gen = _generations.get(self.name, 0)
+        if db is None and not self.own_session:
+            from itcj2.database import SessionLocal
+            with SessionLocal() as session:
+                value = self.loader(session)
+        else:
+            value = self.loader(db)
+        self._snapshot = (gen, time.monotonic(), value)
+        logger.debug("catalog_cache: %s cargado (gen %s)", self.name, gen)
+        return value
+
+    def prime(self, value) -> None:
+        """Instala `value` como snapshot vigente (calentamiento y pruebas)."""
+        self._snapshot = (_generations.get(self.name, 0), time.monotonic(), value)
+
+    def clear(self) -> None:
+        """Descarta solo la copia de este proceso."""
+        self._snapshot = None
+
+    def invalidate(self) -> None:
+        """Descarta la copia local y avisa a todos los procesos."""
+        self._snapshot = None
+        try:
+            r = _redis()
+            gen = int(r.hincrby(_GEN_KEY, self.name, 1))
+            with _lock:
+                _generations[self.name] = gen
+            r.publish(_CHANNEL, json.dumps({"name": self.name, "gen": gen}))
+        except Exception as e:
+            _redis_failed(e)
+        logger.debug("catalog_cache: %s invalidado", self.name)
+
+
+def get_catalog(name: str) -> Catalog | None:
+    return _registry.get(name)
@@ -5,7 +5,7 @@ from itcj2.core.models.department import Department
 
 
 def _bust_dept_map() -> None:
-    """Invalida el cache del mapa de descendientes tras mutar el árbol. Best-effort."""
+    """Invalida el mapa de descendientes (y los alcances cacheados que lo usan) tras mutar el árbol. Best-effort."""
     try:
         from itcj2.core.services.authz_cache import invalidate_dept_map
         invalidate_dept_map()
@@ -13,6 +13,15 @@ def _bust_dept_map() -> None:
         pass
 
 
+def _bust_directory() -> None:
+    """Invalida el snapshot del directorio de extensiones (nombres/árbol). Best-effort."""
+    try:
+        from itcj2.apps.directory.services.directory_service import invalidate_directory
+        invalidate_directory()
+    except Exception:
+        pass
+
+
 def get_direction(db: Session):
     return db.query(Department).filter_by(code='direction', is_active=True).first()
 
@@ -115,6 +124,7 @@ def create_department(db: Session, code: str, name: str, description=None, paren
     db.add(dept)
     db.commit()
     _bust_dept_map()
+    _bust_directory()
     return dept
 
 
@@ -141,6 +151,7 @@ def update_department(db: Session, dept_id: int, **kwargs):
 
     db.commit()
     _bust_dept_map()
+    _bust_directory()
     return dept
 
 
@@ -0,0 +1,249 @@
+"""Outbox de correo transaccional (``core_email_outbox``) drenado por la cola ``email``.
+
+Antes MaintEmailHelper y el envío de encuestas de AgendaTec llamaban a Graph
+dentro del request: ``acquire_token_silent`` (cache de MSAL en disco bajo un
+lock) y un ``POST /me/sendMail`` bloqueante de hasta 30 s por destinatario.
+
+Ahora:
+
+- `enqueue` agrega la fila a la sesión del llamador: se guarda con el mismo
+  COMMIT que el cambio que la origina (un rollback la descarta) y, tras el
+  commit, se encola `drain_email_outbox` para esa app.
+- `drain_batch` (worker) toma pendientes vencidos con ``FOR UPDATE SKIP LOCKED``
+  (dos workers nunca envían la misma fila), agrupa por app y los manda en
+  llamadas a ``/$batch`` de hasta 20 correos, con la sesión HTTP y el token en
+  memoria de msgraph_mail.
+- Resultado por correo: 2xx → sent; 401/408/429/5xx/sin respuesta → reintento
+  con backoff exponencial (o el Retry-After de Graph, si es mayor); cualquier
+  otro 4xx → failed. Al agotar ``EMAIL_OUTBOX_MAX_ATTEMPTS`` queda failed.
+- Métricas por app: ``itcj_email_messages_total{app,outcome}`` y
+  ``itcj_email_batch_seconds{app}``.
+
+Si el broker no responde el correo queda pending y lo recoge la siguiente
+corrida; con ``EMAIL_OUTBOX_ASYNC_ENABLED=False`` se drena en línea tras el
+commit (como antes, pero ya en lote).
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from itcj2.core.models.email_outbox import EmailOutbox
+from itcj2.core.services import metrics
+from itcj2.core.utils import msgraph_mail
+from itcj2.core.utils.timezone import db_now
+
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = "email_outbox"
+_RETRY_CAP_SECONDS = 3600
+_RETRY_LOCK = "email_outbox:retry_scheduled"
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+# ---------------------------------------------------------------------------
+# Lado del request
+# ---------------------------------------------------------------------------
+def is_connected(app_key: str) -> bool:
+    """True si la app tiene cuenta de correo conectada (solo lee el archivo de cuenta)."""
+    return msgraph_mail.read_account_info(app_key) is not None
+
+
+def enqueue(db: Session, app_key: str, to, subject: str, html: str, *,
+            ref: str | None = None) -> EmailOutbox | None:
+    """Agrega un correo al outbox en la transacción de `db` (sin commit)."""
+    recipients = [to] if isinstance(to, str) else [a for a in to if a]
+    if not recipients:
+        return None
+    row = EmailOutbox(
+        app_key=app_key,
+        recipients=recipients,
+        subject=subject[:255],
+        html=html,
+        ref=ref,
+        next_attempt_at=db_now(),
+    )
+    db.add(row)
+    apps = db.info.setdefault(_SESSION_KEY, set())
+    # Listeners permanentes (no once=True): SQLAlchemy ignora un segundo
+    # listen de la misma función, y una sesión reutilizada tras su primer
+    # commit se quedaría sin despacho.
+    if not apps and not event.contains(db, "after_commit", _after_commit):
+        event.listen(db, "after_commit", _after_commit)
+        event.listen(db, "after_soft_rollback", _after_soft_rollback)
+    apps.add(app_key)
+    return row
+
+
+def _after_commit(session) -> None:
+    for app_key in sorted(session.info.pop(_SESSION_KEY, ())):
+        dispatch(app_key)
+
+
+def _after_soft_rollback(session, previous_transaction) -> None:
+    # Solo al cerrarse la transacción externa: el rollback de un SAVEPOINT
+    # (begin_nested) no descarta las filas que sí se van a commitear.
+    if previous_transaction.nested:
+        return
+    session.info.pop(_SESSION_KEY, None)
+
+
+def dispatch(app_key: str | None = None, countdown: float | None = None) -> None:
+    """Encola el drenado de `app_key`; sin cola, drena en línea."""
+    if _settings().EMAIL_OUTBOX_ASYNC_ENABLED:
+        try:
+            from itcj2.tasks.email_tasks import drain_email_outbox
+            drain_email_outbox.apply_async(kwargs={"app_key": app_key}, countdown=countdown)
+            return
+        except Exception as e:
+            logger.warning("email_outbox: no se pudo encolar el drenado de %s (%s); queda pendiente",
+                           app_key, e)
+            return
+    if countdown is None:
+        drain(app_key)
+
+
+# ---------------------------------------------------------------------------
+# Lado del worker
+# ---------------------------------------------------------------------------
+def _outcome(status: int) -> str:
+    if 200 <= status < 300:
+        return "sent"
+    if status in (0, 401, 408, 429) or status >= 500:
+        return "retry"
+    return "failed"
+
+
+def _send_app(app_key: str, rows: list[EmailOutbox]) -> dict[int, tuple[int, float | None, str | None]]:
+    """Envía los correos de una app. Devuelve ``{id: (status, retry_after, error)}``."""
+    token = msgraph_mail.cached_token(app_key)
+    if not token:
+        return {r.id: (0, None, "cuenta de correo no conectada") for r in rows}
+
+    results = {}
+    size = msgraph_mail.GRAPH_BATCH_MAX
+    for i in range(0, len(rows), size):
+        chunk = rows[i:i + size]
+        messages = [{"id": r.id, "subject": r.subject, "html": r.html, "to": r.recipients} for r in chunk]
+        for attempt in (1, 2):
+            t0 = time.perf_counter()
+            try:
+                res = msgraph_mail.graph_send_batch(token, messages)
+            except msgraph_mail.GraphBatchError as e:
+                res = {str(r.id): (e.status or 0, e.retry_after, str(e)) for r in chunk}
+            metrics.observe("itcj_email_batch_seconds", time.perf_counter() - t0, app=app_key)
+            if attempt == 1 and any(status == 401 for status, _, _ in res.values()):
+                # Token revocado o vencido antes de lo previsto: uno nuevo y se repite.
+                msgraph_mail.forget_token(app_key)
+                token = msgraph_mail.cached_token(app_key)
+                if token:
+                    continue
+            break
+        for r in chunk:
+            results[r.id] = res.get(str(r.id), (0, None, "sin respuesta en $batch"))
+        if not token:
+            for r in rows[i + size:]:
+                results[r.id] = (0, None, "cuenta de correo no conectada")
+            break
+    return results
+
+
+def _apply(row: EmailOutbox, result: tuple[int, float | None, str | None], now: datetime,
+           settings) -> str:
+    status, retry_after, error = result
+    outcome = _outcome(status)
+    row.attempts += 1
+    if outcome == "sent":
+        row.status = "sent"
+        row.sent_at = now
+        row.last_error = None
+        return outcome
+    row.last_error = error
+    if outcome == "retry" and row.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        outcome = "failed"
+    if outcome == "failed":
+        row.status = "failed"
+        logger.warning("email_outbox: correo %s (%s) descartado tras %s intento(s): %s",
+                       row.id, row.ref or row.app_key, row.attempts, error)
+        return outcome
+    delay = min(settings.EMAIL_OUTBOX_RETRY_SECONDS * 2 ** (row.attempts - 1), _RETRY_CAP_SECONDS)
+    row.next_attempt_at = now + timedelta(seconds=max(delay, retry_after or 0))
+    return outcome
+
+
+def drain_batch(db: Session, app_key: str | None = None, *, limit: int | None = None) -> Counter:
+    """Envía un lote de pendientes vencidos y hace commit. Devuelve conteos por resultado."""
+    settings = _settings()
+    limit = limit or settings.EMAIL_OUTBOX_BATCH
+    now = db_now()
+    stmt = select(EmailOutbox).where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+    if app_key:
+        stmt = stmt.where(EmailOutbox.app_key == app_key)
+    rows = db.scalars(stmt.order_by(EmailOutbox.id).limit(limit).with_for_update(skip_locked=True)).all()
+
+    stats = Counter(picked=len(rows))
+    by_app: dict[str, list[EmailOutbox]] = {}
+    for row in rows:
+        by_app.setdefault(row.app_key, []).append(row)
+
+    for app, app_rows in by_app.items():
+        results = _send_app(app, app_rows)
+        outcomes = Counter(_apply(r, results[r.id], now, settings) for r in app_rows)
+        for outcome, n in outcomes.items():
+            metrics.inc("itcj_email_messages_total", n, app=app, outcome=outcome)
+        stats.update(outcomes)
+    db.commit()
+    return stats
+
+
+def next_due(db: Session, app_key: str | None = None) -> datetime | None:
+    """Próximo `next_attempt_at` pendiente (reintentos en espera)."""
+    stmt = select(func.min(EmailOutbox.next_attempt_at)).where(EmailOutbox.status == "pending")
+    if app_key:
+        stmt = stmt.where(EmailOutbox.app_key == app_key)
+    return db.scalar(stmt)
+
+
+def drain(app_key: str | None = None, *, budget: float = 90.0) -> dict:
+    """Drena lotes hasta vaciar los vencidos o agotar `budget` segundos.
+
+    Si quedan reintentos en espera (de cualquier app) programa una sola corrida
+    para cuando venza el primero (candado en Redis para no acumular una por cada
+    correo).
+    """
+    from itcj2.database import SessionLocal
+
+    deadline = time.monotonic() + budget
+    stats: Counter = Counter()
+    with SessionLocal() as db:
+        while True:
+            batch = drain_batch(db, app_key)
+            stats.update(batch)
+            if batch["picked"] < _settings().EMAIL_OUTBOX_BATCH or time.monotonic() >= deadline:
+                break
+        due = next_due(db)
+
+    if due is not None:
+        _schedule_retry(max((due - db_now()).total_seconds(), 1.0))
+    return dict(stats)
+
+
+def _schedule_retry(delay: float) -> None:
+    if not _settings().EMAIL_OUTBOX_ASYNC_ENABLED:
+        return
+    try:
+        from itcj2.core.utils.redis_conn import get_redis
+        if not get_redis().set(_RETRY_LOCK, "1", nx=True, ex=max(int(delay), 1)):
+            return
+    except Exception as e:
+        logger.debug("email_outbox: sin Redis para el candado de reintento (%s)", e)
+    dispatch(None, countdown=delay)
@@ -0,0 +1,145 @@
+"""Entrega de archivos después de autorizar (descargas de adjuntos y documentos).
+
+Antes cada endpoint devolvía un ``FileResponse`` (o, para los adjuntos ``.gz``
+de helpdesk, un ``StreamingResponse`` que descomprimía 64 KB a la vez): el
+worker uvicorn copiaba todos los bytes y los ``.gz`` no admitían Range.
+
+`send_file` recibe la ruta ya autorizada y:
+
+- Con ``FILE_ACCEL_ENABLED`` (nginx delante, con ``instance/`` montado) responde
+  vacío con ``X-Accel-Redirect`` a una location ``internal`` de nginx, que
+  sirve el archivo con sendfile, Range, ETag y Last-Modified. nginx conserva
+  de la respuesta original Content-Type, Content-Disposition y Cache-Control.
+  Los ``.gz`` van a ``/_protected_gz/`` (``gzip_static always`` + ``gunzip``):
+  ``Content-Encoding: gzip`` tal cual para quien lo acepta, descomprimido por
+  nginx para el resto.
+- Sin nginx (desarrollo local, tests) usa ``FileResponse`` (Range, ETag y
+  Last-Modified de Starlette) más 304 por ``If-None-Match``. Un ``.gz`` se
+  manda comprimido si el cliente acepta gzip; solo los clientes que no lo
+  aceptan caen en la descompresión en Python.
+
+Las rutas fuera de ``INSTANCE_PATH`` (no montadas en nginx) siempre van por
+Python. Las claves ``s3://`` (core/services/file_storage.py) se sirven con un
+302 a una URL firmada del bucket.
+"""
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import os
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+
+ACCEL_PREFIX = "/_protected/"
+ACCEL_GZ_PREFIX = "/_protected_gz/"
+
+_GZ_CHUNK = 64 * 1024
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+def accepts_gzip(request: Request) -> bool:
+    """True si ``Accept-Encoding`` admite gzip (``q=0`` lo excluye)."""
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        q = params.strip().replace(" ", "")
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def content_disposition(disposition: str, filename: str) -> str:
+    """Cabecera Content-Disposition; nombres no ASCII en RFC 5987 (``filename*``)."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def _instance_relpath(path: str) -> str | None:
+    root = os.path.realpath(_settings().INSTANCE_PATH)
+    real = os.path.realpath(path)
+    if os.path.commonpath([root, real]) != root:
+        return None
+    return os.path.relpath(real, root).replace(os.sep, "/")
+
+
+def send_file(
+    request: Request,
+    path: str | os.PathLike,
+    *,
+    media_type: str | None = None,
+    filename: str | None = None,
+    disposition: str | None = "attachment",
+    gzipped: bool = False,
+    headers: dict | None = None,
+) -> Response:
+    """Respuesta para servir `path` (ya autorizado).
+
+    `filename`/`media_type` son los del archivo lógico (sin ``.gz``); si falta
+    el tipo se adivina por el nombre. `disposition` None omite
+    Content-Disposition (p.ej. imágenes para ``<img>``). `gzipped` indica que
+    `path` es el ``.gz`` de gzip transparente.
+    """
+    path = os.fspath(path)
+    name = filename or os.path.basename(path[:-3] if gzipped else path)
+    media_type = media_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    from itcj2.core.services import file_storage
+
+    backend = file_storage.backend_for(path)
+    if backend.remote:
+        url = backend.url(path, filename=name, disposition=disposition, media_type=media_type)
+        return RedirectResponse(url, status_code=302, headers={"Cache-Control": "private, no-store"})
+
+    out = dict(headers or {})
+    if disposition:
+        out["Content-Disposition"] = content_disposition(disposition, name)
+
+    if _settings().FILE_ACCEL_ENABLED:
+        rel = _instance_relpath(path)
+        if rel is not None:
+            if gzipped:
+                # gzip_static busca "<uri>.gz": se redirige al nombre sin extensión.
+                target = ACCEL_GZ_PREFIX + quote(rel[:-3])
+            else:
+                target = ACCEL_PREFIX + quote(rel)
+            out["X-Accel-Redirect"] = target
+            return Response(status_code=200, media_type=media_type, headers=out)
+
+    if gzipped:
+        out["Vary"] = "Accept-Encoding"
+        if not accepts_gzip(request):
+            return StreamingResponse(_gunzip(path), media_type=media_type, headers=out)
+        out["Content-Encoding"] = "gzip"
+
+    response = FileResponse(path, media_type=media_type, headers=out, stat_result=os.stat(path))
+    etag = response.headers.get("etag")
+    tags = _etags(request.headers.get("if-none-match"))
+    if etag and (etag in tags or "*" in tags):
+        keep = {k: v for k, v in out.items() if k in ("Cache-Control", "Vary")}
+        return Response(status_code=304, headers={"ETag": etag, **keep})
+    return response
+
+
+def _etags(header: str | None) -> set[str]:
+    if not header:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def _gunzip(path: str):
+    with gzip.open(path, "rb") as fh:
+        while chunk := fh.read(_GZ_CHUNK):
+            yield chunk
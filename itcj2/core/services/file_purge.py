@@ -0,0 +1,135 @@
+"""Purga por lotes de adjuntos vencidos (helpdesk y maint).
+
+Antes cada limpieza cargaba TODOS los vencidos con el ORM, borraba archivo por
+archivo y hacía un ``db.delete``/UPDATE por fila; tras unas vacaciones largas el
+lote no cabía en el ``soft_time_limit`` y la tarea moría a medias.
+
+`PurgeRun` recorre los candidatos por keyset sobre ``(auto_delete_at, id)``
+(índice parcial, ver migración p9c1l2n3u4p5) en lotes de
+``ATTACHMENT_CLEANUP_CHUNK``:
+
+1. ``select(db, after, limit)`` trae el siguiente lote (solo columnas).
+2. Los archivos (principal + variantes, vía file_storage) se borran en un pool de
+   ``ATTACHMENT_CLEANUP_WORKERS`` hilos; un archivo que ya no existe cuenta como
+   borrado, cualquier otro error deja la fila para la siguiente corrida.
+3. ``finish(db, rows)`` aplica el lote en BD con sentencias masivas (DELETE o
+   UPDATE por ``id IN``, notas de auditoría) y se hace commit por lote.
+
+El checkpoint (`checkpoint`) es la llave del último lote confirmado: si se acaba
+el presupuesto de tiempo, la tarea se re-encola desde ahí.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from itcj2.core.services import file_storage, media_service
+
+logger = logging.getLogger(__name__)
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+def _remove_files(paths: list[str]) -> int:
+    freed = 0
+    for path in paths:
+        try:
+            size = file_storage.size(path)
+        except FileNotFoundError:
+            continue
+        file_storage.delete(path)
+        freed += size
+    return freed
+
+
+def _row_paths(row) -> list[str]:
+    if not row.filepath:
+        return []
+    return [row.filepath] + media_service.variant_paths(row.filepath, row.variants)
+
+
+class PurgeRun:
+    """Una corrida de purga reanudable.
+
+    `select` devuelve filas ordenadas por ``(auto_delete_at, id)`` con al menos
+    ``id``, ``auto_delete_at``, ``filepath`` y ``variants``. `finish` recibe las
+    filas cuyos archivos ya no están. `account(row, freed_bytes)` (opcional) se
+    llama por cada fila procesada, también en ``dry_run`` (donde no se borra nada
+    y solo se mide).
+    """
+
+    def __init__(self, db, *, select, finish, account=None, after=None, dry_run: bool = False,
+                 chunk_size: int | None = None, workers: int | None = None):
+        s = _settings()
+        self.db = db
+        self.select = select
+        self.finish = finish
+        self.account = account
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size or s.ATTACHMENT_CLEANUP_CHUNK
+        self.workers = workers or s.ATTACHMENT_CLEANUP_WORKERS
+        self.after = self._parse_checkpoint(after)
+        self.purged = 0
+        self.freed_bytes = 0
+        self.errors: list[dict] = []
+        self.done = False
+
+    @staticmethod
+    def _parse_checkpoint(after):
+        if not after:
+            return None
+        stamp, last_id = after
+        if isinstance(stamp, str):
+            stamp = datetime.fromisoformat(stamp)
+        return stamp, int(last_id)
+
+    def checkpoint(self) -> list | None:
+        """Llave del último lote confirmado, serializable para Celery."""
+        if self.after is None:
+            return None
+        return [self.after[0].isoformat(), self.after[1]]
+
+    def run(self, deadline: float | None = None) -> bool:
+        """Procesa lotes hasta agotar candidatos (True) o pasar `deadline` (False)."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+                rows = self.select(self.db, self.after, self.chunk_size)
+                if not rows:
+                    break
+                self._chunk(pool, rows)
+                self.after = (rows[-1].auto_delete_at, rows[-1].id)
+                if len(rows) < self.chunk_size:
+                    break
+        self.done = True
+        return True
+
+    def _chunk(self, pool: ThreadPoolExecutor, rows: list) -> None:
+        if self.dry_run:
+            futures = [pool.submit(media_service.disk_bytes, r.filepath, r.variants) for r in rows]
+        else:
+            futures = [pool.submit(_remove_files, _row_paths(r)) for r in rows]
+
+        done = []
+        for row, fut in zip(rows, futures):
+            try:
+                freed = fut.result()
+            except Exception as e:
+                self.errors.append({"attachment_id": row.id, "error": str(e)})
+                logger.error(f"Error eliminando attachment {row.id}: {e}")
+                continue
+            done.append(row)
+            self.freed_bytes += freed
+            if self.account is not None:
+                self.account(row, freed)
+
+        if done and not self.dry_run:
+            self.finish(self.db, done)
+            self.db.commit()
+        self.purged += len(done)
@@ -0,0 +1,280 @@
+"""Backend de almacenamiento de uploads (disco local con shards, o S3 compatible).
+
+Antes cada app escribía en un solo directorio plano (``HELPDESK_UPLOAD_PATH/
+{ticket_id}.jpg``, una carpeta por ticket directamente bajo la raíz, etc.): con
+años de tickets un directorio acumula cientos de miles de entradas y
+``os.path.exists``, los listados y los respaldos se vuelven lentos.
+
+La "clave" de un archivo es lo que se guarda en BD (``filepath``,
+``document_path``):
+
+- Local: la ruta absoluta de siempre. `place` inserta un nivel de shard de 2
+  hex (sha1 del grupo, p.ej. el ticket): ``{base}/{shard}/{grupo}/{nombre}``.
+  Las filas viejas con rutas planas siguen funcionando; ``core reshard-storage``
+  las mueve en línea (ver storage_reshard.py).
+- S3 (``STORAGE_BACKEND=s3``; MinIO en desarrollo, perfil ``s3`` del compose):
+  ``s3://{bucket}/{ruta relativa a INSTANCE_PATH}``, con el mismo layout. El
+  procesamiento (Pillow, gzip) sigue siendo local: se escribe en
+  `local_target` y `publish` sube el archivo y sus variantes.
+
+`backend_for` elige el backend por la forma de la clave, así que conviven filas
+locales y de S3 durante una migración. boto3 solo se importa con S3.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+import threading
+
+logger = logging.getLogger(__name__)
+
+S3_SCHEME = "s3://"
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+def shard(group) -> str:
+    """Shard de 2 hex (256 directorios) para un grupo (ticket, folio...)."""
+    return hashlib.sha1(str(group).encode()).hexdigest()[:2]
+
+
+class StorageBackend:
+    """Interfaz común. Las claves son las que se guardan en BD."""
+
+    remote = False
+
+    def place(self, base_dir: str, group, name: str) -> str:
+        """Clave para un archivo nuevo `name` del `group` bajo `base_dir`."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def size(self, key: str) -> int:
+        """Tamaño en bytes; FileNotFoundError si no existe."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        """Borra; False si no existía."""
+        raise NotImplementedError
+
+    def open(self, key: str):
+        raise NotImplementedError
+
+    def local_target(self, key: str) -> str:
+        """Ruta local donde escribir antes de `publish`."""
+        raise NotImplementedError
+
+    def publish(self, key: str, siblings: tuple[str, ...] = ()) -> None:
+        """Hace visible `key` (y sus `siblings`, nombres en la misma carpeta)."""
+        raise NotImplementedError
+
+    def import_file(self, src: str, key: str) -> None:
+        """Copia un archivo local existente a `key` sin borrar `src`."""
+        raise NotImplementedError
+
+    def url(self, key: str, *, filename: str | None = None, disposition: str | None = None,
+            media_type: str | None = None) -> str | None:
+        """URL firmada para descarga directa (solo backends remotos)."""
+        return None
+
+    def unique(self, key: str) -> str:
+        """`key` o, si ya está ocupada, ``nombre_1.ext``, ``nombre_2.ext``..."""
+        base, ext = os.path.splitext(key)
+        candidate, counter = key, 1
+        while self.exists(candidate) or os.path.exists(self.local_target(candidate)):
+            candidate = f"{base}_{counter}{ext}"
+            counter += 1
+        return candidate
+
+
+class LocalStorage(StorageBackend):
+    def place(self, base_dir: str, group, name: str) -> str:
+        return os.path.join(base_dir, shard(group), str(group), name)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(key)
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(key)
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(key)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def open(self, key: str):
+        return open(key, "rb")
+
+    def local_target(self, key: str) -> str:
+        return key
+
+    def publish(self, key: str, siblings: tuple[str, ...] = ()) -> None:
+        return None
+
+    def import_file(self, src: str, key: str) -> None:
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        try:
+            # Mismo volumen: hard link (instantáneo, sin duplicar bytes).
+            os.link(src, key)
+        except OSError:
+            shutil.copy2(src, key)
+
+
+class S3Storage(StorageBackend):
+    remote = True
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+                    from botocore.config import Config
+
+                    s = _settings()
+                    self._client = boto3.client(
+                        "s3",
+                        endpoint_url=s.STORAGE_S3_ENDPOINT_URL or None,
+                        aws_access_key_id=s.STORAGE_S3_ACCESS_KEY or None,
+                        aws_secret_access_key=s.STORAGE_S3_SECRET_KEY or None,
+                        region_name=s.STORAGE_S3_REGION,
+                        # MinIO y la mayoría de compatibles exigen path-style.
+                        config=Config(s3={"addressing_style": "path"}),
+                    )
+        return self._client
+
+    def _object_key(self, key: str) -> str:
+        prefix = f"{S3_SCHEME}{self.bucket}/"
+        if not key.startswith(prefix):
+            raise ValueError(f"Clave fuera del bucket {self.bucket}: {key}")
+        return key[len(prefix):]
+
+    def place(self, base_dir: str, group, name: str) -> str:
+        local = LocalStorage().place(base_dir, group, name)
+        rel = os.path.relpath(local, _settings().INSTANCE_PATH).replace(os.sep, "/")
+        return f"{S3_SCHEME}{self.bucket}/{rel}"
+
+    def _head(self, key: str):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str) -> int:
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head["ContentLength"]
+
+    def delete(self, key: str) -> bool:
+        existed = self.exists(key)
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        return existed
+
+    def open(self, key: str):
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"]
+
+    def local_target(self, key: str) -> str:
+        return os.path.join(_settings().MEDIA_STAGING_PATH, "s3", self.bucket, self._object_key(key))
+
+    def _upload(self, src: str, key: str) -> None:
+        name = key[:-3] if key.endswith(".gz") else key
+        extra = {"ContentType": mimetypes.guess_type(name)[0] or "application/octet-stream"}
+        if key.endswith(".gz"):
+            extra["ContentEncoding"] = "gzip"
+        self.client.upload_file(src, self.bucket, self._object_key(key), ExtraArgs=extra)
+
+    def publish(self, key: str, siblings: tuple[str, ...] = ()) -> None:
+        folder = os.path.dirname(key)
+        for k in (key, *(f"{folder}/{n}" for n in siblings)):
+            local = self.local_target(k)
+            self._upload(local, k)
+            os.remove(local)
+
+    def import_file(self, src: str, key: str) -> None:
+        self._upload(src, key)
+
+    def url(self, key: str, *, filename: str | None = None, disposition: str | None = None,
+            media_type: str | None = None) -> str | None:
+        from itcj2.core.services.file_delivery import content_disposition
+
+        params = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if disposition and filename:
+            params["ResponseContentDisposition"] = content_disposition(disposition, filename)
+        if media_type:
+            params["ResponseContentType"] = media_type
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=_settings().STORAGE_S3_URL_TTL,
+        )
+
+
+_local = LocalStorage()
+_s3: dict[str, S3Storage] = {}
+
+
+def _s3_backend(bucket: str) -> S3Storage:
+    backend = _s3.get(bucket)
+    if backend is None:
+        backend = _s3.setdefault(bucket, S3Storage(bucket))
+    return backend
+
+
+def get_storage() -> StorageBackend:
+    """Backend para archivos NUEVOS (``STORAGE_BACKEND``)."""
+    s = _settings()
+    if s.STORAGE_BACKEND == "s3":
+        return _s3_backend(s.STORAGE_S3_BUCKET)
+    return _local
+
+
+def backend_for(key: str) -> StorageBackend:
+    """Backend dueño de una clave ya guardada."""
+    if key.startswith(S3_SCHEME):
+        return _s3_backend(key[len(S3_SCHEME):].split("/", 1)[0])
+    return _local
+
+
+def exists(key: str | None) -> bool:
+    return bool(key) and backend_for(key).exists(key)
+
+
+def size(key: str) -> int:
+    return backend_for(key).size(key)
+
+
+def delete(key: str | None) -> bool:
+    return bool(key) and backend_for(key).delete(key)
+
+
+def attachment_key(storage: StorageBackend, upload_root: str, attachment_type: str,
+                   ticket_id: int, ticket_number: str, name: str) -> str:
+    """Clave de un adjunto de ticket (mismo esquema en helpdesk y maint).
+
+    ticket → ``{raíz}/{shard}/{ticket_id}/``; resolution/comment →
+    ``{raíz}/resolutions|comments/{shard}/{ticket_number}/``.
+    """
+    if attachment_type == "resolution":
+        return storage.place(os.path.join(upload_root, "resolutions"), ticket_number, name)
+    if attachment_type == "comment":
+        return storage.place(os.path.join(upload_root, "comments"), ticket_number, name)
+    return storage.place(upload_root, ticket_id, name)
@@ -0,0 +1,414 @@
+"""Procesamiento de uploads fuera del request (cola Celery ``media``).
+
+El request solo copia el archivo crudo y responde; el decode/resize/encode de
+Pillow y el gzip de documentos corren en el worker:
+
+- Adjuntos de helpdesk/maint: el crudo va a ``MEDIA_STAGING_PATH`` y la fila se
+  crea con ``media_status='processing'`` y ``filepath`` apuntando al crudo (la
+  descarga sigue funcionando mientras tanto). El worker escribe el archivo
+  final y sus variantes en el destino local del backend (file_storage), los
+  publica (sube a S3 si aplica), actualiza la fila a ``ready`` y avisa al
+  uploader por /notify (evento ``media_ready``, vía el canal ``task_events``).
+- Prendas de VisteTec y documentos de titulatec no tienen estado: el crudo se
+  escribe ya en su ruta final y el worker lo reprocesa en su lugar.
+
+`enqueue` difiere el envío hasta el COMMIT de la sesión (el worker no debe ver
+una fila que todavía no existe); un rollback descarta los jobs pendientes y las
+reservas de sus destinos. Si la cola no está disponible o
+``MEDIA_ASYNC_ENABLED`` es False, el job corre en línea: peor latencia, pero
+nunca una fila atascada en ``processing``.
+
+El crudo de un adjunto se borra solo después del commit que deja la fila en
+``ready``: si la publicación o el commit fallan, el reintento de Celery vuelve a
+partir del crudo, y la descarga sigue sirviéndolo mientras tanto.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+from sqlalchemy import event
+
+from itcj2.core.services import file_storage, media_service
+
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = "media_jobs"
+_SWEEP_EVERY = 3600
+_last_sweep = 0.0
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+# ---------------------------------------------------------------------------
+# Lado del request
+# ---------------------------------------------------------------------------
+def stage_upload(fileobj) -> str:
+    """Copia el upload crudo al área de staging y devuelve su ruta."""
+    staging = _settings().MEDIA_STAGING_PATH
+    os.makedirs(staging, exist_ok=True)
+    path = os.path.join(staging, uuid.uuid4().hex)
+    fileobj.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(fileobj, out, 1024 * 1024)
+    return path
+
+
+def write_raw(fileobj, path: str) -> int:
+    """Copia el upload crudo directo a su ruta final (jobs en sitio)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fileobj.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(fileobj, out, 1024 * 1024)
+    return os.path.getsize(path)
+
+
+def enqueue(db, job: dict) -> None:
+    """Encola `job` cuando `db` haga commit; un rollback lo descarta."""
+    pending = db.info.setdefault(_SESSION_KEY, [])
+    # Listeners permanentes, como en el outbox de correo (sesiones reutilizadas)
+    if not pending and not event.contains(db, "after_commit", _after_commit):
+        event.listen(db, "after_commit", _after_commit)
+        event.listen(db, "after_soft_rollback", _after_soft_rollback)
+    pending.append(job)
+
+
+def enqueue_attachment(db, app: str, attachment, *, target: str, is_image: bool) -> None:
+    """Encola el procesamiento de un adjunto creado con ``filepath`` = crudo en staging.
+
+    `target` es la clave de file_storage. Hace flush para obtener el id; el
+    uploader recibe ``media_ready`` al terminar. Crea el destino local vacío como
+    reserva: los endpoints eligen nombres únicos con `StorageBackend.unique` y el
+    archivo final aún no existe.
+    """
+    local = file_storage.backend_for(target).local_target(target)
+    os.makedirs(os.path.dirname(local), exist_ok=True)
+    open(local, "a").close()
+    db.flush()
+    enqueue(db, {
+        "kind": "attachment",
+        "app": app,
+        "attachment_id": attachment.id,
+        "staged": attachment.filepath,
+        "target": target,
+        "is_image": is_image,
+        "user_id": attachment.uploaded_by_id,
+    })
+
+
+def _after_commit(session) -> None:
+    jobs = session.info.pop(_SESSION_KEY, [])
+    for job in jobs:
+        dispatch(job)
+
+
+def _after_soft_rollback(session, previous_transaction) -> None:
+    # Solo al cerrarse la transacción externa: el rollback de un SAVEPOINT no
+    # descarta los adjuntos que sí se van a commitear (si el suyo se perdió, el
+    # worker no encuentra la fila y limpia).
+    if previous_transaction.nested:
+        return
+    for job in session.info.pop(_SESSION_KEY, []):
+        if job["kind"] == "attachment":
+            _drop_reservation(job["target"])
+
+
+def _drop_reservation(target: str) -> None:
+    """Borra la reserva vacía que dejó `enqueue_attachment` (nunca un archivo con datos)."""
+    local = file_storage.backend_for(target).local_target(target)
+    try:
+        if os.path.getsize(local) == 0:
+            os.remove(local)
+    except OSError:
+        pass
+
+
+def dispatch(job: dict) -> None:
+    if _settings().MEDIA_ASYNC_ENABLED:
+        try:
+            from itcj2.tasks.media_tasks import process_media
+            process_media.apply_async(kwargs={"job": job})
+            return
+        except Exception as e:
+            logger.warning("media: no se pudo encolar %s (%s); se procesa en línea", job.get("kind"), e)
+    run_job(job)
+
+
+# ---------------------------------------------------------------------------
+# Lado del worker
+# ---------------------------------------------------------------------------
+def run_job(job: dict) -> dict:
+    kind = job["kind"]
+    if kind == "attachment":
+        result = _process_attachment(job)
+    elif kind == "garment":
+        result = _process_in_place(job["path"])
+    elif kind == "titulatec":
+        result = _process_titulatec(job)
+    else:
+        raise ValueError(f"media: tipo de job desconocido: {kind}")
+    _maybe_sweep_staging()
+    return result
+
+
+def _attachment_model(app: str):
+    if app == "helpdesk":
+        from itcj2.apps.helpdesk.models.attachment import Attachment
+        return Attachment
+    if app == "maint":
+        from itcj2.apps.maint.models.attachment import MaintAttachment
+        return MaintAttachment
+    raise ValueError(f"media: app desconocida: {app}")
+
+
+def _process_attachment(job: dict) -> dict:
+    from itcj2.database import SessionLocal
+
+    staged, target = job["staged"], job["target"]
+    backend = file_storage.backend_for(target)
+    local = backend.local_target(target)
+    model = _attachment_model(job["app"])
+
+    with SessionLocal() as db:
+        att = db.get(model, job["attachment_id"])
+        if att is None or att.filepath != staged:
+            # Borrado (o ya procesado) mientras esperaba en la cola.
+            for path in (staged, local):
+                if os.path.exists(path) and (path == staged or os.path.getsize(path) == 0):
+                    os.remove(path)
+            return {"attachment_id": job["attachment_id"], "status": "skipped"}
+
+        if os.path.exists(staged):
+            target, size, mime, variants = _publish(job, att, staged, target, local)
+        else:
+            # Sin crudo pero la fila sigue en processing: un intento anterior
+            # publicó y falló antes de terminar. Se completa la fila desde lo publicado.
+            published = _published(backend, target, job["is_image"])
+            if published is None:
+                raise FileNotFoundError(f"media: crudo {staged} perdido y {target} sin publicar")
+            target, size, mime, variants = published
+            mime = mime or att.mime_type
+
+        att.filepath = target
+        att.filename = os.path.basename(target)
+        att.file_size = size
+        att.mime_type = mime
+        att.variants = variants
+        att.media_status = "ready"
+        db.commit()
+        ticket_id = att.ticket_id
+
+    # La fila ya no apunta al crudo: recién ahora se puede borrar.
+    _remove_quietly(staged)
+    _notify_ready(job, ticket_id)
+    return {"attachment_id": job["attachment_id"], "status": "ready", "bytes": size}
+
+
+def _publish(job: dict, att, staged: str, target: str, local: str):
+    """Escribe el archivo final (y variantes) desde el crudo, sin tocarlo, y lo publica."""
+    backend = file_storage.backend_for(target)
+    variants = None
+    mime = att.mime_type
+    if job["is_image"]:
+        try:
+            size, variants = media_service.save_image_variants(staged, local)
+            mime = "image/jpeg"
+        except Exception as e:
+            # Como antes en el request: si no se pudo recomprimir, queda el original.
+            logger.warning("media: no se pudo procesar imagen %s/%s (%s); se guarda el original",
+                           job["app"], att.id, e)
+            _copy_staged(staged, local)
+            size = os.path.getsize(local)
+    else:
+        stored, size = _store_document(staged, local)
+        target += stored[len(local):]  # ".gz" si se comprimió
+        local = stored
+
+    backend.publish(target, siblings=tuple(
+        os.path.basename(p) for p in media_service.variant_paths(local, variants)))
+    return target, size, mime, variants
+
+
+def _published(backend, target: str, is_image: bool):
+    """(clave, tamaño, mime, variantes) de lo que ya quedó publicado, o None.
+
+    La reserva vacía de `enqueue_attachment` no cuenta como publicada. El tamaño
+    de un ``.gz`` es el almacenado (el lógico se perdió con el crudo).
+    """
+    for key in (target,) if is_image else (target, target + ".gz"):
+        if backend.exists(key) and backend.size(key) > 0:
+            if not is_image:
+                return key, backend.size(key), None, None
+            variants = media_service.sibling_variants(key, exists=backend.exists)
+            return key, backend.size(key), "image/jpeg", variants or None
+    return None
+
+
+def _copy_staged(staged: str, target: str) -> None:
+    """Copia el crudo a `target` (hard link si están en el mismo volumen)."""
+    if os.path.exists(target):
+        os.remove(target)  # reserva vacía de enqueue_attachment
+    try:
+        os.link(staged, target)
+    except OSError:
+        shutil.copyfile(staged, target)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _store_document(staged: str, target: str) -> tuple[str, int]:
+    """Escribe el documento en su ruta final. Devuelve (ruta final, tamaño lógico).
+
+    gzip transparente: se guarda como ``.gz`` solo si reduce tamaño (PDF/Office
+    ya vienen comprimidos y se dejan tal cual); la descarga lo descomprime. El
+    crudo se conserva: lo borra quien llama tras el commit.
+    """
+    with open(staged, "rb") as fh:
+        raw = fh.read()
+    gz = gzip.compress(raw, compresslevel=6)
+    if len(gz) < len(raw):
+        if os.path.exists(target):
+            os.remove(target)  # reserva vacía de enqueue_attachment
+        target += ".gz"
+        with open(target, "wb") as out:
+            out.write(gz)
+    else:
+        _copy_staged(staged, target)
+    return target, len(raw)
+
+
+def _replace_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _process_in_place(path: str) -> dict:
+    """Prenda: el crudo ya está en `path`; se recomprime y se generan variantes."""
+    if not os.path.exists(path):
+        return {"path": path, "status": "skipped"}
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    # save_image_variants escribe el JPEG principal sobre `path`: se lee antes.
+    try:
+        size, _ = media_service.save_image_variants(raw, path)
+    except Exception as e:
+        logger.warning("media: no se pudo procesar %s (%s); se conserva el original", path, e)
+        _replace_atomic(path, raw)
+        return {"path": path, "status": "skipped"}
+    return {"path": path, "status": "ready", "bytes": size}
+
+
+def _process_titulatec(job: dict) -> dict:
+    from itcj2.apps.titulatec.models import Document
+    from itcj2.apps.titulatec.utils import storage
+    from itcj2.database import SessionLocal
+
+    path = job["path"]
+    if not os.path.exists(path):
+        return {"path": path, "status": "skipped"}
+    try:
+        with open(path, "rb") as fh:
+            data, _ = storage.compress_image(fh.read(), job["ext"])
+    except Exception as e:
+        # Como antes en el request: si Pillow no puede, queda el original.
+        logger.warning("media: no se pudo comprimir %s (%s); se conserva el original", path, e)
+        return {"path": path, "status": "skipped"}
+    _replace_atomic(path, data)
+
+    with SessionLocal() as db:
+        doc = db.get(Document, job["document_id"])
+        if doc is not None and doc.file_path == job["file_path"]:
+            doc.size_bytes = len(data)
+            db.commit()
+    return {"path": path, "status": "ready", "bytes": len(data)}
+
+
+def _notify_ready(job: dict, ticket_id: int) -> None:
+    """Avisa al uploader por /notify (lo retransmite el proceso de sockets)."""
+    if not job.get("user_id"):
+        return
+    try:
+        import redis
+        r = redis.from_url(_settings().REDIS_URL)
+        r.publish("task_events", json.dumps({
+            "type": "media_ready",
+            "user_id": job["user_id"],
+            "app": job["app"],
+            "attachment_id": job["attachment_id"],
+            "ticket_id": ticket_id,
+            "ts": time.time(),
+        }))
+    except Exception as e:
+        logger.warning("media: no se pudo publicar media_ready (%s)", e)
+
+
+def _maybe_sweep_staging() -> None:
+    """Borra crudos huérfanos (request que hizo rollback tras stage_upload).
+
+    La edad sola no alcanza: un crudo que sigue siendo el ``filepath`` de un
+    adjunto en ``processing`` (job en cola o reintentando) se deja, o el job
+    fallaría para siempre al no encontrarlo.
+    """
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < _SWEEP_EVERY:
+        return
+    _last_sweep = now
+    staging = _settings().MEDIA_STAGING_PATH
+    try:
+        entries = list(os.scandir(staging))
+    except FileNotFoundError:
+        return
+    cutoff = now - 24 * 3600
+    old = []
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                old.append(entry.path)
+        except OSError:
+            pass
+    if not old:
+        return
+    try:
+        in_use = _staged_in_use(old)
+    except Exception as e:
+        logger.warning("media: no se pudo verificar el staging en uso (%s); se omite el barrido", e)
+        return
+    for path in old:
+        if path in in_use:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _staged_in_use(paths: list[str]) -> set[str]:
+    """De `paths`, los que aún son el crudo de un adjunto en ``processing``."""
+    from sqlalchemy import select
+    from itcj2.database import SessionLocal
+
+    in_use = set()
+    with SessionLocal() as db:
+        for app in ("helpdesk", "maint"):
+            model = _attachment_model(app)
+            in_use.update(db.scalars(
+                select(model.filepath)
+                .where(model.media_status == "processing", model.filepath.in_(paths))
+            ))
+    return in_use
@@ -0,0 +1,234 @@
+"""Pipeline compartido de imágenes subidas: decodifica una vez, variantes por tamaño.
+
+Antes cada app recomprimía por su cuenta (helpdesk, maint, vistetec,
+titulatec) a un único JPEG de hasta 1920px, y las tarjetas de ticket y el
+catálogo de VisteTec bajaban esa imagen completa para pintar miniaturas de
+80-200px. Aquí:
+
+- `open_image` decodifica con ``draft()`` (el decodificador JPEG reduce por
+  potencias de 2 al leer, sin materializar los 12 MP de una foto de celular),
+  aplica la orientación EXIF y aplana transparencia sobre blanco.
+- `save_image_variants` escribe el JPEG "full" en la ruta de siempre (lo que
+  apunta ``filepath`` en BD, así descargas y limpiezas existentes no cambian)
+  y al lado las variantes ``thumb``/``medium``/``full`` en WebP, más el JPEG de
+  respaldo de cada tamaño. Cada tamaño se reduce desde el anterior, no desde el
+  original. Devuelve un manifiesto para guardar en la fila (columna
+  ``variants``) con nombres relativos a la carpeta del archivo principal.
+- `variant_response` sirve ``?size=thumb|medium|full`` eligiendo WebP si el
+  navegador lo acepta, con caché larga: el contenido de un adjunto no cambia
+  (una foto nueva es otra fila/otra ruta).
+
+Filas viejas sin manifiesto: cualquier ``size`` sirve el archivo principal.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import math
+import os
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# (nombre, lado mayor en px), de mayor a menor.
+VARIANT_SIZES: tuple[tuple[str, int], ...] = (("full", 1920), ("medium", 960), ("thumb", 320))
+VARIANT_NAMES = tuple(name for name, _ in VARIANT_SIZES)
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# El adjunto es privado (requiere sesión) pero inmutable para su URL.
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+NO_CACHE = "private, no-cache"
+
+_MIME = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+
+def open_image(src, max_dim: int = VARIANT_SIZES[0][1], flatten: bool = True) -> Image.Image:
+    """Abre `src` (ruta, bytes o file-like) listo para recodificar: orientado y ≤ `max_dim`.
+
+    Con `flatten` (default) además queda en RGB con la transparencia sobre blanco;
+    sin él se conserva el modo original (PNG/WebP que se guardan como tales).
+    """
+    if isinstance(src, (bytes, bytearray)):
+        src = io.BytesIO(src)
+    img = Image.open(src)
+    # Solo JPEG implementa draft (en otros formatos es no-op). Se pide el tamaño
+    # final con la proporción real: con una caja cuadrada el lado corto manda y
+    # una foto 4:3 no se reduciría.
+    ratio = max_dim / max(img.size)
+    if ratio < 1:
+        img.draft("RGB", (math.ceil(img.width * ratio), math.ceil(img.height * ratio)))
+    img = ImageOps.exif_transpose(img)
+
+    if not flatten:
+        pass
+    elif img.mode in ("RGBA", "LA", "P"):
+        if img.mode == "P":
+            img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    if img.width > max_dim or img.height > max_dim:
+        img.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+    return img
+
+
+def encode(img: Image.Image, fmt: str) -> bytes:
+    out = io.BytesIO()
+    if fmt == "webp":
+        img.save(out, format="WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        img.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def compress_to_jpeg(src, max_dim: int = VARIANT_SIZES[0][1]) -> bytes:
+    """Un solo JPEG (para quien no guarda variantes)."""
+    return encode(open_image(src, max_dim), "jpg")
+
+
+def save_image_variants(src, filepath: str) -> tuple[int, dict]:
+    """Guarda el JPEG principal en `filepath` y sus variantes al lado.
+
+    Returns:
+        (tamaño en bytes del JPEG principal, manifiesto de variantes)
+
+    El manifiesto tiene la forma
+    ``{"thumb": {"w": 320, "h": 240, "webp": "x.thumb.webp", "jpg": "x.thumb.jpg"}, ...}``.
+    Si la imagen ya es más chica que un tamaño, ese tamaño reutiliza los archivos
+    del anterior en vez de duplicarlos.
+    """
+    folder = os.path.dirname(filepath)
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    img = open_image(src)
+
+    manifest: dict[str, dict] = {}
+    written: list[str] = []
+    prev = None
+    try:
+        for name, dim in VARIANT_SIZES:
+            if prev is not None and max(img.size) <= dim:
+                manifest[name] = dict(manifest[prev])
+                continue
+            if img.width > dim or img.height > dim:
+                img = img.copy()
+                img.thumbnail((dim, dim), Image.Resampling.LANCZOS)
+
+            files = {
+                "webp": f"{stem}.{name}.webp",
+                "jpg": os.path.basename(filepath) if name == "full" else f"{stem}.{name}.jpg",
+            }
+            for fmt, fname in files.items():
+                path = os.path.join(folder, fname)
+                with open(path, "wb") as f:
+                    f.write(encode(img, fmt))
+                written.append(path)
+            manifest[name] = {"w": img.width, "h": img.height, **files}
+            prev = name
+    except Exception:
+        for path in written:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise
+
+    return os.path.getsize(filepath), manifest
+
+
+def sibling_variants(filepath: str, exists=os.path.exists) -> dict:
+    """Reconstruye el manifiesto desde disco, para quien no lo guarda en BD.
+
+    Busca ``{stem}.{tamaño}.{webp,jpg}`` junto a `filepath`; un tamaño que no se
+    generó (imagen original más chica) cae al siguiente más grande. `exists`
+    permite buscar en otro backend (p.ej. ``file_storage.exists`` para S3).
+    """
+    folder = os.path.dirname(filepath)
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    manifest: dict[str, dict] = {}
+    prev = None
+    for name in VARIANT_NAMES:
+        entry = {
+            fmt: f"{stem}.{name}.{fmt}"
+            for fmt in _MIME
+            if exists(os.path.join(folder, f"{stem}.{name}.{fmt}"))
+        }
+        if name == "full":
+            entry["jpg"] = os.path.basename(filepath)
+        if entry.get("webp") or entry.get("jpg"):
+            entry.setdefault("jpg", manifest[prev]["jpg"] if prev else os.path.basename(filepath))
+            manifest[name] = entry
+            prev = name
+        elif prev:
+            manifest[name] = dict(manifest[prev])
+    return manifest
+
+
+def variant_paths(filepath: str | None, variants: dict | None) -> list[str]:
+    """Rutas absolutas de las variantes (sin el archivo principal)."""
+    if not filepath or not variants:
+        return []
+    folder = os.path.dirname(filepath)
+    main = os.path.basename(filepath)
+    names = {
+        v[fmt] for v in variants.values() for fmt in _MIME if v.get(fmt) and v[fmt] != main
+    }
+    return [os.path.join(folder, n) for n in sorted(names)]
+
+
+def disk_bytes(filepath: str | None, variants: dict | None) -> int:
+    """Bytes almacenados del archivo principal más sus variantes."""
+    from itcj2.core.services import file_storage
+
+    total = 0
+    for path in ([filepath] if filepath else []) + variant_paths(filepath, variants):
+        try:
+            total += file_storage.size(path)
+        except OSError:
+            pass
+    return total
+
+
+def remove_variants(filepath: str | None, variants: dict | None) -> None:
+    """Borra las variantes del disco. El archivo principal lo borra quien llama."""
+    from itcj2.core.services import file_storage
+
+    for path in variant_paths(filepath, variants):
+        try:
+            file_storage.delete(path)
+        except OSError as e:
+            logger.warning("No se pudo eliminar la variante %s: %s", path, e)
+
+
+def pick_variant(filepath: str, variants: dict | None, size: str, accept: str | None) -> tuple[str, str | None]:
+    """(ruta, mime) de la variante `size`; WebP si `accept` lo admite."""
+    entry = (variants or {}).get(size)
+    if not entry:
+        return filepath, None
+    fmt = "webp" if accept and "image/webp" in accept and entry.get("webp") else "jpg"
+    return os.path.join(os.path.dirname(filepath), entry[fmt]), _MIME[fmt]
+
+
+def variant_response(request, filepath: str, variants: dict | None, size: str, fallback_mime: str | None = None):
+    """Respuesta inline de la variante pedida con caché larga (vía file_delivery).
+
+    Sin variante (upload aún en la cola ``media`` o fila previa al pipeline) se
+    sirve el archivo principal con ``no-cache``: la misma URL pasará a servir la
+    variante cuando el worker termine.
+    """
+    from itcj2.core.services import file_delivery, file_storage
+
+    path, mime = pick_variant(filepath, variants, size, request.headers.get("accept"))
+    if not file_storage.exists(path):
+        path, mime = filepath, None
+    return file_delivery.send_file(
+        request, path,
+        media_type=mime or fallback_mime,
+        disposition=None,
+        headers={"Cache-Control": CACHE_CONTROL if mime else NO_CACHE, "Vary": "Accept"},
+    )
@@ -0,0 +1,357 @@
+"""Métricas estilo Prometheus agregadas entre procesos vía Redis.
+
+Hasta ahora la saturación de la pool se averiguaba con `grep QueuePool` y
+`tools/loadtest/sampler.py` dentro del contenedor. Este módulo expone en
+`GET /metrics` (formato de texto de Prometheus) lo que hace falta para verlo:
+
+    itcj_http_request_duration_seconds   histograma por método/ruta/clase de status
+    itcj_db_pool_checkout_seconds        espera para obtener conexión de la pool
+    itcj_db_pool_checked_out             gauge por proceso (también overflow/size)
+    itcj_redis_command_seconds           latencia de comandos Redis (cliente síncrono)
+    itcj_socketio_connections            sockets por namespace (proceso de sockets)
+    itcj_socketio_rooms / _room_members_max   cuartos por tipo de cuarto
+    itcj_task_events_relay_lag_seconds   publicado por Celery → retransmitido
+    itcj_celery_task_duration_seconds    duración de tareas LoggedTask
+    itcj_office_conversion_seconds       conversiones a PDF (core/services/office_converter)
+    itcj_email_messages_total            correos del outbox por app y resultado (sent/retry/failed)
+    itcj_email_batch_seconds             llamadas a Graph /$batch por app
+
+Diseño (multiproceso y barato en el hot path):
+- Cada proceso (4 workers uvicorn, sockets, workers de Celery) acumula en un
+  registro en memoria: un lock + suma a un dict por observación.
+- Un hilo daemon por proceso vuelca ese registro a Redis cada
+  ``METRICS_FLUSH_SECONDS`` con un pipeline de HINCRBYFLOAT, y antes toma las
+  muestras de los gauges registrados (pool, Socket.IO).
+- `render()` lee Redis y arma la exposición. Los contadores/histogramas son
+  sumas globales; los gauges llevan la etiqueta ``pid`` y se descartan si su
+  proceso no los refrescó en 3 intervalos (worker muerto o reciclado).
+
+No se usa `prometheus_client`: no está en requirements y su modo multiproceso
+necesita un directorio mmap compartido, que no existe entre contenedores
+(backend, sockets y celery viven en contenedores distintos). Redis sí.
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "metrics:v1"
+
+# Buckets en segundos.
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+_TASK_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+# name -> (type, help, buckets)
+METRICS: dict[str, tuple[str, str, tuple | None]] = {
+    "itcj_http_request_duration_seconds": (
+        "histogram", "Duración de requests HTTP por ruta.", _LATENCY_BUCKETS),
+    "itcj_db_pool_checkout_seconds": (
+        "histogram", "Tiempo para obtener una conexión de la pool de SQLAlchemy.", _FAST_BUCKETS),
+    "itcj_db_pool_checked_out": (
+        "gauge", "Conexiones de la pool prestadas en este momento.", None),
+    "itcj_db_pool_overflow": (
+        "gauge", "Conexiones por encima de pool_size (negativo = huecos libres).", None),
+    "itcj_db_pool_size": (
+        "gauge", "pool_size configurado.", None),
+    "itcj_redis_command_seconds": (
+        "histogram", "Latencia de comandos Redis del cliente síncrono compartido.", _FAST_BUCKETS),
+    "itcj_socketio_connections": (
+        "gauge", "Sockets conectados por namespace.", None),
+    "itcj_socketio_rooms": (
+        "gauge", "Cuartos abiertos por namespace y tipo de cuarto.", None),
+    "itcj_socketio_room_members_max": (
+        "gauge", "Miembros del cuarto más poblado por namespace y tipo.", None),
+    "itcj_task_events_relay_lag_seconds": (
+        "histogram", "Retraso entre publicar en task_events y retransmitir por Socket.IO.", _LATENCY_BUCKETS),
+    "itcj_celery_task_duration_seconds": (
+        "histogram", "Duración de tareas Celery (LoggedTask).", _TASK_BUCKETS),
+    "itcj_office_conversion_seconds": (
+        "histogram", "Conversión a PDF con el pool de LibreOffice (espera + conversión).", _LATENCY_BUCKETS),
+    "itcj_email_messages_total": (
+        "counter", "Correos procesados por el drenado del outbox, por app y resultado.", None),
+    "itcj_email_batch_seconds": (
+        "histogram", "Duración de las llamadas a Graph /$batch del outbox de correo.", _LATENCY_BUCKETS),
+}
+
+
+# ---------------------------------------------------------------------------
+# Registro en memoria del proceso
+# ---------------------------------------------------------------------------
+_lock = threading.Lock()
+_values: dict[tuple[str, str], float] = {}        # (name, field) -> delta
+_samplers: list[Callable[[], Iterable[tuple[str, dict, float]]]] = []
+_flusher_pid: int | None = None
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+
+
+def _enabled() -> bool:
+    from itcj2.config import get_settings
+    return get_settings().METRICS_ENABLED
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Registra una observación de histograma."""
+    if not _enabled():
+        return
+    buckets = METRICS[name][2]
+    lbl = _labels(labels)
+    idx = bisect.bisect_left(buckets, value)
+    bucket = f"{buckets[idx]}" if idx < len(buckets) else "+Inf"
+    with _lock:
+        for field, delta in ((f"{lbl}|le={bucket}", 1), (f"{lbl}|sum", value), (f"{lbl}|count", 1)):
+            key = (name, field)
+            _values[key] = _values.get(key, 0) + delta
+    _ensure_flusher()
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """Suma a un contador."""
+    if not _enabled():
+        return
+    key = (name, f"{_labels(labels)}|total")
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+    _ensure_flusher()
+
+
+def register_sampler(fn: Callable[[], Iterable[tuple[str, dict, float]]]) -> None:
+    """Registra una función que devuelve gauges ``(name, labels, value)`` al volcar."""
+    if not _enabled():
+        return
+    _samplers.append(fn)
+    _ensure_flusher()
+
+
+# ---------------------------------------------------------------------------
+# Volcado a Redis
+# ---------------------------------------------------------------------------
+def _flush_redis():
+    # Cliente sin instrumentar (misma pool): si no, cada volcado mediría sus
+    # propios HINCRBYFLOAT en itcj_redis_command_seconds.
+    import redis
+
+    from itcj2.core.utils.redis_conn import get_redis
+    return redis.Redis(connection_pool=get_redis().connection_pool)
+
+
+def flush(r=None) -> None:
+    """Vuelca lo acumulado y los gauges del proceso. Fail-open."""
+    with _lock:
+        data = dict(_values)
+        _values.clear()
+
+    gauges = []
+    for fn in list(_samplers):
+        try:
+            gauges.extend(fn())
+        except Exception as e:
+            logger.debug("metrics: sampler %r falló (%s)", fn, e)
+
+    if not data and not gauges:
+        return
+    try:
+        r = r or _flush_redis()
+        pipe = r.pipeline(transaction=False)
+        for (name, field), delta in data.items():
+            pipe.hincrbyfloat(f"{_PREFIX}:{name}", field, delta)
+        now = int(time.time())
+        pid = os.getpid()
+        for name, labels, value in gauges:
+            pipe.hset(f"{_PREFIX}:{name}", _labels({**labels, "pid": pid}), f"{value}|{now}")
+        pipe.execute()
+    except Exception as e:
+        # Se pierde este intervalo; reinyectarlo crecería sin límite si Redis no vuelve.
+        logger.warning("metrics: no se pudo volcar a Redis (%s)", e)
+
+
+def _flush_loop(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        flush()
+
+
+def _ensure_flusher() -> None:
+    """Arranca (una vez por proceso) el hilo que vuelca a Redis.
+
+    Se compara el pid porque los workers prefork de Celery heredan el módulo
+    ya importado del padre, pero no sus hilos.
+    """
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+    from itcj2.config import get_settings
+    interval = get_settings().METRICS_FLUSH_SECONDS
+    threading.Thread(target=_flush_loop, args=(interval,), name="metrics-flush", daemon=True).start()
+
+
+# ---------------------------------------------------------------------------
+# Exposición
+# ---------------------------------------------------------------------------
+def _split(field: str) -> tuple[str, str]:
+    lbl, _, suffix = field.rpartition("|")
+    return lbl, suffix
+
+
+def _join(*parts: str) -> str:
+    inner = ",".join(p for p in parts if p)
+    return f"{{{inner}}}" if inner else ""
+
+
+def render(r=None) -> str:
+    """Texto en formato de exposición de Prometheus con el agregado de Redis."""
+    from itcj2.config import get_settings
+
+    r = r or _flush_redis()
+    pipe = r.pipeline(transaction=False)
+    for name in METRICS:
+        pipe.hgetall(f"{_PREFIX}:{name}")
+    stale_before = time.time() - 3 * get_settings().METRICS_FLUSH_SECONDS
+
+    out: list[str] = []
+    for (name, (mtype, help_text, buckets)), raw in zip(METRICS.items(), pipe.execute()):
+        fields = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in raw.items()
+        }
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {mtype}")
+
+        if mtype == "gauge":
+            for lbl, packed in sorted(fields.items()):
+                value, _, ts = packed.partition("|")
+                if ts and int(ts) < stale_before:
+                    continue
+                out.append(f"{name}{_join(lbl)} {value}")
+            continue
+
+        if mtype == "counter":
+            for field, v in sorted(fields.items()):
+                out.append(f"{name}{_join(_split(field)[0])} {float(v):g}")
+            continue
+
+        series: dict[str, dict[str, float]] = {}
+        for field, v in fields.items():
+            lbl, suffix = _split(field)
+            series.setdefault(lbl, {})[suffix] = float(v)
+        for lbl in sorted(series):
+            s = series[lbl]
+            cumulative = 0.0
+            for b in (*buckets, "+Inf"):
+                cumulative += s.get(f"le={b}", 0.0)
+                out.append(f"{name}_bucket{_join(lbl, _labels({'le': b}))} {cumulative:g}")
+            out.append(f"{name}_sum{_join(lbl)} {s.get('sum', 0.0):g}")
+            out.append(f"{name}_count{_join(lbl)} {s.get('count', 0.0):g}")
+
+    return "\n".join(out) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Instrumentación
+# ---------------------------------------------------------------------------
+def instrument_engine(engine) -> None:
+    """Tiempo de checkout y gauges de la pool de `engine` (por proceso)."""
+    pool = engine.pool
+    original_connect = pool.connect
+
+    def timed_connect():
+        t0 = time.perf_counter()
+        try:
+            return original_connect()
+        finally:
+            observe("itcj_db_pool_checkout_seconds", time.perf_counter() - t0)
+
+    pool.connect = timed_connect
+
+    def sample():
+        p = engine.pool
+        return [
+            ("itcj_db_pool_checked_out", {}, p.checkedout()),
+            ("itcj_db_pool_overflow", {}, p.overflow()),
+            ("itcj_db_pool_size", {}, p.size()),
+        ]
+
+    register_sampler(sample)
+
+
+_ROOM_ID_RE = re.compile(r"\d{4}-\d{2}-\d{2}|\d+")
+
+
+def _room_kind(room: str) -> str:
+    """Nombre del cuarto sin ids ni fechas: acota la cardinalidad de etiquetas."""
+    return _ROOM_ID_RE.sub("*", room)
+
+
+def instrument_socketio(sio) -> None:
+    """Conexiones por namespace y tamaño de cuartos (solo proceso de sockets)."""
+    def sample():
+        rows = []
+        rooms_by_ns = dict(sio.manager.rooms)
+        for ns, rooms in rooms_by_ns.items():
+            rooms = dict(rooms)
+            rows.append(("itcj_socketio_connections", {"namespace": ns}, len(rooms.get(None, ()))))
+            kinds: dict[str, list[int]] = {}
+            for room, members in rooms.items():
+                if room is None:
+                    continue
+                kinds.setdefault(_room_kind(str(room)), []).append(len(members))
+            for kind, sizes in kinds.items():
+                labels = {"namespace": ns, "room": kind}
+                rows.append(("itcj_socketio_rooms", labels, len(sizes)))
+                rows.append(("itcj_socketio_room_members_max", labels, max(sizes)))
+        return rows
+
+    register_sampler(sample)
+
+
+# ---------------------------------------------------------------------------
+# Middleware HTTP
+# ---------------------------------------------------------------------------
+class MetricsMiddleware:
+    """ASGI puro: histograma de duración por ruta (plantilla, no path crudo)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+        t0 = time.perf_counter()
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "<sin ruta>"
+            observe(
+                "itcj_http_request_duration_seconds",
+                time.perf_counter() - t0,
+                method=scope.get("method", ""),
+                route=route,
+                status=f"{status['code'] // 100}xx",
+            )
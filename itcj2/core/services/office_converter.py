@@ -0,0 +1,287 @@
+"""Conversión DOCX/XLSX → PDF con un pool de LibreOffice residentes.
+
+Antes cada documento lanzaba un ``libreoffice --headless --convert-to pdf`` en
+frío (perfil nuevo en un tempdir, ~2-4 s de arranque) y los lotes de helpdesk lo
+hacían en serie: 50 tickets "combinado" = 100 arranques.
+
+Ahora cada proceso (worker uvicorn o hijo de Celery) mantiene, bajo demanda,
+hasta ``OFFICE_CONVERTER_POOL_SIZE`` slots:
+
+- Modo UNO (producción): cada slot es un ``office_daemon.py`` ejecutado con
+  ``OFFICE_UNO_PYTHON``, que mantiene un soffice vivo y convierte por UNO; se
+  le habla por XML-RPC en loopback. Se recicla tras
+  ``OFFICE_CONVERTER_MAX_JOBS`` conversiones (fugas de memoria de soffice) o
+  ante cualquier error/timeout.
+- Modo CLI (sin python3-uno, p.ej. desarrollo): el ``--convert-to`` de siempre,
+  pero con un perfil persistente por slot (se ahorra la creación del perfil y
+  permite varias conversiones en paralelo sin pisarse el lock).
+
+`convert_many` reparte un lote entre los slots; los slots se toman LIFO, así
+que con poca carga solo arranca un soffice.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_DAEMON = str(Path(__file__).with_name("office_daemon.py"))
+
+
+class ConversionError(RuntimeError):
+    pass
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+def find_soffice() -> str | None:
+    for cmd in ['libreoffice', 'soffice']:
+        if shutil.which(cmd):
+            return cmd
+
+    win_paths = [
+        r'C:\Program Files\LibreOffice\program\soffice.exe',
+        r'C:\Program Files (x86)\LibreOffice\program\soffice.exe',
+    ]
+    for path in win_paths:
+        if os.path.exists(path):
+            return path
+
+    return None
+
+
+@lru_cache(maxsize=1)
+def _uno_python() -> str | None:
+    """Intérprete con ``uno`` disponible, o None (→ modo CLI)."""
+    python = _settings().OFFICE_UNO_PYTHON
+    if not python or not os.path.exists(python):
+        return None
+    try:
+        ok = subprocess.run([python, "-c", "import uno"], capture_output=True, timeout=15).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        ok = False
+    if not ok:
+        logger.info("office_converter: %s no tiene uno; se usa el modo CLI", python)
+    return python if ok else None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _Transport(xmlrpc.client.Transport):
+    def __init__(self, timeout: float):
+        super().__init__()
+        self._timeout = timeout
+
+    def make_connection(self, host):
+        conn = super().make_connection(host)
+        conn.timeout = self._timeout
+        return conn
+
+
+class _Slot:
+    """Un soffice del pool (daemon UNO o perfil persistente para CLI)."""
+
+    def __init__(self, index: int, soffice: str, uno_python: str | None):
+        self.index = index
+        self.soffice = soffice
+        self.uno_python = uno_python
+        self.jobs = 0
+        self.generation = 0
+        self.proc: subprocess.Popen | None = None
+        self.proxy: xmlrpc.client.ServerProxy | None = None
+        self.profile = Path(tempfile.gettempdir()) / f"itcj-lo-{os.getpid()}-{index}"
+
+    # -- ciclo de vida (solo modo UNO) ------------------------------------
+    def _start(self, timeout: float) -> None:
+        self.generation += 1
+        # Perfil nuevo por generación: un soffice huérfano con el mismo perfil
+        # absorbería el arranque del siguiente.
+        profile = self.profile.with_name(f"{self.profile.name}-{self.generation}")
+        port, uno_port = _free_port(), _free_port()
+        self.proc = subprocess.Popen(
+            [self.uno_python, _DAEMON, "--port", str(port), "--uno-port", str(uno_port),
+             "--soffice", self.soffice, "--profile", profile.as_uri()],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+        )
+        self.proxy = xmlrpc.client.ServerProxy(
+            f"http://127.0.0.1:{port}/", transport=_Transport(timeout), allow_none=True)
+        probe = xmlrpc.client.ServerProxy(f"http://127.0.0.1:{port}/", transport=_Transport(2))
+        deadline = time.monotonic() + 45
+        while True:
+            try:
+                probe.ping()
+                break
+            except (OSError, xmlrpc.client.Error):
+                if self.proc.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise ConversionError("No se pudo iniciar LibreOffice")
+                time.sleep(0.2)
+        self.jobs = 0
+        logger.info("office_converter: slot %s listo (pid %s)", self.index, self.proc.pid)
+
+    def stop(self) -> None:
+        if self.proc is not None:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=5)
+            except Exception:
+                self.proc.kill()
+            shutil.rmtree(self.profile.with_name(f"{self.profile.name}-{self.generation}"),
+                          ignore_errors=True)
+        self.proc = None
+        self.proxy = None
+
+    # -- conversión -------------------------------------------------------
+    def convert(self, data: bytes, ext: str, timeout: float) -> bytes:
+        if not self.uno_python:
+            return self._convert_cli(data, ext, timeout)
+
+        if self.proc is None or self.proc.poll() is not None:
+            self._start(timeout)
+        try:
+            pdf = self.proxy.convert(xmlrpc.client.Binary(data), ext).data
+        except Exception as e:
+            self.stop()
+            raise ConversionError(f"Error al convertir a PDF: {e}") from e
+        self.jobs += 1
+        if self.jobs >= _settings().OFFICE_CONVERTER_MAX_JOBS:
+            self.stop()
+        return pdf
+
+    def _convert_cli(self, data: bytes, ext: str, timeout: float) -> bytes:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            src = os.path.join(tmpdir, f'document.{ext}')
+            with open(src, 'wb') as f:
+                f.write(data)
+            try:
+                result = subprocess.run(
+                    [self.soffice, f'-env:UserInstallation={self.profile.as_uri()}',
+                     '--headless', '--convert-to', 'pdf', '--outdir', tmpdir, src],
+                    capture_output=True, text=True, timeout=timeout,
+                )
+            except subprocess.TimeoutExpired:
+                raise ConversionError('LibreOffice excedió el tiempo de conversión')
+            if result.returncode != 0:
+                logger.error(f'LibreOffice error: {result.stderr}')
+                raise ConversionError(f'Error al convertir a PDF: {result.stderr}')
+            pdf_path = os.path.join(tmpdir, 'document.pdf')
+            if not os.path.exists(pdf_path):
+                raise ConversionError('No se generó el archivo PDF')
+            with open(pdf_path, 'rb') as f:
+                return f.read()
+
+
+class _Pool:
+    def __init__(self, size: int, soffice: str, uno_python: str | None):
+        self.size = size
+        self.slots = [_Slot(i, soffice, uno_python) for i in range(size)]
+        self._free: queue.LifoQueue[_Slot] = queue.LifoQueue()
+        for slot in reversed(self.slots):
+            self._free.put(slot)
+
+    def convert(self, data: bytes, ext: str) -> bytes:
+        from itcj2.core.services import metrics
+
+        timeout = _settings().OFFICE_CONVERTER_TIMEOUT
+        try:
+            slot = self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise ConversionError('No hay conversores de LibreOffice libres')
+        started = time.perf_counter()
+        try:
+            return slot.convert(data, ext, timeout)
+        finally:
+            self._free.put(slot)
+            metrics.observe("itcj_office_conversion_seconds", time.perf_counter() - started,
+                            mode="uno" if slot.uno_python else "cli")
+
+    def shutdown(self) -> None:
+        for slot in self.slots:
+            slot.stop()
+
+
+_pool: _Pool | None = None
+_pool_pid: int | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> _Pool:
+    global _pool, _pool_pid
+    # Por pid: los hijos de Celery (prefork) no heredan los daemons del padre.
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                soffice = find_soffice()
+                if not soffice:
+                    raise ConversionError(
+                        'LibreOffice no está instalado. '
+                        'Instálalo para la conversión a PDF, o descarga en formato DOCX.'
+                    )
+                _pool = _Pool(max(1, _settings().OFFICE_CONVERTER_POOL_SIZE), soffice, _uno_python())
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _read(doc) -> bytes:
+    if isinstance(doc, (bytes, bytearray)):
+        return bytes(doc)
+    doc.seek(0)
+    return doc.read()
+
+
+def convert_to_pdf(doc: BytesIO | bytes, ext: str = 'docx') -> BytesIO:
+    """Convierte un documento de Office a PDF usando el pool."""
+    return BytesIO(_get_pool().convert(_read(doc), ext))
+
+
+def convert_many(docs: list, ext: str = 'docx') -> list:
+    """Convierte un lote en paralelo (tantos a la vez como slots tiene el pool).
+
+    Devuelve una lista en el mismo orden que `docs`; cada elemento es el
+    ``BytesIO`` del PDF o la excepción de ese documento (un fallo no aborta el lote).
+    """
+    pool = _get_pool()
+    payloads = [_read(d) for d in docs]
+
+    def _one(data: bytes):
+        try:
+            return BytesIO(pool.convert(data, ext))
+        except Exception as e:
+            return e
+
+    if len(payloads) <= 1:
+        return [_one(p) for p in payloads]
+    with ThreadPoolExecutor(max_workers=min(pool.size, len(payloads))) as ex:
+        return list(ex.map(_one, payloads))
+
+
+def shutdown() -> None:
+    """Detiene los soffice de este proceso (también se llama en atexit)."""
+    global _pool
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown()
+    _pool = None
+
+
+atexit.register(shutdown)
@@ -0,0 +1,138 @@
+"""Daemon de conversión a PDF sobre un soffice residente (lo lanza office_converter).
+
+Se ejecuta con el Python que trae el módulo ``uno`` (``OFFICE_UNO_PYTHON``,
+``/usr/bin/python3`` + python3-uno en la imagen), NO con el del backend: por eso
+solo importa stdlib y uno, nunca ``itcj2``.
+
+Arranca un ``soffice --headless --accept=socket...`` con su propio perfil, se
+conecta por UNO y expone por XML-RPC en 127.0.0.1:
+
+    ping() -> True
+    convert(data: Binary, ext: str) -> Binary (PDF)
+
+Una conversión a la vez (SimpleXMLRPCServer es de un hilo); el paralelismo lo da
+el pool con varios daemons. Termina (y mata a su soffice) cuando el proceso padre
+cierra su stdin o recibe SIGTERM.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from xmlrpc.client import Binary
+from xmlrpc.server import SimpleXMLRPCServer
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+
+_FILTERS = {
+    "docx": "writer_pdf_Export",
+    "doc": "writer_pdf_Export",
+    "odt": "writer_pdf_Export",
+    "xlsx": "calc_pdf_Export",
+    "xls": "calc_pdf_Export",
+    "ods": "calc_pdf_Export",
+}
+
+
+def _prop(name, value):
+    p = PropertyValue()
+    p.Name = name
+    p.Value = value
+    return p
+
+
+def _start_soffice(args):
+    return subprocess.Popen(
+        [
+            args.soffice, "--headless", "--invisible", "--nologo", "--norestore",
+            "--nodefault", "--nolockcheck",
+            f"-env:UserInstallation={args.profile}",
+            f"--accept=socket,host=127.0.0.1,port={args.uno_port};urp;StarOffice.ComponentContext",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def _connect(port, proc, timeout):
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local)
+    url = f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            ctx = resolver.resolve(url)
+            return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+        except NoConnectException:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                raise
+            time.sleep(0.25)
+
+
+class _Converter:
+    def __init__(self, desktop):
+        self.desktop = desktop
+
+    def ping(self):
+        return True
+
+    def convert(self, data, ext):
+        filter_name = _FILTERS.get(ext)
+        if filter_name is None:
+            raise ValueError(f"Extensión no soportada: {ext}")
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, f"document.{ext}")
+            dst = os.path.join(tmp, "document.pdf")
+            with open(src, "wb") as fh:
+                fh.write(data.data)
+            doc = self.desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(src), "_blank", 0, (_prop("Hidden", True),))
+            try:
+                doc.storeToURL(uno.systemPathToFileUrl(dst), (_prop("FilterName", filter_name),))
+            finally:
+                doc.close(True)
+            with open(dst, "rb") as fh:
+                return Binary(fh.read())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--uno-port", type=int, required=True)
+    parser.add_argument("--soffice", required=True)
+    parser.add_argument("--profile", required=True)
+    parser.add_argument("--startup-timeout", type=float, default=45)
+    args = parser.parse_args()
+
+    soffice = _start_soffice(args)
+
+    def _exit(*_):
+        soffice.kill()
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, _exit)
+    # stdin es un pipe del padre: EOF = el padre cerró el slot o murió.
+    threading.Thread(target=lambda: (sys.stdin.read(), _exit()), daemon=True).start()
+
+    try:
+        desktop = _connect(args.uno_port, soffice, args.startup_timeout)
+    except Exception as e:
+        print(f"office_daemon: no se pudo conectar a soffice: {e}", file=sys.stderr)
+        _exit()
+
+    server = SimpleXMLRPCServer(("127.0.0.1", args.port), logRequests=False, allow_none=True)
+    server.register_instance(_Converter(desktop))
+    try:
+        server.serve_forever()
+    finally:
+        _exit()
+
+
+if __name__ == "__main__":
+    main()
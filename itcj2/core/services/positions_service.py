@@ -34,6 +34,15 @@ def _bust_all() -> None:
         pass
 
 
+def _bust_directory() -> None:
+    """Invalida el snapshot del directorio de extensiones (titulares/puestos). Best-effort."""
+    try:
+        from itcj2.apps.directory.services.directory_service import invalidate_directory
+        invalidate_directory()
+    except Exception:
+        pass
+
+
 # ---------------------------
 # CRUD de Puestos
 # ---------------------------
@@ -67,6 +76,7 @@ def create_position(
     logger.info(f"Creating position: {position}")
     db.add(position)
     db.commit()
+    _bust_directory()
     return position
 
 def get_position_by_code(db: Session, code: str) -> Optional[Position]:
@@ -101,6 +111,7 @@ def update_position(db: Session, position_id: int, **kwargs) -> Position:
             setattr(position, key, value)
 
     db.commit()
+    _bust_directory()
     # Cambiar is_active de un puesto afecta el acceso de sus usuarios.
     if 'is_active' in kwargs:
         _bust_all()
@@ -124,6 +135,7 @@ def deactivate_position(db: Session, position_id: int) -> bool:
 
     db.commit()
     _bust_all()  # afecta a todos los usuarios del puesto
+    _bust_directory()
     return True
 
 def delete_position(db: Session, position_id: int) -> bool:
@@ -135,6 +147,7 @@ def delete_position(db: Session, position_id: int) -> bool:
     db.delete(position)
     db.commit()
     _bust_all()  # afecta a todos los usuarios del puesto
+    _bust_directory()
     return True
 
 def get_position_by_id(db: Session, position_id: int) -> Optional[Position]:
@@ -188,6 +201,7 @@ def assign_user_to_position(
     db.add(assignment)
     db.commit()
     _bust_user(user_id)
+    _bust_directory()
     return assignment
 
 def remove_user_from_position(db: Session, user_id: int, position_id: int, end_date: date = None) -> bool:
@@ -208,6 +222,7 @@ def remove_user_from_position(db: Session, user_id: int, position_id: int, end_d
     assignment.end_date = end_date
     db.commit()
     _bust_user(user_id)
+    _bust_directory()
     return True
 
 def transfer_position(
@@ -0,0 +1,306 @@
+"""Contador de queries por request y agregado por ruta entre workers.
+
+Los N+1 de `Ticket.to_dict`, `directory_service.list_directory` o
+`get_global_stats` solo se encontraban leyendo código. Esto los hace visibles:
+
+- Listeners `before/after_cursor_execute` sobre el engine cuentan statements,
+  tiempo en BD y fingerprints repetidos, y los atribuyen al request vigente vía
+  un contextvar (se copia a los hilos del threadpool donde corren los
+  endpoints `def`; el perfil es mutable y compartido).
+- `QueryProfilerMiddleware` (ASGI puro, el más externo) abre el perfil, añade
+  `Server-Timing` fuera de producción y, al terminar, loguea los requests que
+  pasan los umbrales y acumula el agregado de la ruta.
+- El agregado vive en memoria del worker y se vuelca a Redis cada
+  ``QUERY_PROFILER_FLUSH_SECONDS`` (un pipeline, en un hilo), así que leer
+  `GET /api/core/v2/profiler/routes` junta a todos los workers con ese desfase.
+
+Claves (``qprof:v1:*``, sorted sets con la ruta ``"GET /api/..."`` como miembro):
+``requests``, ``queries``, ``db_ms``, ``dups``, ``max_queries`` y por ruta
+``dupfp:{ruta}`` (fingerprint → repeticiones). Fail-open: si Redis cae se
+pierde el agregado, nunca el request.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "qprof:v1"
+_ZSETS = ("requests", "queries", "db_ms", "dups", "max_queries")
+_FP_MAX_LEN = 240
+
+
+# ---------------------------------------------------------------------------
+# Perfil por request
+# ---------------------------------------------------------------------------
+@dataclass
+class RequestProfile:
+    queries: int = 0
+    db_ms: float = 0.0
+    fingerprints: Counter = field(default_factory=Counter)
+
+    @property
+    def duplicates(self) -> int:
+        """Statements repetidos (misma forma SQL) más allá de la primera vez."""
+        return sum(n - 1 for n in self.fingerprints.values() if n > 1)
+
+
+_current: contextvars.ContextVar[RequestProfile | None] = contextvars.ContextVar(
+    "query_profile", default=None
+)
+
+_PARAM_RE = re.compile(r"%\(\w+\)s|\?|\$\d+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_NUM_RE = re.compile(r"\b\d+\b")
+_WS_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Forma normalizada de un statement: sin parámetros ni largo de listas IN."""
+    s = _WS_RE.sub(" ", statement).strip()
+    s = _PARAM_RE.sub("?", s)
+    s = _NUM_RE.sub("?", s)
+    s = _IN_LIST_RE.sub("(?+)", s)
+    return s[:_FP_MAX_LEN]
+
+
+def current_profile() -> RequestProfile | None:
+    return _current.get()
+
+
+# ---------------------------------------------------------------------------
+# Listeners de SQLAlchemy
+# ---------------------------------------------------------------------------
+_installed: set[int] = set()
+
+
+def install(engine) -> None:
+    """Engancha los listeners al engine (idempotente)."""
+    from sqlalchemy import event
+
+    if id(engine) in _installed:
+        return
+    _installed.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("qprof_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        prof = _current.get()
+        if prof is None:
+            return
+        starts = conn.info.get("qprof_start")
+        elapsed = (time.perf_counter() - starts.pop()) * 1000 if starts else 0.0
+        prof.queries += 1
+        prof.db_ms += elapsed
+        prof.fingerprints[fingerprint(statement)] += 1
+
+
+# ---------------------------------------------------------------------------
+# Agregado por ruta (memoria del worker → Redis)
+# ---------------------------------------------------------------------------
+@dataclass
+class _RouteStats:
+    requests: int = 0
+    queries: int = 0
+    db_ms: float = 0.0
+    dups: int = 0
+    max_queries: int = 0
+    dup_fingerprints: Counter = field(default_factory=Counter)
+
+
+_buffer: dict[str, _RouteStats] = {}
+_last_flush = time.monotonic()
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+def record(route: str, prof: RequestProfile) -> None:
+    st = _buffer.get(route)
+    if st is None:
+        st = _buffer[route] = _RouteStats()
+    st.requests += 1
+    st.queries += prof.queries
+    st.db_ms += prof.db_ms
+    st.max_queries = max(st.max_queries, prof.queries)
+    dups = prof.duplicates
+    if dups:
+        st.dups += dups
+        for fp, n in prof.fingerprints.items():
+            if n > 1:
+                st.dup_fingerprints[fp] += n - 1
+
+
+def flush_due() -> bool:
+    return time.monotonic() - _last_flush >= _settings().QUERY_PROFILER_FLUSH_SECONDS
+
+
+def take_buffer() -> dict[str, _RouteStats]:
+    """Saca el buffer actual (para volcarlo fuera del event loop)."""
+    global _buffer, _last_flush
+    data, _buffer = _buffer, {}
+    _last_flush = time.monotonic()
+    return data
+
+
+def _redis():
+    try:
+        from itcj2.core.utils.redis_conn import get_redis
+        return get_redis()
+    except Exception as e:  # pragma: no cover - defensivo
+        logger.warning("query_profiler: no se pudo obtener Redis (%s)", e)
+        return None
+
+
+def flush(data: dict[str, _RouteStats], r=None) -> None:
+    """Vuelca un buffer a Redis en un solo pipeline."""
+    if not data:
+        return
+    r = r or _redis()
+    if r is None:
+        return
+    ttl = _settings().QUERY_PROFILER_RETENTION_SECONDS
+    try:
+        pipe = r.pipeline(transaction=False)
+        for route, st in data.items():
+            pipe.zincrby(f"{_PREFIX}:requests", st.requests, route)
+            pipe.zincrby(f"{_PREFIX}:queries", st.queries, route)
+            pipe.zincrby(f"{_PREFIX}:db_ms", round(st.db_ms, 3), route)
+            if st.dups:
+                pipe.zincrby(f"{_PREFIX}:dups", st.dups, route)
+                fp_key = f"{_PREFIX}:dupfp:{route}"
+                for fp, n in st.dup_fingerprints.most_common(20):
+                    pipe.zincrby(fp_key, n, fp)
+                pipe.expire(fp_key, ttl)
+            pipe.zadd(f"{_PREFIX}:max_queries", {route: st.max_queries}, gt=True)
+        for name in _ZSETS:
+            pipe.expire(f"{_PREFIX}:{name}", ttl)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("query_profiler: error volcando agregado a Redis (%s)", e)
+
+
+def top_routes(sort: str = "queries", limit: int = 20, r=None) -> list[dict]:
+    """Top-N rutas de todos los workers, ordenadas por `sort`.
+
+    `sort` ∈ requests, queries, db_ms, dups, max_queries, queries_per_request,
+    db_ms_per_request.
+    """
+    r = r or _redis()
+    if r is None:
+        return []
+
+    pipe = r.pipeline(transaction=False)
+    for name in _ZSETS:
+        pipe.zrange(f"{_PREFIX}:{name}", 0, -1, withscores=True)
+    raw = dict(zip(_ZSETS, pipe.execute()))
+
+    def _decode(m):
+        return m.decode() if isinstance(m, bytes) else m
+
+    scores = {name: {_decode(m): s for m, s in raw[name]} for name in _ZSETS}
+    rows = []
+    for route, n in scores["requests"].items():
+        n = int(n) or 1
+        q = scores["queries"].get(route, 0)
+        ms = scores["db_ms"].get(route, 0.0)
+        rows.append({
+            "route": route,
+            "requests": n,
+            "queries": int(q),
+            "db_ms": round(ms, 1),
+            "dups": int(scores["dups"].get(route, 0)),
+            "max_queries": int(scores["max_queries"].get(route, 0)),
+            "queries_per_request": round(q / n, 2),
+            "db_ms_per_request": round(ms / n, 2),
+        })
+
+    rows.sort(key=lambda x: x.get(sort, 0), reverse=True)
+    rows = rows[:limit]
+
+    pipe = r.pipeline(transaction=False)
+    for row in rows:
+        pipe.zrevrange(f"{_PREFIX}:dupfp:{row['route']}", 0, 2, withscores=True)
+    for row, fps in zip(rows, pipe.execute()):
+        row["top_duplicates"] = [{"sql": _decode(fp), "extra": int(n)} for fp, n in fps]
+    return rows
+
+
+def reset(r=None) -> int:
+    """Borra todo el agregado en Redis. Devuelve cuántas claves borró."""
+    r = r or _redis()
+    if r is None:
+        return 0
+    keys = list(r.scan_iter(match=f"{_PREFIX}:*", count=500))
+    if keys:
+        r.delete(*keys)
+    return len(keys)
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+def _route_key(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "<sin ruta>"
+    return f"{scope.get('method', '')} {path}"
+
+
+class QueryProfilerMiddleware:
+    """ASGI puro: perfil por request, `Server-Timing`, log de lentos y agregado."""
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        prof = RequestProfile()
+        token = _current.set(prof)
+        t0 = time.perf_counter()
+
+        async def _send(message):
+            if self.server_timing and message["type"] == "http.response.start":
+                total = (time.perf_counter() - t0) * 1000
+                desc = f"{prof.queries} queries"
+                if prof.duplicates:
+                    desc += f", {prof.duplicates} repetidas"
+                value = f'db;dur={prof.db_ms:.1f};desc="{desc}", app;dur={total:.1f}'
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", value.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current.reset(token)
+            await self._finish(scope, prof, (time.perf_counter() - t0) * 1000)
+
+    async def _finish(self, scope, prof: RequestProfile, total_ms: float) -> None:
+        route = _route_key(scope)
+        s = _settings()
+        if prof.queries >= s.QUERY_PROFILER_LOG_QUERIES or prof.db_ms >= s.QUERY_PROFILER_LOG_DB_MS:
+            top_fp, top_n = (prof.fingerprints.most_common(1) or [("", 0)])[0]
+            logger.warning(
+                "Request pesado en BD: %s — %d queries (%d repetidas), %.1f ms BD, %.1f ms total; "
+                "más repetida x%d: %s",
+                route, prof.queries, prof.duplicates, prof.db_ms, total_ms, top_n, top_fp[:120],
+            )
+        record(route, prof)
+        if flush_due():
+            import anyio
+            await anyio.to_thread.run_sync(flush, take_buffer())
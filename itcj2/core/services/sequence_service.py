@@ -0,0 +1,155 @@
+"""Folios y números consecutivos sin escanear tablas (``core_sequence_counters``).
+
+Antes cada generador buscaba el último número con ``ORDER BY ... DESC LIMIT 1``
+sobre un ``LIKE 'PREFIJO-AÑO-%'``: una consulta por número generado y carreras
+entre registros concurrentes (dos requests leen el mismo máximo).
+
+`reserve` aparta un bloque contiguo de `count` números en una sola sentencia
+(``UPDATE ... SET last_value = last_value + :count RETURNING last_value``). El
+candado de fila dura hasta el commit del llamador, así que los concurrentes se
+serializan sobre la fila y un rollback devuelve el bloque: sin huecos ni
+reintentos.
+
+La primera vez que se usa un (nombre, ámbito) la fila no existe: se crea con
+``INSERT ... ON CONFLICT`` arrancando desde `seed`, una subconsulta escalar con
+el último número ya usado (para contadores de tablas con datos previos). El seed
+solo se evalúa esa vez.
+
+Para folios con formato, cada app declara un `Sequence` (nombre, plantilla con
+``{n}`` al final y la columna donde viven) y usa `next_number` / `next_numbers`
+/ `peek_number`; el ámbito es el año (si la plantilla lo lleva) más una llave
+opcional, p.ej. la categoría de inventario.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime
+
+from sqlalchemy import Integer, case, cast, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from itcj2.core.models.sequence import SequenceCounter
+
+_table = SequenceCounter.__table__
+
+
+def reserve(db: Session, name: str, scope: str = "", count: int = 1, *, seed=None) -> int:
+    """Aparta `count` números consecutivos; devuelve el primero del bloque."""
+    if count < 1:
+        raise ValueError("count debe ser >= 1")
+
+    last = db.execute(
+        update(_table)
+        .where(_table.c.name == name, _table.c.scope == scope)
+        .values(last_value=_table.c.last_value + count, updated_at=func.now())
+        .returning(_table.c.last_value)
+    ).scalar()
+
+    if last is None:
+        start = func.coalesce(seed, 0) if seed is not None else 0
+        stmt = insert(_table).values(name=name, scope=scope, last_value=start + count)
+        last = db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[_table.c.name, _table.c.scope],
+                set_={"last_value": _table.c.last_value + count, "updated_at": func.now()},
+            ).returning(_table.c.last_value)
+        ).scalar_one()
+
+    return last - count + 1
+
+
+def peek(db: Session, name: str, scope: str = "", *, seed=None) -> int:
+    """Siguiente número que entregaría `reserve`, sin apartarlo (vista previa)."""
+    last = db.execute(
+        select(_table.c.last_value).where(_table.c.name == name, _table.c.scope == scope)
+    ).scalar()
+    if last is None:
+        last = (db.execute(select(func.coalesce(seed, 0))).scalar() or 0) if seed is not None else 0
+    return last + 1
+
+
+def advance(db: Session, name: str, scope: str, value: int) -> None:
+    """Sube el contador a `value` si va por detrás (número capturado a mano).
+
+    Si la fila aún no existe no hace nada: el seed de la primera reserva ya verá
+    ese registro.
+    """
+    db.execute(
+        update(_table)
+        .where(_table.c.name == name, _table.c.scope == scope)
+        .values(last_value=case((_table.c.last_value < value, value), else_=_table.c.last_value))
+    )
+
+
+class Sequence:
+    """Folio con formato: ``Sequence("helpdesk.ticket", "TK-{year}-{n:04d}", Ticket.ticket_number)``.
+
+    El consecutivo ``{n}`` va al final de la plantilla; el resto (``{year}`` y
+    cualquier otro campo, p.ej. ``{prefix}``) se pasa al pedir el número.
+    `column` solo se usa para arrancar el contador desde los datos existentes.
+    """
+
+    def __init__(self, name: str, template: str, column=None):
+        if not re.search(r"\{n(:[^}]*)?\}$", template):
+            raise ValueError(f"La plantilla debe terminar en {{n}}: {template}")
+        self.name = name
+        self.template = template
+        self.column = column
+        self.yearly = "{year" in template
+        self._head = template[:template.index("{n")]
+
+    def head(self, **fields) -> str:
+        return self._head.format(**fields)
+
+    def render(self, n: int, **fields) -> str:
+        return self.template.format(n=n, **fields)
+
+    def scope(self, key: str = "", year: int | None = None) -> str:
+        return ":".join(str(p) for p in (key, year) if p not in ("", None))
+
+    def seed(self, head: str, where=()):
+        """Último consecutivo de `head` en `column` (subconsulta escalar) o None."""
+        if self.column is None:
+            return None
+        col = self.column
+        return (
+            select(func.max(cast(func.substr(col, len(head) + 1), Integer)))
+            .where(col.like(f"{head}%"), col.regexp_match(f"^{re.escape(head)}[0-9]+$"), *where)
+            .scalar_subquery()
+        )
+
+    def _prepare(self, key: str, where, fields: dict):
+        if self.yearly:
+            fields.setdefault("year", datetime.now().year)
+        head = self.head(**fields)
+        return head, self.scope(key, fields.get("year")), self.seed(head, where)
+
+
+def next_numbers(db: Session, seq: Sequence, count: int = 1, *, key: str = "", where=(),
+                 **fields) -> list[str]:
+    """Aparta `count` folios consecutivos de `seq` (ver `reserve`)."""
+    head, scope, seed = seq._prepare(key, where, fields)
+    first = reserve(db, seq.name, scope, count, seed=seed)
+    return [seq.render(n, **fields) for n in range(first, first + count)]
+
+
+def next_number(db: Session, seq: Sequence, *, key: str = "", where=(), **fields) -> str:
+    return next_numbers(db, seq, 1, key=key, where=where, **fields)[0]
+
+
+def peek_number(db: Session, seq: Sequence, *, key: str = "", where=(), **fields) -> str:
+    """Siguiente folio de `seq` sin apartarlo (vista previa)."""
+    head, scope, seed = seq._prepare(key, where, fields)
+    return seq.render(peek(db, seq.name, scope, seed=seed), **fields)
+
+
+def observe(db: Session, seq: Sequence, value: str, *, key: str = "", **fields) -> None:
+    """Adelanta el contador si `value` (capturado a mano) tiene el formato de `seq`."""
+    if seq.yearly:
+        fields = {**fields, "year": "\x00"}
+    pattern = re.escape(seq.head(**fields)).replace("\x00", r"(\d{4})") + r"(\d+)"
+    match = re.fullmatch(pattern, value)
+    if match:
+        year = int(match.group(1)) if seq.yearly else None
+        advance(db, seq.name, seq.scope(key, year), int(match.group(match.lastindex)))
@@ -0,0 +1,215 @@
+"""Mueve los uploads existentes al layout de file_storage (``core reshard-storage``).
+
+Recorre por keyset de ``id`` los adjuntos de helpdesk y maint y los documentos de
+bajas de inventario, calcula la clave que tendrían hoy (`file_storage.attachment_key`
+/ `StorageBackend.place`) y, si difiere de la guardada:
+
+1. Copia el archivo y sus variantes al destino (hard link en el mismo volumen;
+   con ``STORAGE_BACKEND=s3`` se suben, así que el mismo comando migra a S3).
+2. Actualiza las rutas del lote en BD con un UPDATE masivo y hace commit.
+3. Solo entonces borra los originales.
+
+Hasta el commit la fila apunta al original, que sigue en su lugar: las descargas
+no fallan mientras corre, y un corte a medias solo deja copias huérfanas que la
+siguiente corrida sobrescribe. Un destino ocupado con otro contenido (tamaño
+distinto) no se toca y se reporta como conflicto.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass, field
+
+from sqlalchemy import bindparam, literal, select, update
+from sqlalchemy.orm import Session
+
+from itcj2.core.services import file_storage, media_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReshardStats:
+    moved: int = 0
+    skipped: int = 0
+    missing: int = 0
+    conflicts: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+
+def _settings():
+    from itcj2.config import get_settings
+    return get_settings()
+
+
+def _helpdesk_source():
+    from itcj2.apps.helpdesk.models.attachment import Attachment
+    from itcj2.apps.helpdesk.models.ticket import Ticket
+
+    root = _settings().HELPDESK_UPLOAD_PATH
+
+    def _rows(db: Session, after: int, limit: int) -> list:
+        return db.execute(
+            select(
+                Attachment.id, Attachment.filepath, Attachment.variants,
+                Attachment.attachment_type, Attachment.ticket_id, Ticket.ticket_number,
+            )
+            .join(Ticket, Ticket.id == Attachment.ticket_id)
+            .where(Attachment.id > after, Attachment.media_status == "ready",
+                   Attachment.filepath.isnot(None))
+            .order_by(Attachment.id)
+            .limit(limit)
+        ).all()
+
+    def _dest(storage, row) -> str:
+        return file_storage.attachment_key(
+            storage, root, row.attachment_type, row.ticket_id, row.ticket_number,
+            os.path.basename(row.filepath),
+        )
+
+    return Attachment.__table__, "filepath", _rows, _dest
+
+
+def _maint_source():
+    from itcj2.apps.maint.models.attachment import MaintAttachment
+    from itcj2.apps.maint.models.ticket import MaintTicket
+
+    root = _settings().MAINT_UPLOAD_PATH
+
+    def _rows(db: Session, after: int, limit: int) -> list:
+        return db.execute(
+            select(
+                MaintAttachment.id, MaintAttachment.filepath, MaintAttachment.variants,
+                MaintAttachment.attachment_type, MaintAttachment.ticket_id, MaintTicket.ticket_number,
+            )
+            .join(MaintTicket, MaintTicket.id == MaintAttachment.ticket_id)
+            .where(MaintAttachment.id > after, MaintAttachment.media_status == "ready",
+                   MaintAttachment.is_purged.is_(False), MaintAttachment.filepath.isnot(None))
+            .order_by(MaintAttachment.id)
+            .limit(limit)
+        ).all()
+
+    def _dest(storage, row) -> str:
+        return file_storage.attachment_key(
+            storage, root, row.attachment_type, row.ticket_id, row.ticket_number,
+            os.path.basename(row.filepath),
+        )
+
+    return MaintAttachment.__table__, "filepath", _rows, _dest
+
+
+def _retirement_source():
+    from itcj2.apps.helpdesk.models.inventory_retirement_request import InventoryRetirementRequest as Req
+
+    root = _settings().HELPDESK_RETIREMENT_PATH
+
+    def _rows(db: Session, after: int, limit: int) -> list:
+        return db.execute(
+            select(Req.id, Req.document_path.label("filepath"), literal(None).label("variants"), Req.folio)
+            .where(Req.id > after, Req.document_path.isnot(None))
+            .order_by(Req.id)
+            .limit(limit)
+        ).all()
+
+    def _dest(storage, row) -> str:
+        return storage.place(root, row.folio, os.path.basename(row.filepath))
+
+    return Req.__table__, "document_path", _rows, _dest
+
+
+SOURCES = {
+    "helpdesk_attachments": _helpdesk_source,
+    "maint_attachments": _maint_source,
+    "retirement_documents": _retirement_source,
+}
+
+
+def _taken_by_other(storage, src: str, dest: str) -> bool:
+    """Destino ocupado por un archivo distinto (no una copia de una corrida previa)."""
+    try:
+        return storage.size(dest) != os.path.getsize(src)
+    except FileNotFoundError:
+        return False
+
+
+def _copy(storage, row, dest: str) -> list[str]:
+    """Copia principal + variantes a `dest`; devuelve los originales a borrar."""
+    folder = os.path.dirname(dest)
+    sources = [row.filepath] + media_service.variant_paths(row.filepath, row.variants)
+    storage.import_file(row.filepath, dest)
+    for src in sources[1:]:
+        if os.path.exists(src):
+            storage.import_file(src, f"{folder}/{os.path.basename(src)}")
+    return sources
+
+
+def reshard_source(db: Session, name: str, *, dry_run: bool = False, batch: int = 200,
+                   echo=None) -> ReshardStats:
+    """Reubica los archivos de una fuente de `SOURCES`; ver docstring del módulo."""
+    table, column, rows_for, dest_for = SOURCES[name]()
+    storage = file_storage.get_storage()
+    stats = ReshardStats()
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values({column: bindparam("new_path")})
+    )
+
+    after = 0
+    while True:
+        rows = rows_for(db, after, batch)
+        if not rows:
+            break
+        after = rows[-1].id
+
+        moved, stale = [], []
+        for row in rows:
+            src = row.filepath
+            if file_storage.backend_for(src).remote:
+                stats.skipped += 1
+                continue
+            dest = dest_for(storage, row)
+            if dest == src:
+                stats.skipped += 1
+                continue
+            if not os.path.exists(src):
+                stats.missing += 1
+                continue
+            if _taken_by_other(storage, src, dest):
+                stats.conflicts.append(f"{name}#{row.id}: {dest}")
+                continue
+            if dry_run:
+                stats.moved += 1
+                continue
+            try:
+                stale.extend(_copy(storage, row, dest))
+            except Exception as e:
+                stats.errors.append(f"{name}#{row.id}: {e}")
+                logger.error(f"reshard: no se pudo copiar {src} → {dest}: {e}")
+                continue
+            moved.append({"row_id": row.id, "new_path": dest})
+
+        if moved:
+            db.execute(stmt, moved)
+            db.commit()
+            stats.moved += len(moved)
+            for path in stale:
+                file_storage.delete(path)
+            for folder in {os.path.dirname(p) for p in stale}:
+                try:
+                    os.rmdir(folder)  # solo si quedó vacía
+                except OSError:
+                    pass
+        if echo is not None:
+            echo(f"{name}: hasta id {after} — {stats.moved} movidos")
+        if len(rows) < batch:
+            break
+
+    return stats
+
+
+def reshard(db: Session, *, dry_run: bool = False, batch: int = 200, echo=None) -> dict[str, ReshardStats]:
+    return {
+        name: reshard_source(db, name, dry_run=dry_run, batch=batch, echo=echo)
+        for name in SOURCES
+    }
@@ -11,6 +11,7 @@ import logging
 import os
 import re
 import threading
+import time
 from pathlib import Path
 
 import msal
@@ -33,6 +34,10 @@ _SCOPES_FULL = (
 ).split()
 _RESERVED = {"openid", "profile", "offline_access"}
 
+GRAPH_BASE_URL = os.getenv("MS_GRAPH_BASE_URL", "https://graph.microsoft.com/v1.0").rstrip("/")
+# Límite de Graph para peticiones por llamada a /$batch.
+GRAPH_BATCH_MAX = 20
+
 _INSTANCE_BASE = Path(
     os.getenv("MS_INSTANCE_BASE", "/app/instance/apps")
 )
@@ -215,11 +220,16 @@ def acquire_token_silent(app_key: str) -> str | None:
     except InvalidAppKey:
         logger.warning("acquire_token_silent con app_key invalido: %r", app_key)
         return None
-    cache = load_cache(app_key)
-    app = get_msal_app(app_key, cache)
-    acct = read_account_info(app_key)
+    result = _acquire_silent(app_key, read_account_info(app_key))
+    return result["access_token"] if result else None
+
+
+def _acquire_silent(app_key: str, acct: dict | None) -> dict | None:
+    """Resultado de MSAL (access_token, expires_in) para la cuenta `acct` o None."""
     if not acct:
         return None
+    cache = load_cache(app_key)
+    app = get_msal_app(app_key, cache)
 
     account = None
     for a in app.get_accounts():
@@ -233,19 +243,66 @@ def acquire_token_silent(app_key: str) -> str | None:
     save_cache(app_key, cache)
     if not result or "access_token" not in result:
         return None
+    return result
+
+
+# Tokens en memoria del proceso (drenado de core/services/email_outbox.py):
+# app_key -> (token, vence en monotonic, home_account_id). Evita leer/escribir el
+# cache de MSAL en disco (bajo _LOCK) por cada correo.
+_tokens: dict[str, tuple[str, float, str | None]] = {}
+_TOKEN_MARGIN = 120
+
+
+def cached_token(app_key: str) -> str | None:
+    """Access token de `app_key` reutilizado hasta poco antes de vencer.
+
+    Se relee el archivo de cuenta en cada llamada (barato): si la app se
+    desconectó o cambió de cuenta, el token en memoria se descarta.
+    """
+    acct = read_account_info(app_key)
+    if not acct:
+        _tokens.pop(app_key, None)
+        return None
+    home = acct.get("home_account_id")
+    hit = _tokens.get(app_key)
+    if hit and hit[2] == home and hit[1] > time.monotonic():
+        return hit[0]
+    result = _acquire_silent(app_key, acct)
+    if not result:
+        _tokens.pop(app_key, None)
+        return None
+    ttl = max(int(result.get("expires_in") or 0) - _TOKEN_MARGIN, 0)
+    _tokens[app_key] = (result["access_token"], time.monotonic() + ttl, home)
     return result["access_token"]
 
 
-def graph_send_mail(
-    access_token: str,
-    subject: str,
-    content_html: str,
-    to_list: list[str],
-    save_to_sent: bool = True,
-):
-    """Envio delegado: usa /me/sendMail (envia como el usuario autenticado)."""
-    endpoint = "https://graph.microsoft.com/v1.0/me/sendMail"
-    payload = {
+def forget_token(app_key: str) -> None:
+    """Descarta el token en memoria (Graph respondió 401)."""
+    _tokens.pop(app_key, None)
+
+
+_http: requests.Session | None = None
+_http_pid: int | None = None
+
+
+def http_session() -> requests.Session:
+    """Sesión HTTP con keep-alive hacia Graph, una por proceso.
+
+    Se compara el pid porque los workers prefork de Celery heredan el módulo
+    del padre y no deben compartir sockets.
+    """
+    global _http, _http_pid
+    if _http is None or _http_pid != os.getpid():
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=8)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http, _http_pid = session, os.getpid()
+    return _http
+
+
+def _message_payload(subject: str, content_html: str, to_list: list[str], save_to_sent: bool) -> dict:
+    return {
         "message": {
             "subject": subject,
             "body": {"contentType": "HTML", "content": content_html},
@@ -255,8 +312,92 @@ def graph_send_mail(
         },
         "saveToSentItems": bool(save_to_sent),
     }
+
+
+def graph_send_mail(
+    access_token: str,
+    subject: str,
+    content_html: str,
+    to_list: list[str],
+    save_to_sent: bool = True,
+):
+    """Envio delegado: usa /me/sendMail (envia como el usuario autenticado)."""
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json",
     }
-    return requests.post(endpoint, headers=headers, json=payload, timeout=30)
+    return http_session().post(
+        f"{GRAPH_BASE_URL}/me/sendMail",
+        headers=headers,
+        json=_message_payload(subject, content_html, to_list, save_to_sent),
+        timeout=30,
+    )
+
+
+class GraphBatchError(Exception):
+    """La llamada a /$batch falló completa (red o status distinto de 200)."""
+
+    def __init__(self, message: str, status: int | None = None, retry_after: float | None = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _retry_after(headers) -> float | None:
+    for k, v in (headers or {}).items():
+        if k.lower() == "retry-after":
+            try:
+                return float(v)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def graph_send_batch(
+    access_token: str,
+    messages: list[dict],
+    save_to_sent: bool = True,
+    timeout: int = 30,
+) -> dict[str, tuple[int, float | None, str | None]]:
+    """Envía hasta GRAPH_BATCH_MAX correos en una sola llamada a /$batch.
+
+    `messages`: ``[{"id", "subject", "html", "to": [...]}, ...]``. Devuelve
+    ``{id: (status, retry_after, error)}`` por mensaje (202 = aceptado). Lanza
+    GraphBatchError si la llamada completa falla.
+    """
+    if len(messages) > GRAPH_BATCH_MAX:
+        raise ValueError(f"Graph acepta hasta {GRAPH_BATCH_MAX} peticiones por $batch")
+    body = {
+        "requests": [
+            {
+                "id": str(m["id"]),
+                "method": "POST",
+                "url": "/me/sendMail",
+                "headers": {"Content-Type": "application/json"},
+                "body": _message_payload(m["subject"], m["html"], m["to"], save_to_sent),
+            }
+            for m in messages
+        ]
+    }
+    try:
+        r = http_session().post(
+            f"{GRAPH_BASE_URL}/$batch",
+            headers={"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"},
+            json=body,
+            timeout=timeout,
+        )
+    except requests.RequestException as e:
+        raise GraphBatchError(f"$batch sin respuesta: {e}") from e
+    if r.status_code != 200:
+        raise GraphBatchError(f"$batch respondió {r.status_code}: {r.text[:200]}",
+                              status=r.status_code, retry_after=_retry_after(r.headers))
+
+    results = {}
+    for resp in r.json().get("responses", []):
+        status = int(resp.get("status", 0))
+        error = None
+        if status >= 300:
+            err = (resp.get("body") or {}).get("error") or {}
+            error = f"{status} {err.get('code', '')}: {err.get('message', '')}".strip()
+        results[str(resp.get("id"))] = (status, _retry_after(resp.get("headers")), error)
+    return results
@@ -1,4 +1,5 @@
 import os
+import time
 
 import redis
 
@@ -15,13 +16,33 @@ SLOT_HOLD_SECONDS = int(os.getenv("SLOT_HOLD_SECONDS", "45"))
 _redis = None
 
 
+class _TimedRedis(redis.Redis):
+    """Cliente que registra la latencia de cada comando en /metrics.
+
+    Los pipelines y pub/sub no pasan por aquí: el histograma es de comandos
+    sueltos, que son los que bloquean el request uno por uno.
+    """
+
+    def execute_command(self, *args, **options):
+        t0 = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            from itcj2.core.services import metrics
+            metrics.observe(
+                "itcj_redis_command_seconds",
+                time.perf_counter() - t0,
+                command=str(args[0]).upper() if args else "",
+            )
+
+
 def get_redis():
     global _redis
     if _redis is None:
         if REDIS_URL:
-            _redis = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+            _redis = _TimedRedis.from_url(REDIS_URL, decode_responses=True)
         else:
-            _redis = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+            _redis = _TimedRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
     return _redis
 
 
@@ -1,6 +1,7 @@
 import asyncio
 import json
 import logging
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
@@ -20,6 +21,7 @@ async def _handle_task_event(data: dict) -> None:
     Tipos de evento:
         task_completed    — tarea finalizada (SUCCESS/FAILURE), emite 'task_event'
         user_notification — notificación individual,   emite 'notify'
+        media_ready       — upload procesado por la cola `media`, emite 'notify'
     """
     from itcj2.sockets.notifications import push_notification
 
@@ -42,6 +44,14 @@ async def _handle_task_event(data: dict) -> None:
         if notification:
             await push_notification(user_id, notification)
 
+    elif event_type == "media_ready":
+        await push_notification(user_id, {
+            "type": "media_ready",
+            "app": data.get("app"),  # no app_name: el FAB lo listaría como aviso
+            "attachment_id": data.get("attachment_id"),
+            "ticket_id": data.get("ticket_id"),
+        })
+
 
 async def _redis_task_subscriber() -> None:
     """Background task que escucha el canal 'task_events' de Redis y
@@ -67,6 +77,13 @@ async def _redis_task_subscriber() -> None:
                         try:
                             data = json.loads(message["data"])
                             await _handle_task_event(data)
+                            if "ts" in data:
+                                from itcj2.core.services import metrics
+                                metrics.observe(
+                                    "itcj_task_events_relay_lag_seconds",
+                                    max(time.time() - float(data["ts"]), 0.0),
+                                    type=data.get("type", ""),
+                                )
                         except Exception as e:
                             logger.error(
                                 f"Redis subscriber: error procesando mensaje: {e}"
@@ -103,6 +120,11 @@ async def lifespan(app: FastAPI):
     subscriber_task = None
     if get_settings().APP_ROLE != "http":
         subscriber_task = asyncio.create_task(_redis_task_subscriber())
+
+        # Los cuartos de Socket.IO solo existen en este proceso.
+        from itcj2.core.services import metrics
+        from itcj2.sockets.server import sio
+        metrics.instrument_socketio(sio)
     else:
         logger.info("APP_ROLE=http — subscriber de 'task_events' NO iniciado (lo corre el proceso de sockets)")
 
@@ -152,6 +174,30 @@ def create_app() -> FastAPI:
     async def health():
         return {"ok": True, "server": "fastapi", "version": "2.0.0"}
 
+    # Métricas para Prometheus. Fuera del prefijo /api y sin cookie: lo consulta
+    # el scraper con `Authorization: Bearer <METRICS_TOKEN>`. Sin token
+    # configurado responde 404 (fail-closed, no anuncia que existe).
+    @app.get("/metrics", tags=["system"], include_in_schema=False)
+    def metrics_endpoint(request: Request):
+        import hmac
+
+        from fastapi.responses import PlainTextResponse
+
+        from itcj2.core.services import metrics
+
+        token = get_settings().METRICS_TOKEN
+        if not token:
+            return JSONResponse(status_code=404, content={"detail": "Not Found"})
+        auth = request.headers.get("authorization", "")
+        if not hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()):
+            return JSONResponse(status_code=403, content={"detail": "Forbidden"})
+        try:
+            body = metrics.render()
+        except Exception as e:  # pragma: no cover
+            logger.error("metrics: no se pudo leer Redis: %s", e)
+            return JSONResponse(status_code=503, content={"detail": "metrics unavailable"})
+        return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
     # Readiness — confirma que PUEDE servir: DB (via pgbouncer) + Redis.
     # El healthcheck de Docker y el gate de promoción de deploy.sh apuntan aquí,
     # para que blue/green NO promueva un backend que booteó pero no conecta.
@@ -151,3 +151,23 @@ def setup_middleware(app: FastAPI):
     )
 
     app.add_middleware(JWTMiddleware)
+
+    # Por fuera de JWTMiddleware (solo MetricsMiddleware, si está activo, queda
+    # más afuera): así el conteo incluye también las queries del refresh del
+    # JWT, que son parte del costo real del request.
+    if settings.QUERY_PROFILER_ENABLED:
+        from itcj2.core.services import query_profiler
+        from itcj2.database import engine
+
+        query_profiler.install(engine)
+        app.add_middleware(
+            query_profiler.QueryProfilerMiddleware,
+            server_timing=settings.FLASK_ENV != "production",
+        )
+
+    if settings.METRICS_ENABLED:
+        from itcj2.core.services import metrics
+        from itcj2.database import engine
+
+        metrics.instrument_engine(engine)
+        app.add_middleware(metrics.MetricsMiddleware)
@@ -13,6 +13,7 @@ from itcj2.core.models import (  # noqa: F401
     Notification, Position, UserPosition, PositionAppRole,
     PositionAppPerm, ProgramPosition,
     TaskDefinition, PeriodicTask, TaskRun,
+    SequenceCounter, EmailOutbox, BusinessClosure,
 )
 
 # Helpdesk
@@ -39,13 +40,13 @@ from itcj2.apps.vistetec.models import (  # noqa: F401
 # Warehouse
 from itcj2.apps.warehouse.models import (  # noqa: F401
     WarehouseCategory, WarehouseSubcategory, WarehouseProduct,
-    WarehouseStockEntry, WarehouseMovement, WarehouseTicketMaterial,
+    WarehouseStockEntry, WarehouseMovement, WarehouseTicketMaterial, WarehouseConsumptionDaily,
 )
 
 # Maint
 from itcj2.apps.maint.models import (  # noqa: F401
     MaintArea,
-    MaintCategory, MaintTicket, MaintTicketTechnician, MaintTechnicianArea,
+    MaintCategory, MaintLocation, MaintTicket, MaintTicketTechnician, MaintTechnicianArea,
     MaintStatusLog, MaintTicketActionLog, MaintComment, MaintAttachment,
     MaintPriority, MaintConfigChangeLog,
     MaintMaintenanceType, MaintServiceOrigin,
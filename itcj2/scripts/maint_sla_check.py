@@ -5,22 +5,40 @@ Detecta tickets abiertos vencidos (due_at < now) y envía notificaciones
 TICKET_OVERDUE a los técnicos activos y dispatchers/admins de la app maint.
 Los tickets ya alertados en las últimas 24 h se omiten (re-alerta diaria).
 
-Ejecutar vía cron (ejemplo cada 15 minutos):
-  */15 * * * * cd /app && python -m itcj2.scripts.maint_sla_check >> /var/log/maint_sla.log 2>&1
+Las alertas al momento las emite el planificador por eventos
+(apps/maint/services/sla_scheduler.py + tarea maint_tasks.fire_sla_deadlines).
+Este script queda como reconciliación:
+
+  --resync  reconstruye el ZSET de vencimientos desde la BD y dispara lo que ya
+            venció (despliegue inicial, Redis vaciado). Ejemplo diario:
+              0 4 * * * cd /app && python -m itcj2.scripts.maint_sla_check --resync >> /var/log/maint_sla.log 2>&1
+  sin flag  barrido completo de tickets abiertos como antes (respaldo sin Redis):
+              */15 * * * * cd /app && python -m itcj2.scripts.maint_sla_check >> /var/log/maint_sla.log 2>&1
 
 La salida es JSON por stdout para facilitar el parsing en pipelines de monitoreo.
 """
+import argparse
 import json
 import sys
 
 
-def main() -> int:
+def main(argv: list[str] | None = None) -> int:
     from itcj2.database import SessionLocal
+    from itcj2.apps.maint.services import sla_scheduler
     from itcj2.apps.maint.services.sla_service import run_overdue_check
 
+    parser = argparse.ArgumentParser(description="SLA overdue check de maint")
+    parser.add_argument("--resync", action="store_true",
+                        help="Reconstruir el ZSET de vencimientos y disparar los vencidos")
+    args = parser.parse_args(argv)
+
     db = SessionLocal()
     try:
-        result = run_overdue_check(db)
+        if args.resync:
+            result = sla_scheduler.resync(db)
+            result["fired"] = sla_scheduler.fire_due(db)
+        else:
+            result = run_overdue_check(db)
         print(json.dumps(result, indent=2))
         return 0
     except Exception as exc:
@@ -1 +1,29 @@
 """Tareas Celery de itcj2."""
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Módulos que exportan TASK_DEFINITIONS (y opcionalmente PERIODIC_TASKS). Lo
+# leen `celery sync-tasks` y POST /tasks/definitions/sync: un módulo nuevo se
+# registra solo aquí.
+TASK_MODULES = (
+    "itcj2.tasks.helpdesk_tasks",
+    "itcj2.tasks.notification_tasks",
+    "itcj2.tasks.mundial_tasks",
+    "itcj2.tasks.agendatec_tasks",
+    "itcj2.tasks.email_tasks",
+    "itcj2.tasks.maint_tasks",
+    "itcj2.tasks.warehouse_tasks",
+)
+
+
+def load_task_modules() -> list:
+    """Importa TASK_MODULES; el que no se pueda importar se omite con un warning."""
+    modules = []
+    for name in TASK_MODULES:
+        try:
+            modules.append(importlib.import_module(name))
+        except ImportError as e:
+            logger.warning("No se pudo importar %s: %s", name, e)
+    return modules
@@ -0,0 +1,106 @@
+"""
+Tareas Celery del módulo AgendaTec.
+
+Tareas disponibles:
+    export_requests_report — genera el Excel de solicitudes (citas + bajas) en
+                             background cuando el rango es demasiado grande para
+                             hacerlo dentro de la request HTTP
+"""
+import logging
+import os
+
+from itcj2.celery_app import celery_app
+from itcj2.tasks.base import LoggedTask
+from itcj2.tasks.notification_tasks import push_user_notification
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Metadata de registro (se usa en CLI sync-tasks para poblar TaskDefinition)
+# ---------------------------------------------------------------------------
+
+TASK_DEFINITIONS = [
+    {
+        "task_name": "itcj2.tasks.agendatec_tasks.export_requests_report",
+        "display_name": "Exportar Reporte de AgendaTec",
+        "description": (
+            "Genera el reporte XLSX de solicitudes de AgendaTec (citas y bajas) en "
+            "segundo plano, lo guarda en disco y notifica al usuario solicitante con "
+            "el enlace de descarga. La API lo encola sola cuando el rango es grande."
+        ),
+        "app_name": "agendatec",
+        "category": "report",
+        "default_args": {"filters": {}, "layout": {}, "filename": "", "requested_by_user_id": 0},
+    },
+]
+
+
+# ---------------------------------------------------------------------------
+# export_requests_report
+# ---------------------------------------------------------------------------
+
+@celery_app.task(
+    bind=True,
+    base=LoggedTask,
+    name="itcj2.tasks.agendatec_tasks.export_requests_report",
+    max_retries=1,
+    default_retry_delay=60,
+    soft_time_limit=600,
+    time_limit=660,
+    queue="reports",
+)
+def export_requests_report(
+    self,
+    task_run_id: int,
+    filters: dict,
+    layout: dict,
+    filename: str,
+    requested_by_user_id: int,
+) -> dict:
+    """
+    Genera el Excel de solicitudes en instance/apps/agendatec/exports/.
+
+    Args:
+        task_run_id:          ID del TaskRun creado por la API.
+        filters:              Filtros ya parseados por la API (ver report_service).
+        layout:               Columnas, resúmenes y orden de las hojas.
+        filename:             Nombre de descarga sugerido (ya saneado).
+        requested_by_user_id: ID del usuario que recibirá la notificación.
+
+    Returns:
+        dict con claves: file_path, rows, download_url
+    """
+    from itcj2.database import SessionLocal
+    from itcj2.apps.agendatec.api.admin.reports import get_exports_dir
+    from itcj2.apps.agendatec.services.report_service import write_requests_xlsx
+
+    logger.info(f"[export_requests_report] Iniciando — filters={filters}, task_run_id={task_run_id}")
+    self.update_progress(task_run_id, current=0, total=1, message="Consultando solicitudes...")
+
+    # El prefijo con el id del TaskRun evita que dos exportaciones con el mismo
+    # nombre sugerido se pisen.
+    stored_name = f"{task_run_id}_{os.path.basename(filename) or 'reporte_agendatec.xlsx'}"
+    file_path = os.path.join(get_exports_dir(), stored_name)
+
+    def _progress(current: int, total: int) -> None:
+        self.update_progress(
+            task_run_id, current=current, total=total,
+            message=f"Escribiendo filas {current}/{total}...",
+        )
+
+    with SessionLocal() as db:
+        rows = write_requests_xlsx(db, file_path, filters, layout, progress=_progress)
+
+    download_url = f"/api/agendatec/v2/admin/reports/exports/{stored_name}"
+
+    push_user_notification(
+        user_id=requested_by_user_id,
+        app_name="agendatec",
+        title="Reporte de AgendaTec listo",
+        body=f"El reporte con {rows} solicitudes está disponible para descargar.",
+        link=download_url,
+    )
+
+    result = {"file_path": file_path, "rows": rows, "download_url": download_url}
+    logger.info(f"[export_requests_report] Completado: {result}")
+    return result
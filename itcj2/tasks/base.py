@@ -17,6 +17,7 @@ para que el backend Uvicorn lo retransmita por Socket.IO al usuario.
 """
 import json
 import logging
+import time
 from datetime import datetime
 
 from celery import Task
@@ -40,6 +41,7 @@ class LoggedTask(Task):
 
     def before_start(self, task_id, args, kwargs):
         """Marca el TaskRun como RUNNING justo antes de ejecutar."""
+        self.request.metrics_started = time.perf_counter()
         task_run_id = kwargs.get("task_run_id")
         if not task_run_id:
             return
@@ -93,6 +95,22 @@ class LoggedTask(Task):
     # Helper para actualizar el progreso desde el cuerpo de la tarea      #
     # ------------------------------------------------------------------ #
 
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        """Duración para /metrics (también tareas de Beat, sin TaskRun)."""
+        started = getattr(self.request, "metrics_started", None)
+        if started is None:
+            return
+        try:
+            from itcj2.core.services import metrics
+            metrics.observe(
+                "itcj_celery_task_duration_seconds",
+                time.perf_counter() - started,
+                task=self.name,
+                status=status,
+            )
+        except Exception as e:
+            logger.debug("LoggedTask: no se pudo registrar métrica (%s)", e)
+
     def update_progress(self, task_run_id: int, current: int, total: int, message: str = ""):
         """Actualiza el progreso de un TaskRun desde el cuerpo de la tarea.
 
@@ -178,6 +196,7 @@ class LoggedTask(Task):
                 "task_name": task_name,
                 "status": status,
                 "user_id": user_id,
+                "ts": time.time(),
             }))
         except Exception as e:
             logger.error(
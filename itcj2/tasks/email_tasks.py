@@ -0,0 +1,61 @@
+"""
+Tareas Celery del outbox de correo (cola ``email``).
+
+Tareas disponibles:
+    drain_email_outbox — envía los correos pendientes de core_email_outbox a
+                         Microsoft Graph en lotes (ver core/services/email_outbox.py)
+
+La encola el propio outbox tras cada COMMIT que agrega correos y al programar
+reintentos. La definición se registra para poder agendar además un barrido
+periódico (p.ej. cada 5 minutos) que recoja lo que quedó pendiente si el broker
+no estaba disponible.
+"""
+import logging
+
+from itcj2.celery_app import celery_app
+from itcj2.tasks.base import LoggedTask
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Metadata de registro (se usa en CLI sync-tasks para poblar TaskDefinition)
+# ---------------------------------------------------------------------------
+
+TASK_DEFINITIONS = [
+    {
+        "task_name": "itcj2.tasks.email_tasks.drain_email_outbox",
+        "display_name": "Enviar Correos Pendientes",
+        "description": (
+            "Envía los correos pendientes del outbox (asignaciones, resoluciones, "
+            "encuestas, ...) a Microsoft Graph en lotes de hasta 20 y reprograma "
+            "los que fallaron con backoff."
+        ),
+        "app_name": "core",
+        "category": "notification",
+        "default_args": {"app_key": None},
+    },
+]
+
+
+@celery_app.task(
+    bind=True,
+    base=LoggedTask,
+    name="itcj2.tasks.email_tasks.drain_email_outbox",
+    max_retries=3,
+    default_retry_delay=30,
+    soft_time_limit=120,
+    time_limit=150,
+    queue="email",
+)
+def drain_email_outbox(self, app_key: str | None = None, task_run_id: int | None = None) -> dict:
+    """Drena el outbox (todas las apps o solo `app_key`). Reintenta ante errores de BD."""
+    from itcj2.core.services import email_outbox
+
+    try:
+        stats = email_outbox.drain(app_key)
+    except Exception as exc:
+        logger.error("drain_email_outbox: error drenando %s: %s", app_key or "todas", exc)
+        raise self.retry(exc=exc)
+    if stats.get("picked"):
+        logger.info("drain_email_outbox[%s]: %s", app_key or "todas", stats)
+    return stats
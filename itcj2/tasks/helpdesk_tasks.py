@@ -4,14 +4,16 @@ Tareas Celery del módulo Helpdesk.
 Tareas disponibles:
     cleanup_attachments     — elimina adjuntos expirados y marca los de tickets cerrados
     convert_document        — genera solicitud/orden_trabajo como PDF en background
+    prerender_orden_trabajo — deja en caché la orden de trabajo al resolver/cerrar
     export_inventory_report — exporta inventario a CSV o XLSX en background
 """
-import json
 import logging
 import os
+import time
 
 from itcj2.celery_app import celery_app
 from itcj2.tasks.base import LoggedTask
+from itcj2.tasks.notification_tasks import push_user_notification
 from itcj2.core.utils.timezone import db_now
 
 logger = logging.getLogger(__name__)
@@ -63,6 +65,11 @@ TASK_DEFINITIONS = [
 # cleanup_attachments
 # ---------------------------------------------------------------------------
 
+# Presupuesto por corrida: se deja margen al soft_time_limit para confirmar el
+# lote en curso y re-encolar desde el checkpoint.
+_CLEANUP_BUDGET_SECONDS = 90
+
+
 @celery_app.task(
     bind=True,
     base=LoggedTask,
@@ -72,118 +79,91 @@ TASK_DEFINITIONS = [
     soft_time_limit=120,
     time_limit=150,
 )
-def cleanup_attachments(self, task_run_id: int | None = None, dry_run: bool = False):
+def cleanup_attachments(self, task_run_id: int | None = None, dry_run: bool = False,
+                        resume_after: list | None = None):
     """
     Tarea de mantenimiento: limpia adjuntos del helpdesk.
 
-    Paso 1 — Marcar para borrado: recorre tickets en status CLOSED sin fecha
-              de auto-delete y asigna auto_delete_at = ticket.updated_at + 7 días
-              (updated_at es la fecha de cierre, ya que un ticket cerrado no cambia más).
+    Paso 1 — Marcar para borrado: un UPDATE sobre los adjuntos de tickets en
+              status CLOSED sin fecha de auto-delete: auto_delete_at =
+              ticket.updated_at + 7 días (updated_at es la fecha de cierre, ya
+              que un ticket cerrado no cambia más).
     Paso 2 — Eliminar expirados: borra archivos del disco y registros de DB
-              donde auto_delete_at <= ahora Y el ticket lleva >= 7 días cerrado.
+              donde auto_delete_at <= ahora Y el ticket lleva >= 7 días cerrado,
+              por lotes (ver attachment_cleanup.expired_purge). Si el lote no
+              termina dentro del presupuesto, la tarea se re-encola desde el
+              último lote confirmado (`resume_after`) sin repetir el paso 1.
 
     Args:
         task_run_id: ID del TaskRun creado por la API antes de encolar esta tarea.
                      Puede ser None si el scheduler no pudo inyectarlo (modo degradado).
         dry_run: Si True, solo cuenta lo que haría sin modificar nada.
+        resume_after: checkpoint [auto_delete_at ISO, id] de una corrida anterior.
 
     Returns:
         dict con claves: marked_for_delete, deleted_files, freed_bytes, errors, dry_run,
-                         by_ticket (desglose por número de ticket)
+                         by_ticket (desglose por número de ticket), resumed_from, continues
     """
+    from celery.exceptions import SoftTimeLimitExceeded
     from itcj2.database import SessionLocal
     from itcj2.apps.helpdesk.services.attachment_cleanup import (
+        expired_purge,
+        pending_marks_by_ticket,
         set_auto_delete_on_closed_tickets,
     )
 
-    logger.info(f"[cleanup_attachments] Iniciando (dry_run={dry_run}, task_run_id={task_run_id})")
+    logger.info(
+        f"[cleanup_attachments] Iniciando (dry_run={dry_run}, task_run_id={task_run_id}, "
+        f"resume_after={resume_after})"
+    )
 
-    errors = []
+    deadline = time.monotonic() + _CLEANUP_BUDGET_SECONDS
     marked = 0
-    deleted = 0
-    freed_bytes = 0
     by_ticket: dict = {}
     marked_by_ticket: dict = {}   # dry-run: qué SERÍA marcado (step 1)
 
     try:
         with SessionLocal() as db:
-            # Paso 1: marcar tickets resueltos
+            # Paso 1: marcar tickets cerrados (solo en la primera corrida)
             self.update_progress(task_run_id, current=0, total=2, message="Marcando adjuntos de tickets cerrados...")
-            if not dry_run:
-                marked = set_auto_delete_on_closed_tickets(db)
-            else:
-                # En dry_run solo contar sin commit, pero SÍ construir desglose
-                from itcj2.apps.helpdesk.models.ticket import Ticket
-                closed_tickets = db.query(Ticket).filter(
-                    Ticket.status == "CLOSED",
-                ).all()
-                for ticket in closed_tickets:
-                    for att in ticket.attachments:
-                        if att.auto_delete_at is None:
-                            marked += 1
-                            key = ticket.ticket_number
-                            if key not in marked_by_ticket:
-                                marked_by_ticket[key] = {
-                                    "ticket_image": 0,
-                                    "resolution": 0,
-                                    "comment": 0,
-                                    "total": 0,
-                                }
-                            att_type = att.attachment_type
-                            if att_type == "ticket":
-                                marked_by_ticket[key]["ticket_image"] += 1
-                            elif att_type == "resolution":
-                                marked_by_ticket[key]["resolution"] += 1
-                            elif att_type == "comment":
-                                marked_by_ticket[key]["comment"] += 1
-                            marked_by_ticket[key]["total"] += 1
+            if resume_after is None:
+                if not dry_run:
+                    marked = set_auto_delete_on_closed_tickets(db)
+                else:
+                    marked_by_ticket = pending_marks_by_ticket(db)
+                    marked = sum(d["total"] for d in marked_by_ticket.values())
 
             # Paso 2: eliminar expirados
             self.update_progress(task_run_id, current=1, total=2, message="Eliminando adjuntos expirados...")
-            if not dry_run:
-                deleted, freed_bytes, by_ticket = _cleanup_with_metrics(db, errors)
-            else:
-                from itcj2.apps.helpdesk.models.attachment import Attachment
-                from itcj2.apps.helpdesk.models.ticket import Ticket
-                from itcj2.apps.helpdesk.services.attachment_cleanup import AUTO_DELETE_DAYS
-                from sqlalchemy.orm import joinedload
-                from datetime import datetime, timedelta
-                _now = db_now()
-                _cutoff = _now - timedelta(days=AUTO_DELETE_DAYS)
-                expired = (
-                    db.query(Attachment)
-                    .options(joinedload(Attachment.ticket))
-                    .join(Ticket, Ticket.id == Attachment.ticket_id)
-                    .filter(
-                        Attachment.auto_delete_at.isnot(None),
-                        Attachment.auto_delete_at <= _now,
-                        Ticket.status == "CLOSED",
-                        Ticket.updated_at <= _cutoff,
-                    )
-                    .all()
-                )
-                deleted = len(expired)
-                import os
-                freed_bytes = sum(
-                    os.path.getsize(a.filepath)
-                    for a in expired
-                    if a.filepath and os.path.exists(a.filepath)
-                )
-                by_ticket = _build_ticket_breakdown(expired)
+            purge = expired_purge(db, after=resume_after, dry_run=dry_run, by_ticket=by_ticket)
+            try:
+                finished = purge.run(deadline)
+            except SoftTimeLimitExceeded:
+                # Los lotes anteriores ya tienen commit; el actual se repite
+                # (sus archivos ya borrados cuentan como borrados).
+                db.rollback()
+                finished = False
 
     except Exception as exc:
         logger.exception(f"[cleanup_attachments] Error inesperado: {exc}")
         raise self.retry(exc=exc)
 
+    checkpoint = purge.checkpoint()
+    if not finished:
+        logger.info(f"[cleanup_attachments] Presupuesto agotado; continúa desde {checkpoint}")
+        cleanup_attachments.apply_async(kwargs={"dry_run": dry_run, "resume_after": checkpoint})
+
     result = {
         "marked_for_delete": marked,
-        "deleted_files": deleted,
-        "freed_bytes": freed_bytes,
-        "freed_mb": round(freed_bytes / (1024 * 1024), 2),
-        "errors": errors,
+        "deleted_files": purge.purged,
+        "freed_bytes": purge.freed_bytes,
+        "freed_mb": round(purge.freed_bytes / (1024 * 1024), 2),
+        "errors": purge.errors,
         "dry_run": dry_run,
         "by_ticket": by_ticket,
         "marked_by_ticket": marked_by_ticket,
+        "resumed_from": resume_after,
+        "continues": not finished,
     }
     _log_cleanup_result(result)
     return result
@@ -203,140 +183,6 @@ def _get_exports_dir() -> str:
     return exports_dir
 
 
-def _push_user_notification(user_id: int, title: str, body: str, link: str | None) -> None:
-    """Crea un registro Notification en DB y publica en Redis para Socket.IO."""
-    try:
-        from itcj2.database import SessionLocal
-        from itcj2.core.models.notification import Notification
-        import redis
-        from itcj2.config import get_settings
-
-        with SessionLocal() as db:
-            notif = Notification(
-                user_id=user_id,
-                app_name="helpdesk",
-                type="SYSTEM",
-                title=title,
-                body=body,
-                data={"url": link} if link else {},
-            )
-            db.add(notif)
-            db.commit()
-            db.refresh(notif)
-            notif_dict = notif.to_dict()
-
-        r = redis.from_url(get_settings().REDIS_URL)
-        r.publish("task_events", json.dumps({
-            "type": "user_notification",
-            "user_id": user_id,
-            "notification": notif_dict,
-        }))
-    except Exception as e:
-        logger.error(f"[helpdesk_tasks] Error creando notificación para user {user_id}: {e}")
-
-
-def _cleanup_with_metrics(db, errors: list) -> tuple:
-    """Elimina adjuntos expirados y devuelve (deleted_count, freed_bytes, by_ticket).
-
-    Doble condición de seguridad:
-      1. auto_delete_at está fijado y ya venció.
-      2. El ticket está CLOSED y ticket.updated_at tiene >= 7 días (guarda
-         contra fechas mal calculadas que pudieran adelantar el borrado).
-    """
-    import os
-    from datetime import datetime, timedelta
-    from itcj2.apps.helpdesk.models.attachment import Attachment
-    from itcj2.apps.helpdesk.models.ticket import Ticket
-    from itcj2.apps.helpdesk.services.attachment_cleanup import AUTO_DELETE_DAYS
-    from sqlalchemy.orm import joinedload
-
-    now = db_now()
-    cutoff = now - timedelta(days=AUTO_DELETE_DAYS)
-
-    expired = (
-        db.query(Attachment)
-        .options(joinedload(Attachment.ticket))
-        .join(Ticket, Ticket.id == Attachment.ticket_id)
-        .filter(
-            Attachment.auto_delete_at.isnot(None),
-            Attachment.auto_delete_at <= now,
-            Ticket.status == "CLOSED",
-            Ticket.updated_at <= cutoff,
-        )
-        .all()
-    )
-
-    deleted = 0
-    freed_bytes = 0
-    from datetime import timezone
-    deletion_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
-    # Construir el desglose ANTES de borrar: después del commit los objetos
-    # se desvinculan de la sesión y att.ticket ya no puede hacer lazy load.
-    by_ticket = _build_ticket_breakdown(expired)
-
-    successfully_deleted = []
-    for attachment in expired:
-        try:
-            if attachment.filepath and os.path.exists(attachment.filepath):
-                freed_bytes += os.path.getsize(attachment.filepath)
-                os.remove(attachment.filepath)
-            db.delete(attachment)
-            successfully_deleted.append(attachment)
-            deleted += 1
-        except Exception as e:
-            errors.append({"attachment_id": attachment.id, "error": str(e)})
-            logger.error(f"Error eliminando attachment {attachment.id}: {e}")
-
-    # Notas de auditoría agrupadas por entidad padre (un solo mensaje por ticket/comentario)
-    if successfully_deleted:
-        _batch_audit_notes(db, successfully_deleted, deletion_date)
-        db.commit()
-
-    return deleted, freed_bytes, by_ticket
-
-
-def _build_ticket_breakdown(attachments: list) -> dict:
-    """Agrupa los adjuntos eliminados por número de ticket.
-
-    Returns:
-        dict[ticket_number, {ticket_image, resolution, comment, total, freed_bytes}]
-    """
-    import os
-    breakdown: dict = {}
-
-    for att in attachments:
-        ticket = att.ticket
-        key = ticket.ticket_number if ticket else f"ticket_{att.ticket_id}"
-
-        if key not in breakdown:
-            breakdown[key] = {
-                "ticket_image": 0,
-                "resolution": 0,
-                "comment": 0,
-                "total": 0,
-                "freed_bytes": 0,
-            }
-
-        att_type = att.attachment_type
-        if att_type == "ticket":
-            breakdown[key]["ticket_image"] += 1
-        elif att_type == "resolution":
-            breakdown[key]["resolution"] += 1
-        elif att_type == "comment":
-            breakdown[key]["comment"] += 1
-
-        breakdown[key]["total"] += 1
-
-        if att.filepath and os.path.exists(att.filepath):
-            try:
-                breakdown[key]["freed_bytes"] += os.path.getsize(att.filepath)
-            except OSError:
-                pass
-
-    return breakdown
-
-
 def _log_cleanup_result(result: dict) -> None:
     """Emite un log detallado del resultado de la limpieza de adjuntos."""
     dry_run = result.get("dry_run", False)
@@ -404,60 +250,6 @@ def _log_cleanup_result(result: dict) -> None:
         logger.info("%s Sin adjuntos actualmente expirados (ejecutar modo normal para marcarlos).", prefix)
 
 
-def _batch_audit_notes(db, successfully_deleted: list, deletion_date: str) -> None:
-    """Registra notas de auditoría agrupadas por entidad padre.
-
-    Un solo mensaje por ticket (imágenes), un solo mensaje por ticket (resolución),
-    y un solo mensaje por comentario — listando todos los archivos en cada caso.
-    Evita el ruido de N mensajes separados cuando un ticket tiene N archivos.
-    """
-    from collections import defaultdict
-    from datetime import datetime, timezone
-    from itcj2.apps.helpdesk.models.ticket import Ticket
-    from itcj2.apps.helpdesk.models.comment import Comment
-
-    ticket_images: dict = defaultdict(int)           # ticket_id → cantidad de imágenes
-    ticket_resolutions: dict = defaultdict(list)     # ticket_id → [filenames]
-    comment_files: dict = defaultdict(list)          # comment_id → [filenames]
-
-    for att in successfully_deleted:
-        att_type = att.attachment_type
-        if att_type == "ticket":
-            ticket_images[att.ticket_id] += 1
-        elif att_type == "resolution":
-            ticket_resolutions[att.ticket_id].append(att.original_filename)
-        elif att_type == "comment" and att.comment_id:
-            comment_files[att.comment_id].append(att.original_filename)
-
-    try:
-        for ticket_id, count in ticket_images.items():
-            ticket = db.get(Ticket, ticket_id)
-            if ticket is not None:
-                ticket.description = (ticket.description or "") + (
-                    f"\n\n[{deletion_date}] Se eliminaron {count} imagen(es) adjunta(s) automáticamente."
-                )
-
-        for ticket_id, filenames in ticket_resolutions.items():
-            ticket = db.get(Ticket, ticket_id)
-            if ticket is not None:
-                files_list = "".join(f"\n  - {f}" for f in filenames)
-                ticket.resolution_notes = (ticket.resolution_notes or "") + (
-                    f"\n\n[{deletion_date}] Archivos de resolución eliminados automáticamente:{files_list}"
-                )
-
-        for comment_id, filenames in comment_files.items():
-            comment = db.get(Comment, comment_id)
-            if comment is not None:
-                files_list = "".join(f"\n  - {f}" for f in filenames)
-                comment.content = (comment.content or "") + (
-                    f"\n\n[{deletion_date}] Archivos eliminados automáticamente:{files_list}"
-                )
-                comment.updated_at = datetime.now(timezone.utc)
-
-    except Exception as e:
-        logger.warning("[cleanup] Error al registrar notas de auditoría en batch: %s", e)
-
-
 # ---------------------------------------------------------------------------
 # convert_document
 # ---------------------------------------------------------------------------
@@ -550,8 +342,9 @@ def convert_document(
     download_url = f"/api/helpdesk/exports/{filename}"
 
     # ── Paso 4: notificar al usuario ─────────────────────────────────────
-    _push_user_notification(
+    push_user_notification(
         user_id=notify_user_id,
+        app_name="helpdesk",
         title=f"{display_type} lista",
         body=f"El PDF del ticket {ticket_number} está disponible para descargar.",
         link=download_url,
@@ -578,6 +371,37 @@ def _count_pdf_pages(pdf_path: str) -> int | None:
         return None
 
 
+# ---------------------------------------------------------------------------
+# prerender_orden_trabajo
+# ---------------------------------------------------------------------------
+
+@celery_app.task(
+    bind=True,
+    base=LoggedTask,
+    name="itcj2.tasks.helpdesk_tasks.prerender_orden_trabajo",
+    max_retries=1,
+    default_retry_delay=30,
+    soft_time_limit=60,
+    time_limit=90,
+)
+def prerender_orden_trabajo(self, ticket_id: int) -> dict:
+    """
+    Genera la orden de trabajo (DOCX + PDF) de un ticket recién resuelto o
+    cerrado para que la descarga salga de la caché (document_cache). La encola
+    ticket_service; sin TaskRun (es interna, no la lanza un admin).
+    """
+    from itcj2.database import SessionLocal
+    from itcj2.apps.helpdesk.models.ticket import Ticket
+    from itcj2.apps.helpdesk.services.document_service import generate_orden_trabajo_pdf
+
+    with SessionLocal() as db:
+        ticket = db.get(Ticket, ticket_id)
+        if ticket is None or not (ticket.is_resolved or ticket.status == "CLOSED"):
+            return {"ticket_id": ticket_id, "status": "skipped"}
+        size = len(generate_orden_trabajo_pdf(ticket).getvalue())
+    return {"ticket_id": ticket_id, "status": "cached", "bytes": size}
+
+
 # ---------------------------------------------------------------------------
 # export_inventory_report
 # ---------------------------------------------------------------------------
@@ -661,8 +485,9 @@ def export_inventory_report(
     self.update_progress(task_run_id, current=2, total=3, message="Notificando al usuario...")
 
     # ── Paso 3: notificar al usuario ─────────────────────────────────────
-    _push_user_notification(
+    push_user_notification(
         user_id=requested_by_user_id,
+        app_name="helpdesk",
         title="Reporte de inventario listo",
         body=f"El reporte con {row_count} equipos está disponible para descargar ({format.upper()}).",
         link=download_url,
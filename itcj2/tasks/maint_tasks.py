@@ -0,0 +1,72 @@
+"""
+Tareas Celery del módulo Mantenimiento.
+
+Tareas disponibles:
+    fire_sla_deadlines — alerta los tickets cuyo vencimiento SLA ya se cumplió
+                         (ver apps/maint/services/sla_scheduler.py)
+
+El propio planificador la encola con countdown exacto para los vencimientos
+cercanos, y cada corrida arma el siguiente; los lejanos los recoge el beat cada
+10 minutos ("*/10 * * * *"), que `sync-tasks` deja agendado por defecto
+(PERIODIC_TASKS), y les arma su despertar exacto al entrar en
+MAINT_SLA_WAKE_HORIZON. Cada corrida solo toca las entradas vencidas del ZSET,
+así que es barata aunque no haya nada que hacer.
+"""
+import logging
+
+from itcj2.celery_app import celery_app
+from itcj2.tasks.base import LoggedTask
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Metadata de registro (se usa en CLI sync-tasks para poblar TaskDefinition)
+# ---------------------------------------------------------------------------
+
+TASK_DEFINITIONS = [
+    {
+        "task_name": "itcj2.tasks.maint_tasks.fire_sla_deadlines",
+        "display_name": "Alertas SLA de Mantenimiento",
+        "description": (
+            "Envía la alerta TICKET_OVERDUE de los tickets de mantenimiento cuyo "
+            "vencimiento (o re-alerta diaria) ya se cumplió y agenda la siguiente. "
+            "Programar cada 10 minutos; los vencimientos cercanos se despiertan solos."
+        ),
+        "app_name": "maint",
+        "category": "notification",
+        "default_args": {},
+    },
+]
+
+# Schedules que sync-tasks crea si no existen (no pisa los editados en la UI).
+# Sin este cron, los vencimientos fuera de MAINT_SLA_WAKE_HORIZON nunca se alertan.
+PERIODIC_TASKS = [
+    {
+        "name": "maint-sla-deadlines",
+        "task_name": "itcj2.tasks.maint_tasks.fire_sla_deadlines",
+        "cron_expression": "*/10 * * * *",
+        "description": "Alertas SLA de Mantenimiento (red de seguridad del planificador).",
+    },
+]
+
+
+@celery_app.task(
+    bind=True,
+    base=LoggedTask,
+    name="itcj2.tasks.maint_tasks.fire_sla_deadlines",
+    max_retries=3,
+    default_retry_delay=30,
+    soft_time_limit=60,
+    time_limit=90,
+)
+def fire_sla_deadlines(self, task_run_id: int | None = None) -> dict:
+    """Procesa los vencimientos SLA cumplidos. Reintenta ante errores de BD/Redis."""
+    from itcj2.apps.maint.services import sla_scheduler
+    from itcj2.database import SessionLocal
+
+    try:
+        with SessionLocal() as db:
+            return sla_scheduler.fire_due(db)
+    except Exception as exc:
+        logger.error("fire_sla_deadlines: %s", exc)
+        raise self.retry(exc=exc)
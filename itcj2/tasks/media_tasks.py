@@ -0,0 +1,37 @@
+"""
+Tareas Celery de procesamiento de uploads (cola ``media``).
+
+Tareas disponibles:
+    process_media — recomprime/genera variantes de un upload que el request dejó
+                    crudo (ver core/services/media_jobs.py)
+
+No tiene TASK_DEFINITIONS: la encolan los endpoints de upload, no un admin, y
+no crea TaskRun (serían miles de filas por día).
+"""
+import logging
+
+from itcj2.celery_app import celery_app
+from itcj2.tasks.base import LoggedTask
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    bind=True,
+    base=LoggedTask,
+    name="itcj2.tasks.media_tasks.process_media",
+    max_retries=2,
+    default_retry_delay=5,
+    soft_time_limit=120,
+    time_limit=150,
+    queue="media",
+)
+def process_media(self, job: dict) -> dict:
+    """Ejecuta un job de media_jobs. Reintenta ante errores de BD/disco."""
+    from itcj2.core.services import media_jobs
+
+    try:
+        return media_jobs.run_job(job)
+    except Exception as exc:
+        logger.error("process_media: error en job %s: %s", job, exc)
+        raise self.retry(exc=exc)
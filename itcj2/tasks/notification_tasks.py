@@ -7,6 +7,7 @@ Tareas disponibles:
 """
 import json
 import logging
+import time
 from typing import Any
 
 from itcj2.celery_app import celery_app
@@ -166,11 +167,38 @@ def _push_user_notifications(notif_dicts: list[dict]) -> None:
                 "type": "user_notification",
                 "user_id": notif["user_id"] if "user_id" in notif else None,
                 "notification": notif,
+                "ts": time.time(),
             }))
     except Exception as e:
         logger.error(f"[send_mass_notification] Error publicando en Redis: {e}")
 
 
+def push_user_notification(user_id: int, app_name: str, title: str, body: str, link: str | None) -> None:
+    """Crea una notificación SYSTEM para un usuario y la publica para Socket.IO.
+
+    La usan las tareas de exportación (helpdesk, agendatec) para avisar que el
+    archivo está listo. Best-effort: un fallo se loguea y no tumba la tarea.
+    """
+    try:
+        import redis
+        from itcj2.config import get_settings
+        from itcj2.database import SessionLocal
+
+        with SessionLocal() as db:
+            [notif_dict] = _create_notifications_batch(db, [user_id], title, body, app_name, link)
+
+        # user_id explícito: to_dict() no lo trae y el relay lo necesita para el room
+        r = redis.from_url(get_settings().REDIS_URL)
+        r.publish("task_events", json.dumps({
+            "type": "user_notification",
+            "user_id": user_id,
+            "notification": notif_dict,
+            "ts": time.time(),
+        }))
+    except Exception as e:
+        logger.error(f"[notification_tasks] Error creando notificación para user {user_id}: {e}")
+
+
 # ---------------------------------------------------------------------------
 # send_mass_notification
 # ---------------------------------------------------------------------------
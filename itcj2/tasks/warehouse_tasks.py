@@ -0,0 +1,74 @@
+"""
+Tareas Celery del módulo Almacén.
+
+Tareas disponibles:
+    refresh_stock_signals — recálculo del punto de restock + alerta de stock
+                            bajo (ver fifo_service.refresh_stock_signals)
+
+`fifo_service.consume_many` la encola tras el commit con los productos
+consumidos, así el consumo no paga el recálculo dentro de su transacción.
+Sin `product_ids` recalcula todos los productos activos en una sola sentencia
+sobre ``warehouse_consumption_daily`` y purga agregados viejos: `sync-tasks`
+la deja agendada a diario así (PERIODIC_TASKS). Sin esa corrida la tabla de
+agregados crece sin límite y un producto que deja de consumirse conserva su
+bandera de restock vieja, porque el recálculo incremental solo ve lo consumido.
+"""
+import logging
+
+from itcj2.celery_app import celery_app
+from itcj2.tasks.base import LoggedTask
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Metadata de registro (se usa en CLI sync-tasks para poblar TaskDefinition)
+# ---------------------------------------------------------------------------
+
+TASK_DEFINITIONS = [
+    {
+        "task_name": "itcj2.tasks.warehouse_tasks.refresh_stock_signals",
+        "display_name": "Recalcular Restock del Almacén",
+        "description": (
+            "Recalcula el punto de restock (consumo de 90 días) y envía la alerta "
+            "de stock bajo. Sin productos indicados procesa todos los activos; "
+            "programar diariamente."
+        ),
+        "app_name": "warehouse",
+        "category": "maintenance",
+        "default_args": {"product_ids": None},
+    },
+]
+
+# Schedules que sync-tasks crea si no existen (no pisa los editados en la UI).
+# Sin kwargs: product_ids=None es el recálculo completo con purga.
+PERIODIC_TASKS = [
+    {
+        "name": "warehouse-stock-signals",
+        "task_name": "itcj2.tasks.warehouse_tasks.refresh_stock_signals",
+        "cron_expression": "30 2 * * *",
+        "description": "Recálculo diario completo del restock del Almacén (purga agregados viejos).",
+    },
+]
+
+
+@celery_app.task(
+    bind=True,
+    base=LoggedTask,
+    name="itcj2.tasks.warehouse_tasks.refresh_stock_signals",
+    max_retries=3,
+    default_retry_delay=30,
+    soft_time_limit=300,
+    time_limit=360,
+)
+def refresh_stock_signals(self, product_ids: list[int] | None = None, task_run_id: int | None = None) -> dict:
+    """Restock/alerta de `product_ids` (o de todos). Reintenta ante errores de BD."""
+    from itcj2.apps.warehouse.services import fifo_service
+    from itcj2.database import SessionLocal
+
+    try:
+        with SessionLocal() as db:
+            processed = fifo_service.refresh_stock_signals(db, product_ids)
+    except Exception as exc:
+        logger.error("refresh_stock_signals: %s", exc)
+        raise self.retry(exc=exc)
+    return {"processed": processed}
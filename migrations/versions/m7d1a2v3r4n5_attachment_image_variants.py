@@ -0,0 +1,26 @@
+"""helpdesk/maint attachments: columna variants (miniaturas WebP/JPEG)
+
+Manifiesto que escribe core/services/media_service.save_image_variants al
+subir una imagen. Aditivo y nullable: las filas existentes quedan en NULL y se
+sirven con el archivo original para cualquier ?size=.
+
+Revision ID: m7d1a2v3r4n5
+Revises: f6feb1cdc56a
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "m7d1a2v3r4n5"
+down_revision = "f6feb1cdc56a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE helpdesk_attachment ADD COLUMN IF NOT EXISTS variants JSON")
+    op.execute("ALTER TABLE maint_attachments ADD COLUMN IF NOT EXISTS variants JSON")
+
+
+def downgrade():
+    op.execute("ALTER TABLE maint_attachments DROP COLUMN IF EXISTS variants")
+    op.execute("ALTER TABLE helpdesk_attachment DROP COLUMN IF EXISTS variants")
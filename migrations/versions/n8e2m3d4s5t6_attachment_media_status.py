@@ -0,0 +1,32 @@
+"""helpdesk/maint attachments: columna media_status (procesamiento en cola)
+
+'processing' mientras la cola Celery `media` recomprime el upload
+(core/services/media_jobs.py); 'ready' al terminar. Las filas existentes ya
+están procesadas: server_default 'ready'.
+
+Revision ID: n8e2m3d4s5t6
+Revises: m7d1a2v3r4n5
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "n8e2m3d4s5t6"
+down_revision = "m7d1a2v3r4n5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "ALTER TABLE helpdesk_attachment "
+        "ADD COLUMN IF NOT EXISTS media_status VARCHAR(20) NOT NULL DEFAULT 'ready'"
+    )
+    op.execute(
+        "ALTER TABLE maint_attachments "
+        "ADD COLUMN IF NOT EXISTS media_status VARCHAR(20) NOT NULL DEFAULT 'ready'"
+    )
+
+
+def downgrade():
+    op.execute("ALTER TABLE maint_attachments DROP COLUMN IF EXISTS media_status")
+    op.execute("ALTER TABLE helpdesk_attachment DROP COLUMN IF EXISTS media_status")
@@ -0,0 +1,33 @@
+"""helpdesk/maint attachments: índices parciales para la purga por keyset
+
+core/services/file_purge.py recorre los vencidos ordenados por
+(auto_delete_at, id); el índice parcial solo contiene filas con fecha de
+borrado (y, en maint, aún no purgadas).
+
+Revision ID: p9c1l2n3u4p5
+Revises: n8e2m3d4s5t6
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "p9c1l2n3u4p5"
+down_revision = "n8e2m3d4s5t6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_helpdesk_attachment_purge_keyset "
+        "ON helpdesk_attachment (auto_delete_at, id) WHERE auto_delete_at IS NOT NULL"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_maint_attachment_purge_keyset "
+        "ON maint_attachments (auto_delete_at, id) "
+        "WHERE NOT is_purged AND auto_delete_at IS NOT NULL"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_maint_attachment_purge_keyset")
+    op.execute("DROP INDEX IF EXISTS ix_helpdesk_attachment_purge_keyset")
@@ -0,0 +1,31 @@
+"""core: contadores de folios/números consecutivos (core_sequence_counters)
+
+Una fila por (nombre, ámbito); core/services/sequence_service.py aparta
+bloques con UPDATE ... RETURNING en lugar de buscar el máximo en cada tabla.
+Los contadores arrancan solos (seed) la primera vez que se usan.
+
+Revision ID: q1s2e3q4c5n6
+Revises: p9c1l2n3u4p5
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "q1s2e3q4c5n6"
+down_revision = "p9c1l2n3u4p5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS core_sequence_counters ("
+        " name VARCHAR(60) NOT NULL,"
+        " scope VARCHAR(60) NOT NULL DEFAULT '',"
+        " last_value BIGINT NOT NULL DEFAULT 0,"
+        " updated_at TIMESTAMP NOT NULL DEFAULT NOW(),"
+        " PRIMARY KEY (name, scope))"
+    )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS core_sequence_counters")
@@ -0,0 +1,42 @@
+"""core: outbox de correo (core_email_outbox)
+
+Los correos transaccionales se guardan en la misma transacción que el cambio
+que los origina; la cola Celery `email` los drena (core/services/email_outbox.py).
+El índice parcial cubre la búsqueda de pendientes vencidos del drenado.
+
+Revision ID: r2e3m4o5b6x7
+Revises: q1s2e3q4c5n6
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "r2e3m4o5b6x7"
+down_revision = "q1s2e3q4c5n6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS core_email_outbox ("
+        " id SERIAL PRIMARY KEY,"
+        " app_key VARCHAR(32) NOT NULL,"
+        " recipients JSON NOT NULL,"
+        " subject VARCHAR(255) NOT NULL,"
+        " html TEXT NOT NULL,"
+        " ref VARCHAR(100),"
+        " status VARCHAR(10) NOT NULL DEFAULT 'pending',"
+        " attempts SMALLINT NOT NULL DEFAULT 0,"
+        " next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),"
+        " last_error TEXT,"
+        " created_at TIMESTAMP NOT NULL DEFAULT NOW(),"
+        " sent_at TIMESTAMP)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_core_email_outbox_due "
+        "ON core_email_outbox (next_attempt_at) WHERE status = 'pending'"
+    )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS core_email_outbox")
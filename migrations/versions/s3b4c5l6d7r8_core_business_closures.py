@@ -0,0 +1,29 @@
+"""core: días inhábiles institucionales (core_business_closures)
+
+Calendario de festivos/cierres que descuenta el motor de horas hábiles
+(core/services/business_time.py).
+
+Revision ID: s3b4c5l6d7r8
+Revises: r2e3m4o5b6x7
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "s3b4c5l6d7r8"
+down_revision = "r2e3m4o5b6x7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS core_business_closures ("
+        " id SERIAL PRIMARY KEY,"
+        " day DATE NOT NULL UNIQUE,"
+        " name VARCHAR(150) NOT NULL,"
+        " created_at TIMESTAMP NOT NULL DEFAULT NOW())"
+    )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS core_business_closures")
@@ -0,0 +1,46 @@
+"""maint: dimensión de ubicaciones (maint_locations) + maint_tickets.location_id
+
+Los heatmaps de estadísticas agrupaban por ``lower(trim(location))`` y
+parseaban el edificio en Python fila por fila. Cada ubicación distinta queda
+ahora en maint_locations con su edificio/salón y los tickets la referencian
+por llave foránea.
+
+Los tickets existentes se ligan con ``maint backfill-locations`` (el parseo
+del edificio vive en Python).
+
+Revision ID: t4m5l6o7c8d9
+Revises: s3b4c5l6d7r8
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "t4m5l6o7c8d9"
+down_revision = "s3b4c5l6d7r8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS maint_locations ("
+        " id SERIAL PRIMARY KEY,"
+        " key VARCHAR(300) NOT NULL UNIQUE,"
+        " building VARCHAR(120) NOT NULL,"
+        " room VARCHAR(300),"
+        " created_at TIMESTAMP NOT NULL DEFAULT NOW())"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_maint_locations_building ON maint_locations (building)")
+    op.execute(
+        "ALTER TABLE maint_tickets ADD COLUMN IF NOT EXISTS location_id INTEGER"
+        " REFERENCES maint_locations (id)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_maint_tickets_created_location"
+        " ON maint_tickets (created_at, location_id, category_id)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_maint_tickets_created_location")
+    op.execute("ALTER TABLE maint_tickets DROP COLUMN IF EXISTS location_id")
+    op.execute("DROP TABLE IF EXISTS maint_locations")
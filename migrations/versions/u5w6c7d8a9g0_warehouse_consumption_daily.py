@@ -0,0 +1,65 @@
+"""warehouse: agregado diario de consumo + bandera below_restock
+
+El punto de restock se recalculaba leyendo 90 días de warehouse_movements
+producto por producto, y el badge de navegación re-evaluaba todo el catálogo.
+warehouse_consumption_daily guarda el consumo neto por producto/día (lo
+mantienen consumo, ajuste y reversión) y warehouse_products.below_restock la
+comparación stock <= punto de restock.
+
+Se siembra con los últimos 90 días de movimientos y el estado actual.
+
+Revision ID: u5w6c7d8a9g0
+Revises: t4m5l6o7c8d9
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "u5w6c7d8a9g0"
+down_revision = "t4m5l6o7c8d9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS warehouse_consumption_daily ("
+        " product_id INTEGER NOT NULL REFERENCES warehouse_products (id),"
+        " day DATE NOT NULL,"
+        " quantity NUMERIC(12, 2) NOT NULL DEFAULT 0,"
+        " PRIMARY KEY (product_id, day))"
+    )
+    op.execute(
+        "INSERT INTO warehouse_consumption_daily (product_id, day, quantity)"
+        " SELECT product_id, performed_at::date, SUM(quantity)"
+        " FROM warehouse_movements"
+        " WHERE movement_type IN ('CONSUMED', 'ADJUSTED_OUT')"
+        "   AND performed_at >= CURRENT_DATE - INTERVAL '90 days'"
+        " GROUP BY product_id, performed_at::date"
+        " ON CONFLICT (product_id, day) DO NOTHING"
+    )
+
+    op.execute(
+        "ALTER TABLE warehouse_products"
+        " ADD COLUMN IF NOT EXISTS below_restock BOOLEAN NOT NULL DEFAULT FALSE"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_warehouse_products_below_restock"
+        " ON warehouse_products (department_code) WHERE below_restock AND is_active"
+    )
+    op.execute(
+        "UPDATE warehouse_products p"
+        " SET below_restock = COALESCE(s.total, 0)"
+        "     <= COALESCE(p.restock_point_override, p.restock_point_auto)"
+        " FROM warehouse_products p2"
+        " LEFT JOIN (SELECT product_id, SUM(quantity_remaining) AS total"
+        "            FROM warehouse_stock_entries"
+        "            WHERE NOT is_exhausted AND NOT voided"
+        "            GROUP BY product_id) s ON s.product_id = p2.id"
+        " WHERE p2.id = p.id"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_warehouse_products_below_restock")
+    op.execute("ALTER TABLE warehouse_products DROP COLUMN IF EXISTS below_restock")
+    op.execute("DROP TABLE IF EXISTS warehouse_consumption_daily")
@@ -0,0 +1,58 @@
+"""warehouse: totales de stock materializados en warehouse_products
+
+stock_on_hand y stock_value (SUM de quantity_remaining y de
+quantity_remaining × unit_cost de los lotes no anulados) se mantienen en la
+misma transacción que entradas, anulaciones, consumos, reversiones y ajustes;
+listados, badge y autocomplete dejan de sumar lotes por request.
+
+Índices parciales por prefijo (text_pattern_ops) para el autocomplete de
+materiales. Verificación/corrección: `warehouse check-stock [--fix]`.
+
+Revision ID: v6x7d8e9b0h1
+Revises: u5w6c7d8a9g0
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "v6x7d8e9b0h1"
+down_revision = "u5w6c7d8a9g0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "ALTER TABLE warehouse_products"
+        " ADD COLUMN IF NOT EXISTS stock_on_hand NUMERIC(12, 2) NOT NULL DEFAULT 0,"
+        " ADD COLUMN IF NOT EXISTS stock_value NUMERIC(18, 6) NOT NULL DEFAULT 0"
+    )
+    op.execute(
+        "UPDATE warehouse_products p"
+        " SET stock_on_hand = s.qty, stock_value = s.value"
+        " FROM (SELECT product_id, SUM(quantity_remaining) AS qty,"
+        "              SUM(quantity_remaining * unit_cost) AS value"
+        "       FROM warehouse_stock_entries"
+        "       WHERE NOT voided"
+        "       GROUP BY product_id) s"
+        " WHERE s.product_id = p.id"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_warehouse_products_available_name"
+        " ON warehouse_products (department_code, lower(name) text_pattern_ops)"
+        " WHERE is_active AND stock_on_hand > 0"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_warehouse_products_available_code"
+        " ON warehouse_products (department_code, code text_pattern_ops)"
+        " WHERE is_active AND stock_on_hand > 0"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_warehouse_products_available_code")
+    op.execute("DROP INDEX IF EXISTS ix_warehouse_products_available_name")
+    op.execute(
+        "ALTER TABLE warehouse_products"
+        " DROP COLUMN IF EXISTS stock_value,"
+        " DROP COLUMN IF EXISTS stock_on_hand"
+    )
@@ -0,0 +1,185 @@
+"""Reportes de admin: estadística por coordinador (ROLLUP) y Excel en streaming.
+
+La BD de dev puede traer solicitudes reales en el mismo rango, así que las
+aserciones se limitan al coordinador y a los alumnos que crea cada test.
+"""
+from datetime import date, time
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+
+# Día por defecto de `make_grid` (ver conftest).
+DEFAULT_DAY = date(2026, 9, 1)
+
+pytestmark = pytest.mark.usefixtures("agendatec_app")
+
+
+@pytest.fixture()
+def report_setup(db_session, coord_setup, make_grid, make_student, make_booking):
+    """Coordinador con 3 citas (2 resueltas, 1 pendiente) y 1 baja cancelada."""
+    from itcj2.apps.agendatec.models import Request
+
+    s = coord_setup(n_programs=1)
+    pid = s["program_ids"][0]
+    _, slots = make_grid(s["coord"].id, time(9, 0), time(10, 0), 10, [pid])
+
+    students = [make_student(f"2990000{i}", first_name=f"ALUM{i}") for i in range(4)]
+    make_booking(slots[0], students[0], pid, s["period"].id, req_status="RESOLVED_SUCCESS")
+    make_booking(slots[1], students[1], pid, s["period"].id, req_status="RESOLVED_SUCCESS")
+    make_booking(slots[2], students[2], pid, s["period"].id)
+
+    drop = Request(
+        student_id=students[3].id, program_id=pid, period_id=s["period"].id,
+        type="DROP", status="CANCELED",
+    )
+    db_session.add(drop)
+    db_session.flush()
+
+    s["students"] = students
+    return s
+
+
+class TestCoordinatorStats:
+    def test_rollup_levels(self, db_session, report_setup):
+        from itcj2.apps.agendatec.services.report_service import coordinator_stats
+
+        out = coordinator_stats(
+            db_session, DEFAULT_DAY, DEFAULT_DAY,
+            rtype="APPOINTMENT", by_day=True, want_states=True,
+        )
+        mine = next(c for c in out["coordinators"] if c["coordinator_id"] == report_setup["coord"].id)
+
+        assert mine["totals"]["total"] == 3
+        assert mine["totals"]["attended"] == 2
+        assert mine["totals"]["pending"] == 1
+        assert mine["totals"]["states"]["RESOLVED_SUCCESS"] == 2
+        assert [d["day"] for d in mine["days"]] == [DEFAULT_DAY.isoformat()]
+        assert mine["days"][0]["total"] == 3
+
+        # Los niveles superiores del ROLLUP incluyen al menos lo nuestro.
+        assert out["overall"]["total"] >= 3
+        day_row = next(d for d in out["overall_by_day"] if d["day"] == DEFAULT_DAY.isoformat())
+        assert day_row["total"] >= 3
+
+    def test_drops_counted_for_program_coordinator(self, db_session, report_setup):
+        from itcj2.apps.agendatec.services.report_service import coordinator_stats
+
+        today = date.today()
+        out = coordinator_stats(db_session, today, today, rtype="DROP")
+        mine = next(c for c in out["coordinators"] if c["coordinator_id"] == report_setup["coord"].id)
+
+        assert mine["totals"]["total"] == 1
+        assert mine["totals"]["unattended"] == 1
+        assert "days" not in mine
+
+
+class TestRequestsXlsx:
+    def _params(self, setup):
+        today = date.today().isoformat()
+        return {
+            "from": today,
+            "to": today,
+            "q": ",".join(s.control_number for s in setup["students"]),
+        }
+
+    def test_sync_export_writes_both_sheets(self, client, auth_headers, report_setup):
+        from openpyxl import load_workbook
+
+        resp = client.post(
+            "/api/agendatec/v2/admin/reports/requests.xlsx",
+            params=self._params(report_setup),
+            headers=auth_headers,
+        )
+        assert resp.status_code == 200
+        wb = load_workbook(BytesIO(resp.content))
+
+        citas = list(wb["Citas"].iter_rows(values_only=True))
+        assert citas[0][0] == "ID"
+        assert len([r for r in citas[1:] if r[0] is not None]) == 3
+        assert "RESUMEN POR DÍA" in citas[0]
+
+        bajas = list(wb["Solicitudes de Baja"].iter_rows(values_only=True))
+        estado_idx = bajas[0].index("Estado")
+        assert bajas[1][estado_idx] == "Cancelada"
+
+    def test_large_range_is_queued(self, client, report_setup, make_user, headers_for, monkeypatch):
+        from itcj2.config import get_settings
+
+        # El TaskRun apunta al usuario del token: tiene que existir en core_users
+        admin = make_user(first_name="ADMIN", role_name="admin")
+        monkeypatch.setattr(get_settings(), "AGENDATEC_REPORT_ASYNC_ROWS", 1)
+        with patch("itcj2.celery_app.celery_app.send_task") as send_task:
+            resp = client.post(
+                "/api/agendatec/v2/admin/reports/requests.xlsx",
+                params=self._params(report_setup),
+                headers=headers_for(admin, role="admin"),
+            )
+
+        assert resp.status_code == 202
+        body = resp.json()["data"]
+        assert body["async"] is True
+        assert body["rows"] == 4
+        send_task.assert_called_once()
+        assert send_task.call_args.args[0] == "itcj2.tasks.agendatec_tasks.export_requests_report"
+        assert send_task.call_args.kwargs["kwargs"]["task_run_id"] == body["task_run"]["id"]
+
+    def test_download_rejects_traversal(self, client, auth_headers):
+        resp = client.get(
+            "/api/agendatec/v2/admin/reports/exports/..%2F..%2Fsecret.xlsx",
+            headers=auth_headers,
+        )
+        assert resp.status_code in (400, 404)
+
+
+class TestExportDownload:
+    @pytest.fixture()
+    def export(self, db_session, make_user, tmp_path, monkeypatch):
+        """Export terminado de `owner`, ya escrito en el directorio de exports."""
+        from itcj2.apps.agendatec.api.admin import reports
+        from itcj2.config import get_settings
+        from itcj2.core.models.task_models import TaskRun
+
+        monkeypatch.setattr(get_settings(), "INSTANCE_PATH", str(tmp_path))
+        owner = make_user(first_name="DUENO", role_name="staff")
+        run = TaskRun(
+            celery_task_id="export-owner-test", task_name=reports._EXPORT_TASK,
+            display_name="Exportar", status="SUCCESS", trigger="MANUAL",
+            triggered_by_user_id=owner.id,
+        )
+        db_session.add(run)
+        db_session.flush()
+        name = f"{run.id}_reporte.xlsx"
+        with open(f"{reports.get_exports_dir()}/{name}", "wb") as fh:
+            fh.write(b"xlsx")
+        return owner, name
+
+    def _as(self, client, user):
+        """Pasa el permiso del endpoint como `user` (rol staff, sin bypass de admin)."""
+        from itcj2.apps.agendatec.api.admin.reports import ReportPerm
+
+        client.app.dependency_overrides[ReportPerm.dependency] = lambda: {"sub": str(user.id), "role": "staff"}
+
+    def test_only_the_requester_downloads(self, client, export, make_user):
+        owner, name = export
+        url = f"/api/agendatec/v2/admin/reports/exports/{name}"
+        try:
+            self._as(client, make_user(first_name="OTRO", role_name="staff"))
+            assert client.get(url).status_code == 403
+
+            self._as(client, owner)
+            resp = client.get(url)
+            assert resp.status_code == 200
+            assert resp.content == b"xlsx"
+        finally:
+            from itcj2.apps.agendatec.api.admin.reports import ReportPerm
+            client.app.dependency_overrides.pop(ReportPerm.dependency, None)
+
+    def test_global_admin_downloads_any_export(self, client, auth_headers, export):
+        _, name = export
+        resp = client.get(f"/api/agendatec/v2/admin/reports/exports/{name}", headers=auth_headers)
+        assert resp.status_code == 200
+
+    def test_unknown_task_run_is_not_found(self, client, auth_headers, export):
+        resp = client.get("/api/agendatec/v2/admin/reports/exports/999999999_x.xlsx", headers=auth_headers)
+        assert resp.status_code == 404
@@ -86,6 +86,27 @@ def test_split_notifies_the_affected_student(client, db_session, coord_setup, ma
     assert n.data["new_end"] == "09:05"
 
 
+def test_split_invalidates_the_booked_students_history(client, coord_setup, make_grid,
+                                                      make_user, make_booking, redis_client,
+                                                      frozen_morning):
+    from itcj2.apps.agendatec.services.request_service import _history_key
+
+    ctx = coord_setup(n_programs=1)
+    _, slots = make_grid(ctx["coord"].id, time(9, 0), time(10, 0), 10, ctx["program_ids"])
+    alum = make_user(first_name="C", last_name="SEIS", control_number="20990505")
+    make_booking(slots[0], alum, ctx["program_ids"][0], ctx["period"].id)
+    key = _history_key(alum.id)
+    redis_client.set(key, "{}")
+    try:
+        resp = client.post("/api/agendatec/v2/coord/day-config", headers=ctx["headers"], json={
+            "day": DAY_S, "start": "09:00", "end": "10:00", "slot_minutes": 5,
+        })
+        assert resp.status_code == 200, resp.text
+        assert not redis_client.exists(key), "el historial cacheado conservaría el 9:10 viejo"
+    finally:
+        redis_client.delete(key)
+
+
 def test_regenerating_the_same_duration_notifies_nobody(client, db_session, coord_setup,
                                                         make_grid, make_user, make_booking,
                                                         frozen_morning):
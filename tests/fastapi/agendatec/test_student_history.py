@@ -0,0 +1,134 @@
+"""Historial de solicitudes del alumno (GET /requests/mine).
+
+Regresión de N+1: antes cada solicitud costaba 1 query de Appointment + 1
+`db.get(TimeSlot)` y cada período histórico otro `db.get`. Ahora el historial
+sale de UNA consulta con outer joins y se cachea por alumno en Redis (el real
+del stack; la clave del alumno se borra antes y después de cada test).
+"""
+from datetime import date, time
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event, text
+
+from itcj2.apps.agendatec.helpers import app_dt
+
+pytestmark = pytest.mark.usefixtures("agendatec_app")
+
+DAY = date(2026, 9, 1)
+
+
+@pytest.fixture()
+def history_setup(db_session, coord_setup, make_grid, make_student, make_booking):
+    """Alumno con 5 citas resueltas y 1 baja pendiente en el período activo."""
+    from itcj2.apps.agendatec.models import Request
+
+    s = coord_setup(n_programs=1)
+    pid = s["program_ids"][0]
+    _, slots = make_grid(s["coord"].id, time(9, 0), time(11, 0), 10, [pid])
+    student = make_student("29911111")
+
+    for slot in slots[:5]:
+        make_booking(slot, student, pid, s["period"].id,
+                     ap_status="DONE", req_status="RESOLVED_SUCCESS")
+    drop = Request(
+        student_id=student.id, program_id=pid, period_id=s["period"].id,
+        type="DROP", status="PENDING",
+    )
+    db_session.add(drop)
+    db_session.flush()
+
+    s["student"] = student
+    s["drop"] = drop
+    return s
+
+
+@pytest.fixture()
+def history_key(redis_client, history_setup):
+    from itcj2.apps.agendatec.services.request_service import _history_key
+
+    key = _history_key(history_setup["student"].id)
+    redis_client.delete(key)
+    yield key
+    redis_client.delete(key)
+
+
+def _count_queries(db_session, fn):
+    # Ver test_department_tree: el primer statement tras un commit/flush de la
+    # fixture paga un SAVEPOINT de autobegin que no es del código bajo prueba.
+    db_session.execute(text("SELECT 1"))
+    engine = db_session.get_bind().engine
+    counter = {"n": 0}
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    return result, counter["n"]
+
+
+class TestStudentHistory:
+    def test_history_in_constant_queries(self, db_session, history_setup, history_key):
+        from itcj2.apps.agendatec.services import get_request_service
+
+        svc = get_request_service()
+        student = history_setup["student"]
+
+        out, n_miss = _count_queries(db_session, lambda: svc.get_student_requests(db_session, student))
+        # período activo + config + historial con joins
+        assert n_miss <= 3, f"get_student_requests emitió {n_miss} queries (esperado <=3)"
+
+        assert out["active"]["id"] == history_setup["drop"].id
+        assert out["active"]["period"]["id"] == history_setup["period"].id
+        assert len(out["history"]) == 5
+        assert all(h["appointment"]["slot"]["is_booked"] for h in out["history"])
+        assert history_setup["period"].id in out["periods"]
+
+        cached, n_hit = _count_queries(db_session, lambda: svc.get_student_requests(db_session, student))
+        assert n_hit <= 2, f"con caché se emitieron {n_hit} queries (esperado <=2)"
+        assert cached == out
+
+    def test_cancel_invalidates_cache(self, db_session, redis_client, history_setup, history_key):
+        from itcj2.apps.agendatec.services import get_request_service
+
+        svc = get_request_service()
+        student = history_setup["student"]
+        svc.get_student_requests(db_session, student)
+        assert redis_client.exists(history_key)
+
+        result = svc.cancel_request(db_session, history_setup["drop"], student)
+        assert result.success
+        assert not redis_client.exists(history_key)
+
+        out = svc.get_student_requests(db_session, student)
+        assert out["active"] is None
+        assert out["history"][0]["status"] == "CANCELED"
+
+
+@pytest.mark.parametrize("req_type", ["DROP", "APPOINTMENT"])
+def test_admin_create_invalidates_cache(client, auth_headers, redis_client, coord_setup,
+                                        make_grid, make_student, req_type):
+    from itcj2.apps.agendatec.services.request_service import _history_key
+
+    s = coord_setup(n_programs=1)
+    pid = s["program_ids"][0]
+    _, slots = make_grid(s["coord"].id, time(9, 0), time(10, 0), 10, [pid])
+    student = make_student("29922222")
+    key = _history_key(student.id)
+    redis_client.set(key, "{}")
+    # La rejilla cae en DAY, que puede haber pasado ya.
+    morning = app_dt(DAY, time(8, 0))
+    try:
+        with patch("itcj2.apps.agendatec.api.admin.requests.now_app", return_value=morning):
+            resp = client.post("/api/agendatec/v2/admin/requests/create", headers=auth_headers, json={
+                "student_id": student.id, "type": req_type, "program_id": pid,
+                "description": "alta por admin", "slot_id": slots[-1].id,
+            })
+        assert resp.status_code == 200, resp.text
+        assert not redis_client.exists(key)
+    finally:
+        redis_client.delete(key)
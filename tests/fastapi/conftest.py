@@ -130,3 +130,44 @@ def db_session(_pg_engine):
         session.close()
         trans.rollback()
         connection.close()
+
+
+@pytest.fixture()
+def session_local(db_session, monkeypatch):
+    """Hace que `SessionLocal()` devuelva la sesión del test.
+
+    Para código de worker que abre su propia sesión (`with SessionLocal() as db`):
+    sin esto vería la BD fuera de la transacción del test. Ni `close()` ni el
+    `__exit__` del `with` la cierran, para seguir usándola en las aserciones.
+    """
+    class _Shared:
+        def __getattr__(self, name):
+            return getattr(db_session, name)
+
+        def __enter__(self):
+            return db_session
+
+        def __exit__(self, *exc):
+            return False
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr("itcj2.database.SessionLocal", lambda: _Shared())
+    return db_session
+
+
+@pytest.fixture()
+def redis_client():
+    """Redis REAL del stack (fakeredis no está en requirements). Skip si no responde.
+
+    Cada test limpia sus propias claves: este fixture no borra nada.
+    """
+    from itcj2.core.utils.redis_conn import get_redis
+
+    client = get_redis()
+    try:
+        client.ping()
+    except Exception:
+        pytest.skip("Redis no disponible")
+    return client
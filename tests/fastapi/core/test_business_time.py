@@ -0,0 +1,110 @@
+"""Motor de horas hábiles (core/services/business_time.py).
+
+El oráculo es el cálculo día por día que tenía
+helpdesk/utils/time_calculator.py, extendido para saltar días inhábiles. La
+comparación de tiempos contra ese bucle no es un test (depende de la carga de
+la máquina): ``python -m tools.bench_business_time``.
+"""
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from itcj2.apps.helpdesk.utils.timezone_utils import ensure_local_timezone
+from itcj2.core.services import business_time
+from itcj2.core.services.business_time import NO_CLOSURES, business_hours, hours_between, make_closures
+
+HOLIDAYS = [date(2026, 1, 1), date(2026, 2, 2), date(2026, 3, 16), date(2026, 5, 1),
+            date(2026, 9, 16), date(2026, 11, 16), date(2026, 12, 25)]
+HOLIDAYS += [date(2026, 12, 14) + timedelta(days=i) for i in range(21)]  # vacaciones
+
+
+def _reference(start, end, holidays=()):
+    """Algoritmo anterior (while día por día), más días inhábiles."""
+    start = ensure_local_timezone(start)
+    end = ensure_local_timezone(end)
+    if start >= end:
+        return 0.0
+    total = 0.0
+    current = start
+    while current.date() <= end.date():
+        next_day = (current + timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+        if current.weekday() >= 5 or current.date() in holidays:
+            current = next_day
+            continue
+        day_start = current.replace(hour=8, minute=0, second=0, microsecond=0)
+        day_end = current.replace(hour=18, minute=0, second=0, microsecond=0)
+        if current < day_start:
+            current = day_start
+        elif current >= day_end:
+            current = next_day
+            continue
+        if current.date() == end.date():
+            total += max(0, (min(end, day_end) - current).total_seconds() / 3600)
+            break
+        total += max(0, (day_end - current).total_seconds() / 3600)
+        current = next_day
+    return total
+
+
+def _random_intervals(rng, n, max_days=200):
+    base = datetime(2025, 6, 1)
+    pairs = []
+    for _ in range(n):
+        start = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 500))
+        end = start + timedelta(minutes=rng.randrange(0, 60 * 24 * max_days), seconds=rng.randrange(60))
+        pairs.append((start, end))
+    return pairs
+
+
+@pytest.mark.parametrize("holidays", [(), HOLIDAYS])
+def test_matches_day_by_day_reference(holidays):
+    closures = make_closures(holidays)
+    rng = random.Random(45)
+    for start, end in _random_intervals(rng, 300):
+        expected = _reference(start, end, set(holidays))
+        assert hours_between(start, end, closures) == pytest.approx(expected, abs=1e-6), (start, end)
+        # Aditividad: partir el intervalo en cualquier punto no cambia el total.
+        mid = start + (end - start) * rng.random()
+        split = hours_between(start, mid, closures) + hours_between(mid, end, closures)
+        assert split == pytest.approx(expected, abs=1e-6)
+
+
+def test_edge_cases():
+    closures = NO_CLOSURES
+    fri_5pm, mon_10am = datetime(2025, 1, 10, 17), datetime(2025, 1, 13, 10)
+    assert hours_between(fri_5pm, mon_10am, closures) == 3.0
+    assert hours_between(mon_10am, fri_5pm, closures) == 0.0
+    assert hours_between(datetime(2025, 1, 11, 9), datetime(2025, 1, 12, 20), closures) == 0.0
+    assert hours_between(datetime(2025, 1, 13, 6), datetime(2025, 1, 13, 7), closures) == 0.0
+    # Semana completa = 50 h; un festivo en medio quita 10.
+    assert hours_between(datetime(2025, 1, 13), datetime(2025, 1, 20), closures) == 50.0
+    assert hours_between(datetime(2025, 1, 13), datetime(2025, 1, 20),
+                         make_closures([date(2025, 1, 15), date(2025, 1, 18)])) == 40.0
+    assert business_time.business_seconds(None, mon_10am, closures) == 0.0
+
+
+def test_aware_datetimes_use_local_wall_clock():
+    naive = datetime(2026, 3, 6, 17, 30), datetime(2026, 3, 9, 9, 0)
+    aware = tuple(ensure_local_timezone(dt) for dt in naive)
+    utc = tuple(dt.astimezone(timezone.utc) for dt in aware)
+    assert hours_between(*aware, NO_CLOSURES) == hours_between(*naive, NO_CLOSURES) == 1.5
+    assert hours_between(*utc, NO_CLOSURES) == 1.5
+
+
+def test_batch_matches_scalar_and_marks_missing():
+    closures = make_closures(HOLIDAYS)
+    pairs = _random_intervals(random.Random(7), 500)
+    starts = [s for s, _ in pairs] + [None, datetime(2026, 1, 5)]
+    ends = [e for _, e in pairs] + [datetime(2026, 1, 5), None]
+
+    got = business_hours(starts, ends, closures)
+    expected = [hours_between(s, e, closures) for s, e in pairs]
+    np.testing.assert_allclose(got[:-2], expected, atol=1e-6)
+    assert np.isnan(got[-2:]).all()
+
+    as64 = business_hours(np.array([s for s, _ in pairs], dtype="datetime64[us]"),
+                          np.array([e for _, e in pairs], dtype="datetime64[us]"), closures)
+    np.testing.assert_allclose(as64, expected, atol=1e-6)
+
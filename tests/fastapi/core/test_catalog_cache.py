@@ -0,0 +1,122 @@
+"""Caché de catálogos entre procesos (core/services/catalog_cache.py).
+
+Corre contra el Redis REAL del stack (se salta si no hay).
+"""
+import json
+import uuid
+
+import pytest
+import redis as redis_py
+
+from itcj2.config import get_settings
+from itcj2.core.services import catalog_cache
+from itcj2.core.services.catalog_cache import Catalog
+
+
+@pytest.fixture
+def redis(redis_client, monkeypatch):
+    """Redis real con hash de generaciones y canal propios del test.
+
+    "Otro proceso" es un HINCRBY directo sobre ese hash, como lo haría
+    `invalidate` en otro worker. El hilo suscriptor no se arranca: los mensajes
+    se leen con un pubsub del test y se entregan a mano a `_on_message`.
+    """
+    ns = uuid.uuid4().hex
+    monkeypatch.setattr(catalog_cache, "_GEN_KEY", f"test:catalog:{ns}:gen")
+    monkeypatch.setattr(catalog_cache, "_CHANNEL", f"test:catalog:{ns}:invalidate")
+    monkeypatch.setattr(catalog_cache, "_redis", lambda: redis_client)
+    monkeypatch.setattr(catalog_cache, "_ensure_listener", lambda: None)
+    monkeypatch.setattr(catalog_cache, "_generations", {})
+    monkeypatch.setattr(catalog_cache, "_checked_at", 0.0)
+    monkeypatch.setattr(catalog_cache, "_redis_ok", True)
+    monkeypatch.setattr(catalog_cache, "_redis_retry_at", 0.0)
+    monkeypatch.setattr(get_settings(), "CATALOG_CACHE_CHECK_MS", 0)
+    yield redis_client
+    redis_client.delete(catalog_cache._GEN_KEY)
+
+
+def _counting_catalog(name):
+    loads = []
+
+    def loader(db):
+        loads.append(db)
+        return (f"v{len(loads)}",)
+
+    return Catalog(name, loader), loads
+
+
+def test_snapshot_is_reused_until_generation_changes(redis):
+    catalog, loads = _counting_catalog("test.gen")
+    db = object()
+
+    assert catalog.get(db) == ("v1",)
+    assert catalog.get(db) == ("v1",)
+    assert loads == [db]
+
+    # Otro proceso invalida: sube la generación en Redis.
+    redis.hincrby(catalog_cache._GEN_KEY, "test.gen", 1)
+    assert catalog.get(db) == ("v2",)
+    assert catalog.get(db) == ("v2",) and len(loads) == 2
+
+
+def test_invalidate_bumps_and_publishes(redis):
+    catalog, loads = _counting_catalog("test.pub")
+    catalog.get(object())
+    pubsub = redis.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(catalog_cache._CHANNEL)
+    pubsub.get_message(timeout=1.0)  # confirmación de la suscripción
+    catalog.invalidate()
+
+    assert catalog.peek() is None
+    assert int(redis.hget(catalog_cache._GEN_KEY, "test.pub")) == 1
+    message = pubsub.get_message(timeout=1.0)
+    pubsub.close()
+    assert message["channel"] in (catalog_cache._CHANNEL, catalog_cache._CHANNEL.encode())
+    assert json.loads(message["data"]) == {"name": "test.pub", "gen": 1}
+
+    catalog.get(object())
+    assert catalog.get(object()) == ("v2",) and len(loads) == 2
+
+
+def test_pubsub_message_marks_snapshot_stale_between_polls(redis, monkeypatch):
+    monkeypatch.setattr(get_settings(), "CATALOG_CACHE_CHECK_MS", 60_000)
+    catalog, loads = _counting_catalog("test.msg")
+    catalog.get(object())
+
+    # Dentro de la ventana de sondeo solo el mensaje del canal avisa del cambio.
+    redis.hset(catalog_cache._GEN_KEY, "test.msg", 5)
+    assert catalog.get(object()) == ("v1",)
+    catalog_cache._on_message(json.dumps({"name": "test.msg", "gen": 5}))
+    assert catalog.get(object()) == ("v2",)
+
+
+def test_without_redis_snapshots_expire_by_age(redis, monkeypatch):
+    catalog, loads = _counting_catalog("test.ttl")
+    # Un cliente real contra un puerto donde no escucha nadie.
+    down = redis_py.Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.2)
+    monkeypatch.setattr(catalog_cache, "_redis", lambda: down)
+    monkeypatch.setattr(get_settings(), "CATALOG_CACHE_FALLBACK_TTL", 30)
+
+    catalog.get(object())
+    catalog.invalidate()  # sin Redis: al menos este proceso descarta su copia
+    assert catalog.get(object()) == ("v2",)
+    assert catalog.get(object()) == ("v2",)
+
+    monkeypatch.setattr(get_settings(), "CATALOG_CACHE_FALLBACK_TTL", 0)
+    assert catalog.get(object()) == ("v3",)
+
+
+def test_loader_errors_are_not_cached(redis):
+    calls = []
+
+    def loader(db):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("tabla no existe")
+        return ("ok",)
+
+    catalog = Catalog("test.err", loader)
+    with pytest.raises(RuntimeError):
+        catalog.get(object())
+    assert catalog.peek() is None
+    assert catalog.get(object()) == ("ok",)
@@ -0,0 +1,175 @@
+"""Outbox de correo (core/services/email_outbox.py) contra un Graph local.
+
+Postgres real (``db_session``: el drenado usa ``FOR UPDATE SKIP LOCKED``) y un servidor HTTP en un hilo que
+imita ``POST /$batch``: responde por correo según el destinatario
+(``r429@`` → 429 con Retry-After, ``bad@`` → 400, resto → 202) y rechaza con
+401 el token ``tok1`` para probar la renovación.
+"""
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import select
+
+import itcj2.models  # noqa: F401
+from itcj2.config import get_settings
+from itcj2.core.models.email_outbox import EmailOutbox
+from itcj2.core.services import email_outbox, metrics
+from itcj2.core.utils import msgraph_mail
+from itcj2.core.utils.timezone import db_now
+
+
+class _GraphStandIn(BaseHTTPRequestHandler):
+    calls: list = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        token = self.headers["Authorization"].split()[-1]
+        self.calls.append((self.path, token, len(body["requests"])))
+        responses = []
+        for req in body["requests"]:
+            to = req["body"]["message"]["toRecipients"][0]["emailAddress"]["address"]
+            if token == "tok1":
+                responses.append({"id": req["id"], "status": 401, "body": {"error": {"code": "InvalidAuthenticationToken"}}})
+            elif to.startswith("r429@"):
+                responses.append({"id": req["id"], "status": 429, "headers": {"Retry-After": "600"}})
+            elif to.startswith("bad@"):
+                responses.append({"id": req["id"], "status": 400, "body": {"error": {"code": "ErrorInvalidRecipients", "message": "x"}}})
+            else:
+                responses.append({"id": req["id"], "status": 202, "body": None})
+        payload = json.dumps({"responses": responses}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GraphStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(msgraph_mail, "GRAPH_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1.0")
+    _GraphStandIn.calls = []
+
+    issued = []
+
+    def fake_acquire(app_key, acct):
+        issued.append(app_key)
+        return {"access_token": f"tok{len(issued)}", "expires_in": 3600}
+
+    monkeypatch.setattr(msgraph_mail, "read_account_info", lambda app_key: {"home_account_id": "h"})
+    monkeypatch.setattr(msgraph_mail, "_acquire_silent", fake_acquire)
+    monkeypatch.setattr(msgraph_mail, "_tokens", {})
+    monkeypatch.setattr(metrics, "_ensure_flusher", lambda: None)
+    metrics._values.clear()
+    yield _GraphStandIn.calls, issued
+    metrics._values.clear()
+    server.shutdown()
+
+
+@pytest.fixture
+def db(db_session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "EMAIL_OUTBOX_ASYNC_ENABLED", True)
+    return db_session
+
+
+def test_enqueue_is_part_of_the_callers_transaction(db, monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(email_outbox, "dispatch", lambda app_key=None, countdown=None: dispatched.append(app_key))
+
+    email_outbox.enqueue(db, "maint", "a@itcj.mx", "Asunto", "<p>x</p>", ref="maint:ticket:1:assigned")
+    db.rollback()
+    assert db.scalar(select(EmailOutbox.id)) is None and dispatched == []
+
+    email_outbox.enqueue(db, "maint", "a@itcj.mx", "Asunto", "<p>x</p>")
+    email_outbox.enqueue(db, "agendatec", ["b@itcj.mx", None], "Encuesta", "<p>y</p>")
+    assert email_outbox.enqueue(db, "maint", [], "Vacío", "") is None
+    db.commit()
+    assert sorted(dispatched) == ["agendatec", "maint"]
+    assert [r.recipients for r in db.scalars(select(EmailOutbox).order_by(EmailOutbox.id))] == [
+        ["a@itcj.mx"], ["b@itcj.mx"]]
+
+    # La misma sesión, después de su primer commit, sigue despachando.
+    email_outbox.enqueue(db, "maint", "c@itcj.mx", "Otro", "<p>z</p>")
+    db.commit()
+    assert sorted(dispatched) == ["agendatec", "maint", "maint"]
+
+
+def test_savepoint_rollback_keeps_pending_dispatch(db, monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(email_outbox, "dispatch", lambda app_key=None, countdown=None: dispatched.append(app_key))
+
+    email_outbox.enqueue(db, "maint", "a@itcj.mx", "Asignado", "<p>x</p>")
+    sp = db.begin_nested()
+    email_outbox.enqueue(db, "agendatec", "b@itcj.mx", "Encuesta", "<p>y</p>")
+    sp.rollback()
+    db.commit()
+    # El SAVEPOINT solo descarta su fila; el despacho de la que sí se guardó
+    # sigue (el de "agendatec" drena en vacío, es inofensivo).
+    assert "maint" in dispatched
+    assert db.scalars(select(EmailOutbox.subject)).all() == ["Asignado"]
+
+
+def test_drain_batches_by_twenty_and_classifies_results(db, graph):
+    calls, issued = graph
+    for i in range(43):
+        email_outbox.enqueue(db, "maint", f"u{i}@itcj.mx", f"Ticket {i}", "<p>x</p>")
+    email_outbox.enqueue(db, "maint", "r429@itcj.mx", "Limitado", "<p>x</p>")
+    email_outbox.enqueue(db, "maint", "bad@itcj.mx", "Rechazado", "<p>x</p>")
+    db.info.clear()  # sin disparar el drenado al hacer commit
+    db.commit()
+
+    stats = email_outbox.drain_batch(db, limit=100)
+    assert (stats["picked"], stats["sent"], stats["retry"], stats["failed"]) == (45, 43, 1, 1)
+    # tok1 rechazado con 401 → se renueva una vez y se repite el primer lote.
+    assert [c[2] for c in calls] == [20, 20, 20, 5]
+    assert [c[1] for c in calls] == ["tok1", "tok2", "tok2", "tok2"]
+    assert all(path == "/v1.0/$batch" for path, _, _ in calls)
+    assert len(issued) == 2
+
+    limited = db.scalars(select(EmailOutbox).where(EmailOutbox.subject == "Limitado")).one()
+    assert limited.status == "pending" and limited.attempts == 1
+    assert limited.next_attempt_at >= db_now() + timedelta(seconds=590)  # Retry-After > backoff
+    rejected = db.scalars(select(EmailOutbox).where(EmailOutbox.subject == "Rechazado")).one()
+    assert rejected.status == "failed" and "ErrorInvalidRecipients" in rejected.last_error
+
+    # Nada vencido: la segunda corrida no llama a Graph.
+    assert email_outbox.drain_batch(db)["picked"] == 0 and len(calls) == 4
+    assert email_outbox.next_due(db) == limited.next_attempt_at
+
+    lbl = 'app="maint",outcome="{}"'
+    assert metrics._values[("itcj_email_messages_total", f"{lbl.format('sent')}|total")] == 43
+    assert metrics._values[("itcj_email_messages_total", f"{lbl.format('failed')}|total")] == 1
+    assert metrics._values[("itcj_email_batch_seconds", 'app="maint"|count')] == 4
+
+
+def test_retries_give_up_after_max_attempts(db, graph, monkeypatch):
+    monkeypatch.setattr(get_settings(), "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+    row = email_outbox.enqueue(db, "maint", "r429@itcj.mx", "Limitado", "<p>x</p>")
+    db.info.clear()
+    db.commit()
+
+    email_outbox.drain_batch(db)
+    assert row.status == "pending"
+    row.next_attempt_at = db_now() - timedelta(seconds=1)
+    db.commit()
+    assert email_outbox.drain_batch(db)["failed"] == 1
+    assert row.status == "failed" and row.attempts == 2
+
+
+def test_disconnected_account_defers_without_calling_graph(db, graph, monkeypatch):
+    calls, _ = graph
+    monkeypatch.setattr(msgraph_mail, "read_account_info", lambda app_key: None)
+    row = email_outbox.enqueue(db, "agendatec", "a@itcj.mx", "Encuesta", "<p>x</p>")
+    db.info.clear()
+    db.commit()
+
+    assert email_outbox.drain_batch(db)["retry"] == 1
+    assert calls == [] and row.last_error == "cuenta de correo no conectada"
+    assert not email_outbox.is_connected("agendatec")
@@ -0,0 +1,95 @@
+"""Entrega de descargas (core/services/file_delivery.py): X-Accel-Redirect o Python."""
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from itcj2.config import get_settings
+from itcj2.core.services import file_delivery
+
+
+@pytest.fixture
+def instance(tmp_path, monkeypatch):
+    root = tmp_path / "instance"
+    (root / "apps" / "helpdesk").mkdir(parents=True)
+    monkeypatch.setattr(get_settings(), "INSTANCE_PATH", str(root))
+    monkeypatch.setattr(get_settings(), "FILE_ACCEL_ENABLED", False)
+    return root
+
+
+def _client(path, **kwargs):
+    app = FastAPI()
+
+    @app.get("/f")
+    def _serve(request: Request):
+        return file_delivery.send_file(request, path, **kwargs)
+
+    return TestClient(app)
+
+
+def test_accel_redirect_hands_off_to_nginx(instance, monkeypatch):
+    monkeypatch.setattr(get_settings(), "FILE_ACCEL_ENABLED", True)
+    plain = instance / "apps" / "helpdesk" / "reporte final.pdf"
+    plain.write_bytes(b"%PDF-1.4")
+    packed = instance / "apps" / "helpdesk" / "datos.csv.gz"
+    packed.write_bytes(gzip.compress(b"a,b\n"))
+
+    r = _client(str(plain), filename="Reporte año.pdf").get("/f")
+    assert r.headers["x-accel-redirect"] == "/_protected/apps/helpdesk/reporte%20final.pdf"
+    assert r.headers["content-type"] == "application/pdf"
+    assert r.headers["content-disposition"] == "attachment; filename*=utf-8''Reporte%20a%C3%B1o.pdf"
+    assert r.content == b""
+
+    r = _client(str(packed), filename="datos.csv", media_type="text/csv", gzipped=True).get("/f")
+    assert r.headers["x-accel-redirect"] == "/_protected_gz/apps/helpdesk/datos.csv"
+
+    # Fuera de instance/ nginx no lo ve: se sirve desde Python.
+    outside = instance.parent / "otro.txt"
+    outside.write_bytes(b"hola")
+    r = _client(str(outside)).get("/f")
+    assert "x-accel-redirect" not in r.headers and r.content == b"hola"
+
+
+def test_gzip_served_encoded_with_range_or_decompressed(instance):
+    raw = b"columna,valor\n" * 500
+    packed = instance / "apps" / "helpdesk" / "datos.csv.gz"
+    packed.write_bytes(gzip.compress(raw))
+    client = _client(str(packed), filename="datos.csv", media_type="text/csv", gzipped=True)
+
+    r = client.get("/f", headers={"Accept-Encoding": "gzip, deflate"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.content == raw  # httpx decodifica Content-Encoding
+
+    r = client.get("/f", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+    assert r.status_code == 206 and r.headers["content-range"].startswith("bytes 0-9/")
+
+    r = client.get("/f", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers and r.content == raw
+
+
+def test_range_and_conditional_requests(instance):
+    path = instance / "apps" / "helpdesk" / "foto.jpg"
+    path.write_bytes(bytes(range(256)) * 4)
+    client = _client(str(path), disposition=None)
+
+    r = client.get("/f")
+    assert r.headers["content-type"] == "image/jpeg" and "content-disposition" not in r.headers
+    etag = r.headers["etag"]
+    assert r.headers["last-modified"]
+
+    r = client.get("/f", headers={"Range": "bytes=100-199"})
+    assert r.status_code == 206 and r.content == (bytes(range(256)) * 4)[100:200]
+
+    assert client.get("/f", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/f", headers={"If-None-Match": '"otro"'}).status_code == 200
+
+
+def test_accepts_gzip_respects_q_zero():
+    class _Req:
+        def __init__(self, value):
+            self.headers = {"accept-encoding": value}
+
+    assert file_delivery.accepts_gzip(_Req("br, gzip;q=0.8"))
+    assert not file_delivery.accepts_gzip(_Req("gzip;q=0, br"))
+    assert not file_delivery.accepts_gzip(_Req(""))
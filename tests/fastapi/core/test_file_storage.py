@@ -0,0 +1,135 @@
+"""Backend de almacenamiento (core/services/file_storage.py) y reshard en línea.
+
+El reshard corre en Postgres (``db_session``) con un ticket y sus adjuntos de
+helpdesk; recorre toda la tabla, así que asume (como CI) una BD de test sin
+otros adjuntos. La prueba contra S3 solo corre con un MinIO disponible
+(``ITCJ_TEST_S3_ENDPOINT``, bucket ya creado en ``ITCJ_TEST_S3_BUCKET``).
+"""
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+import itcj2.models  # noqa: F401
+from itcj2.apps.helpdesk.models.attachment import Attachment
+from itcj2.apps.helpdesk.models.ticket import Ticket
+from itcj2.config import get_settings
+from itcj2.core.models.user import User
+from itcj2.core.services import file_storage, storage_reshard
+
+from tests.fastapi.helpdesk._catalog import ensure_helpdesk_category
+
+OLD = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    root = tmp_path / "instance" / "apps" / "helpdesk" / "attachments"
+    root.mkdir(parents=True)
+    monkeypatch.setattr(get_settings(), "INSTANCE_PATH", str(tmp_path / "instance"))
+    monkeypatch.setattr(get_settings(), "HELPDESK_UPLOAD_PATH", str(root))
+    monkeypatch.setattr(get_settings(), "STORAGE_BACKEND", "local")
+    return root
+
+
+def test_local_layout_is_sharded_and_unique(uploads):
+    storage = file_storage.get_storage()
+    key = file_storage.attachment_key(storage, str(uploads), "ticket", 42, "TK-42", "foto.jpg")
+    assert key == os.path.join(str(uploads), file_storage.shard(42), "42", "foto.jpg")
+
+    key = file_storage.attachment_key(storage, str(uploads), "comment", 42, "TK-42", "acta.pdf")
+    assert key == os.path.join(str(uploads), "comments", file_storage.shard("TK-42"), "TK-42", "acta.pdf")
+
+    os.makedirs(os.path.dirname(key))
+    open(key, "wb").close()
+    assert storage.unique(key).endswith("acta_1.pdf")
+    assert file_storage.exists(key) and file_storage.delete(key)
+    assert not file_storage.exists(key) and not file_storage.delete(key)
+
+
+def test_reshard_moves_files_and_variants_then_updates_rows(db_session, uploads):
+    db = db_session
+    user = User(first_name="TEST", last_name="SEED", is_active=True)
+    db.add(user)
+    db.flush()
+    ticket = Ticket(
+        ticket_number="TST-TK-7", requester_id=user.id, area="SOPORTE",
+        category_id=ensure_helpdesk_category(db).id, title="t", description="d", status="PENDING",
+        priority="MEDIA", created_by_id=user.id, updated_by_id=user.id, created_at=OLD, updated_at=OLD,
+    )
+    db.add(ticket)
+    db.flush()
+    tid, number = ticket.id, ticket.ticket_number
+
+    legacy = uploads / str(tid)
+    legacy.mkdir()
+    (legacy / "foto.jpg").write_bytes(b"x" * 50)
+    (legacy / "foto.thumb.webp").write_bytes(b"y" * 5)
+    flat = uploads / "comments" / number
+    flat.mkdir(parents=True)
+    (flat / "acta.pdf").write_bytes(b"%PDF")
+
+    base = dict(ticket_id=tid, uploaded_by_id=user.id, media_status="ready", uploaded_at=OLD)
+    photo, acta, lost = (
+        Attachment(**base, attachment_type="ticket", filename="foto.jpg", original_filename="foto.jpg",
+                   filepath=str(legacy / "foto.jpg"), variants={"thumb": {"webp": "foto.thumb.webp"}}),
+        Attachment(**base, attachment_type="comment", filename="acta.pdf", original_filename="acta.pdf",
+                   filepath=str(flat / "acta.pdf")),
+        Attachment(**base, attachment_type="ticket", filename="perdido.jpg", original_filename="perdido.jpg",
+                   filepath=str(legacy / "perdido.jpg")),
+    )
+    db.add_all([photo, acta, lost])
+    db.commit()
+
+    dry = storage_reshard.reshard_source(db, "helpdesk_attachments", dry_run=True)
+    assert (dry.moved, dry.missing) == (2, 1)
+    assert (legacy / "foto.jpg").exists()
+
+    stats = storage_reshard.reshard_source(db, "helpdesk_attachments", batch=2)
+    assert (stats.moved, stats.missing, stats.errors) == (2, 1, [])
+
+    paths = dict(db.execute(select(Attachment.id, Attachment.filepath).where(Attachment.ticket_id == tid)).all())
+    assert paths[photo.id] == str(uploads / file_storage.shard(tid) / str(tid) / "foto.jpg")
+    assert paths[acta.id] == str(uploads / "comments" / file_storage.shard(number) / number / "acta.pdf")
+    assert open(paths[photo.id], "rb").read() == b"x" * 50
+    assert os.path.exists(os.path.join(os.path.dirname(paths[photo.id]), "foto.thumb.webp"))
+    assert not (legacy / "foto.jpg").exists() and not (legacy / "foto.thumb.webp").exists()
+    assert not flat.exists()  # carpeta vieja vacía, eliminada
+
+    again = storage_reshard.reshard_source(db, "helpdesk_attachments")
+    assert (again.moved, again.skipped) == (0, 2)
+
+
+def test_s3_roundtrip(tmp_path, monkeypatch):
+    pytest.importorskip("boto3")
+    endpoint = os.environ.get("ITCJ_TEST_S3_ENDPOINT")
+    if not endpoint:
+        pytest.skip("ITCJ_TEST_S3_ENDPOINT no configurado (MinIO)")
+    s = get_settings()
+    monkeypatch.setattr(s, "INSTANCE_PATH", str(tmp_path))
+    monkeypatch.setattr(s, "MEDIA_STAGING_PATH", str(tmp_path / "staging"))
+    monkeypatch.setattr(s, "STORAGE_BACKEND", "s3")
+    monkeypatch.setattr(s, "STORAGE_S3_ENDPOINT_URL", endpoint)
+    monkeypatch.setattr(s, "STORAGE_S3_BUCKET", os.environ.get("ITCJ_TEST_S3_BUCKET", "itcj-test"))
+    monkeypatch.setattr(s, "STORAGE_S3_ACCESS_KEY", os.environ.get("ITCJ_TEST_S3_ACCESS_KEY", "minioadmin"))
+    monkeypatch.setattr(s, "STORAGE_S3_SECRET_KEY", os.environ.get("ITCJ_TEST_S3_SECRET_KEY", "minioadmin"))
+    monkeypatch.setattr(file_storage, "_s3", {})
+
+    storage = file_storage.get_storage()
+    key = storage.place(str(tmp_path / "apps" / "maint"), "MT-1", "nota.txt")
+    assert key.startswith(f"s3://{s.STORAGE_S3_BUCKET}/apps/maint/")
+
+    local = storage.local_target(key)
+    os.makedirs(os.path.dirname(local))
+    with open(local, "wb") as fh:
+        fh.write(b"hola")
+    storage.publish(key)
+    assert not os.path.exists(local)
+    try:
+        assert file_storage.exists(key) and file_storage.size(key) == 4
+        assert storage.open(key).read() == b"hola"
+        assert "X-Amz-Signature" in storage.url(key, filename="nota.txt", disposition="attachment")
+    finally:
+        assert file_storage.delete(key)
+    assert not file_storage.exists(key)
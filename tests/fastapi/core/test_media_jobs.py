@@ -0,0 +1,193 @@
+"""Procesamiento de uploads fuera del request (core/services/media_jobs.py).
+
+Sin broker: filesystem (tmp_path) y ``db_session`` para comprobar que el job
+se despacha recién en el COMMIT.
+"""
+import gzip
+import io
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from itcj2.core.services import media_jobs
+
+
+def _jpeg(size) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, (20, 120, 200)).save(out, format="JPEG")
+    return out.getvalue()
+
+
+def test_store_document_gzips_only_when_smaller(tmp_path):
+    text = tmp_path / "staged-csv"
+    text.write_bytes(b"a,b,c\n" * 2000)
+    target, size = media_jobs._store_document(str(text), str(tmp_path / "r.csv"))
+    assert target.endswith("r.csv.gz") and size == 12000
+    assert gzip.decompress((tmp_path / "r.csv.gz").read_bytes()) == b"a,b,c\n" * 2000
+    assert text.exists()  # el crudo lo borra quien llama, tras el commit
+
+    noise = tmp_path / "staged-bin"
+    noise.write_bytes(os.urandom(4096))
+    target, size = media_jobs._store_document(str(noise), str(tmp_path / "r.pdf"))
+    assert target.endswith("r.pdf") and size == 4096
+
+
+def test_process_in_place_writes_variants(tmp_path):
+    path = tmp_path / "g-0011aabb.jpg"
+    path.write_bytes(_jpeg((2400, 1600)))
+
+    result = media_jobs._process_in_place(str(path))
+
+    assert result["status"] == "ready"
+    with Image.open(path) as img:
+        assert img.size == (1920, 1280)
+    assert (tmp_path / "g-0011aabb.thumb.webp").is_file()
+
+
+def test_process_in_place_keeps_undecodable_original(tmp_path):
+    path = tmp_path / "broken.jpg"
+    path.write_bytes(b"\xff\xd8\xff not really a jpeg")
+
+    assert media_jobs._process_in_place(str(path))["status"] == "skipped"
+    assert path.read_bytes() == b"\xff\xd8\xff not really a jpeg"
+
+
+def test_enqueue_dispatches_only_after_commit(db_session):
+    sent = []
+    db = db_session
+    with patch.object(media_jobs, "dispatch", sent.append):
+        media_jobs.enqueue(db, {"kind": "garment", "path": "a"})
+        media_jobs.enqueue(db, {"kind": "garment", "path": "b"})
+        db.flush()
+        assert sent == []
+
+        db.commit()
+        assert [j["path"] for j in sent] == ["a", "b"]
+
+        # Un segundo commit en la misma sesión no repite los jobs.
+        db.commit()
+        assert len(sent) == 2
+
+
+def test_rollback_drops_jobs_and_reservations(db_session, tmp_path):
+    sent = []
+    db = db_session
+    kept, dropped = tmp_path / "kept.pdf", tmp_path / "dropped.pdf"
+    with patch.object(media_jobs, "dispatch", sent.append):
+        media_jobs.enqueue(db, {"kind": "attachment", "target": str(kept)})
+        nested = db.begin_nested()
+        kept.touch()  # reserva vacía de enqueue_attachment
+        nested.rollback()  # un SAVEPOINT no descarta lo pendiente
+        assert kept.exists()
+
+        dropped.touch()
+        media_jobs.enqueue(db, {"kind": "attachment", "target": str(dropped)})
+        db.rollback()
+        assert not kept.exists() and not dropped.exists()
+
+        db.commit()
+        assert sent == []
+
+
+def _processing_attachment(db, tmp_path, content: bytes, name: str):
+    """Adjunto de maint en `processing` con su crudo y la reserva del destino."""
+    from itcj2.apps.maint.models.attachment import MaintAttachment
+    from tests.fastapi.maint._seed import make_department, make_ticket, make_user
+
+    user = make_user(db)
+    ticket = make_ticket(db, user, make_department(db))
+    staged = tmp_path / "staging" / "raw"
+    staged.parent.mkdir()
+    staged.write_bytes(content)
+    att = MaintAttachment(
+        ticket_id=ticket.id, uploaded_by_id=user.id, attachment_type="ticket",
+        filename="raw", original_filename=name, filepath=str(staged),
+        mime_type="text/csv", media_status="processing",
+    )
+    db.add(att)
+    target = str(tmp_path / "final" / name)
+    media_jobs.enqueue_attachment(db, "maint", att, target=target, is_image=False)
+    db.info.pop(media_jobs._SESSION_KEY)  # el job se corre a mano
+    db.commit()
+    job = {"kind": "attachment", "app": "maint", "attachment_id": att.id,
+           "staged": str(staged), "target": target, "is_image": False, "user_id": None}
+    return att, staged, job
+
+
+def test_failed_commit_keeps_raw_for_retry(session_local, tmp_path):
+    db = session_local
+    att, staged, job = _processing_attachment(db, tmp_path, b"a,b,c\n" * 2000, "r.csv")
+
+    with patch.object(db, "commit", side_effect=RuntimeError("db caída")), \
+            pytest.raises(RuntimeError):
+        media_jobs._process_attachment(job)
+    db.rollback()
+    assert staged.exists() and att.filepath == str(staged)
+
+    assert media_jobs._process_attachment(job)["status"] == "ready"
+    assert att.filepath == job["target"] + ".gz" and att.file_size == 12000
+    assert not staged.exists()
+
+
+def test_retry_finishes_already_published(session_local, tmp_path):
+    """Sin crudo pero con el destino publicado: el reintento solo completa la fila."""
+    db = session_local
+    att, staged, job = _processing_attachment(db, tmp_path, os.urandom(2048), "r.pdf")
+    with open(job["target"], "wb") as out:
+        out.write(os.urandom(2048))
+    staged.unlink()
+
+    assert media_jobs._process_attachment(job)["status"] == "ready"
+    assert att.media_status == "ready" and att.filepath == job["target"]
+    assert att.file_size == 2048
+
+
+def test_dispatch_runs_inline_when_async_disabled(tmp_path, monkeypatch):
+    from itcj2.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "MEDIA_ASYNC_ENABLED", False)
+    monkeypatch.setattr(get_settings(), "MEDIA_STAGING_PATH", str(tmp_path / "staging"))
+    path = tmp_path / "p.jpg"
+    path.write_bytes(_jpeg((500, 400)))
+
+    media_jobs.dispatch({"kind": "garment", "path": str(path)})
+
+    assert (tmp_path / "p.thumb.jpg").is_file()
+
+
+def test_sweep_keeps_old_raw_files_still_processing(tmp_path, monkeypatch, session_local):
+    """Un crudo de más de 24 h cuyo adjunto sigue en `processing` no se borra."""
+    from itcj2.apps.maint.models.attachment import MaintAttachment
+    from itcj2.config import get_settings
+    from tests.fastapi.maint._seed import make_department, make_ticket, make_user
+
+    db = session_local
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    monkeypatch.setattr(get_settings(), "MEDIA_STAGING_PATH", str(staging))
+    monkeypatch.setattr(media_jobs, "_last_sweep", 0.0)
+
+    day_old = time.time() - 25 * 3600
+    queued, orphan, fresh = (staging / n for n in ("queued", "orphan", "fresh"))
+    for path in (queued, orphan, fresh):
+        path.write_bytes(b"raw")
+    for path in (queued, orphan):
+        os.utime(path, (day_old, day_old))
+
+    user = make_user(db)
+    ticket = make_ticket(db, user, make_department(db))
+    db.add(MaintAttachment(
+        ticket_id=ticket.id, uploaded_by_id=user.id, attachment_type="ticket",
+        filename="queued", original_filename="foto.jpg", filepath=str(queued),
+        media_status="processing",
+    ))
+    db.commit()
+
+    media_jobs._maybe_sweep_staging()
+
+    assert queued.exists()  # job en cola: se conserva
+    assert not orphan.exists()  # nadie lo referencia: se borra
+    assert fresh.exists()  # todavía no cumple 24 h
@@ -0,0 +1,86 @@
+"""Pipeline compartido de imágenes (core/services/media_service.py).
+
+Solo filesystem (tmp_path) y Pillow: no usa BD.
+"""
+import io
+import os
+
+from PIL import Image
+
+from itcj2.core.services import media_service
+
+
+def _jpeg(size, orientation=None) -> bytes:
+    img = Image.new("RGB", size, (200, 30, 30))
+    out = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    img.save(out, format="JPEG", exif=exif.tobytes())
+    return out.getvalue()
+
+
+def test_variants_respect_exif_and_sizes(tmp_path):
+    # 4000x3000 con orientación 6 (rotada 90°): la variante full queda vertical.
+    path = str(tmp_path / "42.jpg")
+    size, manifest = media_service.save_image_variants(_jpeg((4000, 3000), orientation=6), path)
+
+    assert size == os.path.getsize(path)
+    assert (manifest["full"]["w"], manifest["full"]["h"]) == (1440, 1920)
+    assert (manifest["medium"]["w"], manifest["medium"]["h"]) == (720, 960)
+    assert (manifest["thumb"]["w"], manifest["thumb"]["h"]) == (240, 320)
+    assert manifest["full"]["jpg"] == "42.jpg"
+    for entry in manifest.values():
+        for fmt in ("webp", "jpg"):
+            assert (tmp_path / entry[fmt]).is_file()
+    with Image.open(tmp_path / manifest["thumb"]["webp"]) as thumb:
+        assert thumb.format == "WEBP"
+        assert thumb.size == (240, 320)
+
+
+def test_small_image_reuses_larger_variant(tmp_path):
+    path = str(tmp_path / "small.jpg")
+    _, manifest = media_service.save_image_variants(_jpeg((600, 400)), path)
+
+    assert manifest["medium"] == manifest["full"]
+    assert manifest["thumb"]["w"] == 320
+    assert sorted(os.listdir(tmp_path)) == [
+        "small.full.webp", "small.jpg", "small.thumb.jpg", "small.thumb.webp",
+    ]
+
+
+def test_transparency_is_flattened_on_white(tmp_path):
+    img = Image.new("RGBA", (50, 50), (0, 0, 0, 0))
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+
+    flat = media_service.open_image(out.getvalue())
+    assert flat.mode == "RGB"
+    assert flat.getpixel((10, 10)) == (255, 255, 255)
+
+
+def test_pick_variant_negotiates_webp(tmp_path):
+    path = str(tmp_path / "7.jpg")
+    _, manifest = media_service.save_image_variants(_jpeg((2000, 1000)), path)
+
+    webp, mime = media_service.pick_variant(path, manifest, "thumb", "image/avif,image/webp,*/*")
+    assert webp.endswith("7.thumb.webp") and mime == "image/webp"
+    jpg, mime = media_service.pick_variant(path, manifest, "thumb", "image/*")
+    assert jpg.endswith("7.thumb.jpg") and mime == "image/jpeg"
+    # Fila previa al pipeline: cualquier tamaño es el archivo original.
+    assert media_service.pick_variant(path, None, "thumb", "image/webp") == (path, None)
+
+
+def test_sibling_variants_and_cleanup(tmp_path):
+    path = str(tmp_path / "g-1a2b3c4d.jpg")
+    _, manifest = media_service.save_image_variants(_jpeg((3000, 2000)), path)
+
+    rebuilt = media_service.sibling_variants(path)
+    for name in media_service.VARIANT_NAMES:
+        assert {k: rebuilt[name][k] for k in ("webp", "jpg")} == {k: manifest[name][k] for k in ("webp", "jpg")}
+
+    assert media_service.disk_bytes(path, manifest) == sum(
+        os.path.getsize(tmp_path / f) for f in os.listdir(tmp_path)
+    )
+    media_service.remove_variants(path, manifest)
+    assert os.listdir(tmp_path) == ["g-1a2b3c4d.jpg"]
@@ -0,0 +1,127 @@
+"""Métricas estilo Prometheus (core/services/metrics.py) y GET /metrics.
+
+El registro en memoria, el middleware y la exposición se prueban contra el
+Redis REAL del stack (se salta si no hay), cada test bajo su propio prefijo de
+claves.
+"""
+import time
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from itcj2.core.services import metrics
+
+
+@pytest.fixture()
+def r(redis_client, monkeypatch):
+    """Redis real con un prefijo propio del test; el registro en memoria arranca vacío."""
+    prefix = f"test:metrics:{uuid.uuid4().hex}"
+    monkeypatch.setattr(metrics, "_PREFIX", prefix)
+    monkeypatch.setattr(metrics, "_ensure_flusher", lambda: None)
+    metrics._values.clear()
+    yield redis_client
+    metrics._values.clear()
+    keys = list(redis_client.scan_iter(match=f"{prefix}:*"))
+    if keys:
+        redis_client.delete(*keys)
+
+
+def test_histogram_buckets_are_cumulative(r):
+    for v in (0.003, 0.02, 0.02, 30.0):
+        metrics.observe("itcj_http_request_duration_seconds", v, method="GET", route="/x", status="2xx")
+    metrics.flush(r)
+
+    text = metrics.render(r)
+    lbl = 'method="GET",route="/x",status="2xx"'
+    assert f'itcj_http_request_duration_seconds_bucket{{{lbl},le="0.005"}} 1' in text
+    assert f'itcj_http_request_duration_seconds_bucket{{{lbl},le="0.025"}} 3' in text
+    assert f'itcj_http_request_duration_seconds_bucket{{{lbl},le="10.0"}} 3' in text
+    assert f'itcj_http_request_duration_seconds_bucket{{{lbl},le="+Inf"}} 4' in text
+    assert f"itcj_http_request_duration_seconds_count{{{lbl}}} 4" in text
+    assert "# TYPE itcj_http_request_duration_seconds histogram" in text
+
+
+def test_flush_sums_across_processes(r):
+    # Dos procesos vuelcan el mismo histograma: se suman en Redis.
+    for _ in range(2):
+        metrics.observe("itcj_redis_command_seconds", 0.001, command="GET")
+        metrics.flush(r)
+    assert 'itcj_redis_command_seconds_count{command="GET"} 2' in metrics.render(r)
+
+
+def test_counters_render_as_totals(r):
+    for _ in range(2):
+        metrics.inc("itcj_email_messages_total", 3, app="maint", outcome="sent")
+        metrics.flush(r)
+    text = metrics.render(r)
+    assert "# TYPE itcj_email_messages_total counter" in text
+    assert 'itcj_email_messages_total{app="maint",outcome="sent"} 6' in text
+
+
+def test_label_values_are_escaped():
+    assert metrics._labels({"b": 'a"b\\c', "a": 1}) == 'a="1",b="a\\"b\\\\c"'
+
+
+def test_stale_gauges_are_dropped(r):
+    r.hset(f"{metrics._PREFIX}:itcj_db_pool_checked_out", mapping={
+        'pid="1"': f"3|{int(time.time())}",
+        'pid="2"': f"9|{int(time.time()) - 3600}",
+    })
+    text = metrics.render(r)
+    assert 'itcj_db_pool_checked_out{pid="1"} 3' in text
+    assert 'pid="2"' not in text
+
+
+def test_socketio_sampler_groups_rooms_by_kind(r, monkeypatch):
+    samplers = []
+    monkeypatch.setattr(metrics, "_samplers", samplers)
+
+    class _Sio:
+        class manager:
+            rooms = {"/notify": {None: {"a", "b", "c"}, "user:1": {"a"}, "user:22": {"b", "c"}}}
+
+    metrics.instrument_socketio(_Sio)
+    rows = samplers[0]()
+    assert ("itcj_socketio_connections", {"namespace": "/notify"}, 3) in rows
+    assert ("itcj_socketio_rooms", {"namespace": "/notify", "room": "user:*"}, 2) in rows
+    assert ("itcj_socketio_room_members_max", {"namespace": "/notify", "room": "user:*"}, 2) in rows
+
+
+def test_middleware_uses_route_template(r):
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def _item(item_id: int):
+        return {"ok": True}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/items/nope")
+    metrics.flush(r)
+
+    text = metrics.render(r)
+    assert 'itcj_http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="2xx"} 2' in text
+    assert 'route="/items/{item_id}",status="4xx"} 1' in text
+
+
+def test_endpoint_requires_token(monkeypatch, r):
+    from itcj2.config import get_settings
+    from itcj2.main import create_app
+
+    monkeypatch.setattr(metrics, "_flush_redis", lambda: r)
+    client = TestClient(create_app())
+
+    monkeypatch.setattr(get_settings(), "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(get_settings(), "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 403
+    resp = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "# TYPE itcj_db_pool_checkout_seconds histogram" in resp.text
+
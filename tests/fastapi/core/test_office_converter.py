@@ -0,0 +1,98 @@
+"""Pool de conversión a PDF (core/services/office_converter.py).
+
+Sin LibreOffice: se sustituye la conversión del slot para probar el reparto del
+lote, el orden del resultado y el reciclaje.
+"""
+import threading
+import time
+from io import BytesIO
+
+import pytest
+
+from itcj2.core.services import office_converter
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    p = office_converter._Pool(3, "soffice", None)
+    monkeypatch.setattr(office_converter, "_get_pool", lambda: p)
+    return p
+
+
+def test_convert_many_keeps_order_and_isolates_failures(pool, monkeypatch):
+    def fake(self, data, ext, timeout):
+        if data == b"bad":
+            raise office_converter.ConversionError("boom")
+        return b"%PDF " + data
+
+    monkeypatch.setattr(office_converter._Slot, "convert", fake)
+
+    out = office_converter.convert_many([BytesIO(b"a"), b"bad", BytesIO(b"c")])
+
+    assert out[0].read() == b"%PDF a"
+    assert isinstance(out[1], office_converter.ConversionError)
+    assert out[2].read() == b"%PDF c"
+
+
+def test_batch_runs_in_parallel_up_to_pool_size(pool, monkeypatch):
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def fake(self, data, ext, timeout):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return data
+
+    monkeypatch.setattr(office_converter._Slot, "convert", fake)
+
+    office_converter.convert_many([b"x"] * 9)
+
+    assert peak == 3
+
+
+def test_light_load_reuses_the_same_slot(pool, monkeypatch):
+    used = []
+    monkeypatch.setattr(office_converter._Slot, "convert",
+                        lambda self, data, ext, timeout: used.append(self.index) or data)
+
+    for _ in range(4):
+        office_converter.convert_to_pdf(b"x")
+
+    assert used == [0, 0, 0, 0]
+
+
+def test_uno_slot_recycles_after_max_jobs(monkeypatch):
+    from itcj2.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "OFFICE_CONVERTER_MAX_JOBS", 2)
+    slot = office_converter._Slot(0, "soffice", "/usr/bin/python3")
+    starts, stops = [], []
+
+    class _Proxy:
+        def convert(self, data, ext):
+            return data
+
+    def fake_start(timeout):
+        starts.append(1)
+        slot.proc = type("P", (), {"poll": lambda self: None})()
+        slot.proxy = _Proxy()
+        slot.jobs = 0
+
+    def fake_stop():
+        stops.append(1)
+        slot.proc = None
+
+    monkeypatch.setattr(slot, "_start", fake_start)
+    monkeypatch.setattr(slot, "stop", fake_stop)
+    payload = type("B", (), {"data": b"%PDF"})()
+    monkeypatch.setattr(office_converter.xmlrpc.client, "Binary", lambda data: payload)
+
+    for _ in range(5):
+        assert slot.convert(b"doc", "docx", 5) == b"%PDF"
+
+    assert len(starts) == 3 and len(stops) == 2
@@ -0,0 +1,107 @@
+"""Profiler de queries por request (core/services/query_profiler.py).
+
+El middleware y los listeners se prueban con el engine de Postgres de los tests
+(solo lecturas) y una app mínima. El agregado entre workers usa el Redis REAL
+del stack (fakeredis no está en requirements) y se salta si no hay.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from itcj2.core.services import query_profiler as qp
+
+
+@pytest.fixture()
+def engine(_pg_engine):
+    qp.install(_pg_engine)
+    # El primer connect inicializa el dialecto: que no caiga dentro de un request.
+    with _pg_engine.connect():
+        pass
+    return _pg_engine
+
+
+def _make_app(engine, server_timing=True):
+    app = FastAPI()
+    app.add_middleware(qp.QueryProfilerMiddleware, server_timing=server_timing)
+
+    @app.get("/items/{item_id}")
+    def _item(item_id: int):
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT :v"), {"v": item_id})
+            conn.execute(text("SELECT 1 + 1"))
+        return {"ok": True}
+
+    return app
+
+
+@pytest.fixture()
+def profiled_app(engine):
+    qp.take_buffer()
+    yield _make_app(engine)
+    qp.take_buffer()
+
+
+def test_fingerprint_ignores_params_and_in_list_length():
+    a = qp.fingerprint("SELECT * FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s)\n  AND x = 5")
+    b = qp.fingerprint("SELECT * FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s) AND x = 7")
+    assert a == b == "SELECT * FROM t WHERE id IN (?+) AND x = ?"
+
+
+def test_server_timing_and_route_aggregate(profiled_app, monkeypatch):
+    monkeypatch.setattr(qp, "flush_due", lambda: False)
+    client = TestClient(profiled_app)
+
+    resp = client.get("/items/7")
+    assert resp.status_code == 200
+    timing = resp.headers["server-timing"]
+    assert 'desc="4 queries, 2 repetidas"' in timing
+    assert "app;dur=" in timing
+
+    client.get("/items/8")
+    stats = qp.take_buffer()["GET /items/{item_id}"]
+    assert stats.requests == 2
+    assert stats.queries == 8
+    assert stats.max_queries == 4
+    assert stats.dups == 4
+    assert stats.dup_fingerprints.most_common(1)[0][1] == 4
+
+
+def test_no_server_timing_when_disabled(engine):
+    resp = TestClient(_make_app(engine, server_timing=False)).get("/items/1")
+    assert "server-timing" not in resp.headers
+
+
+def test_slow_request_is_logged(profiled_app, monkeypatch, caplog):
+    from itcj2.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "QUERY_PROFILER_LOG_QUERIES", 3)
+    with caplog.at_level("WARNING", logger=qp.logger.name):
+        TestClient(profiled_app).get("/items/1")
+    assert any("GET /items/{item_id}" in r.getMessage() for r in caplog.records)
+
+
+@pytest.fixture()
+def r(redis_client):
+    qp.reset(redis_client)
+    yield redis_client
+    qp.reset(redis_client)
+
+
+def test_flush_aggregates_across_workers(r):
+    # Dos "workers" vuelcan su buffer para la misma ruta.
+    for n_queries in (10, 30):
+        prof = qp.RequestProfile(queries=n_queries, db_ms=5.0)
+        prof.fingerprints["SELECT ? FROM t"] = n_queries
+        qp.take_buffer()
+        qp.record("GET /api/x", prof)
+        qp.flush(qp.take_buffer(), r)
+
+    (row,) = qp.top_routes(sort="queries", limit=5, r=r)
+    assert row["route"] == "GET /api/x"
+    assert row["requests"] == 2
+    assert row["queries"] == 40
+    assert row["max_queries"] == 30
+    assert row["queries_per_request"] == 20
+    assert row["top_duplicates"][0] == {"sql": "SELECT ? FROM t", "extra": 38}
@@ -0,0 +1,64 @@
+"""Folios consecutivos (core/services/sequence_service.py) en Postgres (``db_session``).
+
+La tabla de folios del test es TEMPORARY y se crea dentro de la transacción
+del test: el rollback final la descarta junto con los contadores.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, event, insert
+
+from itcj2.core.services import sequence_service
+
+_meta = MetaData()
+_docs = Table("tst_seq_docs", _meta, Column("id", Integer, primary_key=True), Column("folio", String(30)),
+              prefixes=["TEMPORARY"])
+
+FOLIO = sequence_service.Sequence("test.folio", "DOC-{year}-{n:03d}", _docs.c.folio)
+CODE = sequence_service.Sequence("test.code", "WAR-{n:03d}")
+
+
+@pytest.fixture
+def db(db_session):
+    _meta.create_all(db_session.connection())
+    return db_session
+
+
+def test_seeds_from_existing_rows_once_then_counts_in_place(db):
+    db.execute(insert(_docs), [{"folio": "DOC-2026-007"}, {"folio": "DOC-2026-manual"},
+                               {"folio": "DOC-2025-950"}])
+    assert sequence_service.peek_number(db, FOLIO, year=2026) == "DOC-2026-008"
+
+    statements = []
+    event.listen(db.connection(), "before_cursor_execute", lambda *a, **k: statements.append(a[2]))
+    assert sequence_service.next_number(db, FOLIO, year=2026) == "DOC-2026-008"
+    statements.clear()
+    assert sequence_service.next_numbers(db, FOLIO, 3, year=2026) == [
+        "DOC-2026-009", "DOC-2026-010", "DOC-2026-011"]
+    # Ya existe el contador: un solo UPDATE ... RETURNING, sin tocar los folios.
+    assert len(statements) == 1 and "tst_seq_docs" not in statements[0]
+
+    assert sequence_service.next_number(db, FOLIO, year=2025) == "DOC-2025-951"
+    assert sequence_service.next_number(db, FOLIO, year=2027) == "DOC-2027-001"
+
+
+def test_default_year_keys_and_width_overflow(db):
+    year = datetime.now().year
+    assert sequence_service.next_number(db, FOLIO) == f"DOC-{year}-001"
+    assert sequence_service.next_number(db, CODE) == "WAR-001"
+    assert sequence_service.next_number(db, CODE, key="otra") == "WAR-001"
+    sequence_service.advance(db, "test.code", "", 999)
+    assert sequence_service.next_number(db, CODE) == "WAR-1000"
+
+
+def test_observe_and_rollback(db):
+    sequence_service.next_number(db, FOLIO, year=2026)
+    db.commit()
+    sequence_service.observe(db, FOLIO, "DOC-2026-040")
+    sequence_service.observe(db, FOLIO, "DOC-2026-010")  # no retrocede
+    assert sequence_service.next_number(db, FOLIO, year=2026) == "DOC-2026-041"
+    db.rollback()
+    assert sequence_service.next_number(db, FOLIO, year=2026) == "DOC-2026-002"
+
+    with pytest.raises(ValueError):
+        sequence_service.Sequence("x", "DOC-{n}-{year}")
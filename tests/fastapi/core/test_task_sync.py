@@ -0,0 +1,21 @@
+"""POST /tasks/definitions/sync y `celery sync-tasks` leen los mismos módulos."""
+from itcj2.core.models.task_models import TaskDefinition
+from itcj2.database import get_db
+from itcj2.tasks import TASK_MODULES, load_task_modules
+
+
+def test_api_sync_registers_every_task_module(app_client, auth_headers, db_session):
+    def override():
+        yield db_session
+
+    app_client.app.dependency_overrides[get_db] = override
+    try:
+        resp = app_client.post("/api/core/v2/tasks/definitions/sync", headers=auth_headers)
+    finally:
+        app_client.app.dependency_overrides.pop(get_db, None)
+    assert resp.status_code == 201, resp.text
+
+    assert len(load_task_modules()) == len(TASK_MODULES)
+    names = {row[0] for row in db_session.query(TaskDefinition.task_name).all()}
+    assert "itcj2.tasks.maint_tasks.fire_sla_deadlines" in names
+    assert "itcj2.tasks.warehouse_tasks.refresh_stock_signals" in names
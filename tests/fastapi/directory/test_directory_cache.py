@@ -0,0 +1,136 @@
+"""Snapshot cacheado del directorio: consulta con join, Redis read-through y filtros en memoria.
+
+El snapshot vive en el Redis real bajo una clave propia del test; la consulta
+de puestos corre en Postgres (``db_session``).
+"""
+import json
+import uuid
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import event
+
+import itcj2.models  # noqa: F401
+from itcj2.apps.directory.services import directory_service as svc
+from itcj2.core.models.department import Department
+from itcj2.core.models.position import Position, UserPosition
+from itcj2.core.models.user import User
+
+
+def _row(dept_id, dept, title, source="position", holder="", extension="2000", notes="", is_head=False):
+    return {
+        "source": source, "department_id": dept_id, "department": dept, "title": title,
+        "holder": holder, "extension": extension, "notes": notes,
+        "position_id": 1 if source == "position" else None,
+        "entry_id": None if source == "position" else 9, "is_head": is_head,
+    }
+
+
+SNAPSHOT = {
+    "departments": [{"id": 1, "name": "Dirección", "depth": 0}, {"id": 2, "name": "Sistemas", "depth": 1}],
+    "groups": [
+        {"department_id": 1, "department": "Dirección", "depth": 0, "rows": [
+            _row(1, "Dirección", "Director", holder="Pérez Ana", extension="2000", is_head=True),
+            _row(1, "Dirección", "Recepción", source="entry", extension="2001"),
+        ]},
+        {"department_id": 2, "department": "Sistemas", "depth": 1, "rows": [
+            _row(2, "Sistemas", "Soporte", holder="López Luis", extension="2100", notes="site"),
+        ]},
+    ],
+}
+
+
+@pytest.fixture
+def cache(redis_client, monkeypatch):
+    """Clave del snapshot para este test; se borra al terminar."""
+    key = f"test:directory:{uuid.uuid4().hex}"
+    monkeypatch.setattr(svc, "_KEY", key)
+    yield key
+    redis_client.delete(key)
+
+
+def test_snapshot_is_computed_once_then_served_from_redis(redis_client, cache, monkeypatch):
+    calls = []
+    monkeypatch.setattr(svc, "_compute", lambda db: calls.append(db) or SNAPSHOT)
+    db = MagicMock()
+
+    assert svc.list_directory(db) == SNAPSHOT["groups"]
+    assert svc.list_directory(db, q="soporte")[0]["department"] == "Sistemas"
+    assert len(calls) == 1
+    assert json.loads(redis_client.get(cache)) == SNAPSHOT
+    db.execute.assert_not_called()
+
+
+def test_filters_run_in_memory_over_the_snapshot(redis_client, cache):
+    redis_client.set(cache, json.dumps(SNAPSHOT))
+    db = MagicMock()
+
+    by_q = svc.list_directory(db, q="  PÉREZ ")
+    assert [[r["title"] for r in g["rows"]] for g in by_q] == [["Director"]]
+    # la búsqueda también mira notas y nombre del depto
+    assert [g["department_id"] for g in svc.list_directory(db, q="site")] == [2]
+    assert [g["department_id"] for g in svc.list_directory(db, q="dirección")] == [1]
+
+    entries = svc.list_directory(db, source="entry")
+    assert [[r["title"] for r in g["rows"]] for g in entries] == [["Recepción"]]
+    assert [g["department_id"] for g in svc.list_directory(db, department_id=2)] == [2]
+    assert svc.list_directory(db, department_id=2, source="entry") == []
+    # el filtro no muta el snapshot cacheado
+    assert json.loads(redis_client.get(cache)) == SNAPSHOT
+    db.execute.assert_not_called()
+
+
+def test_writes_invalidate_the_snapshot(redis_client, cache):
+    redis_client.set(cache, json.dumps(SNAPSHOT))
+    db = MagicMock()
+    svc.set_position_extension(db, 7, "2099", None, 200)
+    assert not redis_client.exists(cache)
+
+    redis_client.set(cache, json.dumps(SNAPSHOT))
+    svc.delete_entry(db, 3)
+    assert not redis_client.exists(cache)
+
+
+def test_without_redis_builds_on_every_call(monkeypatch):
+    monkeypatch.setattr(svc, "_redis", lambda: None)
+    calls = []
+    monkeypatch.setattr(svc, "_compute", lambda db: calls.append(db) or SNAPSHOT)
+    svc.list_directory(MagicMock())
+    svc.list_directory(MagicMock())
+    svc.invalidate_directory()
+    assert len(calls) == 2
+
+
+def test_positions_and_holders_come_from_one_distinct_on_query(db_session):
+    db = db_session
+    dept = Department(code="tst_sys", name="Sistemas TST", is_active=True)
+    first, later = (User(first_name=n, last_name="TST", is_active=True) for n in ("Luis", "Ana"))
+    db.add_all([dept, first, later])
+    db.flush()
+    head, aux, off = (
+        Position(code=code, title=title, department_id=dept.id, phone_extension=ext, is_active=active,
+                 allows_multiple=True)
+        for code, title, ext, active in (
+            ("head_tst_sys", "Jefe", "2100", True),
+            ("aux_tst_sys", "Auxiliar", "2101", True),
+            ("old_tst_sys", "Baja", "2102", False),
+        )
+    )
+    db.add_all([head, aux, off])
+    db.flush()
+    # Dos titulares activos del mismo puesto: gana la asignación más antigua.
+    db.add_all([
+        UserPosition(user_id=later.id, position_id=head.id, start_date=date(2026, 2, 1)),
+        UserPosition(user_id=first.id, position_id=head.id, start_date=date(2026, 1, 1)),
+    ])
+    db.commit()
+
+    statements = []
+    event.listen(db.connection(), "before_cursor_execute", lambda *a: statements.append(a[2]))
+    rows = [r for r in svc._position_rows(db) if r["department_id"] == dept.id]
+
+    assert len(statements) == 1 and "DISTINCT ON (core_user_positions.position_id)" in statements[0]
+    assert sorted((r["title"], r["holder"], r["is_head"]) for r in rows) == [
+        ("Auxiliar", "", False), ("Jefe", "TST Luis", True),
+    ]
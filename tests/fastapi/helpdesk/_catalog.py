@@ -55,7 +55,7 @@ def ensure_helpdesk_priority(db, code="MEDIA"):
     este proceso de pytest (porque algún test anterior corrió contra una BD
     sin prioridades), se queda pegado en `set()` para el resto de la sesión.
     Invalidar aquí fuerza una relectura con el `db` de ESTE test — que sí ve
-    la fila recién insertada, porque `_ensure_loaded` usa el `db` que se le
+    la fila recién insertada, porque el loader de `PRIORITIES` usa el `db` que se le
     pasa (a diferencia del cache de maint, que abre su propia sesión).
     """
     pr = db.query(Priority).filter_by(code=code).first()
@@ -0,0 +1,136 @@
+"""Purga por lotes de adjuntos vencidos (helpdesk/services/attachment_cleanup.py).
+
+Postgres real (``db_session``): selección por keyset, borrado de archivos,
+DELETE y notas de auditoría masivas, reanudación desde el checkpoint. La purga
+recorre todos los adjuntos vencidos: los conteos asumen, como CI, una BD de
+test sin otros adjuntos.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from itcj2.apps.helpdesk.models.attachment import Attachment
+from itcj2.apps.helpdesk.models.comment import Comment
+from itcj2.apps.helpdesk.models.ticket import Ticket
+from itcj2.apps.helpdesk.services import attachment_cleanup
+from itcj2.config import get_settings
+from itcj2.core.models.user import User
+from itcj2.core.services import file_purge
+
+from ._catalog import ensure_helpdesk_category
+
+OLD = datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def db(db_session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "ATTACHMENT_CLEANUP_CHUNK", 2)
+    return db_session
+
+
+@pytest.fixture
+def user(db):
+    user = User(first_name="TEST", last_name="SEED", is_active=True)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _ticket(db, user, number, status="CLOSED"):
+    ticket = Ticket(
+        ticket_number=number, requester_id=user.id, area="SOPORTE",
+        category_id=ensure_helpdesk_category(db).id, title="t", description="desc", status=status,
+        priority="MEDIA", created_by_id=user.id, updated_by_id=user.id, created_at=OLD, updated_at=OLD,
+    )
+    db.add(ticket)
+    db.flush()
+    return ticket
+
+
+def _attachment(db, tmp_path, name, ticket, att_type="ticket", comment=None, expired=True):
+    path = tmp_path / f"{name}.jpg"
+    path.write_bytes(b"x" * 100)
+    (tmp_path / f"{name}_thumb.webp").write_bytes(b"y" * 10)
+    att = Attachment(
+        ticket_id=ticket.id, uploaded_by_id=ticket.requester_id, attachment_type=att_type,
+        comment_id=comment.id if comment else None, filename=path.name, original_filename=f"orig_{name}.jpg",
+        filepath=str(path), variants={"thumb": {"webp": f"{name}_thumb.webp"}},
+        media_status="ready", uploaded_at=OLD,
+        auto_delete_at=OLD if expired else datetime(2999, 1, 1),
+    )
+    db.add(att)
+    db.flush()
+    return path, att.id
+
+
+def test_purge_deletes_files_rows_and_appends_notes(db, user, tmp_path):
+    closed = _ticket(db, user, "TST-TK-1")
+    open_ = _ticket(db, user, "TST-TK-2", status="IN_PROGRESS")
+    comment = Comment(ticket_id=closed.id, author_id=user.id, content="hola", created_at=OLD, updated_at=OLD)
+    db.add(comment)
+    db.flush()
+    p1, _ = _attachment(db, tmp_path, "a1", closed)
+    p2, _ = _attachment(db, tmp_path, "a2", closed)
+    p3, _ = _attachment(db, tmp_path, "a3", closed, att_type="resolution")
+    p4, _ = _attachment(db, tmp_path, "a4", closed, att_type="comment", comment=comment)
+    keep_future, future_id = _attachment(db, tmp_path, "a5", closed, expired=False)
+    keep_open, open_id = _attachment(db, tmp_path, "a6", open_)
+    db.commit()
+
+    by_ticket: dict = {}
+    purge = attachment_cleanup.expired_purge(db, by_ticket=by_ticket)
+    assert purge.run() is True
+
+    assert purge.purged == 4 and purge.errors == []
+    assert purge.freed_bytes == 4 * 110
+    for p in (p1, p2, p3, p4):
+        assert not p.exists()
+        assert not (tmp_path / f"{p.stem}_thumb.webp").exists()
+    assert keep_future.exists() and keep_open.exists()
+    remaining = db.scalars(select(Attachment.id).where(Attachment.ticket_id.in_((closed.id, open_.id)))).all()
+    assert sorted(remaining) == [future_id, open_id]
+
+    assert by_ticket == {"TST-TK-1": {"ticket_image": 2, "resolution": 1, "comment": 1,
+                                      "total": 4, "freed_bytes": 440}}
+
+    ticket = db.execute(select(Ticket.description, Ticket.resolution_notes).where(Ticket.id == closed.id)).one()
+    assert "Se eliminaron 2 imagen(es)" in ticket.description
+    assert "orig_a3.jpg" in ticket.resolution_notes
+    assert "orig_a4.jpg" in db.scalar(select(Comment.content).where(Comment.id == comment.id))
+
+
+def test_purge_resumes_from_checkpoint(db, user, tmp_path, monkeypatch):
+    ticket = _ticket(db, user, "TST-TK-1")
+    paths, ids = zip(*(_attachment(db, tmp_path, f"a{i}", ticket) for i in range(1, 6)))
+    db.commit()
+
+    # Primer chequeo del presupuesto pasa, el segundo ya no: un solo lote.
+    clock = iter([0.0, 10.0])
+    monkeypatch.setattr(file_purge.time, "monotonic", lambda: next(clock))
+    purge = attachment_cleanup.expired_purge(db)
+    assert purge.run(deadline=5.0) is False
+    assert purge.purged == 2
+    checkpoint = purge.checkpoint()
+    assert checkpoint[1] == ids[1]
+
+    monkeypatch.undo()
+    monkeypatch.setattr(get_settings(), "ATTACHMENT_CLEANUP_CHUNK", 2)
+    resumed = attachment_cleanup.expired_purge(db, after=checkpoint)
+    assert resumed.run() is True
+    assert resumed.purged == 3
+    assert not any(p.exists() for p in paths)
+    assert db.scalar(select(Attachment.id).where(Attachment.ticket_id == ticket.id)) is None
+
+
+def test_dry_run_measures_without_deleting(db, user, tmp_path):
+    ticket = _ticket(db, user, "TST-TK-1")
+    path, att_id = _attachment(db, tmp_path, "a1", ticket)
+    db.commit()
+
+    by_ticket: dict = {}
+    purge = attachment_cleanup.expired_purge(db, dry_run=True, by_ticket=by_ticket)
+    purge.run()
+    assert purge.purged == 1 and purge.freed_bytes == 110
+    assert path.exists() and db.scalar(select(Attachment.id).where(Attachment.ticket_id == ticket.id)) == att_id
+    assert by_ticket["TST-TK-1"]["total"] == 1
@@ -0,0 +1,84 @@
+"""
+Caché de formatos generados (services/document_cache.py + document_service).
+
+Sin BD ni LibreOffice: ticket simulado, plantilla en tmp_path y el render y el
+pool de conversión sustituidos para contar cuántas veces se llaman.
+"""
+import os
+import time
+from datetime import datetime
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+
+import itcj2.models  # noqa: F401  (registra los modelos en el orden de la app)
+from itcj2.apps.helpdesk.services import document_cache, document_service
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    from itcj2.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "HELPDESK_DOC_CACHE_PATH", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+def _ticket(**kw):
+    base = dict(id=7, ticket_number="TKT-2026-007", status="CLOSED", is_resolved=True,
+                updated_at=datetime(2026, 3, 1, 10, 0), created_at=datetime(2026, 2, 1))
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+
+def test_key_changes_with_ticket_version_and_template(tmp_path, cache_dir):
+    tpl = tmp_path / "plantilla.docx"
+    tpl.write_bytes(b"v1")
+    k1 = document_cache.key_for(str(tpl), "solicitud", _ticket())
+
+    assert k1 == document_cache.key_for(str(tpl), "solicitud", _ticket())
+    assert k1 != document_cache.key_for(str(tpl), "orden_trabajo", _ticket())
+    assert k1 != document_cache.key_for(str(tpl), "solicitud", _ticket(updated_at=datetime(2026, 3, 2)))
+
+    tpl.write_bytes(b"v2-plantilla-nueva")
+    assert k1 != document_cache.key_for(str(tpl), "solicitud", _ticket())
+
+
+def test_evict_removes_least_recently_used(cache_dir):
+    for i, key in enumerate(("aa01", "bb02", "cc03")):
+        document_cache.put(key, "pdf", b"x" * 100)
+        path = cache_dir / key[:2] / f"{key}.pdf"
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    # Un hit vuelve "reciente" a la más vieja.
+    assert document_cache.get("aa01", "pdf") == b"x" * 100
+
+    assert document_cache.evict(250) == 1
+    assert document_cache.get("bb02", "pdf") is None
+    assert document_cache.get("aa01", "pdf") is not None
+
+
+def test_pdfs_render_and_convert_once(tmp_path, cache_dir, monkeypatch):
+    tpl = tmp_path / "orden.docx"
+    tpl.write_bytes(b"plantilla")
+    renders, conversions = [], []
+
+    def render(ticket, template_path):
+        renders.append(ticket.id)
+        return BytesIO(b"docx-%d" % ticket.id)
+
+    def convert_many(docs, ext):
+        conversions.append(len(docs))
+        return [BytesIO(b"%PDF " + d.getvalue()) for d in docs]
+
+    monkeypatch.setattr(document_service, "_get_template_path", lambda name: str(tpl))
+    monkeypatch.setitem(document_service._RENDERERS, "orden_trabajo", ("orden", render))
+    monkeypatch.setattr(document_service.office_converter, "convert_many", convert_many)
+
+    tickets = [_ticket(id=1), _ticket(id=2), _ticket(id=3, status="OPEN", is_resolved=False)]
+    first = document_service._pdfs([(t, "orden_trabajo") for t in tickets])
+    second = document_service._pdfs([(t, "orden_trabajo") for t in tickets])
+
+    assert [b.getvalue() for b in first[:2]] == [b"%PDF docx-1", b"%PDF docx-2"]
+    assert isinstance(first[2], ValueError) and isinstance(second[2], ValueError)
+    assert [b.getvalue() for b in second[:2]] == [b"%PDF docx-1", b"%PDF docx-2"]
+    assert renders == [1, 2] and conversions == [2]
@@ -0,0 +1,44 @@
+"""
+Export por lotes en streaming (document_service.iter_batch_zip).
+
+Sin BD: se sustituyen las tandas de documentos ya generados.
+"""
+import io
+import zipfile
+
+import pytest
+
+import itcj2.models  # noqa: F401  (registra los modelos en el orden de la app)
+from itcj2.apps.helpdesk.services import document_service
+
+
+def _fake_chunks(n_chunks, per_chunk):
+    def chunks(ticket_ids, doc_type, doc_format):
+        for c in range(n_chunks):
+            docs = []
+            for i in range(per_chunk):
+                num = f"TKT-{c}-{i}"
+                buf = RuntimeError("LibreOffice caído") if (c, i) == (1, 0) else io.BytesIO(num.encode() * 500)
+                docs.append((num, "Solicitud", buf))
+            yield docs
+    return chunks
+
+
+def test_zip_is_emitted_per_chunk_and_valid(monkeypatch):
+    monkeypatch.setattr(document_service, "_iter_document_chunks", _fake_chunks(3, 4))
+
+    parts = list(document_service.iter_batch_zip(list(range(12)), "solicitud", "pdf"))
+
+    # Una parte por tanda + el directorio central al cerrar.
+    assert len([p for p in parts if p]) == 4
+    with zipfile.ZipFile(io.BytesIO(b"".join(parts))) as zf:
+        names = zf.namelist()
+        assert len(names) == 11
+        assert "Solicitud_TKT-1-0.pdf" not in names
+        assert zf.read("Solicitud_TKT-2-3.pdf") == b"TKT-2-3" * 500
+        assert zf.testzip() is None
+
+
+def test_zip_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        next(document_service.iter_batch_zip([1], "solicitud", "odt"))
@@ -0,0 +1,109 @@
+"""Registro masivo de inventario (services/inventory_bulk_service.py).
+
+Postgres real (``db_session``): números apartados en bloque desde el contador
+de (categoría, año), INSERT multi-fila de equipos e historial y validación de
+seriales en una sola consulta. La categoría del test tiene prefijo propio
+(``TSTPC``) para que el seed del contador no vea equipos reales.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, func, select
+
+from itcj2.apps.helpdesk.models.inventory_category import InventoryCategory
+from itcj2.apps.helpdesk.models.inventory_history import InventoryHistory
+from itcj2.apps.helpdesk.models.inventory_item import InventoryItem
+from itcj2.apps.helpdesk.services.inventory_bulk_service import InventoryBulkService
+from itcj2.apps.helpdesk.services.inventory_service import INVENTORY_NUMBER, InventoryService
+from itcj2.core.models.user import User
+from itcj2.core.services import sequence_service
+
+from ._catalog import ensure_comp_center
+
+YEAR = datetime.now().year
+
+
+@pytest.fixture
+def user(db_session):
+    user = User(first_name="TEST", last_name="SEED", is_active=True)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def cat(db_session, user):
+    """Categoría con un equipo ya registrado (TSTPC-{año}-0007); devuelve su id."""
+    db = db_session
+    category = InventoryCategory(code="tst_pc", name="PC", inventory_prefix="TSTPC", is_active=True)
+    db.add(category)
+    db.flush()
+    db.add(InventoryItem(
+        inventory_number=f"TSTPC-{YEAR}-0007", category_id=category.id,
+        department_id=ensure_comp_center(db).id, supplier_serial="TST-SP-EXISTE", status="ACTIVE",
+        registered_by_id=user.id, is_active=True, is_locked=False,
+    ))
+    db.commit()
+    return category.id
+
+
+def _count_statements(session):
+    seen = []
+    event.listen(session.connection(), "before_cursor_execute", lambda *a, **k: seen.append(1))
+    return seen
+
+
+def test_bulk_create_reserves_a_block_and_inserts_in_bulk(db_session, cat, user):
+    db = db_session
+    assert InventoryBulkService.get_next_inventory_number(db, cat) == f"TSTPC-{YEAR}-0008"
+
+    statements = _count_statements(db)
+    items = InventoryBulkService.bulk_create_items(db, {
+        "category_id": cat, "brand": "Dell", "quantity": 40,
+        "supplier_serial_list": "\n".join(f"TST-SP-{i}" for i in range(40)),
+    }, registered_by_id=user.id)
+    # Constante, no proporcional a la cantidad de equipos.
+    assert len(statements) < 12
+
+    assert [i.inventory_number for i in items[:2]] == [f"TSTPC-{YEAR}-0008", f"TSTPC-{YEAR}-0009"]
+    assert items[-1].inventory_number == f"TSTPC-{YEAR}-0047"
+    assert items[5].supplier_serial == "TST-SP-5" and items[5].status == "PENDING_ASSIGNMENT"
+    assert db.scalar(select(func.count()).select_from(InventoryHistory)
+                     .where(InventoryHistory.item_id.in_([i.id for i in items]))) == 40
+    history = db.scalars(select(InventoryHistory).where(InventoryHistory.item_id == items[0].id)).one()
+    assert history.new_value["inventory_number"] == f"TSTPC-{YEAR}-0008"
+
+    # El siguiente registro continúa el contador sin volver a buscar el máximo.
+    assert InventoryService.generate_inventory_number(db, cat) == f"TSTPC-{YEAR}-0048"
+
+
+def test_rollback_returns_the_block(db_session, cat):
+    db = db_session
+    InventoryService.reserve_inventory_numbers(db, cat, 5)
+    db.rollback()
+    assert InventoryService.reserve_inventory_numbers(db, cat, 2) == [
+        f"TSTPC-{YEAR}-0008", f"TSTPC-{YEAR}-0009"]
+
+
+def test_manual_number_advances_counter(db_session, cat):
+    db = db_session
+    InventoryService.reserve_inventory_numbers(db, cat, 1)
+    sequence_service.observe(db, INVENTORY_NUMBER, f"TSTPC-{YEAR}-0100", key=str(cat), prefix="TSTPC")
+    sequence_service.observe(db, INVENTORY_NUMBER, "OTRO-0200", key=str(cat), prefix="TSTPC")
+    assert InventoryService.generate_inventory_number(db, cat) == f"TSTPC-{YEAR}-0101"
+
+
+def test_validate_serials_checks_lists_and_db_in_one_query(db_session, cat):
+    statements = _count_statements(db_session)
+    result = InventoryBulkService.validate_bulk_serials(db_session, {
+        "supplier_serial_list": "TST-SP-EXISTE\nTST-SP-1\nTST-SP-1",
+        "itcj_serial_list": "TST-IT-1",
+        "serial_separator": "newline",
+    })
+    assert len(statements) == 1
+    assert not result["valid"]
+    assert result["counts"] == {"supplier_serial_list": 3, "itcj_serial_list": 1, "id_tecnm_list": 0}
+    messages = [e["message"] for e in result["errors"]]
+    assert any("duplicados en la lista: ['TST-SP-1']" in m for m in messages)
+    db_error = next(e for e in result["errors"] if "details" in e)
+    assert db_error["details"] == [{"serial": "TST-SP-EXISTE", "inventory_number": f"TSTPC-{YEAR}-0007"}]
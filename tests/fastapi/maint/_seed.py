@@ -0,0 +1,116 @@
+"""Helpers para sembrar filas de maint/warehouse dentro de `db_session`.
+
+Mismo criterio que `tests/fastapi/helpdesk/_catalog.py`: todo corre dentro de
+la transacción del test (rollback al terminar) y los catálogos son
+get-or-create, así que sirven igual contra la BD vacía de CI que contra la de
+dev. Los códigos llevan prefijo `tst_` para no chocar con datos reales.
+"""
+import itertools
+from datetime import date
+from decimal import Decimal
+
+from itcj2.apps.maint.models.category import MaintCategory
+from itcj2.apps.maint.models.ticket import MaintTicket
+from itcj2.apps.warehouse.models.category import WarehouseCategory
+from itcj2.apps.warehouse.models.product import WarehouseProduct
+from itcj2.apps.warehouse.models.stock_entry import WarehouseStockEntry
+from itcj2.apps.warehouse.models.subcategory import WarehouseSubcategory
+from itcj2.core.models.department import Department
+from itcj2.core.models.user import User
+
+_seq = itertools.count(1)
+
+
+def make_user(db, last_name="SEED", first_name="TEST"):
+    user = User(first_name=first_name, last_name=last_name, is_active=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def make_department(db, code=None, parent_id=None, name=None):
+    code = code or f"tst_dept_{next(_seq)}"
+    dept = Department(code=code, name=name or code, parent_id=parent_id, is_active=True)
+    db.add(dept)
+    db.commit()
+    db.refresh(dept)
+    return dept
+
+
+def ensure_maint_category(db, code="tst_cat"):
+    cat = db.query(MaintCategory).filter_by(code=code).first()
+    if cat:
+        return cat
+    cat = MaintCategory(code=code, name=code, is_active=True)
+    db.add(cat)
+    db.commit()
+    db.refresh(cat)
+    return cat
+
+
+def make_ticket(db, requester, department, *, number=None, category=None, commit=True, **fields):
+    """Ticket de maint. `fields` pisa cualquier columna (status, fechas, ...)."""
+    values = dict(
+        ticket_number=number or f"TST-{next(_seq):06d}",
+        requester_id=requester.id,
+        requester_department_id=department.id,
+        category_id=(category or ensure_maint_category(db)).id,
+        priority="MEDIA",
+        title="ticket de prueba",
+        description="x",
+        status="PENDING",
+        created_by_id=requester.id,
+    )
+    values.update(fields)
+    ticket = MaintTicket(**values)
+    db.add(ticket)
+    if commit:
+        db.commit()
+        db.refresh(ticket)
+    else:
+        db.flush()
+    return ticket
+
+
+def ensure_warehouse_subcategory(db, name="tst_sub"):
+    sub = db.query(WarehouseSubcategory).filter_by(name=name).first()
+    if sub:
+        return sub
+    cat = db.query(WarehouseCategory).filter_by(name="tst_cat").first()
+    if not cat:
+        cat = WarehouseCategory(name="tst_cat")
+        db.add(cat)
+        db.flush()
+    sub = WarehouseSubcategory(category_id=cat.id, name=name)
+    db.add(sub)
+    db.commit()
+    db.refresh(sub)
+    return sub
+
+
+def make_product(db, created_by, *, code=None, name=None, department_code="maint", stock=0, **fields):
+    """Producto de almacén; `stock` va a stock_on_hand y stock_value (costo 1)."""
+    code = code or f"TST-{next(_seq):05d}"
+    product = WarehouseProduct(
+        code=code, name=name or code, subcategory_id=ensure_warehouse_subcategory(db).id,
+        department_code=department_code, unit_of_measure="pza", created_by_id=created_by.id,
+        stock_on_hand=Decimal(stock), stock_value=Decimal(stock), **fields,
+    )
+    db.add(product)
+    db.commit()
+    db.refresh(product)
+    return product
+
+
+def make_entry(db, product, registered_by, qty, purchase_date=date(2026, 1, 1), *, unit_cost="1", voided=False):
+    """Lote sin movimientos: no toca los totales del producto (eso lo hace `make_product`)."""
+    entry = WarehouseStockEntry(
+        product_id=product.id, quantity_original=Decimal(qty), quantity_remaining=Decimal(qty),
+        purchase_date=purchase_date, purchase_folio="F", unit_cost=Decimal(unit_cost),
+        registered_by_id=registered_by.id, voided=voided,
+    )
+    db.add(entry)
+    db.commit()
+    db.refresh(entry)
+    return entry
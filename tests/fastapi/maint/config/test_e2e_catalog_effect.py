@@ -345,8 +345,6 @@ class TestPrioridadSlaDinamico:
         # Cadena universal de queries.
         # Puntos clave que deben devolver valores controlados:
         #   .filter().count()                  → 0  (sin tickets sin calificar)
-        #   .filter().order_by().first()       → None (ticket previo inexistente en generate_ticket_number)
-        #   .filter_by().first()               → None (unicidad en generate_ticket_number, sin colisión)
         chain = MagicMock()
         chain.filter.return_value.count.return_value = 0
         chain.filter.return_value.filter.return_value.count.return_value = 0
@@ -363,7 +361,9 @@ class TestPrioridadSlaDinamico:
 
         try:
             with patch("itcj2.core.services.departments_service.app_departments",
-                       return_value=[mock_department]):
+                       return_value=[mock_department]), \
+                 patch("itcj2.apps.maint.services.ticket_service.generate_ticket_number",
+                       return_value="MANT-2026-000001"):
                 create_ticket(
                     db=db,
                     requester_id=1,
@@ -382,8 +382,8 @@ class TestPrioridadSlaDinamico:
         # Lo esencial: get_sla_hours fue llamado con 'MEDIA' al calcular due_at.
         # La función llega a esa línea porque: validación de prioridad pasa,
         # usuario y categoría existen, no hay departamentos conflictivos,
-        # count de tickets sin calificar = 0, y generate_ticket_number retorna
-        # un número sin colisión gracias a filter().order_by().first() = None.
+        # count de tickets sin calificar = 0, y generate_ticket_number (folio del
+        # contador central, parcheado) retorna un número.
         assert mock_sla.called, (
             "get_sla_hours debería haberse llamado al calcular due_at, "
             "pero no fue invocado — la función falló antes de la línea due_at."
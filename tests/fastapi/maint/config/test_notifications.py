@@ -708,13 +708,13 @@ class TestEmailHelperSubjectsFallback:
         db = MagicMock()
 
         with patch(
-            "itcj2.apps.maint.services.email_helper._acquire_token",
-            return_value="fake-token",
+            "itcj2.apps.maint.services.email_helper._connected",
+            return_value=True,
         ), patch(
             "itcj2.apps.maint.services.email_helper._render",
             return_value="<html>cuerpo</html>",
         ), patch(
-            "itcj2.apps.maint.services.email_helper._send",
+            "itcj2.apps.maint.services.email_helper._queue",
             return_value=True,
         ), patch(
             "itcj2.apps.maint.services.email_helper.render_notification",
@@ -744,13 +744,13 @@ class TestEmailHelperSubjectsFallback:
         db = MagicMock()
 
         with patch(
-            "itcj2.apps.maint.services.email_helper._acquire_token",
-            return_value="fake-token",
+            "itcj2.apps.maint.services.email_helper._connected",
+            return_value=True,
         ), patch(
             "itcj2.apps.maint.services.email_helper._render",
             return_value="<html></html>",
         ), patch(
-            "itcj2.apps.maint.services.email_helper._send",
+            "itcj2.apps.maint.services.email_helper._queue",
             return_value=False,
         ), patch(
             "itcj2.apps.maint.services.email_helper.render_notification",
@@ -769,13 +769,13 @@ class TestEmailHelperSubjectsFallback:
         db = MagicMock()
 
         with patch(
-            "itcj2.apps.maint.services.email_helper._acquire_token",
-            return_value="tok",
+            "itcj2.apps.maint.services.email_helper._connected",
+            return_value=True,
         ), patch(
             "itcj2.apps.maint.services.email_helper._render",
             return_value="<html></html>",
         ), patch(
-            "itcj2.apps.maint.services.email_helper._send",
+            "itcj2.apps.maint.services.email_helper._queue",
             return_value=True,
         ), patch(
             "itcj2.apps.maint.services.email_helper.render_notification",
@@ -797,13 +797,13 @@ class TestEmailHelperSubjectsFallback:
         db = MagicMock()
 
         with patch(
-            "itcj2.apps.maint.services.email_helper._acquire_token",
-            return_value="tok",
+            "itcj2.apps.maint.services.email_helper._connected",
+            return_value=True,
         ), patch(
             "itcj2.apps.maint.services.email_helper._render",
             return_value="<html></html>",
         ), patch(
-            "itcj2.apps.maint.services.email_helper._send",
+            "itcj2.apps.maint.services.email_helper._queue",
             return_value=True,
         ), patch(
             "itcj2.apps.maint.services.email_helper.render_notification",
@@ -826,13 +826,13 @@ class TestEmailHelperSubjectsFallback:
         db = MagicMock()
 
         with patch(
-            "itcj2.apps.maint.services.email_helper._acquire_token",
-            return_value="tok",
+            "itcj2.apps.maint.services.email_helper._connected",
+            return_value=True,
         ), patch(
             "itcj2.apps.maint.services.email_helper._render",
             return_value="<html></html>",
         ), patch(
-            "itcj2.apps.maint.services.email_helper._send",
+            "itcj2.apps.maint.services.email_helper._queue",
             return_value=True,
         ), patch(
             "itcj2.apps.maint.services.email_helper.render_notification",
@@ -862,7 +862,7 @@ class TestEmailHelperSubjectsFallback:
         assert result is False
 
     def test_send_sin_token_retorna_false_sin_lanzar(self):
-        """Sin token de Graph → send_assigned retorna False sin lanzar excepción."""
+        """Sin cuenta de correo conectada → send_assigned retorna False sin lanzar excepción."""
         from itcj2.apps.maint.services.email_helper import MaintEmailHelper
 
         ticket = self._fake_ticket_email()
@@ -870,8 +870,8 @@ class TestEmailHelperSubjectsFallback:
         db = MagicMock()
 
         with patch(
-            "itcj2.apps.maint.services.email_helper._acquire_token",
-            return_value=None,
+            "itcj2.apps.maint.services.email_helper._connected",
+            return_value=False,
         ):
             try:
                 result = MaintEmailHelper.send_assigned(db, ticket, tech)
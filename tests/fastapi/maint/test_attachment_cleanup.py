@@ -6,11 +6,11 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-import itcj2.models  # noqa: F401
-
 from itcj2.apps.maint.services import attachment_cleanup as cleanup
 from itcj2.apps.maint.models.attachment import MaintAttachment
 
+from ._seed import make_department, make_ticket, make_user
+
 
 # ─────────────────────────────────────────────────────────────────────
 # Helpers
@@ -115,79 +115,73 @@ class TestSetAutoDeleteOnResolved:
 
 
 # ─────────────────────────────────────────────────────────────────────
-# cleanup_expired_attachments — preserva fila
+# cleanup_expired_attachments — preserva fila (por lotes, Postgres)
 # ─────────────────────────────────────────────────────────────────────
 
 class TestCleanupExpired:
-    def _make_attachment(self, filepath, auto_delete_at):
-        att = MagicMock(spec=MaintAttachment)
-        att.id = 1
-        att.ticket_id = 1
-        att.filepath = filepath
-        att.auto_delete_at = auto_delete_at
-        att.is_purged = False
-        att.purged_at = None
-        att.original_filename = os.path.basename(filepath) if filepath else "deleted"
-        return att
-
-    def test_purge_removes_file_and_preserves_row(self, tmp_path):
+    """La purga recorre todos los adjuntos vencidos: los conteos asumen, como
+    CI, una BD de test sin otros adjuntos."""
+
+    @pytest.fixture
+    def db(self, db_session, monkeypatch):
+        from itcj2.config import get_settings
+        monkeypatch.setattr(get_settings(), "ATTACHMENT_CLEANUP_CHUNK", 2)
+        return db_session
+
+    @pytest.fixture
+    def ticket(self, db):
+        return make_ticket(db, make_user(db), make_department(db))
+
+    def _add(self, db, ticket, filepath, auto_delete_at=datetime(2020, 1, 1), is_purged=False):
+        att = MaintAttachment(
+            ticket_id=ticket.id, uploaded_by_id=ticket.requester_id, attachment_type="ticket",
+            filename=os.path.basename(filepath), original_filename=os.path.basename(filepath),
+            filepath=filepath, uploaded_at=datetime(2020, 1, 1),
+            auto_delete_at=auto_delete_at, is_purged=is_purged,
+        )
+        db.add(att)
+        db.commit()
+        return att.id
+
+    def test_purge_removes_file_and_preserves_row(self, db, ticket, tmp_path):
         # Crear archivo real para verificar que lo borra
         target = tmp_path / "evidencia.jpg"
         target.write_bytes(b"fake jpeg content")
-        assert target.exists()
-
-        att = self._make_attachment(
-            filepath=str(target),
-            auto_delete_at=datetime(2020, 1, 1),  # ya vencido
-        )
-
-        db = MagicMock()
-        chain = db.query.return_value.filter.return_value
-        chain.all.return_value = [att]
+        att_id = self._add(db, ticket, str(target))
 
         count = cleanup.cleanup_expired_attachments(db)
         assert count == 1
         # Archivo eliminado
         assert not target.exists()
         # Fila preservada con flags
+        att = db.get(MaintAttachment, att_id, populate_existing=True)
         assert att.is_purged is True
         assert att.purged_at is not None
         assert att.filepath is None
-        db.commit.assert_called_once()
 
-    def test_purge_handles_missing_file(self):
-        att = self._make_attachment(
-            filepath="/no/existe/file.jpg",
-            auto_delete_at=datetime(2020, 1, 1),
-        )
-        db = MagicMock()
-        db.query.return_value.filter.return_value.all.return_value = [att]
+    def test_purge_handles_missing_file(self, db, ticket):
+        att_id = self._add(db, ticket, "/no/existe/file.jpg")
 
         # No debe crashear aunque el archivo no exista
         count = cleanup.cleanup_expired_attachments(db)
         assert count == 1
-        assert att.is_purged is True
+        assert db.get(MaintAttachment, att_id, populate_existing=True).is_purged is True
 
-    def test_no_expired_no_commit(self):
-        db = MagicMock()
-        db.query.return_value.filter.return_value.all.return_value = []
+    def test_no_expired_no_commit(self, db, ticket, tmp_path):
+        self._add(db, ticket, str(tmp_path / "x.jpg"), auto_delete_at=datetime(2999, 1, 1))
+        self._add(db, ticket, str(tmp_path / "y.jpg"), is_purged=True)
 
         count = cleanup.cleanup_expired_attachments(db)
         assert count == 0
-        db.commit.assert_not_called()
-
-    def test_purged_loses_filepath(self, tmp_path):
-        """Después de purga, filepath debe ser None (no apuntar a archivo borrado)."""
-        target = tmp_path / "x.pdf"
-        target.write_bytes(b"%PDF")
 
-        att = self._make_attachment(
-            filepath=str(target),
-            auto_delete_at=datetime(2020, 1, 1),
-        )
-
-        db = MagicMock()
-        db.query.return_value.filter.return_value.all.return_value = [att]
-
-        cleanup.cleanup_expired_attachments(db)
-        assert att.filepath is None
+    def test_purge_spans_several_chunks(self, db, ticket, tmp_path):
+        """Más filas que ATTACHMENT_CLEANUP_CHUNK: el keyset recorre todas."""
+        for i in range(1, 6):
+            path = tmp_path / f"f{i}.pdf"
+            path.write_bytes(b"%PDF")
+            self._add(db, ticket, str(path))
+
+        assert cleanup.cleanup_expired_attachments(db) == 5
+        assert not list(tmp_path.iterdir())
+        purged = db.query(MaintAttachment).populate_existing().filter_by(ticket_id=ticket.id, is_purged=True).count()
+        assert purged == 5
@@ -0,0 +1,146 @@
+"""Número de sentencias de los dashboards de maint (dashboard_engine).
+
+Postgres real (``db_session``) con tickets en varios estados/categorías/
+departamentos y el caché de alcance en el Redis real. Los KPIs deben salir de
+UNA sentencia agregada (``FILTER (WHERE ...)``) sin importar cuántos haya, y el
+alcance de visibilidad (áreas/deptos) se resuelve una vez por usuario. Los
+conteos globales del admin asumen, como CI, una BD de test sin otros tickets.
+"""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from itcj2.apps.maint.models.action_log import MaintTicketActionLog
+from itcj2.apps.maint.models.technician_area import MaintTechnicianArea
+from itcj2.apps.maint.models.ticket_technician import MaintTicketTechnician
+from itcj2.apps.helpdesk.utils.timezone_utils import now_local
+from itcj2.apps.maint.services import dashboard_service
+from itcj2.apps.maint.services import department_dashboard_service as dds
+from itcj2.core.services import authz_cache, departments_service
+
+from ._seed import ensure_maint_category, make_department, make_ticket, make_user
+
+NOW = now_local().replace(tzinfo=None, microsecond=0)
+
+
+@pytest.fixture
+def seeded(db_session, redis_client):
+    db = db_session
+    admin = make_user(db, last_name="X", first_name="Admin")
+    tech = make_user(db, last_name="X", first_name="Tec")
+    req = make_user(db, last_name="X", first_name="Sol")
+    d10, d20 = make_department(db), make_department(db)
+    electrical = ensure_maint_category(db, "tst_electrical")
+    ac = ensure_maint_category(db, "tst_ac")
+
+    statuses = ["PENDING", "ASSIGNED", "IN_PROGRESS", "RESOLVED_SUCCESS", "CLOSED", "CANCELED"]
+    tickets = []
+    for i in range(60):
+        status = statuses[i % len(statuses)]
+        resolved = status in ("RESOLVED_SUCCESS", "CLOSED")
+        tickets.append(make_ticket(
+            db, req, d10 if i % 2 else d20, category=ac if i % 2 else electrical, commit=False,
+            priority=("BAJA", "MEDIA", "ALTA", "URGENTE")[i % 4], status=status,
+            due_at=NOW - timedelta(hours=1) if i % 3 == 0 else NOW + timedelta(days=1),
+            resolved_at=NOW - timedelta(days=2) if resolved else None,
+            resolved_by_id=tech.id if resolved else None,
+            time_invested_minutes=90 if resolved else None,
+            rating_attention=5 if resolved and i % 4 == 0 else None,
+            created_at=NOW - timedelta(days=3), updated_at=NOW,
+        ))
+    db.add(MaintTicketTechnician(ticket_id=tickets[1].id, user_id=tech.id, assigned_by_id=admin.id,
+                                 assigned_at=NOW))
+    db.add_all([
+        MaintTicketActionLog(ticket_id=tickets[i].id, action="CREATED", performed_by_id=req.id,
+                             performed_at=NOW - timedelta(minutes=i))
+        for i in range(15)
+    ])
+    db.add(MaintTechnicianArea(user_id=tech.id, area_code="tst_ac", is_primary=True))
+    db.commit()
+    return {"admin": admin.id, "tech": tech.id, "d10": d10}
+
+
+def _statements(db):
+    seen = []
+    event.listen(db.connection(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *a: seen.append(statement))
+    return seen
+
+
+def test_admin_dashboard_counters_in_one_statement(db_session, seeded):
+    db = db_session
+    statements = _statements(db)
+    data = dashboard_service.get_dashboard(db, seeded["admin"], ["admin"])
+
+    # tally + categorías + top técnicos + sus nombres + actividad reciente + actividad 24h
+    assert len(statements) == 6
+    assert sum("FILTER (WHERE" in s for s in statements) == 1
+
+    assert data["by_status"]["PENDING"] == 10 and data["by_status"]["CANCELED"] == 10
+    assert data["open_total"] == 30
+    assert data["overdue"] == 10
+    assert data["by_priority"] == {"BAJA": 10, "MEDIA": 5, "ALTA": 10, "URGENTE": 5}
+    assert {c["code"]: (c["open"], c["total"]) for c in data["by_category"]} == {
+        "tst_electrical": (20, 30), "tst_ac": (10, 30)}
+    assert data["avg_resolution_minutes_30d"] == 90
+    assert data["top_technicians_30d"][0]["resolved_count"] == 20
+    assert len(data["recent_activity"]) == 10
+    assert data["recent_activity"][0]["performed_by"] == "X Sol"
+
+
+def test_scoped_dashboard_resolves_visibility_once_per_user(db_session, seeded):
+    db, tech = db_session, seeded["tech"]
+    first = _statements(db)
+    data = dashboard_service.get_dashboard(db, tech, ["tech_maint"])
+    # Áreas de técnico: consulta + cacheado por usuario.
+    assert any("maint_technician_areas" in s for s in first)
+    assert data["by_status"]["ASSIGNED"] == 10  # solo tickets de su área (tst_ac)
+    assert data["unrated_resolved"] == 0
+
+    first.clear()
+    again = dashboard_service.get_dashboard(db, tech, ["tech_maint"])
+    assert not any("maint_technician_areas" in s for s in first)
+    # tally + categorías + actividad reciente + último ticket propio
+    assert len(first) == 4
+    assert again == data
+
+    # Cambiar las áreas del técnico invalida su alcance.
+    authz_cache.invalidate_user_scope(tech, "maint")
+    first.clear()
+    dashboard_service.get_dashboard(db, tech, ["tech_maint"])
+    assert any("maint_technician_areas" in s for s in first)
+
+    # También mover el árbol de departamentos: el alcance guarda el subárbol expandido.
+    departments_service.update_department(db, seeded["d10"].id, name="Depto movido")
+    first.clear()
+    dashboard_service.get_dashboard(db, tech, ["tech_maint"])
+    assert any("maint_technician_areas" in s for s in first)
+
+
+def test_department_full_counters_in_one_statement(db_session, seeded, monkeypatch):
+    # Los deptos del usuario (app_departments) no entran en la cuenta de sentencias.
+    monkeypatch.setattr(dds, "_resolve_user_departments", lambda db, user_id: [])
+    db, admin = db_session, seeded["admin"]
+    statements = _statements(db)
+    data = dds.get_full(db, admin, True, None)
+
+    assert sum("FILTER (WHERE" in s for s in statements) == 1
+    # tally + activos por técnico + nombres + categorías + 2 listas
+    assert len(statements) == 6
+
+    kpis = data["kpis"]
+    assert (kpis["open_total"], kpis["in_progress"], kpis["overdue"]) == (30, 10, 10)
+    assert kpis["unassigned"] == 10
+    assert kpis["avg_resolution_hours"] == 1.5
+    assert (kpis["rated_count"], kpis["rated_pct"]) == (5, 25.0)
+    assert data["sla_breakdown"]["overdue_resolved"] == 0
+    assert data["sla_breakdown"]["on_time"] == 20
+    assert data["by_technician"] == [
+        {"user_id": seeded["tech"], "name": "X Tec", "active_count": 1, "resolved_count": 20}]
+    assert len(data["recent_open"]) == 10 and len(data["overdue_tickets"]) == 10
+
+    statements.clear()
+    summary = dds.get_summary(db, admin, True, seeded["d10"].id)
+    assert sum("FILTER (WHERE" in s for s in statements) == 1
+    assert summary["kpis"]["open_total"] == 10
@@ -1,7 +1,7 @@
-"""Tests para itcj2.apps.maint.utils.location_parser.parse_building."""
+"""Tests para itcj2.apps.maint.utils.location_parser (parse_building / parse_room)."""
 import pytest
 
-from itcj2.apps.maint.utils.location_parser import parse_building
+from itcj2.apps.maint.utils.location_parser import parse_building, parse_room
 
 
 class TestParseBuilding:
@@ -43,3 +43,17 @@ class TestParseBuilding:
     def test_strips_surrounding_text(self):
         # parser anchors at start of string after trim — text after match ignored
         assert parse_building("Lab 1 — entrada lateral") == "Lab 1"
+
+
+class TestParseRoom:
+    @pytest.mark.parametrize("raw,expected", [
+        ("Edificio A, Aula 12", "Aula 12"),
+        ("edificio b - planta baja", "planta baja"),
+        ("Lab 1 — entrada lateral", "entrada lateral"),
+        ("Oficina 12 - Tesorería", "Tesorería"),
+        ("Biblioteca", None),
+        ("Pasillo principal", None),
+        (None, None),
+    ])
+    def test_rest_after_building(self, raw, expected):
+        assert parse_room(raw) == expected
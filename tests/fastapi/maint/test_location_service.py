@@ -0,0 +1,65 @@
+"""Dimensión de ubicaciones (apps/maint/services/location_service.py) en Postgres.
+
+`backfill` recorre todos los tickets de la tabla: los conteos asumen, como CI,
+una BD de test sin otros tickets ni ubicaciones.
+"""
+from sqlalchemy import select
+
+from itcj2.apps.maint.models.location import MaintLocation
+from itcj2.apps.maint.models.ticket import MaintTicket
+from itcj2.apps.maint.services import location_service
+
+from ._seed import make_department, make_ticket, make_user
+
+
+def _locations(db):
+    return {loc.key: (loc.building, loc.room) for loc in db.scalars(select(MaintLocation))}
+
+
+def test_resolve_creates_once_per_normalized_key(db_session):
+    db = db_session
+    first = location_service.resolve_location_id(db, "  Edificio A, Aula 12 ")
+    again = location_service.resolve_location_id(db, "EDIFICIO A, AULA 12")
+    other = location_service.resolve_location_id(db, "Cancha de fútbol")
+
+    assert first == again != other
+    assert location_service.resolve_location_id(db, "   ") is None
+    assert location_service.resolve_location_id(db, None) is None
+    assert _locations(db) == {
+        "edificio a, aula 12": ("Edificio A", "aula 12"),
+        "cancha de fútbol": ("Sin clasificar", None),
+    }
+
+
+def test_backfill_links_existing_tickets_in_batches(db_session):
+    db = db_session
+    user, dept = make_user(db), make_department(db)
+    known = location_service.resolve_location_id(db, "Lab 5")
+    tickets = {
+        key: make_ticket(db, user, dept, location=location, commit=False)
+        for key, location in (
+            ("plain", "Lab 5"),
+            ("spaced", " lab 5 "),
+            # Mismos blancos que quita str.strip(): la llave de SQL debe coincidir.
+            ("tabs", "\tLab 5\n"),
+            ("b", "Edificio B - planta baja"),
+            ("none", None),
+            ("b_upper", "Edificio B - Planta Baja"),
+        )
+    }
+    # Fila con parseo viejo: se corrige
+    db.add(MaintLocation(key="oficina 3", building="Oficina", room=None))
+    db.commit()
+
+    stats = location_service.backfill(db, batch_size=2)
+
+    assert stats == {"created": 1, "reparsed": 1, "linked": 5}
+    linked = {key: db.scalar(select(MaintTicket.location_id).where(MaintTicket.id == t.id))
+              for key, t in tickets.items()}
+    assert linked["plain"] == linked["spaced"] == linked["tabs"] == known
+    assert linked["b"] == linked["b_upper"] != known
+    assert linked["none"] is None
+    assert _locations(db)["oficina 3"] == ("Oficina 3", None)
+
+    # Idempotente
+    assert location_service.backfill(db)["linked"] == 0
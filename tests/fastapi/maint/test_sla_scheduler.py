@@ -0,0 +1,174 @@
+"""Planificador de vencimientos SLA (apps/maint/services/sla_scheduler.py).
+
+Tickets en `db_session` y el ZSET en el Redis real bajo una clave propia del
+test; los despertares de Celery se registran en una lista en vez de encolarse.
+"""
+import uuid
+from datetime import timedelta
+
+import pytest
+from click.testing import CliRunner
+
+from itcj2.apps.maint.services import sla_scheduler, sla_service
+from itcj2.apps.maint.utils.timezone_utils import now_local
+from itcj2.core.models.task_models import PeriodicTask
+
+from ._seed import make_department, make_ticket, make_user
+
+NOW = now_local().replace(microsecond=0)
+
+
+@pytest.fixture
+def zset(redis_client, monkeypatch):
+    """Lector del ZSET del test como ``{ticket_id: score}``."""
+    key = f"test:maint:sla:{uuid.uuid4().hex}"
+    monkeypatch.setattr(sla_scheduler, "_KEY", key)
+    read = lambda: {m.decode() if isinstance(m, bytes) else m: s  # noqa: E731
+                    for m, s in redis_client.zrange(key, 0, -1, withscores=True)}
+    read.key = key
+    yield read
+    redis_client.delete(key)
+
+
+@pytest.fixture
+def wakes(monkeypatch):
+    armed = []
+    monkeypatch.setattr(sla_scheduler, "_arm", armed.append)
+    return armed
+
+
+@pytest.fixture
+def notified(monkeypatch):
+    calls = []
+
+    def _notify(db, ticket):
+        calls.append(ticket.id)
+        ticket.sla_alert_sent_at = now_local().replace(tzinfo=None)
+        return 1
+
+    monkeypatch.setattr(sla_service, "notify_overdue", _notify)
+    return calls
+
+
+@pytest.fixture
+def ticket(db_session):
+    user = make_user(db_session)
+    dept = make_department(db_session)
+
+    def _make(status="PENDING", due_at=None, sla_alert_sent_at=None):
+        naive = lambda dt: dt.replace(tzinfo=None) if dt else None  # noqa: E731
+        return make_ticket(db_session, user, dept, status=status,
+                           due_at=naive(due_at), sla_alert_sent_at=naive(sla_alert_sent_at))
+    return _make
+
+
+def test_entries_are_applied_only_after_commit(db_session, ticket, zset, wakes):
+    t = ticket(due_at=NOW + timedelta(hours=4))
+    sla_scheduler.schedule(db_session, t)
+    assert zset() == {}
+    db_session.rollback()
+    assert zset() == {}
+
+    sla_scheduler.schedule(db_session, t)
+    db_session.commit()
+    assert zset() == {str(t.id): (NOW + timedelta(hours=4)).timestamp()}
+    assert wakes == [(NOW + timedelta(hours=4)).timestamp()]
+
+    # Cancelado: la entrada sale del ZSET.
+    t.status = "CANCELED"
+    sla_scheduler.schedule(db_session, t)
+    db_session.commit()
+    assert zset() == {}
+
+
+def test_savepoint_rollback_keeps_outer_entries(db_session, ticket, zset, wakes):
+    kept = ticket(due_at=NOW + timedelta(hours=4))
+    other = ticket(due_at=NOW + timedelta(hours=2))
+    sla_scheduler.schedule(db_session, kept)
+    sp = db_session.begin_nested()
+    sla_scheduler.schedule(db_session, other)
+    sp.rollback()
+    db_session.commit()
+    assert str(kept.id) in zset()
+
+
+def test_realert_is_scheduled_24h_after_last_alert(ticket):
+    t = ticket(status="ASSIGNED", due_at=NOW - timedelta(hours=3),
+               sla_alert_sent_at=NOW - timedelta(hours=1))
+    assert sla_scheduler.next_alert_at(t) == NOW + timedelta(hours=23)
+
+
+def test_fire_due_only_touches_due_entries(db_session, ticket, redis_client, zset, wakes, notified):
+    overdue = ticket(status="IN_PROGRESS", due_at=NOW - timedelta(minutes=1))
+    future = ticket(due_at=NOW + timedelta(hours=2))
+    closed = ticket(status="CLOSED", due_at=NOW - timedelta(hours=5))
+    # Entrada vieja: la prioridad cambió y due_at se movió al futuro.
+    moved = ticket(due_at=NOW + timedelta(hours=1))
+    redis_client.zadd(zset.key, {
+        str(overdue.id): sla_scheduler.next_alert_at(overdue).timestamp(),
+        str(future.id): sla_scheduler.next_alert_at(future).timestamp(),
+        str(closed.id): (NOW - timedelta(hours=5)).timestamp(),
+        str(moved.id): (NOW - timedelta(hours=2)).timestamp(),
+    })
+
+    stats = sla_scheduler.fire_due(db_session, now=NOW)
+
+    assert notified == [overdue.id]
+    assert (stats["claimed"], stats["found"], stats["notified_total"]) == (3, 1, 1)
+    entries = zset()
+    assert str(closed.id) not in entries
+    assert entries[str(future.id)] == sla_scheduler.next_alert_at(future).timestamp()
+    assert entries[str(moved.id)] == (NOW + timedelta(hours=1)).timestamp()
+    # Re-alerta diaria del ticket alertado.
+    assert entries[str(overdue.id)] >= (NOW + timedelta(hours=24)).timestamp() - 1
+
+    # Sin vencidos no se consulta la BD ni se notifica nada.
+    notified.clear()
+    assert sla_scheduler.fire_due(db_session, now=NOW)["claimed"] == 0
+    assert notified == []
+
+
+def test_failed_alert_is_retried_later(db_session, ticket, redis_client, zset, wakes, monkeypatch):
+    t = ticket(due_at=NOW - timedelta(minutes=5))
+    redis_client.zadd(zset.key, {str(t.id): (NOW - timedelta(minutes=5)).timestamp()})
+
+    def _boom(db, ticket):
+        raise RuntimeError("notificaciones caídas")
+
+    monkeypatch.setattr(sla_service, "notify_overdue", _boom)
+    stats = sla_scheduler.fire_due(db_session, now=NOW)
+
+    assert stats["found"] == 0
+    assert zset()[str(t.id)] == NOW.timestamp() + sla_scheduler._RETRY_SECONDS
+
+
+def test_resync_rebuilds_from_open_tickets(db_session, ticket, redis_client, zset, wakes):
+    pending = ticket(due_at=NOW + timedelta(hours=1))
+    assigned = ticket(status="ASSIGNED", due_at=NOW - timedelta(hours=1))
+    resolved = ticket(status="RESOLVED_SUCCESS", due_at=NOW - timedelta(hours=1))
+    redis_client.zadd(zset.key, {str(resolved.id): 1.0, "999999999": 2.0})
+
+    stats = sla_scheduler.resync(db_session)
+
+    # `scheduled` cuenta todos los abiertos de la BD, no solo los de este test.
+    assert stats["removed"] == 2
+    entries = zset()
+    assert {str(pending.id), str(assigned.id)} <= set(entries)
+    assert str(resolved.id) not in entries and "999999999" not in entries
+    assert wakes == [min(entries.values())]
+
+
+def test_sync_tasks_schedules_sla_beat_once(session_local):
+    from itcj2.cli.celery import sync_tasks
+
+    runner = CliRunner()
+    assert runner.invoke(sync_tasks).exit_code == 0
+    pt = session_local.query(PeriodicTask).filter_by(name="maint-sla-deadlines").one()
+    assert pt.task_name == "itcj2.tasks.maint_tasks.fire_sla_deadlines"
+    assert pt.cron_expression == "*/10 * * * *" and pt.is_active
+
+    # Un schedule editado en la UI no se pisa en el siguiente arranque.
+    pt.is_active = False
+    session_local.commit()
+    assert runner.invoke(sync_tasks).exit_code == 0
+    assert session_local.query(PeriodicTask).filter_by(name="maint-sla-deadlines").one().is_active is False
@@ -1,131 +1,129 @@
-"""Tests para heatmap de stats (location y building)."""
-from datetime import date
-from unittest.mock import MagicMock
+"""Tests para heatmaps de stats (location y building) y la serie de tiempo de reportes.
 
-import pytest
+Postgres real (``db_session``): ventanas y ``generate_series`` corren tal cual.
+Los tickets se siembran en 2001 para que el rango no mezcle datos de la BD.
+"""
+from datetime import date, datetime
 
-import itcj2.models  # noqa: F401
+import pytest
+from sqlalchemy import event
 
+from itcj2.apps.maint.models.location import MaintLocation
+from itcj2.apps.maint.services import reports_service as rs
 from itcj2.apps.maint.services import stats_service as ss
 
+from ._seed import ensure_maint_category, make_department, make_ticket, make_user
 
-def _row(loc, cat_id, cnt):
-    """Fila tipo MaintTicket query result."""
-    r = MagicMock()
-    r.loc = loc
-    r.category_id = cat_id
-    r.cnt = cnt
-    return r
-
-
-def _row_building(location, month, cnt):
-    r = MagicMock()
-    r.location = location
-    r.month = month
-    r.cnt = cnt
-    return r
+TS = datetime(2001, 3, 10, 9, 0)
+YEAR = (date(2001, 1, 1), date(2001, 12, 31))
 
 
-def _mock_db(query_rows, category_objs=None):
-    """Mock que retorna query_rows en .all() y categorías cuando se piden."""
-    db = MagicMock()
-    call_state = {"i": 0}
+@pytest.fixture
+def seed(db_session):
+    db = db_session
+    user, dept = make_user(db), make_department(db)
+    cats = {1: ensure_maint_category(db, "tst_electrical"), 2: ensure_maint_category(db, "tst_ac")}
+    locations = {}
 
-    def _query_side_effect(*args, **kwargs):
-        chain = MagicMock()
-        if args and hasattr(args[0], "__name__") and args[0].__name__ == "MaintCategory":
-            chain.filter.return_value.all.return_value = category_objs or []
-        else:
-            chain.filter.return_value.group_by.return_value.all.return_value = query_rows
-        return chain
+    def _seed(counts, building="Sin clasificar", created_at=TS, **fields):
+        """counts: {(llave, 1|2): n} → ubicaciones + tickets."""
+        for (key, cat), cnt in counts.items():
+            if key not in locations:
+                loc = MaintLocation(key=key, building=building)
+                db.add(loc)
+                db.flush()
+                locations[key] = loc.id
+            for _ in range(cnt):
+                make_ticket(db, user, dept, category=cats[cat], commit=False, location=key,
+                            location_id=locations[key], created_at=created_at, **fields)
+        db.commit()
 
-    db.query.side_effect = _query_side_effect
-    return db
+    _seed.cats = cats
+    _seed.user, _seed.dept = user, dept
+    return _seed
 
 
 class TestHeatmapByLocation:
-    def test_basic_aggregation(self):
-        rows = [
-            _row("aula 1", 1, 5),
-            _row("aula 1", 2, 2),
-            _row("lab 5", 1, 3),
-        ]
-        cat1 = MagicMock(id=1)
-        cat1.name = "Eléctrico"
-        cat2 = MagicMock(id=2)
-        cat2.name = "AC"
-        db = _mock_db(rows, [cat1, cat2])
-
-        result = ss.get_heatmap_by_location(
-            db, date(2026, 1, 1), date(2026, 12, 31), top_n=10
-        )
+    def test_basic_aggregation(self, db_session, seed):
+        seed({("tst aula 1", 1): 5, ("tst aula 1", 2): 2, ("tst lab 5", 1): 3})
+
+        result = ss.get_heatmap_by_location(db_session, *YEAR, top_n=10)
         assert result["group_by"] == "location"
-        assert "axes" in result
-        assert "matrix" in result
-        # Top 1 location is "aula 1" (5+2=7)
-        assert result["axes"]["y"][0] == "aula 1"
-
-    def test_empty(self):
-        db = _mock_db([])
-        result = ss.get_heatmap_by_location(
-            db, date(2026, 1, 1), date(2026, 12, 31)
-        )
+        # Top 1 location is "tst aula 1" (5+2=7)
+        assert result["axes"] == {"x": ["tst_electrical", "tst_ac"], "y": ["tst aula 1", "tst lab 5"]}
+        assert result["matrix"] == [[5, 2], [3, 0]]
+
+    def test_empty(self, db_session):
+        result = ss.get_heatmap_by_location(db_session, *YEAR)
         assert result["matrix"] == []
         assert result["axes"]["y"] == []
 
-    def test_respects_top_n(self):
-        # 5 ubicaciones, top_n=2 → solo 2 en la respuesta
-        rows = [_row(f"loc-{i}", 1, 10 - i) for i in range(5)]
-        cat = MagicMock(id=1)
-        cat.name = "Cat1"
-        db = _mock_db(rows, [cat])
+    def test_respects_top_n(self, db_session, seed):
+        # 5 ubicaciones, top_n=2 → solo 2 en la respuesta (recortado en SQL)
+        seed({(f"tst loc-{i}", 1): 10 - i for i in range(5)})
 
-        result = ss.get_heatmap_by_location(
-            db, date(2026, 1, 1), date(2026, 12, 31), top_n=2
-        )
-        assert len(result["axes"]["y"]) == 2
-        # Top 2 = loc-0 (10), loc-1 (9)
-        assert result["axes"]["y"][0] == "loc-0"
-        assert result["axes"]["y"][1] == "loc-1"
+        result = ss.get_heatmap_by_location(db_session, *YEAR, top_n=2)
+        assert result["axes"]["y"] == ["tst loc-0", "tst loc-1"]
+        assert result["matrix"] == [[10], [9]]
 
+    def test_filters_range_and_category(self, db_session, seed):
+        seed({("tst aula 1", 1): 2, ("tst aula 1", 2): 4})
+        assert ss.get_heatmap_by_location(db_session, date(2001, 4, 1), date(2001, 4, 30))["matrix"] == []
+        result = ss.get_heatmap_by_location(db_session, date(2001, 3, 1), date(2001, 3, 31),
+                                            category_id=seed.cats[2].id)
+        assert result["axes"]["x"] == ["tst_ac"]
+        assert result["matrix"] == [[4]]
 
-class TestHeatmapByBuilding:
-    def test_uses_location_parser(self):
-        rows = [
-            _row_building("Edificio A — aula 12", "2026-01", 4),
-            _row_building("Edificio A planta 2", "2026-02", 2),
-            _row_building("Lab 5", "2026-01", 3),
-            _row_building("Cancha de fútbol", "2026-01", 1),
-        ]
-        db = _mock_db(rows)
 
-        result = ss.get_heatmap_by_building(
-            db, date(2026, 1, 1), date(2026, 12, 31)
-        )
+class TestHeatmapByBuilding:
+    def test_groups_by_dimension_with_sql_calendar(self, db_session, seed):
+        seed({("tst edificio a", 1): 4}, building="Edificio A", created_at=datetime(2001, 1, 5))
+        seed({("tst lab 5", 1): 3}, building="Lab 5", created_at=datetime(2001, 1, 20))
+        seed({("tst edificio a", 1): 2}, created_at=datetime(2001, 3, 2))
+        # Sin ubicación ligada: "Sin clasificar"
+        make_ticket(db_session, seed.user, seed.dept, category=seed.cats[1], created_at=datetime(2001, 1, 9))
+
+        result = ss.get_heatmap_by_building(db_session, date(2001, 1, 1), date(2001, 3, 31),
+                                            category_id=seed.cats[1].id)
         assert result["group_by"] == "building"
-        # Edificio A debe agruparse en una sola fila aunque vienen 2 raw rows
-        buildings = result["axes"]["y"]
-        assert "Edificio A" in buildings
-        assert "Lab 5" in buildings
-        # "Cancha…" no matchea regex → "Sin clasificar"
-        assert "Sin clasificar" in buildings
-
-    def test_unclassified_at_bottom(self):
-        rows = [
-            _row_building("Pasillo", "2026-01", 1),
-            _row_building("Edificio Z", "2026-01", 1),
-        ]
-        db = _mock_db(rows)
-
-        result = ss.get_heatmap_by_building(
-            db, date(2026, 1, 1), date(2026, 12, 31)
-        )
+        # Meses sin tickets también forman parte del eje
+        assert result["axes"]["x"] == ["2001-01", "2001-02", "2001-03"]
+        assert result["axes"]["y"] == ["Edificio A", "Lab 5", "Sin clasificar"]
+        assert result["matrix"] == [[4, 0, 2], [3, 0, 0], [1, 0, 0]]
+
+    def test_unclassified_at_bottom(self, db_session, seed):
+        seed({("tst z", 1): 1}, building="Edificio Z", created_at=datetime(2001, 1, 5))
+        make_ticket(db_session, seed.user, seed.dept, category=seed.cats[1], created_at=datetime(2001, 1, 9))
+        result = ss.get_heatmap_by_building(db_session, date(2001, 1, 1), date(2001, 1, 31))
         # "Sin clasificar" debe estar al final del eje Y
-        assert result["axes"]["y"][-1] == "Sin clasificar"
+        assert result["axes"]["y"] == ["Edificio Z", "Sin clasificar"]
 
-    def test_empty(self):
-        db = _mock_db([])
-        result = ss.get_heatmap_by_building(
-            db, date(2026, 1, 1), date(2026, 12, 31)
-        )
+    def test_empty(self, db_session):
+        result = ss.get_heatmap_by_building(db_session, date(2001, 1, 1), date(2001, 1, 31))
         assert result["matrix"] == []
+        assert result["axes"] == {"x": ["2001-01"], "y": []}
+
+
+class TestTicketsTimeSeries:
+    def test_single_query_over_calendar(self, db_session, seed):
+        db, ac = db_session, seed.cats[2]
+        for day in (1, 1, 3):
+            make_ticket(db, seed.user, seed.dept, category=ac, commit=False, created_at=datetime(2001, 1, day, 10))
+        # Creados antes del rango, resueltos el día 3; uno sigue abierto y otro es de otra categoría.
+        for status, cat in (("RESOLVED_SUCCESS", ac), ("CLOSED", ac), ("CLOSED", ac),
+                            ("IN_PROGRESS", ac), ("CLOSED", seed.cats[1])):
+            make_ticket(db, seed.user, seed.dept, category=cat, commit=False, status=status,
+                        created_at=datetime(2000, 12, 1), resolved_at=datetime(2001, 1, 3, 18))
+        db.commit()
+
+        statements = []
+        event.listen(db.connection(), "before_cursor_execute",
+                     lambda conn, cur, stmt, *a: statements.append(stmt))
+        result = rs.get_tickets_time_series(db, date(2001, 1, 1), date(2001, 1, 3), category_id=ac.id)
+        assert result["data"] == [
+            {"date": "2001-01-01", "created": 2, "resolved": 0},
+            {"date": "2001-01-02", "created": 0, "resolved": 0},
+            {"date": "2001-01-03", "created": 1, "resolved": 3},
+        ]
+        assert len(statements) == 1
+        assert "generate_series" in statements[0]
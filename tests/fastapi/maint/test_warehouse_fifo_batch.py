@@ -0,0 +1,213 @@
+"""Consumo FIFO en lote del almacén (warehouse/services/fifo_service.consume_many).
+
+Postgres real (``db_session``): el ``SELECT ... FOR UPDATE`` ordenado, el
+reparto por suma acumulada (``UPDATE ... FROM ... RETURNING``) y el upsert
+``ON CONFLICT`` de materiales corren tal cual en producción.
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, select
+
+from itcj2.apps.warehouse.models.movement import WarehouseMovement
+from itcj2.apps.warehouse.models.product import WarehouseProduct
+from itcj2.apps.warehouse.models.stock_entry import WarehouseStockEntry
+from itcj2.apps.warehouse.models.ticket_material import WarehouseTicketMaterial
+from itcj2.apps.warehouse.services import fifo_service
+from itcj2.apps.warehouse.services.fifo_service import ConsumeLine, consume, consume_many
+
+from ._seed import make_entry, make_product, make_user
+
+
+@pytest.fixture
+def stock(db_session):
+    """Producto 1: tres lotes (el de marzo se capturó antes que el de enero).
+    Producto 2: un lote de 4 y uno anulado. Producto 9: inactivo."""
+    db = db_session
+    user = make_user(db)
+    p1 = make_product(db, user, stock=12)
+    p2 = make_product(db, user, stock=4)
+    p9 = make_product(db, user, is_active=False)
+    entries = {
+        "mar": make_entry(db, p1, user, "5", date(2026, 3, 1)),
+        "jan": make_entry(db, p1, user, "3", date(2026, 1, 1)),
+        "feb": make_entry(db, p1, user, "4", date(2026, 2, 1)),
+        "lot2": make_entry(db, p2, user, "4", date(2026, 1, 1)),
+        "void": make_entry(db, p2, user, "50", date(2025, 1, 1), voided=True),
+    }
+    return {"user": user, "p1": p1, "p2": p2, "p9": p9, **{k: e.id for k, e in entries.items()}}
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    calls = []
+
+    class _Task:
+        @staticmethod
+        def apply_async(kwargs):
+            calls.append(kwargs["product_ids"])
+
+    import itcj2.tasks.warehouse_tasks as tasks
+    monkeypatch.setattr(tasks, "refresh_stock_signals", _Task)
+    return calls
+
+
+def _remaining(db, s):
+    E = WarehouseStockEntry
+    return {e.id: (e.quantity_remaining, e.is_exhausted)
+            for e in db.scalars(select(E).where(E.product_id.in_((s["p1"].id, s["p2"].id))))}
+
+
+def _materials(db, s, ticket_id):
+    M = WarehouseTicketMaterial
+    return {m.product_id: m.quantity_used for m in db.scalars(
+        select(M).where(M.source_ticket_id == ticket_id, M.product_id.in_((s["p1"].id, s["p2"].id))))}
+
+
+def test_batch_allocates_fifo_per_product(db_session, stock, enqueued):
+    db, s = db_session, stock
+    p1, p2 = s["p1"].id, s["p2"].id
+    statements = []
+    event.listen(db.connection(), "before_cursor_execute",
+                 lambda conn, cur, stmt, *a: statements.append(stmt))
+
+    movements = consume_many(db, [
+        ConsumeLine(p1, Decimal("6"), "cable"),
+        ConsumeLine(p2, Decimal("1")),
+        ConsumeLine(p1, Decimal("1")),
+    ], source_app="maint", source_ticket_id=77, performed_by_id=s["user"].id)
+    emitted = list(statements)
+    db.commit()
+
+    # Producto 1 (7): lote de enero completo, 4 del de febrero; producto 2: 1.
+    assert [(m.product_id, m.entry_id, m.quantity) for m in movements] == [
+        (p1, s["jan"], Decimal("3")), (p1, s["feb"], Decimal("4")), (p2, s["lot2"], Decimal("1")),
+    ]
+    assert {m.notes for m in movements if m.product_id == p1} == {"cable"}
+    assert _remaining(db, s) == {
+        s["mar"]: (Decimal("5"), False), s["jan"]: (Decimal("0"), True), s["feb"]: (Decimal("0"), True),
+        s["lot2"]: (Decimal("3"), False), s["void"]: (Decimal("50"), False),
+    }
+    assert _materials(db, s, 77) == {p1: Decimal("7"), p2: Decimal("1")}
+    db.refresh(s["p1"])
+    db.refresh(s["p2"])
+    assert (s["p1"].stock_on_hand, s["p1"].stock_value) == (Decimal("5"), Decimal("5"))
+    assert (s["p2"].stock_on_hand, s["p2"].stock_value) == (Decimal("3"), Decimal("3"))
+
+    # Un solo bloqueo (orden determinista) y un UPDATE por producto.
+    lock = [st for st in emitted if st.startswith("SELECT") and "FOR UPDATE" in st]
+    assert len(lock) == 1
+    assert "ORDER BY warehouse_stock_entries.product_id, warehouse_stock_entries.purchase_date, " \
+           "warehouse_stock_entries.id" in lock[0]
+    assert sum(st.startswith("UPDATE warehouse_stock_entries") for st in emitted) == 2
+    # Alerta/restock encolados tras el commit, no durante el consumo.
+    assert enqueued == [[p1, p2]]
+
+
+def test_consume_accumulates_ticket_material(db_session, stock, enqueued):
+    db, s = db_session, stock
+    p1 = s["p1"].id
+    consume(db, p1, Decimal("2"), "maint", 77, s["user"].id)
+    consume(db, p1, Decimal("2.5"), "maint", 77, s["user"].id)
+    db.commit()
+
+    assert _materials(db, s, 77) == {p1: Decimal("4.5")}
+    assert _remaining(db, s)[s["jan"]] == (Decimal("0"), True)
+    assert _remaining(db, s)[s["feb"]] == (Decimal("2.5"), False)
+    assert enqueued == [[p1]]
+
+
+def test_savepoint_rollback_keeps_committed_lines_signals(db_session, stock, enqueued):
+    db, s = db_session, stock
+    p1, p2 = s["p1"].id, s["p2"].id
+    # Como resolve_ticket: cada renglón en su SAVEPOINT; el faltante se descarta solo.
+    consume(db, p1, Decimal("1"), "maint", 78, s["user"].id)
+    sp = db.begin_nested()
+    with pytest.raises(ValueError):
+        consume(db, p2, Decimal("99"), "maint", 78, s["user"].id)
+    sp.rollback()
+    db.commit()
+    assert enqueued == [[p1]]
+
+
+def test_shortage_consumes_nothing(db_session, stock, enqueued):
+    db, s = db_session, stock
+    user_id = s["user"].id
+    with pytest.raises(ValueError, match=s["p2"].name):
+        consume_many(db, [ConsumeLine(s["p1"].id, Decimal("2")), ConsumeLine(s["p2"].id, Decimal("5"))],
+                     source_app="maint", source_ticket_id=1, performed_by_id=user_id)
+    db.rollback()
+    assert db.scalars(select(WarehouseMovement).where(WarehouseMovement.performed_by_id == user_id)).all() == []
+    assert _remaining(db, s)[s["jan"]] == (Decimal("3"), False)
+
+    with pytest.raises(HTTPException):
+        consume_many(db, [ConsumeLine(s["p9"].id, Decimal("1"))],
+                     source_app="maint", source_ticket_id=1, performed_by_id=user_id)
+    with pytest.raises(ValueError, match="source_app"):
+        consume_many(db, [ConsumeLine(s["p1"].id, Decimal("1"))],
+                     source_app="otro", source_ticket_id=1, performed_by_id=user_id)
+    db.rollback()
+    assert enqueued == []
+
+
+def test_refresh_stock_signals_alerts_only_below_restock(db_session, stock, monkeypatch):
+    from itcj2.apps.warehouse.services import alert_service
+
+    db, s = db_session, stock
+    # Producto 2: 4 en stock con override 5 → bajo restock; producto 1 (12) no.
+    s["p2"].restock_point_override = Decimal("5")
+    db.commit()
+
+    seen = []
+
+    def _alert(db, pid):
+        seen.append(pid)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(alert_service, "check_and_alert", _alert)
+    # Un error en la alerta no deshace el recálculo
+    assert fifo_service.refresh_stock_signals(db, [s["p1"].id, s["p2"].id]) == 2
+    assert seen == [s["p2"].id]
+    assert db.get(WarehouseProduct, s["p2"].id).below_restock is True
+    assert db.get(WarehouseProduct, s["p1"].id).below_restock is False
+
+
+def test_full_refresh_purges_old_consumption(db_session, stock):
+    from datetime import timedelta
+
+    from itcj2.apps.warehouse.models.consumption_daily import WarehouseConsumptionDaily
+    from itcj2.apps.warehouse.services.restock_service import _RETENTION_DAYS
+
+    db, pid = db_session, stock["p1"].id
+    old, recent = date.today() - timedelta(days=_RETENTION_DAYS + 1), date.today()
+    db.add_all([
+        WarehouseConsumptionDaily(product_id=pid, day=old, quantity=Decimal("2")),
+        WarehouseConsumptionDaily(product_id=pid, day=recent, quantity=Decimal("1")),
+    ])
+    db.commit()
+
+    def days():
+        return set(db.scalars(select(WarehouseConsumptionDaily.day)
+                              .where(WarehouseConsumptionDaily.product_id == pid)))
+
+    # Con productos indicados (el camino incremental) no se purga.
+    fifo_service.refresh_stock_signals(db, [pid])
+    assert days() == {old, recent}
+
+    fifo_service.refresh_stock_signals(db)
+    assert days() == {recent}
+
+
+def test_sync_tasks_schedules_daily_full_refresh(session_local):
+    from click.testing import CliRunner
+
+    from itcj2.cli.celery import sync_tasks
+    from itcj2.core.models.task_models import PeriodicTask
+
+    assert CliRunner().invoke(sync_tasks).exit_code == 0
+    pt = session_local.query(PeriodicTask).filter_by(name="warehouse-stock-signals").one()
+    assert pt.task_name == "itcj2.tasks.warehouse_tasks.refresh_stock_signals"
+    assert pt.cron_expression == "30 2 * * *"
+    assert not pt.kwargs_json.get("product_ids")  # None/ausente = recálculo completo
@@ -0,0 +1,122 @@
+"""Punto de restock incremental (warehouse/services/restock_service.py) en Postgres.
+
+El agregado diario se alimenta de consumo, ajuste y reversión (upsert
+``ON CONFLICT``); `refresh` recalcula punto y bandera ``below_restock`` en un
+``UPDATE ... FROM``. Los productos llevan departamento ``tst_*`` para que los
+conteos no mezclen catálogo real.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from itcj2.apps.warehouse.models.consumption_daily import WarehouseConsumptionDaily
+from itcj2.apps.warehouse.models.movement import WarehouseMovement
+from itcj2.apps.warehouse.models.ticket_material import WarehouseTicketMaterial
+from itcj2.apps.warehouse.services import alert_service, fifo_service, restock_service
+
+from ._seed import make_entry, make_product, make_user
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def stock(db_session, monkeypatch):
+    monkeypatch.setattr(fifo_service, "_stage_signals", lambda db, ids: None)
+    db = db_session
+    user = make_user(db)
+    products = {
+        "big": make_product(db, user, department_code="tst_maint", stock=500),
+        "small": make_product(db, user, department_code="tst_maint", stock=3),
+        "comp": make_product(db, user, department_code="tst_comp", stock=1),
+        "off": make_product(db, user, department_code="tst_maint", is_active=False),
+    }
+    lots = {f"{key}_lot": make_entry(db, products[key], user, qty)
+            for key, qty in (("big", "500"), ("small", "3"), ("comp", "1"))}
+    return {"user": user, **products, **lots}
+
+
+def _daily(db, product):
+    D = WarehouseConsumptionDaily
+    return {r.day: r.quantity for r in db.scalars(select(D).where(D.product_id == product.id))}
+
+
+def test_consume_adjust_and_revert_maintain_daily_aggregate(db_session, stock):
+    db, big, user_id = db_session, stock["big"], stock["user"].id
+    fifo_service.consume(db, big.id, Decimal("30"), "maint", 7, user_id)
+    fifo_service.adjust_stock(db, big.id, Decimal("2"), "OUT", "merma", "rota", user_id)
+    db.commit()
+    assert _daily(db, big) == {TODAY: Decimal("32")}
+
+    fifo_service.revert_consumption(db, "maint", 7, big.id, user_id)
+    db.commit()
+    assert _daily(db, big) == {TODAY: Decimal("2")}
+
+
+def test_revert_subtracts_from_the_days_it_was_consumed(db_session, stock):
+    db, big, user_id = db_session, stock["big"], stock["user"].id
+    entry_id = stock["big_lot"].id
+    old = datetime.combine(TODAY - timedelta(days=5), datetime.min.time())
+    ancient = datetime.combine(TODAY - timedelta(days=120), datetime.min.time())
+    db.add_all([
+        WarehouseMovement(product_id=big.id, entry_id=entry_id, movement_type="CONSUMED",
+                          quantity=Decimal("4"), source_app="maint", source_ticket_id=9,
+                          performed_by_id=user_id, performed_at=ancient),
+        WarehouseMovement(product_id=big.id, entry_id=entry_id, movement_type="CONSUMED",
+                          quantity=Decimal("6"), source_app="maint", source_ticket_id=9,
+                          performed_by_id=user_id, performed_at=old),
+        WarehouseTicketMaterial(source_app="maint", source_ticket_id=9, product_id=big.id,
+                                quantity_used=Decimal("10"), added_by_id=user_id),
+    ])
+    db.flush()
+    restock_service.record_consumption(db, [(big.id, old.date(), Decimal("6"))])
+
+    fifo_service.revert_consumption(db, "maint", 9, big.id, user_id)
+    db.commit()
+    # Lo de hace 120 días ya no cuenta para el restock: no se toca
+    assert _daily(db, big) == {old.date(): Decimal("0")}
+
+
+def test_refresh_computes_points_and_flags_in_one_statement(db_session, stock):
+    db = db_session
+    big, small, comp, off = stock["big"], stock["small"], stock["comp"], stock["off"]
+    restock_service.record_consumption(db, [
+        (big.id, TODAY, Decimal("300")),
+        (big.id, TODAY - timedelta(days=89), Decimal("60")),
+        (big.id, TODAY - timedelta(days=90), Decimal("999")),  # fuera de la ventana
+        (small.id, TODAY, Decimal("1")),
+    ])
+    comp.restock_point_override = Decimal("2")
+    db.commit()
+
+    flags = restock_service.refresh(db)
+    db.commit()
+
+    # big: ceil(360 × 10 / 90) = 40, stock 500; small: piso de 1, stock 3;
+    # comp: sin consumo (auto 0) pero override 2 ≥ stock 1; off está inactivo.
+    assert {pid: flags[pid] for pid in (big.id, small.id, comp.id)} == {
+        big.id: False, small.id: False, comp.id: True}
+    assert off.id not in flags
+    for p in (big, small, comp, off):
+        db.refresh(p)
+    assert [(p.restock_point_auto, p.below_restock) for p in (big, small, comp, off)] == [
+        (Decimal("40"), False), (Decimal("1"), False), (Decimal("0"), True), (Decimal("0"), False),
+    ]
+    assert restock_service.refresh(db, department_code="tst_comp") == {comp.id: True}
+    assert restock_service.refresh(db, []) == {}
+
+
+def test_nav_badge_counts_flags(db_session, stock):
+    db, small, comp = db_session, stock["small"], stock["comp"]
+    fifo_service.consume(db, small.id, Decimal("3"), "maint", 1, stock["user"].id)
+    comp.restock_point_override = Decimal("2")
+    db.commit()
+    assert alert_service.get_nav_badge_count(db, "tst_maint") == 0
+    baseline = alert_service.get_nav_badge_count(db, None)
+
+    restock_service.refresh(db, [small.id, comp.id])
+    db.commit()
+    assert alert_service.get_nav_badge_count(db, None) == baseline + 2
+    assert alert_service.get_nav_badge_count(db, "tst_maint") == 1
+    assert alert_service.get_nav_badge_count(db, "tst_comp") == 1
@@ -0,0 +1,133 @@
+"""Totales de stock materializados en warehouse_products (Postgres, ``db_session``).
+
+Entradas, anulaciones, consumos, reversiones y ajustes mueven
+stock_on_hand/stock_value en la misma transacción; `check_stock_totals` los
+compara contra los lotes y el autocomplete es una consulta por prefijo.
+"""
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, update
+
+from itcj2.apps.warehouse.models.product import WarehouseProduct
+from itcj2.apps.warehouse.services import fifo_service, product_service, stock_service
+
+from ._seed import make_product, make_user
+
+
+@pytest.fixture
+def stock(db_session, monkeypatch):
+    monkeypatch.setattr(fifo_service, "_stage_signals", lambda db, ids: None)
+    db = db_session
+    user = make_user(db)
+    products = {
+        key: make_product(db, user, code=code, name=name, department_code=dept, is_active=key != "old")
+        for key, code, name, dept in (
+            ("utp", "TSTWH-001", "Cable UTP", "tst_maint"),
+            ("tape", "TSTWH-002", "Cinta 100%", "tst_maint"),
+            ("hdmi", "TSTWH-003", "Cable HDMI", "tst_comp"),
+            ("old", "TSTWH-004", "Cable viejo", "tst_maint"),
+        )
+    }
+    return {"user": user, **products}
+
+
+def _register(db, s, product, qty, cost, purchase_date=date(2026, 1, 1)):
+    return stock_service.register_entry(db, SimpleNamespace(
+        product_id=product.id, quantity=Decimal(qty), purchase_date=purchase_date, purchase_folio="F-1",
+        unit_cost=Decimal(cost), supplier=None, notes=None,
+    ), registered_by_id=s["user"].id)
+
+
+def _totals(db, product):
+    db.refresh(product)
+    return product.stock_on_hand, product.stock_value
+
+
+def _drift(db, s, fix=False):
+    ours = {s[k].id for k in ("utp", "tape", "hdmi", "old")}
+    return [d for d in stock_service.check_stock_totals(db, fix=fix) if d["product_id"] in ours]
+
+
+def test_every_stock_operation_keeps_totals_in_sync(db_session, stock):
+    db, s, utp = db_session, stock, stock["utp"]
+    user_id = s["user"].id
+    _register(db, s, utp, "10", "2.5", date(2026, 1, 1))
+    late = _register(db, s, utp, "4", "3", date(2026, 2, 1))
+    db.commit()
+    assert _totals(db, utp) == (Decimal("14"), Decimal("37"))
+
+    # FIFO: 10 × 2.5 del primer lote + 2 × 3 del segundo
+    fifo_service.consume(db, utp.id, Decimal("12"), "maint", 7, user_id)
+    db.commit()
+    assert _totals(db, utp) == (Decimal("2"), Decimal("6"))
+
+    # La reversión repone al lote más reciente (costo 3)
+    fifo_service.revert_consumption(db, "maint", 7, utp.id, user_id)
+    db.commit()
+    assert _totals(db, utp) == (Decimal("14"), Decimal("42"))
+
+    fifo_service.adjust_stock(db, utp.id, Decimal("1"), "OUT", "merma", "rota", user_id)
+    fifo_service.adjust_stock(db, utp.id, Decimal("3"), "IN", "conteo", "sobrante", user_id)
+    db.commit()
+    assert _totals(db, utp) == (Decimal("16"), Decimal("39"))
+
+    other = _register(db, s, utp, "2", "1")
+    db.commit()
+    stock_service.void_entry(db, other.id, "capturado dos veces", user_id)
+    db.commit()
+    assert _totals(db, utp) == (Decimal("16"), Decimal("39"))
+    db.refresh(late)
+    assert late.quantity_remaining == Decimal("13")
+    assert _drift(db, s) == []
+
+
+def test_check_stock_totals_reports_and_fixes_drift(db_session, stock):
+    db, s = db_session, stock
+    utp, tape, hdmi = s["utp"], s["tape"], s["hdmi"]
+    _register(db, s, utp, "5", "2")
+    _register(db, s, hdmi, "1", "10")
+    db.commit()
+    db.execute(update(WarehouseProduct).where(WarehouseProduct.id == hdmi.id).values(stock_on_hand=7))
+    db.execute(update(WarehouseProduct).where(WarehouseProduct.id == tape.id).values(stock_value=1))
+    db.commit()
+
+    drift = _drift(db, s)
+    assert [(d["product_id"], d["expected_stock"], d["expected_value"]) for d in drift] == [
+        (tape.id, 0, 0), (hdmi.id, Decimal("1"), Decimal("10")),
+    ]
+    assert _totals(db, hdmi)[0] == Decimal("7")
+
+    assert len(_drift(db, s, fix=True)) == 2
+    assert _totals(db, hdmi) == (Decimal("1"), Decimal("10"))
+    assert _drift(db, s) == []
+
+
+def test_autocomplete_is_one_prefix_query_over_materialized_stock(db_session, stock):
+    db, s = db_session, stock
+    for key in ("utp", "tape", "hdmi"):
+        _register(db, s, s[key], "3", "1")
+    # Inactivo con stock: no se ofrece
+    db.execute(update(WarehouseProduct).where(WarehouseProduct.id == s["old"].id).values(stock_on_hand=5))
+    db.commit()
+    fifo_service.consume(db, s["tape"].id, Decimal("3"), "maint", 1, s["user"].id)  # sin stock
+    db.commit()
+
+    statements = []
+    event.listen(db.connection(), "before_cursor_execute",
+                 lambda conn, cur, stmt, *a: statements.append(stmt))
+
+    result = product_service.get_available_for_autocomplete(db, "tst_maint", "  cab")
+    assert [(p["code"], p["total_stock"]) for p in result] == [("TSTWH-001", Decimal("3"))]
+    assert len(statements) == 1
+
+    # Prefijo de código, sin distinguir mayúsculas, todos los departamentos
+    assert [p["code"] for p in product_service.get_available_for_autocomplete(db, None, "tstwh-00")] == [
+        "TSTWH-003", "TSTWH-001",
+    ]
+    # Prefijo, no subcadena; los comodines del término son literales
+    assert product_service.get_available_for_autocomplete(db, "tst_maint", "utp") == []
+    assert product_service.get_available_for_autocomplete(db, "tst_maint", "_") == []
+    assert len(product_service.get_available_for_autocomplete(db, None, limit=1)) == 1
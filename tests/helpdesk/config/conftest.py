@@ -342,26 +342,21 @@ def app_client(db_session):
 
     # Stub mínimo para que catalog_cache no intente abrir sesiones reales.
     # Los tests que prueben el cache real lo resetean con setup_method/teardown_method.
-    _orig_priorities = cc._PRIORITIES_BY_CODE
-    _orig_statuses = cc._STATUSES_BY_CODE
-    _orig_transitions_from = cc._TRANSITIONS_BY_FROM_CODE
-    _orig_transitions_full = cc._TRANSITIONS_FULL
-    _orig_areas = cc._AREAS_BY_CODE
-    _orig_templates = cc._NOTIFICATION_TEMPLATES_BY_CODE
-
-    # Poblar con dicts vacíos para que _ensure_*loaded no llamen a BD
-    if cc._PRIORITIES_BY_CODE is None:
-        cc._PRIORITIES_BY_CODE = {}
-    if cc._STATUSES_BY_CODE is None:
-        cc._STATUSES_BY_CODE = {}
-    if cc._TRANSITIONS_BY_FROM_CODE is None:
-        cc._TRANSITIONS_BY_FROM_CODE = {}
-        cc._TRANSITIONS_FULL = {}
-    if cc._AREAS_BY_CODE is None:
-        cc._AREAS_BY_CODE = {"DESARROLLO": {"code": "DESARROLLO", "is_active": True},
-                              "SOPORTE": {"code": "SOPORTE", "is_active": True}}
-    if cc._NOTIFICATION_TEMPLATES_BY_CODE is None:
-        cc._NOTIFICATION_TEMPLATES_BY_CODE = {}
+    _catalogs = (cc.PRIORITIES, cc.STATUSES, cc.TRANSITIONS, cc.AREAS, cc.NOTIFICATION_TEMPLATES)
+    _orig = [c.peek() for c in _catalogs]
+
+    # Poblar con snapshots stub para que los loaders no llamen a BD
+    _stubs = (
+        {},
+        {},
+        ({}, {}),
+        {"DESARROLLO": {"code": "DESARROLLO", "is_active": True},
+         "SOPORTE": {"code": "SOPORTE", "is_active": True}},
+        {},
+    )
+    for catalog, stub in zip(_catalogs, _stubs):
+        if catalog.peek() is None:
+            catalog.prime(stub)
 
     app = create_app()
 
@@ -386,12 +381,11 @@ def app_client(db_session):
     app.dependency_overrides.clear()
 
     # Restaurar estado original del cache
-    cc._PRIORITIES_BY_CODE = _orig_priorities
-    cc._STATUSES_BY_CODE = _orig_statuses
-    cc._TRANSITIONS_BY_FROM_CODE = _orig_transitions_from
-    cc._TRANSITIONS_FULL = _orig_transitions_full
-    cc._AREAS_BY_CODE = _orig_areas
-    cc._NOTIFICATION_TEMPLATES_BY_CODE = _orig_templates
+    for catalog, value in zip(_catalogs, _orig):
+        if value is None:
+            catalog.clear()
+        else:
+            catalog.prime(value)
 
 
 @pytest.fixture()
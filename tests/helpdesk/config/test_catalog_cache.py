@@ -84,7 +84,7 @@ class TestPrioritiesCache:
     def setup_method(self):
         """Limpia el cache antes de cada test."""
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
-        cc._PRIORITIES_BY_CODE = None
+        cc.PRIORITIES.clear()
 
     def test_get_priorities_loads_from_db_on_first_call(self):
         """Con cache vacío, get_priorities() llama a db.query para cargar datos."""
@@ -98,7 +98,7 @@ class TestPrioritiesCache:
         result = cc.get_priorities(db)
         assert db.query.called
         # El cache ahora tiene "ALTA"
-        assert "ALTA" in cc._PRIORITIES_BY_CODE
+        assert "ALTA" in cc.PRIORITIES.peek()
 
     def test_get_priorities_second_call_does_not_hit_db(self):
         """Con cache poblado, segunda llamada a get_priorities() NO golpea BD."""
@@ -120,19 +120,19 @@ class TestPrioritiesCache:
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
         # Llenar el cache manualmente
-        cc._PRIORITIES_BY_CODE = {"BAJA": {"code": "BAJA", "is_active": True}}
-        assert cc._PRIORITIES_BY_CODE is not None
+        cc.PRIORITIES.prime({"BAJA": {"code": "BAJA", "is_active": True}})
+        assert cc.PRIORITIES.peek() is not None
 
         cc.invalidate_priorities()
-        assert cc._PRIORITIES_BY_CODE is None
+        assert cc.PRIORITIES.peek() is None
 
     def test_get_priority_codes_active_only(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._PRIORITIES_BY_CODE = {
+        cc.PRIORITIES.prime({
             "ALTA": {"code": "ALTA", "is_active": True},
             "BAJA": {"code": "BAJA", "is_active": False},
-        }
+        })
         db = MagicMock()
 
         codes = cc.get_priority_codes(db, active_only=True)
@@ -142,10 +142,10 @@ class TestPrioritiesCache:
     def test_get_priority_codes_include_inactive(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._PRIORITIES_BY_CODE = {
+        cc.PRIORITIES.prime({
             "ALTA": {"code": "ALTA", "is_active": True},
             "BAJA": {"code": "BAJA", "is_active": False},
-        }
+        })
         db = MagicMock()
 
         codes = cc.get_priority_codes(db, active_only=False)
@@ -155,9 +155,9 @@ class TestPrioritiesCache:
     def test_get_sla_hours_returns_correct_value(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._PRIORITIES_BY_CODE = {
+        cc.PRIORITIES.prime({
             "URGENTE": {"code": "URGENTE", "sla_hours": 4, "is_active": True}
-        }
+        })
         db = MagicMock()
 
         assert cc.get_sla_hours(db, "URGENTE") == 4
@@ -165,14 +165,14 @@ class TestPrioritiesCache:
     def test_get_sla_hours_returns_none_for_unknown(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._PRIORITIES_BY_CODE = {}
+        cc.PRIORITIES.prime({})
         db = MagicMock()
 
         assert cc.get_sla_hours(db, "UNKNOWN") is None
 
     def teardown_method(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
-        cc._PRIORITIES_BY_CODE = None
+        cc.PRIORITIES.clear()
 
 
 # =============================================================================
@@ -182,7 +182,7 @@ class TestPrioritiesCache:
 class TestStatusesCache:
     def setup_method(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
-        cc._STATUSES_BY_CODE = None
+        cc.STATUSES.clear()
 
     def test_get_statuses_loads_on_first_call(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
@@ -192,24 +192,24 @@ class TestStatusesCache:
         db.query.return_value.order_by.return_value.all.return_value = [mock_s]
 
         with patch("itcj2.apps.helpdesk.utils.catalog_cache.TicketStatus", create=True):
-            cc._ensure_statuses_loaded(db)
+            cc.STATUSES.get(db)
 
         assert db.query.called
 
     def test_invalidate_statuses_clears_cache(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._STATUSES_BY_CODE = {"PENDING": {"code": "PENDING", "is_active": True}}
+        cc.STATUSES.prime({"PENDING": {"code": "PENDING", "is_active": True}})
         cc.invalidate_statuses()
-        assert cc._STATUSES_BY_CODE is None
+        assert cc.STATUSES.peek() is None
 
     def test_get_status_codes_active_only(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._STATUSES_BY_CODE = {
+        cc.STATUSES.prime({
             "PENDING": {"code": "PENDING", "is_active": True},
             "CLOSED": {"code": "CLOSED", "is_active": False},
-        }
+        })
         db = MagicMock()
         codes = cc.get_status_codes(db, active_only=True)
         assert "PENDING" in codes
@@ -218,7 +218,7 @@ class TestStatusesCache:
     def test_second_call_does_not_hit_db(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._STATUSES_BY_CODE = {"PENDING": {"code": "PENDING", "is_active": True}}
+        cc.STATUSES.prime({"PENDING": {"code": "PENDING", "is_active": True}})
         db = MagicMock()
 
         cc.get_statuses(db)
@@ -228,7 +228,7 @@ class TestStatusesCache:
 
     def teardown_method(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
-        cc._STATUSES_BY_CODE = None
+        cc.STATUSES.clear()
 
 
 # =============================================================================
@@ -238,8 +238,7 @@ class TestStatusesCache:
 class TestTransitionsCache:
     def setup_method(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
-        cc._TRANSITIONS_BY_FROM_CODE = None
-        cc._TRANSITIONS_FULL = None
+        cc.TRANSITIONS.clear()
 
     def test_is_transition_allowed_self_transition_always_true(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
@@ -252,8 +251,7 @@ class TestTransitionsCache:
     def test_is_transition_allowed_with_cached_data(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._TRANSITIONS_BY_FROM_CODE = {"PENDING": {"ASSIGNED"}}
-        cc._TRANSITIONS_FULL = {("PENDING", "ASSIGNED"): {"from_code": "PENDING"}}
+        cc.TRANSITIONS.prime(({"PENDING": {"ASSIGNED"}}, {("PENDING", "ASSIGNED"): {"from_code": "PENDING"}}))
         db = MagicMock()
 
         assert cc.is_transition_allowed(db, "PENDING", "ASSIGNED") is True
@@ -262,18 +260,15 @@ class TestTransitionsCache:
     def test_invalidate_transitions_clears_both_indexes(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._TRANSITIONS_BY_FROM_CODE = {"A": {"B"}}
-        cc._TRANSITIONS_FULL = {("A", "B"): {}}
+        cc.TRANSITIONS.prime(({"A": {"B"}}, {("A", "B"): {}}))
         cc.invalidate_transitions()
 
-        assert cc._TRANSITIONS_BY_FROM_CODE is None
-        assert cc._TRANSITIONS_FULL is None
+        assert cc.TRANSITIONS.peek() is None
 
     def test_get_allowed_transitions_returns_empty_set_for_unknown(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._TRANSITIONS_BY_FROM_CODE = {}
-        cc._TRANSITIONS_FULL = {}
+        cc.TRANSITIONS.prime(({}, {}))
         db = MagicMock()
 
         result = cc.get_allowed_transitions(db, "NONEXISTENT")
@@ -281,8 +276,7 @@ class TestTransitionsCache:
 
     def teardown_method(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
-        cc._TRANSITIONS_BY_FROM_CODE = None
-        cc._TRANSITIONS_FULL = None
+        cc.TRANSITIONS.clear()
 
 
 # =============================================================================
@@ -292,7 +286,7 @@ class TestTransitionsCache:
 class TestAreasCache:
     def setup_method(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
-        cc._AREAS_BY_CODE = None
+        cc.AREAS.clear()
 
     def test_get_area_codes_loads_from_db(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
@@ -302,7 +296,7 @@ class TestAreasCache:
         db.query.return_value.order_by.return_value.all.return_value = [mock_a]
 
         with patch("itcj2.apps.helpdesk.utils.catalog_cache.Area", create=True):
-            cc._ensure_areas_loaded(db)
+            cc.AREAS.get(db)
 
         assert db.query.called
 
@@ -310,7 +304,7 @@ class TestAreasCache:
         """Si la BD lanza excepción, get_area_codes devuelve {'DESARROLLO','SOPORTE'}."""
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._AREAS_BY_CODE = None
+        cc.AREAS.clear()
         db = MagicMock()
         db.query.side_effect = Exception("DB connection failed")
 
@@ -321,7 +315,7 @@ class TestAreasCache:
         """get_area_codes(None) con cache vacío devuelve {'DESARROLLO','SOPORTE'}."""
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._AREAS_BY_CODE = None
+        cc.AREAS.clear()
         # db=None lanzará AttributeError al intentar query → fallback
         result = cc.get_area_codes(None)
         assert result == {"DESARROLLO", "SOPORTE"}
@@ -330,7 +324,7 @@ class TestAreasCache:
         """Cache poblado vacío (sin áreas) también devuelve fallback."""
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._AREAS_BY_CODE = {}  # cache vacío
+        cc.AREAS.prime({})  # cache vacío
         db = MagicMock()
 
         result = cc.get_area_codes(db)
@@ -339,16 +333,16 @@ class TestAreasCache:
     def test_invalidate_areas_clears_cache(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._AREAS_BY_CODE = {"DESARROLLO": {"code": "DESARROLLO", "is_active": True}}
+        cc.AREAS.prime({"DESARROLLO": {"code": "DESARROLLO", "is_active": True}})
         cc.invalidate_areas()
-        assert cc._AREAS_BY_CODE is None
+        assert cc.AREAS.peek() is None
 
     def test_second_call_uses_cache(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._AREAS_BY_CODE = {
+        cc.AREAS.prime({
             "DESARROLLO": {"code": "DESARROLLO", "is_active": True, "display_order": 1}
-        }
+        })
         db = MagicMock()
 
         cc.get_areas(db)
@@ -357,7 +351,7 @@ class TestAreasCache:
 
     def teardown_method(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
-        cc._AREAS_BY_CODE = None
+        cc.AREAS.clear()
 
 
 # =============================================================================
@@ -367,7 +361,7 @@ class TestAreasCache:
 class TestNotificationTemplatesCache:
     def setup_method(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
-        cc._NOTIFICATION_TEMPLATES_BY_CODE = None
+        cc.NOTIFICATION_TEMPLATES.clear()
 
     def test_get_notification_template_loads_from_db(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
@@ -377,7 +371,7 @@ class TestNotificationTemplatesCache:
         db.query.return_value.all.return_value = [mock_t]
 
         with patch("itcj2.apps.helpdesk.utils.catalog_cache.NotificationTemplate", create=True):
-            cc._ensure_notification_templates_loaded(db)
+            cc.NOTIFICATION_TEMPLATES.get(db)
 
         assert db.query.called
 
@@ -385,9 +379,9 @@ class TestNotificationTemplatesCache:
         """Plantilla is_active=False devuelve None (no debe usarse)."""
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._NOTIFICATION_TEMPLATES_BY_CODE = {
+        cc.NOTIFICATION_TEMPLATES.prime({
             "ticket_created": {"code": "ticket_created", "is_active": False}
-        }
+        })
         db = MagicMock()
 
         result = cc.get_notification_template(db, "ticket_created")
@@ -396,9 +390,9 @@ class TestNotificationTemplatesCache:
     def test_get_notification_template_returns_active(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._NOTIFICATION_TEMPLATES_BY_CODE = {
+        cc.NOTIFICATION_TEMPLATES.prime({
             "ticket_resolved": {"code": "ticket_resolved", "is_active": True}
-        }
+        })
         db = MagicMock()
 
         result = cc.get_notification_template(db, "ticket_resolved")
@@ -408,16 +402,16 @@ class TestNotificationTemplatesCache:
     def test_invalidate_notification_templates_clears_cache(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._NOTIFICATION_TEMPLATES_BY_CODE = {"x": {"code": "x"}}
+        cc.NOTIFICATION_TEMPLATES.prime({"x": {"code": "x"}})
         cc.invalidate_notification_templates()
-        assert cc._NOTIFICATION_TEMPLATES_BY_CODE is None
+        assert cc.NOTIFICATION_TEMPLATES.peek() is None
 
     def test_second_call_uses_cache_not_db(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._NOTIFICATION_TEMPLATES_BY_CODE = {
+        cc.NOTIFICATION_TEMPLATES.prime({
             "ticket_created": {"code": "ticket_created", "is_active": True}
-        }
+        })
         db = MagicMock()
 
         cc.get_notification_templates(db)
@@ -426,4 +420,4 @@ class TestNotificationTemplatesCache:
 
     def teardown_method(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
-        cc._NOTIFICATION_TEMPLATES_BY_CODE = None
+        cc.NOTIFICATION_TEMPLATES.clear()
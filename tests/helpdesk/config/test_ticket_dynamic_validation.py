@@ -219,7 +219,7 @@ class TestTicketStatusFlags:
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
         # Prepoblar cache
-        cc._STATUSES_BY_CODE = {
+        cc.STATUSES.prime({
             "PENDING": {
                 "code": "PENDING",
                 "is_active": True,
@@ -227,7 +227,7 @@ class TestTicketStatusFlags:
                 "is_resolved": False,
                 "is_terminal": False,
             }
-        }
+        })
 
         flags = cc.get_status_flags("PENDING")
         assert flags is not None
@@ -235,17 +235,17 @@ class TestTicketStatusFlags:
         assert flags["is_resolved"] is False
 
         # Limpiar
-        cc._STATUSES_BY_CODE = None
+        cc.STATUSES.clear()
 
     def test_get_status_flags_returns_none_for_unknown(self):
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._STATUSES_BY_CODE = {"PENDING": {"code": "PENDING"}}
+        cc.STATUSES.prime({"PENDING": {"code": "PENDING"}})
 
         result = cc.get_status_flags("NONEXISTENT")
         assert result is None
 
-        cc._STATUSES_BY_CODE = None
+        cc.STATUSES.clear()
 
 
 # =============================================================================
@@ -257,30 +257,26 @@ class TestStatusTransitionValidation:
         """Una transición activa en cache → is_transition_allowed retorna True."""
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._TRANSITIONS_BY_FROM_CODE = {"TVAL_S1": {"TVAL_S2"}}
-        cc._TRANSITIONS_FULL = {("TVAL_S1", "TVAL_S2"): {"is_active": True}}
+        cc.TRANSITIONS.prime(({"TVAL_S1": {"TVAL_S2"}}, {("TVAL_S1", "TVAL_S2"): {"is_active": True}}))
         db = MagicMock()
 
         result = cc.is_transition_allowed(db, "TVAL_S1", "TVAL_S2")
         assert result is True
 
-        cc._TRANSITIONS_BY_FROM_CODE = None
-        cc._TRANSITIONS_FULL = None
+        cc.TRANSITIONS.clear()
 
     def test_is_transition_allowed_with_inactive_transition_returns_false(self):
         """Transición no en el cache activo → retorna False."""
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
         # Solo activas se cargan en el cache
-        cc._TRANSITIONS_BY_FROM_CODE = {"TVAL_I1": set()}  # vacío → no hay destinos activos
-        cc._TRANSITIONS_FULL = {}
+        cc.TRANSITIONS.prime(({"TVAL_I1": set()}, {}))  # vacío → no hay destinos activos
         db = MagicMock()
 
         result = cc.is_transition_allowed(db, "TVAL_I1", "TVAL_I2")
         assert result is False
 
-        cc._TRANSITIONS_BY_FROM_CODE = None
-        cc._TRANSITIONS_FULL = None
+        cc.TRANSITIONS.clear()
 
     def test_deactivating_transition_via_api_calls_invalidate(self, app_client, db_session, admin_headers):
         """
@@ -291,8 +287,7 @@ class TestStatusTransitionValidation:
         from tests.helpdesk.config.conftest import make_status, make_transition
 
         # Poblar cache para que no haya consulta de BD al preparar el test
-        cc._TRANSITIONS_BY_FROM_CODE = {"TVAL_D1": {"TVAL_D2"}}
-        cc._TRANSITIONS_FULL = {("TVAL_D1", "TVAL_D2"): {"is_active": True}}
+        cc.TRANSITIONS.prime(({"TVAL_D1": {"TVAL_D2"}}, {("TVAL_D1", "TVAL_D2"): {"is_active": True}}))
         db_val = MagicMock()
 
         # Verificar que antes del DELETE la transición está permitida
@@ -311,25 +306,22 @@ class TestStatusTransitionValidation:
         )
         assert r.status_code == 200
 
-        # El cache fue invalidado por el endpoint → ambas variables deben ser None
-        assert cc._TRANSITIONS_BY_FROM_CODE is None
-        assert cc._TRANSITIONS_FULL is None
+        # El cache fue invalidado por el endpoint → no queda snapshot local
+        assert cc.TRANSITIONS.peek() is None
 
     def test_self_transition_always_allowed_regardless_of_db(self, db_session):
         """from_code == to_code siempre retorna True sin consultar la BD."""
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._TRANSITIONS_BY_FROM_CODE = None
-        cc._TRANSITIONS_FULL = None
+        cc.TRANSITIONS.clear()
 
         # No crear ninguna transición — la BD está vacía
         result = cc.is_transition_allowed(db_session, "PENDING", "PENDING")
         assert result is True
         # La BD NO fue consultada
-        assert cc._TRANSITIONS_BY_FROM_CODE is None  # cache no fue inicializado
+        assert cc.TRANSITIONS.peek() is None  # cache no fue inicializado
 
-        cc._TRANSITIONS_BY_FROM_CODE = None
-        cc._TRANSITIONS_FULL = None
+        cc.TRANSITIONS.clear()
 
 
 # =============================================================================
@@ -341,34 +333,34 @@ class TestTicketSlaTargetHours:
         """get_sla_hours devuelve el valor del cache, que debería reflejar BD."""
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
-        cc._PRIORITIES_BY_CODE = {
+        cc.PRIORITIES.prime({
             "URGENTE_SLA": {"code": "URGENTE_SLA", "sla_hours": 4, "is_active": True}
-        }
+        })
         db = MagicMock()
 
         hours = cc.get_sla_hours(db, "URGENTE_SLA")
         assert hours == 4
 
-        cc._PRIORITIES_BY_CODE = None
+        cc.PRIORITIES.clear()
 
     def test_get_sla_hours_reflects_updated_value_after_invalidate(self):
         """Tras invalidar y recargar cache, get_sla_hours refleja el nuevo valor."""
         import itcj2.apps.helpdesk.utils.catalog_cache as cc
 
         # Estado inicial en cache
-        cc._PRIORITIES_BY_CODE = {
+        cc.PRIORITIES.prime({
             "SLA_CHG": {"code": "SLA_CHG", "sla_hours": 24, "is_active": True}
-        }
+        })
         db = MagicMock()
 
         assert cc.get_sla_hours(db, "SLA_CHG") == 24
 
         # Simular actualización: invalidar y repoblar con nuevo valor
         cc.invalidate_priorities()
-        cc._PRIORITIES_BY_CODE = {
+        cc.PRIORITIES.prime({
             "SLA_CHG": {"code": "SLA_CHG", "sla_hours": 8, "is_active": True}
-        }
+        })
 
         assert cc.get_sla_hours(db, "SLA_CHG") == 8
 
-        cc._PRIORITIES_BY_CODE = None
+        cc.PRIORITIES.clear()
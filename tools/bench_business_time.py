@@ -0,0 +1,43 @@
+"""Bench del motor de horas hábiles contra el cálculo día por día anterior.
+
+  python -m tools.bench_business_time [intervalos]
+
+Mide, sobre los mismos intervalos (2000 por defecto, tickets de hasta ~6
+meses abiertos con el calendario de días inhábiles de los tests), el bucle
+viejo, `hours_between` (O(1)) y `business_hours` (lote NumPy). Es DIRECCIONAL:
+no afirma nada sobre tiempos, solo que los tres den el mismo total. El oráculo
+es el de tests/fastapi/core/test_business_time.py, para no mantener dos copias.
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from itcj2.core.services.business_time import business_hours, hours_between, make_closures
+from tests.fastapi.core.test_business_time import HOLIDAYS, _random_intervals, _reference
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def main(n: int) -> None:
+    closures = make_closures(HOLIDAYS)
+    holidays = set(HOLIDAYS)
+    pairs = _random_intervals(random.Random(1), n)
+
+    loop, t_loop = _timed(lambda: [_reference(s, e, holidays) for s, e in pairs])
+    scalar, t_scalar = _timed(lambda: [hours_between(s, e, closures) for s, e in pairs])
+    batch, t_batch = _timed(lambda: business_hours([s for s, _ in pairs], [e for _, e in pairs], closures))
+
+    np.testing.assert_allclose(scalar, loop, atol=1e-6)
+    np.testing.assert_allclose(batch, loop, atol=1e-6)
+    print(f"{n} intervalos: bucle {t_loop:.1f} ms, O(1) {t_scalar:.1f} ms "
+          f"(x{t_loop / t_scalar:.0f}), NumPy {t_batch:.1f} ms (x{t_loop / t_batch:.0f})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,380 @@
+"""Banco reproducible: levanta `create_app()` bajo uvicorn y le tira escenarios.
+
+A diferencia de `bench.py`/`socket_flood.py`, NO necesita Docker, la réplica del
+nginx del host ni la BD de dev compartida: basta un PostgreSQL y un Redis
+locales (los de `DATABASE_URL` / `REDIS_URL` del entorno, con el esquema
+migrado y algo de datos). El objetivo no es medir capacidad de producción sino
+tener una línea base en JSON que se pueda comparar entre commits.
+
+    # correr un escenario y guardar la línea base
+    PYTHONPATH=. python tools/loadtest/harness.py run agendatec_herd \\
+        --procs 4 --conc 25 --duration 20 --out /tmp/herd_main.json
+
+    # comparar contra otra corrida (p. ej. la rama)
+    PYTHONPATH=. python tools/loadtest/harness.py compare /tmp/herd_main.json /tmp/herd_rama.json
+
+    # escenarios disponibles
+    PYTHONPATH=. python tools/loadtest/harness.py list
+
+Qué mide:
+- Latencia por petición (p50/p95/p99) global y por etiqueta del escenario,
+  vista desde el cliente.
+- Queries a la BD por petición: el servidor cuenta los `before_cursor_execute`
+  de cada request (contextvar) y lo devuelve en la cabecera `X-Bench-Queries`.
+- Pico de conexiones del pool de SQLAlchemy fuera (checkout - checkin), para
+  comparar contra `DB_POOL_SIZE + DB_MAX_OVERFLOW`.
+
+El generador corre en `--procs` procesos con `--conc` corrutinas httpx cada
+uno: con un solo proceso Python el cliente se satura antes que el servidor
+(ver README, "Trampas"). El servidor es UN worker uvicorn en su propio proceso.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import json
+import multiprocessing as mp
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+_BENCH_PREFIX = "/__bench"
+_QUERIES_HEADER = "x-bench-queries"
+
+
+# ---------------------------------------------------------------------------
+# Servidor instrumentado (proceso hijo)
+# ---------------------------------------------------------------------------
+def _instrument(app) -> None:
+    """Cuenta queries por request y el pico de conexiones del pool."""
+    from sqlalchemy import event
+
+    from itcj2.database import engine
+
+    current = contextvars.ContextVar("bench_queries", default=None)
+    pool = {"out": 0, "peak": 0, "requests": 0, "queries": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _on_query(conn, cursor, statement, parameters, context, executemany):
+        pool["queries"] += 1
+        box = current.get()
+        if box is not None:
+            box[0] += 1
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        pool["out"] += 1
+        pool["peak"] = max(pool["peak"], pool["out"])
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        pool["out"] -= 1
+
+    # Middleware ASGI puro: el contextvar se copia a los hilos del threadpool
+    # donde corren los endpoints sync, y la caja (lista) es compartida.
+    inner = app.build_middleware_stack()
+
+    async def counted(scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(_BENCH_PREFIX):
+            return await inner(scope, receive, send)
+        box = [0]
+        token = current.set(box)
+        pool["requests"] += 1
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (_QUERIES_HEADER.encode(), str(box[0]).encode())
+                ]
+            await send(message)
+
+        try:
+            await inner(scope, receive, _send)
+        finally:
+            current.reset(token)
+
+    app.middleware_stack = counted
+
+    @app.get(f"{_BENCH_PREFIX}/stats", include_in_schema=False)
+    def _stats():
+        from itcj2.config import get_settings
+        s = get_settings()
+        return {
+            "pool_peak": pool["peak"],
+            "pool_out": pool["out"],
+            "pool_limit": s.DB_POOL_SIZE + s.DB_MAX_OVERFLOW,
+            "requests": pool["requests"],
+            "queries": pool["queries"],
+        }
+
+    @app.post(f"{_BENCH_PREFIX}/reset", include_in_schema=False)
+    def _reset():
+        pool.update(peak=pool["out"], requests=0, queries=0)
+        return {"ok": True}
+
+
+def _serve(port: int) -> None:
+    import uvicorn
+
+    from itcj2.main import create_app
+
+    app = create_app()
+    _instrument(app)
+    uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=port, log_level="warning", lifespan="on",
+    )).run()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base: str, proc: mp.Process, timeout: float = 60) -> None:
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if not proc.is_alive():
+            raise SystemExit("el servidor murió al arrancar (revisar DATABASE_URL / REDIS_URL)")
+        try:
+            if httpx.get(f"{base}/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise SystemExit(f"el servidor no respondió /ready en {timeout:.0f}s")
+
+
+# ---------------------------------------------------------------------------
+# Generador de carga (procesos hijos)
+# ---------------------------------------------------------------------------
+async def _drive(base: str, plan: dict, worker: int, conc: int, duration: float) -> dict:
+    import httpx
+
+    tokens, steps = plan["tokens"], plan["steps"]
+    samples: list[tuple[str, int, float, int]] = []
+    limits = httpx.Limits(max_connections=conc, max_keepalive_connections=conc)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+
+        async def vu(i: int):
+            vu_id = worker * conc + i
+            headers = {"Cookie": f"itcj_token={tokens[vu_id % len(tokens)]}"}
+            k = vu_id % len(steps)
+            while time.perf_counter() < deadline:
+                step = steps[k % len(steps)]
+                k += 1
+                t0 = time.perf_counter()
+                try:
+                    r = await client.request(step["method"], step["path"], headers=headers)
+                    status = r.status_code
+                    queries = int(r.headers.get(_QUERIES_HEADER, -1))
+                except httpx.HTTPError as e:
+                    status, queries = f"error:{type(e).__name__}", -1
+                samples.append((step["label"], status, time.perf_counter() - t0, queries))
+
+        await asyncio.gather(*(vu(i) for i in range(conc)))
+    return {"samples": samples}
+
+
+def _load_worker(args) -> dict:
+    base, plan, worker, conc, duration = args
+    return asyncio.run(_drive(base, plan, worker, conc, duration))
+
+
+# ---------------------------------------------------------------------------
+# Reporte
+# ---------------------------------------------------------------------------
+def _pct(sorted_vals: list[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, int(round(p / 100 * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+def _summary(samples: list[tuple], duration: float) -> dict:
+    lat = sorted(s[2] * 1000 for s in samples)
+    queries = sorted(s[3] for s in samples if s[3] >= 0)
+    codes = Counter(str(s[1]) for s in samples)
+    errors = sum(n for c, n in codes.items() if not c.startswith(("2", "3")))
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / duration, 1) if duration else 0.0,
+        "p50_ms": round(_pct(lat, 50), 1),
+        "p95_ms": round(_pct(lat, 95), 1),
+        "p99_ms": round(_pct(lat, 99), 1),
+        "queries_per_request": {
+            "mean": round(statistics.fmean(queries), 2) if queries else None,
+            "p95": _pct(queries, 95) if queries else None,
+            "max": queries[-1] if queries else None,
+        },
+        "status_codes": dict(sorted(codes.items())),
+    }
+
+
+def _git_sha() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT, text=True, stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return None
+
+
+def run(scenario_name: str, procs: int, conc: int, duration: float, users: int,
+        warmup: float, out: str | None) -> dict:
+    import httpx
+
+    from itcj2.database import SessionLocal
+    from scenarios import SCENARIOS
+
+    scenario = SCENARIOS.get(scenario_name)
+    if scenario is None:
+        raise SystemExit(f"escenario desconocido: {scenario_name} (ver `list`)")
+
+    with SessionLocal() as db:
+        plan = scenario.setup(db, users)
+    # Los tokens son de usuarios reales: nada de escrituras (ver scenarios.py)
+    writes = sorted({s["label"] for s in plan["steps"] if s["method"] != "GET"})
+    if writes:
+        raise SystemExit(f"{scenario_name}: pasos que escriben ({', '.join(writes)}); los escenarios son solo lectura")
+
+    ctx = mp.get_context("spawn")
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = ctx.Process(target=_serve, args=(port,), daemon=True)
+    server.start()
+    try:
+        _wait_ready(base, server)
+
+        with ctx.Pool(procs) as pool:
+            if warmup > 0:
+                pool.map(_load_worker, [(base, plan, w, conc, warmup) for w in range(procs)])
+            httpx.post(f"{base}{_BENCH_PREFIX}/reset")
+
+            t0 = time.perf_counter()
+            results = pool.map(_load_worker, [(base, plan, w, conc, duration) for w in range(procs)])
+            elapsed = time.perf_counter() - t0
+
+        server_stats = httpx.get(f"{base}{_BENCH_PREFIX}/stats").json()
+    finally:
+        server.terminate()
+        server.join(10)
+
+    samples = [s for r in results for s in r["samples"]]
+    by_label: dict[str, list] = defaultdict(list)
+    for s in samples:
+        by_label[s[0]].append(s)
+
+    report = {
+        "scenario": scenario_name,
+        "git_sha": _git_sha(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"procs": procs, "conc": conc, "duration": duration, "users": len(plan["tokens"])},
+        "totals": _summary(samples, elapsed),
+        "by_label": {k: _summary(v, elapsed) for k, v in sorted(by_label.items())},
+        "server": server_stats,
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if out:
+        with open(out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return report
+
+
+# Métricas que se comparan; True = más alto es mejor.
+_COMPARE = [
+    ("rps", True),
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("errors", False),
+]
+
+
+def _fmt_delta(a, b, higher_better: bool) -> str:
+    if a in (None, 0) or b is None:
+        return f"{a} -> {b}"
+    pct = (b - a) / a * 100
+    better = pct > 0 if higher_better else pct < 0
+    mark = "" if abs(pct) < 5 else (" (mejor)" if better else " (PEOR)")
+    return f"{a} -> {b} ({pct:+.1f}%){mark}"
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    if old["scenario"] != new["scenario"]:
+        print(f"aviso: escenarios distintos ({old['scenario']} vs {new['scenario']})")
+    if old["config"] != new["config"]:
+        print(f"aviso: configuración distinta ({old['config']} vs {new['config']})")
+    print(f"{old['scenario']}: {old.get('git_sha')} -> {new.get('git_sha')}")
+
+    sections = [("TOTAL", old["totals"], new["totals"])] + [
+        (label, old["by_label"][label], new["by_label"][label])
+        for label in sorted(set(old["by_label"]) & set(new["by_label"]))
+    ]
+    for name, a, b in sections:
+        print(f"\n[{name}]")
+        for key, higher in _COMPARE:
+            print(f"  {key:<10} {_fmt_delta(a[key], b[key], higher)}")
+        qa, qb = a["queries_per_request"], b["queries_per_request"]
+        print(f"  {'queries':<10} {_fmt_delta(qa['mean'], qb['mean'], False)}  (max {qa['max']} -> {qb['max']})")
+
+    print("\n[SERVIDOR]")
+    print(f"  pool_peak  {old['server']['pool_peak']} -> {new['server']['pool_peak']}"
+          f" (límite {new['server']['pool_limit']})")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="corre un escenario y emite la línea base JSON")
+    p_run.add_argument("scenario")
+    p_run.add_argument("--procs", type=int, default=max(1, min(4, (os.cpu_count() or 2) - 1)))
+    p_run.add_argument("--conc", type=int, default=25, help="corrutinas por proceso generador")
+    p_run.add_argument("--duration", type=float, default=20, help="segundos medidos")
+    p_run.add_argument("--warmup", type=float, default=3, help="segundos de calentamiento (no se miden)")
+    p_run.add_argument("--users", type=int, default=200, help="usuarios distintos a tomar de la BD")
+    p_run.add_argument("--out", help="archivo JSON de salida")
+
+    p_cmp = sub.add_parser("compare", help="compara dos líneas base JSON")
+    p_cmp.add_argument("old")
+    p_cmp.add_argument("new")
+
+    sub.add_parser("list", help="lista los escenarios")
+
+    args = parser.parse_args(argv)
+    if args.cmd == "run":
+        run(args.scenario, args.procs, args.conc, args.duration, args.users, args.warmup, args.out)
+    elif args.cmd == "compare":
+        compare(args.old, args.new)
+    else:
+        from scenarios import SCENARIOS
+        for s in SCENARIOS.values():
+            print(f"{s.name:<20} {s.description}")
+
+
+if __name__ == "__main__":
+    main()
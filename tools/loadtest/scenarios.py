@@ -0,0 +1,169 @@
+"""Escenarios guionizados para `harness.py`.
+
+Cada escenario tiene un `setup(db)` que corre UNA vez en el proceso padre contra
+la BD local y devuelve lo que necesitan los generadores (todo JSON-serializable,
+porque viaja a otros procesos):
+
+    {"tokens": [jwt, ...],            # un usuario virtual usa tokens[i % len]
+     "steps":  [{"label", "method", "path"}, ...]}
+
+Los usuarios virtuales recorren `steps` en ciclo, cada uno empezando en un
+offset distinto para que no pidan todos lo mismo en el mismo instante. Para
+darle más peso a una petición, repetirla en la lista.
+
+Los usuarios salen de la BD (no se inventan ids): con ids que no existen las
+dependencias de roles responden 403 antes de llegar al código que se quiere
+medir, y el banco mediría solo el rechazo. Por lo mismo los pasos son SOLO
+LECTURA: actúan como usuarios reales y un PATCH/POST les cambiaría datos (p. ej.
+`mark-all-read` les borraría los no leídos) en la BD contra la que se corra.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    description: str
+    setup: Callable[[Session, int], dict]
+
+
+def _token(user_id: int, role: str) -> str:
+    from itcj2.core.utils.jwt_tools import encode_jwt
+    return encode_jwt({"sub": str(user_id), "role": role, "cn": f"BENCH{user_id}"})
+
+
+def _users_with_app_role(db: Session, app_key: str, role_name: str, limit: int) -> list[int]:
+    from itcj2.core.models.app import App
+    from itcj2.core.models.role import Role
+    from itcj2.core.models.user_app_role import UserAppRole
+
+    rows = (
+        db.query(UserAppRole.user_id)
+        .join(Role, Role.id == UserAppRole.role_id)
+        .join(App, App.id == UserAppRole.app_id)
+        .filter(App.key == app_key, Role.name == role_name)
+        .order_by(UserAppRole.user_id)
+        .limit(limit)
+        .all()
+    )
+    return [r[0] for r in rows]
+
+
+def _any_user_ids(db: Session, limit: int) -> list[int]:
+    from itcj2.core.models.user import User
+
+    rows = db.query(User.id).filter(User.is_active == True).order_by(User.id).limit(limit).all()  # noqa: E712
+    return [r[0] for r in rows]
+
+
+# ---------------------------------------------------------------------------
+# AgendaTec: herd de alumnos al abrir la ventana de admisión
+# ---------------------------------------------------------------------------
+def _setup_agendatec_herd(db: Session, users: int) -> dict:
+    from itcj2.apps.agendatec.models.period_enabled_day import PeriodEnabledDay
+    from itcj2.core.models.program_coordinator import ProgramCoordinator
+    from itcj2.core.services import period_service
+
+    student_ids = _users_with_app_role(db, "agendatec", "student", users)
+    if not student_ids:
+        raise SystemExit("agendatec_herd: no hay alumnos con rol agendatec/student en la BD")
+
+    period = period_service.get_active_period(db)
+    day = None
+    if period:
+        first = (
+            db.query(PeriodEnabledDay.day)
+            .filter(PeriodEnabledDay.period_id == period.id)
+            .order_by(PeriodEnabledDay.day)
+            .first()
+        )
+        day = first[0] if first else None
+    day = (day or date.today()).isoformat()
+
+    pc = db.query(ProgramCoordinator.program_id).order_by(ProgramCoordinator.program_id).first()
+    if not pc:
+        raise SystemExit("agendatec_herd: no hay carreras con coordinador en la BD")
+    pid = pc[0]
+
+    base = "/api/agendatec/v2"
+    return {
+        "tokens": [_token(uid, "student") for uid in student_ids],
+        "steps": [
+            {"label": "requests_mine", "method": "GET", "path": f"{base}/requests/mine"},
+            {"label": "program_days", "method": "GET", "path": f"{base}/availability/program/{pid}/days"},
+            {"label": "program_slots", "method": "GET",
+             "path": f"{base}/availability/program/{pid}/slots?day={day}"},
+            {"label": "program_slots", "method": "GET",
+             "path": f"{base}/availability/program/{pid}/slots?day={day}"},
+            {"label": "unread_counts", "method": "GET", "path": "/api/core/v2/notifications/unread-counts"},
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Help-Desk: dashboard de admin (consultas agregadas pesadas)
+# ---------------------------------------------------------------------------
+def _setup_helpdesk_dashboard(db: Session, users: int) -> dict:
+    # role=admin en el token bypasea require_perms: mide la consulta, no el authz.
+    ids = _any_user_ids(db, min(users, 10))
+    if not ids:
+        raise SystemExit("helpdesk_dashboard: la BD no tiene usuarios activos")
+
+    base = "/api/help-desk/v2"
+    return {
+        "tokens": [_token(uid, "admin") for uid in ids],
+        "steps": [
+            {"label": "admin_overview", "method": "GET", "path": f"{base}/dashboard/admin-overview?preset=month"},
+            {"label": "admin_overview", "method": "GET", "path": f"{base}/dashboard/admin-overview"},
+            {"label": "stats_global", "method": "GET", "path": f"{base}/stats/global"},
+            {"label": "stats_by_department", "method": "GET", "path": f"{base}/stats/by-department"},
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Notificaciones: ráfaga de campanitas (lista + conteos)
+# ---------------------------------------------------------------------------
+def _setup_notification_burst(db: Session, users: int) -> dict:
+    ids = _any_user_ids(db, users)
+    if not ids:
+        raise SystemExit("notification_burst: la BD no tiene usuarios activos")
+
+    base = "/api/core/v2/notifications"
+    return {
+        "tokens": [_token(uid, "staff") for uid in ids],
+        "steps": [
+            {"label": "unread_counts", "method": "GET", "path": f"{base}/unread-counts"},
+            {"label": "unread_counts", "method": "GET", "path": f"{base}/unread-counts"},
+            {"label": "list", "method": "GET", "path": f"{base}?limit=20"},
+            {"label": "list_unread", "method": "GET", "path": f"{base}?unread=true&limit=20"},
+        ],
+    }
+
+
+SCENARIOS: dict[str, Scenario] = {
+    s.name: s
+    for s in (
+        Scenario(
+            "agendatec_herd",
+            "Alumnos abriendo AgendaTec: /requests/mine, días y slots de una carrera, campanita",
+            _setup_agendatec_herd,
+        ),
+        Scenario(
+            "helpdesk_dashboard",
+            "Admins refrescando el dashboard de Help-Desk y las estadísticas globales",
+            _setup_helpdesk_dashboard,
+        ),
+        Scenario(
+            "notification_burst",
+            "Ráfaga de campanitas: conteos y listas (solo lectura)",
+            _setup_notification_burst,
+        ),
+    )
+}